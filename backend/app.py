@@ -2,12 +2,23 @@ from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
 import logging
 import os
+import time
 import requests
 from modules.personne import personne_bp
 from modules.specialite_bp import specialite_bp
 from modules.universite_bp import universite_bp
 from modules.search import search_bp
-from sparql_utils import sparql_utils
+from sparql_utils import sparql_utils, RESULT_TYPED
+from streaming import requested_stream_format, stream_query_response
+from pagination import PaginationError
+from class_hierarchy import class_hierarchy
+from materialized_stats import materialized_stats
+from facet_index import facet_index
+from text_index import text_index
+from autocomplete import autocomplete, MAX_SUGGESTIONS
+from graph_index import graph_index
+from query_templates import templates, TemplateBindingError
+from http_cache import http_cache
 from modules.cours_bp import cours_bp
 from modules.competences_bp import competences_bp
 from modules.projets_bp import projets_bp
@@ -18,6 +29,8 @@ from modules.orientations_bp import orientations_bp
 
 app = Flask(__name__)
 CORS(app)
+# ETag / 304 / Cache-Control des lectures, d'après la version du jeu de données
+http_cache.init_app(app)
 
 # Basic logger setup to avoid NameError in exception handlers
 logging.basicConfig(level=logging.INFO)
@@ -36,6 +49,27 @@ app.register_blueprint(technologies_bp, url_prefix='/api')
 app.register_blueprint(evaluations_bp, url_prefix='/api')
 app.register_blueprint(orientations_bp, url_prefix='/api')
 
+# Fermeture de rdfs:subClassOf calculée au démarrage (recalculée après écriture sur l'ontologie)
+class_hierarchy.refresh()
+# Statistiques calculées une fois puis maintenues par les écritures (recalcul complet périodique)
+materialized_stats.start()
+# Index des facettes (bitsets) des endpoints /facets, déclarées par les blueprints
+facet_index.start()
+# Index plein texte des libellés pour les endpoints /search
+text_index.start()
+# Trie des libellés pour /api/autocomplete
+autocomplete.start()
+# Graphe en tableaux CSR pour /api/ontology/graph, ses voisinages et ses statistiques
+graph_index.start()
+
+@app.errorhandler(PaginationError)
+def handle_pagination_error(error):
+    return jsonify({"error": str(error)}), 400
+
+@app.errorhandler(TemplateBindingError)
+def handle_template_binding_error(error):
+    return jsonify({"error": str(error)}), 400
+
 @app.route('/')
 def home():
     return jsonify({"message": "Education Intelligente Platform API is running!"})
@@ -45,6 +79,57 @@ def health_check():
     """Endpoint de santé de l'API"""
     return jsonify({"status": "OK", "message": "API fonctionnelle"})
 
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Compteurs du cache des résultats SPARQL, des requêtes regroupées (single-flight) et des index dérivés"""
+    single_flight = sparql_utils.single_flight.stats() if sparql_utils.single_flight else {"enabled": False}
+    derived = {
+        "single_flight": single_flight,
+        "materialized_stats": materialized_stats.status(),
+        "facet_index": facet_index.status(),
+        "text_index": text_index.status(),
+        "autocomplete": autocomplete.status(),
+        "graph_index": graph_index.status(),
+        "query_templates": templates.status(),
+        "http_cache": http_cache.status()
+    }
+    if sparql_utils.cache is None:
+        return jsonify({"enabled": False, **derived})
+    return jsonify({"enabled": True, **sparql_utils.cache.stats(), **derived})
+
+@app.route('/api/cache/refresh', methods=['POST'])
+def refresh_caches():
+    """À appeler après une modification du dataset faite hors de l'API (load_data.py) :
+    caches vidés, index dérivés recalculés à la lecture suivante, ETags renouvelés"""
+    version = sparql_utils.notify_external_update()
+    return jsonify({"status": "success", "dataset_version": version})
+
+@app.route('/api/autocomplete', methods=['GET'])
+def get_autocomplete():
+    """Suggestions de libellés pendant la saisie : ?q=univ&types=Universite,Cours&limit=10"""
+    text = request.args.get('q', '')
+    classes_by_name = {name.lower(): name for name in autocomplete.classes}
+    requested = [name.strip() for name in request.args.get('types', '').split(',') if name.strip()]
+    unknown = [name for name in requested if name.lower() not in classes_by_name]
+    if unknown:
+        return jsonify({
+            "error": f"Type(s) inconnu(s): {', '.join(unknown)}. Types acceptés: {', '.join(autocomplete.classes)}"
+        }), 400
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_SUGGESTIONS:
+        return jsonify({"error": f"limit doit être un entier entre 1 et {MAX_SUGGESTIONS}"}), 400
+
+    started = time.perf_counter()
+    suggestions = autocomplete.complete(text, [classes_by_name[name.lower()] for name in requested], limit)
+    return jsonify({
+        "query": text,
+        "suggestions": suggestions,
+        "took_ms": round((time.perf_counter() - started) * 1000, 3)
+    })
+
 @app.route('/api/test', methods=['GET'])
 def test_connection():
     """Test de connexion à Fuseki et aux données"""
@@ -57,7 +142,6 @@ def test_connection():
             
         # Test simple de comptage
         query = "SELECT (COUNT(*) as ?count) WHERE { ?s ?p ?o }"
-        results = sparql_utils.execute_query(query)
         
         # Test des personnes
         personnes_query = """
@@ -66,7 +150,6 @@ def test_connection():
             ?personne a edu:Personne .
         }
         """
-        personnes_results = sparql_utils.execute_query(personnes_query)
         
         # Test des étudiants
         etudiants_query = """
@@ -75,7 +158,6 @@ def test_connection():
             ?etudiant a edu:Etudiant .
         }
         """
-        etudiants_results = sparql_utils.execute_query(etudiants_query)
         
         # Test des enseignants
         enseignants_query = """
@@ -84,7 +166,6 @@ def test_connection():
             ?enseignant a edu:Enseignant .
         }
         """
-        enseignants_results = sparql_utils.execute_query(enseignants_query)
         
         # Test des cours
         cours_query = """
@@ -93,19 +174,41 @@ def test_connection():
             ?cours a edu:Cours .
         }
         """
-        cours_results = sparql_utils.execute_query(cours_query)
         
-        return jsonify({
-            "status": "success",
-            "message": "Connexion Fuseki OK",
-            "data_summary": {
-                "total_triplets": results[0].get('count', 0) if results else 0,
-                "total_personnes": personnes_results[0].get('personne_count', 0) if personnes_results else 0,
-                "total_etudiants": etudiants_results[0].get('etudiant_count', 0) if etudiants_results else 0,
-                "total_enseignants": enseignants_results[0].get('enseignant_count', 0) if enseignants_results else 0,
-                "total_cours": cours_results[0].get('cours_count', 0) if cours_results else 0
-            }
+        # Les cinq comptages sont indépendants : on les exécute en parallèle
+        results = sparql_utils.execute_many({
+            "total_triplets": query,
+            "total_personnes": personnes_query,
+            "total_etudiants": etudiants_query,
+            "total_enseignants": enseignants_query,
+            "total_cours": cours_query
         })
+        count_keys = {
+            "total_triplets": "count",
+            "total_personnes": "personne_count",
+            "total_etudiants": "etudiant_count",
+            "total_enseignants": "enseignant_count",
+            "total_cours": "cours_count"
+        }
+        
+        data_summary = {}
+        errors = {}
+        for name, rows in results.items():
+            if isinstance(rows, dict) and "error" in rows:
+                errors[name] = rows["error"]
+                data_summary[name] = 0
+            else:
+                data_summary[name] = rows[0].get(count_keys[name], 0) if rows else 0
+        
+        response = {
+            "status": "success" if not errors else "partial",
+            "message": "Connexion Fuseki OK",
+            "backend": sparql_utils.backend.describe(),
+            "data_summary": data_summary
+        }
+        if errors:
+            response["errors"] = errors
+        return jsonify(response)
         
     except Exception as e:
         app.logger.error(f"Erreur test Fuseki: {str(e)}")
@@ -126,89 +229,10 @@ def get_ontology_stats():
                 "message": "SPARQL utils non initialisé"
             }), 500
         
-        # Requête pour compter toutes les classes principales
-        stats_query = """
-        PREFIX edu: <http://www.education-intelligente.org/ontologie#>
-        PREFIX owl: <http://www.w3.org/2002/07/owl#>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        
-        SELECT 
-            (COUNT(DISTINCT ?class) as ?total_classes)
-            (COUNT(DISTINCT ?property) as ?total_properties)
-            (COUNT(DISTINCT ?individual) as ?total_individuals)
-        WHERE {
-            {
-                ?class a owl:Class .
-                FILTER(STRSTARTS(STR(?class), "http://www.education-intelligente.org/ontologie#"))
-            } UNION {
-                ?property a owl:ObjectProperty .
-                FILTER(STRSTARTS(STR(?property), "http://www.education-intelligente.org/ontologie#"))
-            } UNION {
-                ?property a owl:DatatypeProperty .
-                FILTER(STRSTARTS(STR(?property), "http://www.education-intelligente.org/ontologie#"))
-            } UNION {
-                ?individual a ?class .
-                FILTER(STRSTARTS(STR(?class), "http://www.education-intelligente.org/ontologie#"))
-            }
-        }
-        """
-        
-        results = sparql_utils.execute_query(stats_query)
-        
-        # Requête pour compter les instances par type
-        instances_query = """
-        PREFIX edu: <http://www.education-intelligente.org/ontologie#>
-        
-        SELECT 
-            (COUNT(DISTINCT ?personne) as ?personnes)
-            (COUNT(DISTINCT ?etudiant) as ?etudiants)
-            (COUNT(DISTINCT ?enseignant) as ?enseignants)
-            (COUNT(DISTINCT ?cours) as ?cours)
-            (COUNT(DISTINCT ?universite) as ?universites)
-            (COUNT(DISTINCT ?specialite) as ?specialites)
-            (COUNT(DISTINCT ?competence) as ?competences)
-            (COUNT(DISTINCT ?projet) as ?projets)
-            (COUNT(DISTINCT ?ressource) as ?ressources)
-            (COUNT(DISTINCT ?technologie) as ?technologies)
-        WHERE {
-            OPTIONAL { ?personne a edu:Personne }
-            OPTIONAL { ?etudiant a edu:Etudiant }
-            OPTIONAL { ?enseignant a edu:Enseignant }
-            OPTIONAL { ?cours a edu:Cours }
-            OPTIONAL { ?universite a edu:Universite }
-            OPTIONAL { ?specialite a edu:Specialite }
-            OPTIONAL { ?competence a edu:Competence }
-            OPTIONAL { ?projet a edu:ProjetAcademique }
-            OPTIONAL { ?ressource a edu:RessourcePedagogique }
-            OPTIONAL { ?technologie a edu:TechnologieEducative }
-        }
-        """
-        
-        instances_results = sparql_utils.execute_query(instances_query)
-        
-        # Requête pour obtenir les informations de l'ontologie
-        ontology_info_query = """
-        PREFIX edu: <http://www.education-intelligente.org/ontologie#>
-        PREFIX terms: <http://purl.org/dc/terms/>
-        
-        SELECT ?title ?description ?version ?creator ?created
-        WHERE {
-            ?ontology a owl:Ontology .
-            OPTIONAL { ?ontology terms:title ?title }
-            OPTIONAL { ?ontology terms:description ?description }
-            OPTIONAL { ?ontology owl:versionInfo ?version }
-            OPTIONAL { ?ontology terms:creator ?creator }
-            OPTIONAL { ?ontology terms:created ?created }
-        }
-        """
-        
-        ontology_info = sparql_utils.execute_query(ontology_info_query)
-        
+        # Agrégats matérialisés : tenus à jour à chaque écriture, sans requête ici
         return jsonify({
             "status": "success",
-            "ontology_info": ontology_info[0] if ontology_info else {},
-            "statistics": results[0] if results else {},
-            "instances": instances_results[0] if instances_results else {}
+            **materialized_stats.ontology_stats()
         })
         
     except Exception as e:
@@ -217,79 +241,58 @@ def get_ontology_stats():
             "message": f"Erreur lors de la récupération des statistiques: {str(e)}"
         }), 500
 
+# Classes dont les individus forment le graphe de /api/ontology/graph (sous-classes comprises)
+GRAPH_CLASSES = ('Personne', 'Cours', 'Universite', 'Specialite', 'Competence')
+GRAPH_MAX_TRIPLES = 2000
+NEIGHBORS_MAX_DEPTH = 3
+NEIGHBORS_MAX_NODES = 2000
+
 @app.route('/api/ontology/graph', methods=['GET'])
 def get_ontology_graph():
     """Return nodes and edges for a graph visualization focused on education domain."""
     try:
-        # Build a SPARQL query that returns individuals of the main classes and their outgoing properties
-        query = '''
-        PREFIX edu: <http://www.education-intelligente.org/ontologie#>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-
-        SELECT DISTINCT ?s ?sLabel ?type ?p ?pLabel ?o ?oLabel WHERE {
-            ?s a ?type .
-            # include types that are the class itself or subclasses
-            ?type rdfs:subClassOf* ?superType .
-            VALUES ?superType { edu:Personne edu:Etudiant edu:Enseignant edu:Cours edu:Universite edu:Specialite edu:Competence }
-            OPTIONAL { ?s rdfs:label ?sLabel }
-            OPTIONAL {
-                ?s ?p ?o .
-                OPTIONAL { ?p rdfs:label ?pLabel }
-                OPTIONAL { ?o rdfs:label ?oLabel }
-            }
-        }
-        LIMIT 2000
-        '''
-
-        sparql_utils.sparql.setQuery(query)
-        results = sparql_utils.sparql.query().convert()
-
-        nodes = {}
-        edges = []
-
-        for b in results.get('results', {}).get('bindings', []):
-            s = b.get('s', {}).get('value')
-            t = b.get('type', {}).get('value')
-            if not s:
-                continue
-            sLabel = b.get('sLabel', {}).get('value')
-
-            if s not in nodes:
-                nodes[s] = { 'id': s, 'label': sLabel or s.split('#')[-1].split('/')[-1], 'types': [], 'properties': {} }
-            if t and t not in nodes[s]['types']:
-                nodes[s]['types'].append(t)
-
-            # handle p/o
-            if 'p' in b and 'o' in b:
-                pval = b['p']['value']
-                pLabel = b.get('pLabel', {}).get('value')
-                o = b['o']
-                otype = o.get('type')
-                oval = o.get('value')
-                oLabel = b.get('oLabel', {}).get('value')
-                if otype == 'uri':
-                    # ensure target node exists
-                    if oval not in nodes:
-                        nodes[oval] = { 'id': oval, 'label': oLabel or oval.split('#')[-1].split('/')[-1], 'types': [], 'properties': {} }
-                    # skip rdf:type triples as edges
-                    if pval != 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type':
-                        edges.append({ 'source': s, 'target': oval, 'predicate': pval, 'predicateLabel': pLabel or (pval.split('#')[-1].split('/')[-1]) })
-                else:
-                    # literal -> store as property on subject
-                    nodes[s]['properties'].setdefault(pval, []).append(oval)
-
-        # Convert nodes dict to list
-        nodes_list = []
-        for n in nodes.values():
-            nodes_list.append(n)
-
-        return jsonify({ 'nodes': nodes_list, 'edges': edges })
+        # Read from the in-memory CSR index, kept in sync with writes (no SPARQL query here)
+        return jsonify(graph_index.ontology_graph(GRAPH_CLASSES, GRAPH_MAX_TRIPLES))
 
     except Exception as e:
         app.logger.error(f"Erreur building ontology graph: {str(e)}")
         return jsonify({ 'error': str(e) }), 500
 
+@app.route('/api/ontology/graph/neighbors', methods=['GET'])
+def get_graph_neighbors():
+    """Voisinage d'une entité : ?uri=<IRI>&depth=1&limit=200 (liens dans les deux sens)"""
+    uri = request.args.get('uri', '')
+    if not uri:
+        return jsonify({"error": "Le paramètre uri est requis"}), 400
+    try:
+        depth = int(request.args.get('depth', 1))
+        limit = int(request.args.get('limit', 200))
+    except ValueError:
+        depth = limit = 0
+    if not 1 <= depth <= NEIGHBORS_MAX_DEPTH or not 1 <= limit <= NEIGHBORS_MAX_NODES:
+        return jsonify({
+            "error": f"depth doit être entre 1 et {NEIGHBORS_MAX_DEPTH}, limit entre 1 et {NEIGHBORS_MAX_NODES}"
+        }), 400
+    try:
+        neighborhood = graph_index.neighborhood(uri, depth, limit)
+    except Exception as e:
+        app.logger.error(f"Erreur voisinage du graphe: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    if neighborhood is None:
+        return jsonify({"error": f"Entité inconnue: {uri}"}), 404
+    return jsonify(neighborhood)
+
+@app.route('/api/ontology/graph/stats', methods=['GET'])
+def get_graph_stats():
+    """Taille du graphe, liens par prédicat, classes les plus peuplées et nœuds les plus connectés"""
+    try:
+        return jsonify({"status": "success", **graph_index.stats()})
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Erreur lors du calcul des statistiques du graphe: {str(e)}"
+        }), 500
+
 @app.route('/api/education-stats', methods=['GET'])
 def get_education_stats():
     """Récupère les statistiques spécifiques au domaine éducatif"""
@@ -300,49 +303,9 @@ def get_education_stats():
                 "message": "SPARQL utils non initialisé"
             }), 500
         
-        # Statistiques des étudiants par niveau
-        etudiants_niveau_query = """
-        PREFIX edu: <http://www.education-intelligente.org/ontologie#>
-        SELECT ?niveau (COUNT(?etudiant) as ?count)
-        WHERE {
-            ?etudiant a edu:Etudiant .
-            OPTIONAL { ?etudiant edu:niveauEtude ?niveau . }
-        }
-        GROUP BY ?niveau
-        """
-        
-        # Statistiques des enseignants par grade
-        enseignants_grade_query = """
-        PREFIX edu: <http://www.education-intelligente.org/ontologie#>
-        SELECT ?grade (COUNT(?enseignant) as ?count)
-        WHERE {
-            ?enseignant a edu:Enseignant .
-            OPTIONAL { ?enseignant edu:grade ?grade . }
-        }
-        GROUP BY ?grade
-        """
-        
-        # Statistiques des cours par spécialité
-        cours_specialite_query = """
-        PREFIX edu: <http://www.education-intelligente.org/ontologie#>
-        SELECT ?specialite (COUNT(?cours) as ?count)
-        WHERE {
-            ?cours a edu:Cours .
-            ?cours edu:faitPartieDe ?specialite .
-            ?specialite edu:nomSpecialite ?nomSpecialite .
-        }
-        GROUP BY ?specialite ?nomSpecialite
-        """
-        
-        etudiants_niveau = sparql_utils.execute_query(etudiants_niveau_query)
-        enseignants_grade = sparql_utils.execute_query(enseignants_grade_query)
-        cours_specialite = sparql_utils.execute_query(cours_specialite_query)
-        
         return jsonify({
             "status": "success",
-            "etudiants_par_niveau": etudiants_niveau,
-            "enseignants_par_grade": enseignants_grade,
-            "cours_par_specialite": cours_specialite
+            **materialized_stats.education_stats()
         })
         
     except Exception as e:
@@ -388,6 +351,10 @@ def browse_ontology():
             LIMIT {limit}
             """
         
+        stream_format = requested_stream_format()
+        if stream_format:
+            return stream_query_response(query, stream_format)
+        
         results = sparql_utils.execute_query(query)
         return jsonify({
             "status": "success",
@@ -413,8 +380,19 @@ def execute_sparql_query():
                 "message": "Query is required"
             }), 400
         
+        # Large results can be streamed row by row (NDJSON or chunked JSON array)
+        stream_format = requested_stream_format(data)
+        if stream_format:
+            return stream_query_response(query, stream_format, typed=bool(data.get('typed')))
+        
         # Execute the query
-        results = sparql_utils.execute_query(query)
+        if data.get('typed'):
+            # Keep full URIs, literal datatypes and language tags
+            results = sparql_utils.execute_query(query, mode=RESULT_TYPED)
+            if isinstance(results, list):
+                results = [{key: term.to_dict() for key, term in row.items()} for row in results]
+        else:
+            results = sparql_utils.execute_query(query)
         return jsonify({
             "status": "success",
             "results": results,
@@ -430,11 +408,9 @@ def execute_sparql_query():
 def export_ontology():
     """Export the current ontology state from Fuseki as RDF"""
     try:
-        # Get the Fuseki endpoint
-        fuseki_endpoint = os.getenv('FUSEKI_ENDPOINT', 'http://localhost:3030/educationInfin')
         format_type = request.args.get('format', 'xml')  # xml, turtle, ntriples, json-ld
         
-        # Map format types to Fuseki content types
+        # Map format types to RDF content types
         format_map = {
             'xml': 'application/rdf+xml',
             'turtle': 'text/turtle',
@@ -444,35 +420,26 @@ def export_ontology():
         
         accept_header = format_map.get(format_type, 'application/rdf+xml')
         
-        # Query Fuseki to get all data
-        query_endpoint = f"{fuseki_endpoint}/data"
-        headers = {'Accept': accept_header}
-        
-        response = requests.get(query_endpoint, headers=headers, timeout=60)
+        # Get all data from the active backend (Fuseki /data or embedded store)
+        content = sparql_utils.export_dataset(accept_header)
         
-        if response.status_code == 200:
-            # Determine file extension
-            ext_map = {
-                'xml': 'rdf',
-                'turtle': 'ttl',
-                'ntriples': 'nt',
-                'json-ld': 'jsonld'
+        # Determine file extension
+        ext_map = {
+            'xml': 'rdf',
+            'turtle': 'ttl',
+            'ntriples': 'nt',
+            'json-ld': 'jsonld'
+        }
+        file_ext = ext_map.get(format_type, 'rdf')
+        
+        # Return the RDF data
+        return Response(
+            content,
+            mimetype=accept_header,
+            headers={
+                'Content-Disposition': f'attachment; filename=ontology_export.{file_ext}'
             }
-            file_ext = ext_map.get(format_type, 'rdf')
-            
-            # Return the RDF data
-            return Response(
-                response.content,
-                mimetype=accept_header,
-                headers={
-                    'Content-Disposition': f'attachment; filename=ontology_export.{file_ext}'
-                }
-            )
-        else:
-            return jsonify({
-                "status": "error",
-                "message": f"Erreur lors de l'export: {response.status_code}"
-            }), 500
+        )
             
     except Exception as e:
         return jsonify({
@@ -0,0 +1,99 @@
+"""Point d'entrée ASGI : recherche sémantique et DBpedia en asyncio, le reste via Flask.
+
+    uvicorn asgi:application --port 5000
+
+POST /api/search et POST /api/dbpedia/search sont servis directement par la
+boucle asyncio (appels TALN, Gemini, DBpedia et Fuseki non bloquants) ; les
+autres routes, y compris les requêtes CORS préliminaires, passent par
+l'application Flask exécutée dans des threads (asgiref).
+"""
+
+import json
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app
+from async_http import HTTPX_AVAILABLE, close_client
+from modules.search import dbpedia_search_async, semantic_search_async
+from sparql_utils import sparql_utils
+
+if not HTTPX_AVAILABLE:
+    raise RuntimeError("Le serveur ASGI nécessite httpx : pip install httpx")
+
+
+async def _search(payload):
+    return await semantic_search_async((payload.get('question') or '').strip())
+
+
+async def _dbpedia_search(payload):
+    return await dbpedia_search_async(payload.get('text'))
+
+
+ASYNC_ROUTES = {
+    '/api/search': _search,
+    '/api/dbpedia/search': _dbpedia_search
+}
+
+flask_application = WsgiToAsgi(app)
+
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def _send_json(send, payload, status):
+    body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('ascii')),
+            # Même politique que CORS(app) côté Flask
+            (b'access-control-allow-origin', b'*')
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_client()
+            sparql_utils.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+
+    handler = ASYNC_ROUTES.get(scope.get('path')) if scope['type'] == 'http' else None
+    if handler is None or scope['method'] != 'POST':
+        await flask_application(scope, receive, send)
+        return
+
+    try:
+        payload = json.loads(await _read_body(receive) or b'{}')
+        if not isinstance(payload, dict):
+            raise ValueError("objet JSON attendu")
+    except ValueError as e:
+        await _send_json(send, {"error": f"Corps JSON invalide: {str(e)}"}, 400)
+        return
+
+    try:
+        result, status = await handler(payload)
+    except Exception as e:
+        print(f"Error in async search: {str(e)}")
+        result, status = {"error": f"Erreur dans la recherche sémantique: {str(e)}"}, 500
+    await _send_json(send, result, status)
@@ -0,0 +1,54 @@
+"""Client HTTP asynchrone partagé (httpx) pour le chemin ASGI de la recherche"""
+
+import asyncio
+import os
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTPX_AVAILABLE = False
+
+# Requêtes simultanées autorisées vers l'ensemble des services externes
+ASYNC_MAX_CONNECTIONS = int(os.getenv('ASYNC_HTTP_MAX_CONNECTIONS', '200'))
+ASYNC_MAX_KEEPALIVE = int(os.getenv('ASYNC_HTTP_MAX_KEEPALIVE', '50'))
+
+_clients = {}
+
+
+def get_client():
+    """Client httpx de la boucle asyncio courante (créé au premier appel).
+
+    Un client httpx ne peut servir que la boucle qui l'a créé, d'où un client
+    par boucle ; le serveur ASGI n'en utilise qu'une.
+    """
+    if not HTTPX_AVAILABLE:
+        raise RuntimeError("httpx n'est pas installé : pip install httpx")
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_MAX_KEEPALIVE
+            ),
+            timeout=request_timeout(
+                float(os.getenv('FUSEKI_CONNECT_TIMEOUT', '5')),
+                float(os.getenv('FUSEKI_READ_TIMEOUT', '60'))
+            )
+        )
+        _clients[loop] = client
+    return client
+
+
+def request_timeout(connect, read):
+    """Délais httpx équivalents au tuple (connexion, lecture) de requests"""
+    return httpx.Timeout(read, connect=connect)
+
+
+async def close_client():
+    """Ferme le client de la boucle courante (arrêt du serveur ASGI)"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,348 @@
+"""Autocomplétion des libellés d'entités : trie compressé (radix) en mémoire, insensible aux accents"""
+
+import threading
+import time
+from bisect import insort
+from collections import defaultdict
+
+from class_hierarchy import HIERARCHY_UPDATE_MARKERS, class_hierarchy
+from query_cache import ONTOLOGY_NS, written_entities
+from sparql_utils import RESULT_TYPED, short_name, sparql_utils
+from text_index import tokenize
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+
+# Classe -> propriétés dont la concaténation forme le libellé proposé
+LABEL_PROPERTIES = {
+    'Personne': ('prenom', 'nom'),
+    'Universite': ('nomUniversite',),
+    'Specialite': ('nomSpecialite',),
+    'Cours': ('intitule',),
+    'Competence': ('nomCompetence',),
+    'ProjetAcademique': ('titreProjet',),
+    'RessourcePedagogique': ('titreRessource',),
+    'TechnologieEducative': ('nomTechnologie',),
+    'Evaluation': ('typeEvaluation',),
+    'OrientationAcademique': ('objectifOrientation',)
+}
+
+# Meilleures suggestions gardées dans chaque nœud (borne de `limit`)
+MAX_SUGGESTIONS = 50
+REFRESH_BATCH_SIZE = 500
+
+
+class Node:
+    """Nœud du trie : `edge` est le fragment de clé qui y mène depuis le parent"""
+    __slots__ = ('edge', 'children', 'entries', 'top')
+
+    def __init__(self, edge=''):
+        self.edge = edge
+        self.children = {}
+        self.entries = set()
+        # Les MAX_SUGGESTIONS meilleures entrées du sous-arbre, triées
+        self.top = []
+
+
+class RadixTrie:
+    """Trie compressé dont chaque nœud connaît les meilleures entrées de son sous-arbre.
+
+    Une entrée est un tuple comparable (le plus petit est le meilleur) ; la
+    recherche des k meilleures complétions d'un préfixe se limite à descendre
+    jusqu'au nœud du préfixe et à lire sa liste `top`.
+    """
+
+    def __init__(self):
+        self.root = Node()
+        self.size = 0
+
+    def insert(self, key, entry):
+        node = self.root
+        path = [node]
+        i = 0
+        while i < len(key):
+            child = node.children.get(key[i])
+            if child is None:
+                child = node.children[key[i]] = Node(key[i:])
+                i = len(key)
+            else:
+                common = 0
+                limit = min(len(child.edge), len(key) - i)
+                while common < limit and child.edge[common] == key[i + common]:
+                    common += 1
+                if common < len(child.edge):
+                    # Découpe de l'arête : un nœud intermédiaire porte le préfixe commun
+                    middle = Node(child.edge[:common])
+                    child.edge = child.edge[common:]
+                    middle.children[child.edge[0]] = child
+                    middle.top = list(child.top)
+                    node.children[key[i]] = middle
+                    child = middle
+                i += common
+            node = child
+            path.append(node)
+        if entry in node.entries:
+            return
+        node.entries.add(entry)
+        self.size += 1
+        for ancestor in path:
+            if len(ancestor.top) < MAX_SUGGESTIONS or entry < ancestor.top[-1]:
+                insort(ancestor.top, entry)
+                del ancestor.top[MAX_SUGGESTIONS:]
+
+    def remove(self, key, entry):
+        node = self.root
+        path = [node]
+        i = 0
+        while i < len(key):
+            child = node.children.get(key[i])
+            if child is None or not key.startswith(child.edge, i):
+                return
+            node = child
+            path.append(node)
+            i += len(child.edge)
+        if entry not in node.entries:
+            return
+        node.entries.discard(entry)
+        self.size -= 1
+        # Les listes `top` sont recalculées du bas vers le haut à partir des enfants
+        for ancestor in reversed(path):
+            if entry in ancestor.top:
+                candidates = sorted(ancestor.entries)[:MAX_SUGGESTIONS]
+                for child in ancestor.children.values():
+                    candidates.extend(child.top)
+                ancestor.top = sorted(candidates)[:MAX_SUGGESTIONS]
+        # Élagage des nœuds devenus vides, fusion des nœuds sans entrée à un seul enfant
+        for depth in range(len(path) - 1, 0, -1):
+            current, parent = path[depth], path[depth - 1]
+            if current.entries:
+                break
+            if not current.children:
+                del parent.children[current.edge[0]]
+            elif len(current.children) == 1:
+                (child,) = current.children.values()
+                child.edge = current.edge + child.edge
+                parent.children[child.edge[0]] = child
+                break
+            else:
+                break
+
+    def _locate(self, prefix):
+        """Nœud dont le sous-arbre contient exactement les clés commençant par `prefix`"""
+        node = self.root
+        i = 0
+        while i < len(prefix):
+            child = node.children.get(prefix[i])
+            if child is None:
+                return None
+            if prefix.startswith(child.edge, i):
+                i += len(child.edge)
+                node = child
+            elif child.edge.startswith(prefix[i:]):
+                return child
+            else:
+                return None
+        return node
+
+    def complete(self, prefix, accept, limit):
+        """Meilleures entrées sous `prefix` acceptées par `accept`, au plus `limit` entités distinctes"""
+        node = self._locate(prefix)
+        if node is None:
+            return []
+        found = self._collect(node.top, accept, limit)
+        if len(found) < limit and len(node.top) == MAX_SUGGESTIONS:
+            # La liste précalculée ne suffit pas (filtre par type, doublons) : parcours du sous-arbre
+            entries = []
+            stack = [node]
+            while stack:
+                current = stack.pop()
+                entries.extend(current.entries)
+                stack.extend(current.children.values())
+            found = self._collect(sorted(entries), accept, limit)
+        return found
+
+    @staticmethod
+    def _collect(entries, accept, limit):
+        found = []
+        seen = set()
+        for entry in entries:
+            if entry.uri not in seen and accept(entry):
+                seen.add(entry.uri)
+                found.append(entry)
+                if len(found) == limit:
+                    break
+        return found
+
+
+class Suggestion(tuple):
+    """Entrée du trie, ordonnée par (position du mot, longueur, libellé normalisé, IRI)"""
+    __slots__ = ()
+
+    def __new__(cls, position, label, uri, class_name):
+        return tuple.__new__(cls, (position, len(label), label.lower(), uri, label, class_name))
+
+    uri = property(lambda self: self[3])
+    label = property(lambda self: self[4])
+    class_name = property(lambda self: self[5])
+
+    def to_dict(self):
+        return {"uri": self.uri, "id": short_name(self.uri), "label": self.label, "type": self.class_name}
+
+
+def label_keys(label):
+    """Clés indexées pour un libellé : le texte normalisé à partir de chacun de ses mots"""
+    words = tokenize(label)
+    return [(position, ' '.join(words[position:])) for position in range(len(words))]
+
+
+class Autocomplete:
+    """Index d'autocomplétion construit au démarrage et mis à jour à chaque écriture.
+
+    Chaque libellé est inséré à partir de chacun de ses mots ("Université de
+    Sfax" répond à "univ", "de sf" et "sfax") ; les suggestions commençant par
+    le premier mot passent en tête, puis les libellés les plus courts.
+    """
+
+    def __init__(self, store, hierarchy, label_properties):
+        self.store = store
+        self.hierarchy = hierarchy
+        self.label_properties = label_properties
+        self._lock = threading.RLock()
+        self._trie = None
+        self._entries = {}
+        self._stale = True
+        self._writes = 0
+        self.refreshed_at = None
+        self.full_refreshes = 0
+        self.incremental_updates = 0
+
+    @property
+    def classes(self):
+        return list(self.label_properties)
+
+    def _labels_query(self, entities=None):
+        predicates = sorted({ONTOLOGY_NS + name for names in self.label_properties.values() for name in names})
+        values = f"VALUES ?s {{ {' '.join(f'<{iri}>' for iri in entities)} }}" if entities is not None else ""
+        return f"""
+        SELECT ?s ?p ?o WHERE {{
+            {values}
+            ?s ?p ?o .
+            FILTER(?p = <{RDF_TYPE}> || (?p IN ({', '.join(f'<{p}>' for p in predicates)}) && isLiteral(?o)))
+        }}
+        """
+
+    def _closures(self):
+        """Classe indexée -> IRIs de la classe et de ses sous-classes"""
+        return {class_name: set(self.hierarchy.subclasses(class_name) or [ONTOLOGY_NS + class_name])
+                for class_name in self.label_properties}
+
+    def _suggestions(self, entities=None):
+        """Entrées du trie par entité (clé normalisée, Suggestion)"""
+        types = defaultdict(set)
+        values = defaultdict(lambda: defaultdict(list))
+        for row in self.store.stream_query(self._labels_query(entities), mode=RESULT_TYPED):
+            if row['p'].value == RDF_TYPE:
+                types[row['s'].value].add(row['o'].value)
+            else:
+                values[row['s'].value][row['p'].value[len(ONTOLOGY_NS):]].append(row['o'].value)
+
+        closures = self._closures()
+        suggestions = {}
+        for uri, entity_types in types.items():
+            # Première classe indexée dont l'entité est instance (sous-classes comprises)
+            class_name = next((name for name, closure in closures.items() if entity_types & closure), None)
+            if class_name is None:
+                continue
+            parts = [' '.join(sorted(values[uri][name])) for name in self.label_properties[class_name]]
+            label = ' '.join(part for part in parts if part)
+            if label:
+                suggestions[uri] = [(key, Suggestion(position, label, uri, class_name))
+                                    for position, key in label_keys(label)]
+        return suggestions
+
+    def refresh(self):
+        """Reconstruction complète du trie (une requête sur le graphe)"""
+        with self._lock:
+            writes = self._writes
+        started = time.monotonic()
+        trie = RadixTrie()
+        entries = self._suggestions()
+        for items in entries.values():
+            for key, suggestion in items:
+                trie.insert(key, suggestion)
+        with self._lock:
+            self._trie = trie
+            self._entries = entries
+            # Une écriture pendant la construction a pu être appliquée à l'ancien trie
+            self._stale = writes != self._writes
+            self.refreshed_at = time.time()
+            self.full_refreshes += 1
+        print(f"Autocomplétion: {len(entries)} libellé(s) en {time.monotonic() - started:.2f}s")
+
+    def start(self):
+        """Construction initiale ; en cas d'échec, elle est retentée à la première requête"""
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"WARNING: Autocomplétion indisponible: {str(e)}")
+
+    def on_update(self, update_query):
+        """Écouteur des mises à jour réussies : remplace les libellés des entités citées"""
+        with self._lock:
+            self._writes += 1
+            if self._trie is None or self._stale:
+                return
+            entities = written_entities(update_query)
+            if entities is None or any(marker in update_query for marker in HIERARCHY_UPDATE_MARKERS):
+                self._stale = True
+                return
+            try:
+                self._reindex(sorted(entities))
+                self.incremental_updates += 1
+            except Exception as e:
+                print(f"WARNING: Mise à jour incrémentale de l'autocomplétion impossible: {str(e)}")
+                self._stale = True
+
+    def _reindex(self, entities):
+        fresh = {}
+        for start in range(0, len(entities), REFRESH_BATCH_SIZE):
+            fresh.update(self._suggestions(entities[start:start + REFRESH_BATCH_SIZE]))
+        for uri in entities:
+            for key, suggestion in self._entries.pop(uri, ()):
+                self._trie.remove(key, suggestion)
+            if uri in fresh:
+                self._entries[uri] = fresh[uri]
+                for key, suggestion in fresh[uri]:
+                    self._trie.insert(key, suggestion)
+
+    def complete(self, text, classes=None, limit=10):
+        """Suggestions pour une saisie partielle, filtrées par classe si `classes` est donné"""
+        prefix = ' '.join(tokenize(text))
+        if not prefix:
+            return []
+        # "de " doit compléter le mot suivant, pas le mot "de" seul
+        if text[-1:].isspace():
+            prefix += ' '
+        with self._lock:
+            if self._trie is None or self._stale:
+                self.refresh()
+            wanted = set(classes) if classes else None
+            found = self._trie.complete(
+                prefix, (lambda entry: entry.class_name in wanted) if wanted else (lambda entry: True), limit
+            )
+        return [suggestion.to_dict() for suggestion in found]
+
+    def status(self):
+        with self._lock:
+            return {
+                "loaded": self._trie is not None,
+                "stale": self._stale,
+                "labels": len(self._entries),
+                "keys": self._trie.size if self._trie is not None else 0,
+                "refreshed_at": self.refreshed_at,
+                "full_refreshes": self.full_refreshes,
+                "incremental_updates": self.incremental_updates
+            }
+
+
+autocomplete = Autocomplete(sparql_utils, class_hierarchy, LABEL_PROPERTIES)
+sparql_utils.add_update_listener(autocomplete.on_update)
@@ -0,0 +1,63 @@
+"""Création en masse d'entités : un tableau JSON -> une seule requête SPARQL Update"""
+
+import os
+from collections import Counter
+from flask import jsonify
+from sparql_utils import sparql_utils
+
+ONTOLOGY_PREFIX = "http://www.education-intelligente.org/ontologie#"
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', '1000'))
+
+
+def insert_data_query(triples):
+    """Requête INSERT DATA pour un ou plusieurs blocs de triplets"""
+    return f"""
+    PREFIX ont: <{ONTOLOGY_PREFIX}>
+    PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+    INSERT DATA {{
+        {' '.join(triples)}
+    }}
+    """
+
+
+def bulk_create(items, validate, build_triples, label):
+    """Valide puis insère un lot d'entités en un seul aller-retour.
+
+    `validate(item)` retourne le dictionnaire des erreurs d'un élément et
+    `build_triples(item)` le couple (URI, triplets terminés par '.').
+    Le lot est rejeté en entier si un élément est invalide : rien n'est écrit.
+    """
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Le corps doit être un tableau JSON non vide"}), 400
+    if len(items) > BULK_MAX_ITEMS:
+        return jsonify({"error": f"Lot trop volumineux ({len(items)} > {BULK_MAX_ITEMS} éléments)"}), 400
+
+    errors = {}
+    for index, item in enumerate(items):
+        item_errors = validate(item) if isinstance(item, dict) else {"item": "Objet JSON attendu"}
+        if item_errors:
+            errors[index] = item_errors
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    uris = []
+    triples = []
+    for index, item in enumerate(items):
+        try:
+            uri, item_triples = build_triples(item)
+        except (TypeError, ValueError) as e:
+            return jsonify({"errors": {index: {"item": f"Valeur invalide: {str(e)}"}}}), 400
+        uris.append(uri)
+        triples.append(item_triples)
+
+    duplicates = sorted(uri for uri, count in Counter(uris).items() if count > 1)
+    if duplicates:
+        return jsonify({"error": "URIs en double dans le lot", "uris": duplicates}), 400
+
+    try:
+        result = sparql_utils.execute_update(insert_data_query(triples))
+        if "error" in result:
+            return jsonify(result), 500
+        return jsonify({"message": f"{len(uris)} {label} créé(e)s avec succès", "uris": uris}), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,106 @@
+"""Index de la hiérarchie des classes (fermeture de rdfs:subClassOf) de l'ontologie"""
+
+import threading
+from collections import defaultdict
+from query_cache import ONTOLOGY_NS
+from sparql_utils import sparql_utils
+
+SUBCLASS_EDGES_QUERY = """
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+SELECT ?sub ?super WHERE {
+    ?sub rdfs:subClassOf ?super .
+    FILTER(isIRI(?sub) && isIRI(?super))
+}
+"""
+
+# Mots-clés qui, dans une mise à jour, peuvent modifier la hiérarchie
+HIERARCHY_UPDATE_MARKERS = ('subClassOf', 'owl:Class', 'owl#Class', 'CLEAR', 'DROP', 'LOAD')
+
+
+class ClassHierarchy:
+    """Sous-classes (directes et indirectes) de chaque classe de l'ontologie.
+
+    Calculé une fois au démarrage à partir des triplets rdfs:subClassOf, puis
+    recalculé à la première utilisation après une écriture qui touche
+    l'ontologie. Les requêtes remplacent `?type rdfs:subClassOf* ont:X` et les
+    listes `FILTER(?type IN (...))` par un bloc `VALUES` issu de cet index.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._descendants = None
+        self._stale = True
+
+    def refresh(self):
+        """Recalcule la fermeture transitive ; retourne False si le store est injoignable"""
+        try:
+            results = self.store.query_raw(SUBCLASS_EDGES_QUERY)
+        except Exception as e:
+            print(f"WARNING: Hiérarchie des classes indisponible: {str(e)}")
+            return False
+
+        children = defaultdict(set)
+        for binding in results["results"]["bindings"]:
+            children[binding["super"]["value"]].add(binding["sub"]["value"])
+
+        descendants = {}
+
+        def collect(cls, path):
+            if cls in descendants:
+                return descendants[cls]
+            found = {cls}
+            for child in children.get(cls, ()):
+                # Une hiérarchie cyclique ne doit pas boucler indéfiniment
+                if child not in path:
+                    found |= collect(child, path | {child})
+            descendants[cls] = frozenset(found)
+            return descendants[cls]
+
+        for cls in list(children):
+            collect(cls, {cls})
+
+        with self._lock:
+            self._descendants = descendants
+            self._stale = False
+        print(f"Hiérarchie des classes indexée: {len(descendants)} classe(s)")
+        return True
+
+    def invalidate(self, update_query=None):
+        """Marque l'index à recalculer si une mise à jour peut toucher la hiérarchie"""
+        if update_query is None or any(marker in update_query for marker in HIERARCHY_UPDATE_MARKERS):
+            self._stale = True
+
+    def _index(self):
+        if self._stale:
+            self.refresh()
+        return self._descendants
+
+    def subclasses(self, class_name):
+        """IRIs de la classe et de toutes ses sous-classes, ou None si l'index est indisponible"""
+        index = self._index()
+        if index is None:
+            return None
+        iri = class_name if class_name.startswith('http') else ONTOLOGY_NS + class_name
+        return sorted(index.get(iri, {iri}))
+
+    def type_values(self, var, *class_names):
+        """Motif SPARQL contraignant ?var à l'une des classes données ou à leurs sous-classes.
+
+        Produit `VALUES ?var { <...> }` ; si l'index n'a pas pu être chargé, se
+        replie sur le chemin `rdfs:subClassOf*` (correct mais plus lent).
+        """
+        iris = set()
+        for class_name in class_names:
+            subclasses = self.subclasses(class_name)
+            if subclasses is None:
+                return " UNION ".join(
+                    f"{{ ?{var} <http://www.w3.org/2000/01/rdf-schema#subClassOf>* <{ONTOLOGY_NS}{name}> . }}"
+                    for name in class_names
+                )
+            iris.update(subclasses)
+        return f"VALUES ?{var} {{ {' '.join(f'<{iri}>' for iri in sorted(iris))} }}"
+
+
+class_hierarchy = ClassHierarchy(sparql_utils)
+sparql_utils.add_update_listener(class_hierarchy.invalidate)
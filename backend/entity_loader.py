@@ -0,0 +1,161 @@
+"""Chargement d'une entité et de son voisinage en un seul CONSTRUCT, mis en forme par un cadre déclaratif"""
+
+from collections import defaultdict
+
+from class_hierarchy import class_hierarchy
+from query_cache import ONTOLOGY_NS
+from query_templates import templates, IRI
+from sparql_utils import short_name, sparql_utils
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+
+
+def _iri(name):
+    return name if name.startswith('http') else ONTOLOGY_NS + name
+
+
+class EntityId:
+    """Champ valant le nom court de l'entité cadrée"""
+
+
+class TypeLabel:
+    """Champ dérivé des types de l'entité : libellé du premier type trouvé dans `labels`"""
+
+    def __init__(self, labels):
+        self.labels = {_iri(class_name): label for class_name, label in labels.items()}
+
+
+ENTITY_ID = EntityId()
+
+
+class Relation:
+    """Collection d'entités liées par `predicate` (ou pointant vers l'entité si reverse=True).
+
+    `fields` associe chaque clé de sortie à une propriété de l'entité liée ;
+    une entité liée sans l'un des champs `required` est ignorée, comme avec un
+    motif obligatoire dans un OPTIONAL. Avec many=False, seule la première
+    entité liée est retournée (un dict vide s'il n'y en a pas).
+    """
+
+    def __init__(self, predicate, key, fields, required=(), reverse=False, many=True):
+        self.predicate = _iri(predicate)
+        self.key = key
+        self.fields = {name: _iri(prop) for name, prop in fields.items()}
+        self.required = required
+        self.reverse = reverse
+        self.many = many
+
+
+class EntityGraph:
+    """Triplets d'un CONSTRUCT indexés par sujet et par objet"""
+
+    def __init__(self, triples):
+        self.outgoing = defaultdict(lambda: defaultdict(list))
+        self.incoming = defaultdict(lambda: defaultdict(list))
+        for triple in triples:
+            s, p, o = triple["s"].value, triple["p"].value, triple["o"]
+            self.outgoing[s][p].append(o)
+            if o.is_uri:
+                self.incoming[o.value][p].append(s)
+
+    def first(self, subject, predicate):
+        """Plus petite valeur (nom court) de la propriété, None si absente"""
+        values = self.outgoing[subject].get(predicate)
+        return min(short_name(term.value) for term in values) if values else None
+
+    def types(self, subject):
+        return {term.value for term in self.outgoing[subject].get(RDF_TYPE, ())}
+
+    def related(self, subject, relation):
+        if relation.reverse:
+            return set(self.incoming[subject].get(relation.predicate, ()))
+        return {term.value for term in self.outgoing[subject].get(relation.predicate, ()) if term.is_uri}
+
+
+class Frame:
+    """Forme JSON d'une classe : champs de l'entité, regroupés sous `section`, et relations.
+
+    À l'enregistrement, le cadre produit la requête CONSTRUCT qui ne ramène
+    que les triplets dont il a besoin : les propriétés de l'entité, les liens
+    de chaque relation et les propriétés des entités liées. Le résultat est
+    ensuite assemblé en un seul passage, sans produit cartésien ni
+    dédoublonnage des lignes.
+    """
+
+    def __init__(self, name, class_name, fields, relations, required=(), section=None,
+                 include_subclasses=True, store=sparql_utils, hierarchy=class_hierarchy):
+        self.name = name
+        self.class_name = class_name
+        self.fields = {key: spec if isinstance(spec, (EntityId, TypeLabel)) else _iri(spec)
+                       for key, spec in fields.items()}
+        self.relations = relations
+        self.required = required
+        self.section = section
+        self.include_subclasses = include_subclasses
+        self.store = store
+        self.hierarchy = hierarchy
+        self.template = templates.register(name, self._construct_text(), entity_id=IRI)
+
+    def _construct_text(self):
+        own = {RDF_TYPE} | {spec for spec in self.fields.values() if isinstance(spec, str)}
+        own |= {relation.predicate for relation in self.relations.values() if not relation.reverse}
+        branches = [f"{{ $entity_id ?p ?o . FILTER(?p IN ({self._list(own)})) BIND($entity_id AS ?s) }}"]
+        for relation in self.relations.values():
+            properties = set(relation.fields.values())
+            if relation.reverse:
+                # Le lien ?s prédicat entité fait partie des triplets retournés
+                properties.add(relation.predicate)
+                link = f"?s <{relation.predicate}> $entity_id ."
+            else:
+                link = f"$entity_id <{relation.predicate}> ?s ."
+            branches.append(f"{{ {link} ?s ?p ?o . FILTER(?p IN ({self._list(properties)})) }}")
+        union = "\nUNION\n".join(branches)
+        return f"CONSTRUCT {{ ?s ?p ?o }}\nWHERE {{\n{union}\n}}"
+
+    @staticmethod
+    def _list(iris):
+        return ', '.join(f'<{iri}>' for iri in sorted(iris))
+
+    def _classes(self):
+        if self.include_subclasses:
+            subclasses = self.hierarchy.subclasses(self.class_name)
+            if subclasses is not None:
+                return set(subclasses)
+        return {_iri(self.class_name)}
+
+    def bind(self, entity_id):
+        """Requête CONSTRUCT de l'entité (TemplateBindingError si l'IRI est invalide)"""
+        return self.template.bind(entity_id=entity_id)
+
+    def frame(self, triples, entity_id):
+        """Document JSON de l'entité à partir des triplets du CONSTRUCT, None si elle n'existe pas"""
+        graph = EntityGraph(triples)
+        if not graph.types(entity_id) & self._classes():
+            return None
+        fields = {key: self._field(graph, entity_id, spec) for key, spec in self.fields.items()}
+        if any(fields[key] is None for key in self.required):
+            return None
+
+        document = {self.section: fields} if self.section else dict(fields)
+        for name, relation in self.relations.items():
+            items = []
+            for related in sorted(graph.related(entity_id, relation)):
+                item = {relation.key: short_name(related)}
+                item.update({key: graph.first(related, prop) for key, prop in relation.fields.items()})
+                if all(item[key] is not None for key in relation.required):
+                    items.append(item)
+            document[name] = items if relation.many else (items[0] if items else {})
+        return document
+
+    @staticmethod
+    def _field(graph, entity_id, spec):
+        if isinstance(spec, EntityId):
+            return short_name(entity_id)
+        if isinstance(spec, TypeLabel):
+            types = graph.types(entity_id)
+            return next((label for iri, label in spec.labels.items() if iri in types), None)
+        return graph.first(entity_id, spec)
+
+    def load(self, entity_id):
+        """Entité cadrée, lue en une requête CONSTRUCT ; None si elle n'existe pas"""
+        return self.frame(self.store.construct(self.bind(entity_id)), entity_id)
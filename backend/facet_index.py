@@ -0,0 +1,350 @@
+"""Index inversé des facettes : (classe, propriété, valeur) -> entités, sous forme de bitsets"""
+
+import threading
+import time
+from collections import defaultdict
+
+from class_hierarchy import class_hierarchy
+from query_cache import ONTOLOGY_NS, written_entities
+from sparql_utils import RESULT_TYPED, short_name, sparql_utils
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+# Taille des blocs VALUES lors de la relecture d'entités après une écriture
+REFRESH_BATCH_SIZE = 500
+
+
+def _iri(name):
+    return name if name.startswith('http') else ONTOLOGY_NS + name
+
+
+def _bits(bitset):
+    """Positions des bits à 1 d'un bitset (entier Python)"""
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
+
+
+def _popcount(bitset):
+    """Nombre de bits à 1 d'un bitset (`int.bit_count` n'existe qu'à partir de Python 3.10)"""
+    return bin(bitset).count("1")
+
+
+class ValueFacet:
+    """Comptage par valeur d'une propriété de l'entité : ?entity prop ?value"""
+
+    def __init__(self, name, var, predicate):
+        self.name = name
+        self.var = var
+        self.predicate = _iri(predicate)
+        self.predicates = (self.predicate,)
+
+
+class LinkFacet:
+    """Comptage par entité liée et son libellé : ?entity prop ?target . ?target label ?nom
+
+    Avec reverse=True le lien est lu dans l'autre sens (?target prop ?entity)
+    et, comme dans la requête d'origine, l'entité n'est pas contrainte par sa
+    classe tant qu'aucun filtre n'est sélectionné.
+    """
+
+    def __init__(self, name, var, label_var, predicate, label_predicate, reverse=False, limit=20):
+        self.name = name
+        self.var = var
+        self.label_var = label_var
+        self.predicate = _iri(predicate)
+        self.label_predicate = _iri(label_predicate)
+        self.reverse = reverse
+        self.limit = limit
+        self.predicates = (self.predicate, self.label_predicate)
+
+
+class TypeFacet:
+    """Comptage par type direct parmi une liste de classes (sans contrainte de classe)"""
+
+    def __init__(self, name, var, classes):
+        self.name = name
+        self.var = var
+        self.classes = [_iri(class_name) for class_name in classes]
+        self.predicates = (RDF_TYPE,)
+
+
+class Postings:
+    """Identifiants des nœuds et listes inversées par prédicat.
+
+    Chaque IRI ou littéral reçoit un identifiant entier ; un ensemble
+    d'entités est un entier Python dont le bit i représente le nœud i, de sorte
+    que l'intersection est un `&` et le comptage un `_popcount()`.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.nodes = []
+        # prédicat -> objet -> bitset des sujets ; prédicat -> sujet -> bitset des objets
+        self.subjects = defaultdict(dict)
+        self.objects = defaultdict(dict)
+
+    def node_id(self, term):
+        key = term.value if term.is_uri else (term.value, term.datatype, term.lang)
+        node = self.ids.get(key)
+        if node is None:
+            node = self.ids[key] = len(self.nodes)
+            self.nodes.append(term.value)
+        return node
+
+    def lookup(self, iri):
+        return self.ids.get(iri)
+
+    def add(self, s, p, o):
+        self.subjects[p][o] = self.subjects[p].get(o, 0) | (1 << s)
+        self.objects[p][s] = self.objects[p].get(s, 0) | (1 << o)
+
+    def remove_node(self, node):
+        """Retire tous les triplets indexés dont le nœud est sujet ou objet"""
+        mask = ~(1 << node)
+        for p in list(self.subjects):
+            for index, other in ((self.objects[p], self.subjects[p]), (self.subjects[p], self.objects[p])):
+                for related in _bits(index.pop(node, 0)):
+                    remaining = other.get(related, 0) & mask
+                    if remaining:
+                        other[related] = remaining
+                    else:
+                        other.pop(related, None)
+
+    def matching(self, index, value):
+        """Bitsets des clés dont la valeur (complète ou nom court) vaut `value`"""
+        bitset = 0
+        for node, bits in index.items():
+            if self.nodes[node] == value or short_name(self.nodes[node]) == value:
+                bitset |= bits
+        return bitset
+
+
+class FacetSet:
+    """Facettes d'un endpoint /facets : une classe et ses dimensions"""
+
+    def __init__(self, index, class_name, facets, include_subclasses):
+        self.index = index
+        self.class_name = class_name
+        self.facets = facets
+        self.include_subclasses = include_subclasses
+
+    def counts(self, args=None):
+        """Comptages par facette, restreints aux entités sélectionnées par `args`.
+
+        `args` associe le nom de variable d'une facette (ex. `semestre`) à une
+        ou plusieurs valeurs (MultiDict Flask accepté) : les valeurs d'une même
+        facette s'additionnent (OU), les facettes se combinent (ET).
+        """
+        return self.index.counts(self, args or {})
+
+
+class FacetIndex:
+    """Index des facettes construit au démarrage et mis à jour à chaque écriture.
+
+    Une écriture relit les triplets indexés des entités qu'elle cite (comme
+    sujet ou objet) et remplace les leurs ; une écriture de portée inconnue
+    (CLEAR, `?s ont:grade "PR"`) fait reconstruire l'index à la lecture
+    suivante. Les comptages, y compris en exploration (drill-down), sont des
+    intersections de bitsets sans requête SPARQL.
+    """
+
+    def __init__(self, store, hierarchy):
+        self.store = store
+        self.hierarchy = hierarchy
+        self.facet_sets = []
+        self.predicates = {RDF_TYPE}
+        self._lock = threading.RLock()
+        self._postings = None
+        self._stale = True
+        self._writes = 0
+        self.refreshed_at = None
+        self.full_refreshes = 0
+        self.incremental_updates = 0
+
+    def register(self, class_name, facets, include_subclasses=True):
+        """Déclare les facettes d'une classe ; retourne le FacetSet à interroger"""
+        facet_set = FacetSet(self, class_name, facets, include_subclasses)
+        with self._lock:
+            self.facet_sets.append(facet_set)
+            new_predicates = {p for facet in facets for p in facet.predicates} - self.predicates
+            if new_predicates:
+                self.predicates |= new_predicates
+                self._stale = True
+        return facet_set
+
+    def _triples_query(self, entities=None):
+        predicates = ', '.join(f'<{p}>' for p in sorted(self.predicates))
+        if entities is None:
+            pattern = "?s ?p ?o ."
+        else:
+            values = ' '.join(f'<{iri}>' for iri in entities)
+            pattern = f"""VALUES ?e {{ {values} }}
+            {{ ?e ?p ?o . BIND(?e AS ?s) }} UNION {{ ?s ?p ?e . BIND(?e AS ?o) }}"""
+        return f"""
+        SELECT ?s ?p ?o WHERE {{
+            {pattern}
+            FILTER(?p IN ({predicates}))
+        }}
+        """
+
+    def _load(self, postings, entities=None):
+        for row in self.store.stream_query(self._triples_query(entities), mode=RESULT_TYPED):
+            postings.add(postings.node_id(row['s']), row['p'].value, postings.node_id(row['o']))
+
+    def refresh(self):
+        """Reconstruction complète de l'index (une requête sur le graphe)"""
+        with self._lock:
+            writes = self._writes
+        started = time.monotonic()
+        postings = Postings()
+        self._load(postings)
+        with self._lock:
+            self._postings = postings
+            # Une écriture pendant la construction a pu être appliquée à l'ancien index
+            self._stale = writes != self._writes
+            self.refreshed_at = time.time()
+            self.full_refreshes += 1
+        print(f"Index des facettes: {len(postings.nodes)} nœud(s) en {time.monotonic() - started:.2f}s")
+
+    def start(self):
+        """Construction initiale ; en cas d'échec, elle est retentée à la première lecture"""
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"WARNING: Index des facettes indisponible: {str(e)}")
+
+    def on_update(self, update_query):
+        """Écouteur des mises à jour réussies : réindexe les entités citées"""
+        with self._lock:
+            self._writes += 1
+            if self._postings is None or self._stale:
+                return
+            entities = written_entities(update_query)
+            if entities is None:
+                self._stale = True
+                return
+            try:
+                self._reindex(sorted(entities))
+                self.incremental_updates += 1
+            except Exception as e:
+                print(f"WARNING: Mise à jour incrémentale de l'index des facettes impossible: {str(e)}")
+                self._stale = True
+
+    def _reindex(self, entities):
+        postings = self._postings
+        for iri in entities:
+            node = postings.lookup(iri)
+            if node is not None:
+                postings.remove_node(node)
+        for start in range(0, len(entities), REFRESH_BATCH_SIZE):
+            self._load(postings, entities[start:start + REFRESH_BATCH_SIZE])
+
+    def _current(self):
+        with self._lock:
+            if self._postings is None or self._stale:
+                self.refresh()
+            return self._postings
+
+    def _extension(self, postings, facet_set):
+        """Bitset des instances de la classe (et de ses sous-classes si demandé)"""
+        classes = [_iri(facet_set.class_name)]
+        if facet_set.include_subclasses:
+            classes = self.hierarchy.subclasses(facet_set.class_name) or classes
+        types = postings.subjects[RDF_TYPE]
+        bitset = 0
+        for iri in classes:
+            node = postings.lookup(iri)
+            if node is not None:
+                bitset |= types.get(node, 0)
+        return bitset
+
+    def _filter(self, postings, facet, value):
+        if isinstance(facet, TypeFacet):
+            return postings.matching(postings.subjects[RDF_TYPE], value)
+        index = postings.objects if isinstance(facet, LinkFacet) and facet.reverse else postings.subjects
+        return postings.matching(index[facet.predicate], value)
+
+    def counts(self, facet_set, args):
+        with self._lock:
+            postings = self._current()
+            extension = self._extension(postings, facet_set)
+
+            selection = None
+            filters = {}
+            for facet in facet_set.facets:
+                values = args.getlist(facet.var) if hasattr(args, 'getlist') else args.get(facet.var)
+                if not values:
+                    continue
+                values = [values] if isinstance(values, str) else list(values)
+                bitset = 0
+                for value in values:
+                    bitset |= self._filter(postings, facet, value)
+                selection = (extension if selection is None else selection) & bitset
+                filters[facet.var] = values
+
+            result = {facet.name: self._facet_rows(postings, facet, extension, selection)
+                      for facet in facet_set.facets}
+            if selection is not None:
+                result["filters"] = filters
+                result["total"] = str(_popcount(selection))
+            return result
+
+    def _facet_rows(self, postings, facet, extension, selection):
+        # Sans filtre, chaque facette garde le périmètre de sa requête d'origine
+        if isinstance(facet, TypeFacet) or (isinstance(facet, LinkFacet) and facet.reverse):
+            scope = selection
+        else:
+            scope = extension if selection is None else selection
+
+        def count(bits):
+            return _popcount(bits if scope is None else bits & scope)
+
+        rows = []
+        if isinstance(facet, TypeFacet):
+            types = postings.subjects[RDF_TYPE]
+            for iri in facet.classes:
+                node = postings.lookup(iri)
+                total = count(types.get(node, 0)) if node is not None else 0
+                if total:
+                    rows.append({facet.var: short_name(iri), "count": total})
+        elif isinstance(facet, ValueFacet):
+            for node, bits in postings.subjects[facet.predicate].items():
+                total = count(bits)
+                if total:
+                    rows.append({facet.var: short_name(postings.nodes[node]), "count": total})
+        else:
+            index = postings.objects if facet.reverse else postings.subjects
+            labels = postings.objects[facet.label_predicate]
+            for node, bits in index[facet.predicate].items():
+                total = count(bits)
+                if not total:
+                    continue
+                for label in _bits(labels.get(node, 0)):
+                    rows.append({facet.var: short_name(postings.nodes[node]),
+                                 facet.label_var: short_name(postings.nodes[label]), "count": total})
+
+        rows.sort(key=lambda row: -row["count"])
+        limit = getattr(facet, 'limit', None)
+        if limit:
+            rows = rows[:limit]
+        for row in rows:
+            row["count"] = str(row["count"])
+        return rows
+
+    def status(self):
+        with self._lock:
+            postings = self._postings
+            return {
+                "loaded": postings is not None,
+                "stale": self._stale,
+                "nodes": len(postings.nodes) if postings is not None else 0,
+                "facet_sets": [facet_set.class_name for facet_set in self.facet_sets],
+                "refreshed_at": self.refreshed_at,
+                "full_refreshes": self.full_refreshes,
+                "incremental_updates": self.incremental_updates
+            }
+
+
+facet_index = FacetIndex(sparql_utils, class_hierarchy)
+sparql_utils.add_update_listener(facet_index.on_update)
@@ -0,0 +1,417 @@
+"""Index du graphe en mémoire : IRIs internées en entiers, arêtes en tableaux CSR"""
+
+import os
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+
+from class_hierarchy import class_hierarchy
+from query_cache import ONTOLOGY_NS, written_entities
+from sparql_utils import RESULT_TYPED, short_name, sparql_utils
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+RDFS_LABEL = "http://www.w3.org/2000/01/rdf-schema#label"
+# Taille des blocs VALUES lors de la relecture de sujets après une écriture
+REFRESH_BATCH_SIZE = 500
+# Sujets réécrits (surcouche) au-delà desquels les tableaux sont reconstruits
+COMPACT_THRESHOLD = int(os.getenv('GRAPH_INDEX_COMPACT_THRESHOLD', '1024'))
+
+
+class TermTable:
+    """Termes internés : identifiant entier <-> valeur"""
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def intern(self, key, value=None):
+        term_id = self.ids.get(key)
+        if term_id is None:
+            term_id = self.ids[key] = len(self.values)
+            self.values.append(key if value is None else value)
+        return term_id
+
+    def lookup(self, key):
+        return self.ids.get(key)
+
+    def __len__(self):
+        return len(self.values)
+
+
+class Csr:
+    """Listes d'adjacence compressées : arêtes du nœud n dans [offsets[n], offsets[n + 1])"""
+    __slots__ = ('offsets', 'predicates', 'targets')
+
+    def __init__(self, node_count, sources, predicates, targets):
+        offsets = array('I', [0]) * (node_count + 1)
+        for source in sources:
+            offsets[source + 1] += 1
+        for node in range(node_count):
+            offsets[node + 1] += offsets[node]
+        cursor = offsets[:-1]
+        self.predicates = array('I', [0]) * len(sources)
+        self.targets = array('I', [0]) * len(sources)
+        for source, predicate, target in zip(sources, predicates, targets):
+            at = cursor[source]
+            self.predicates[at] = predicate
+            self.targets[at] = target
+            cursor[source] = at + 1
+        self.offsets = offsets
+
+    def row(self, node):
+        """(prédicat, cible) des arêtes du nœud ; vide pour un nœud interné après la construction"""
+        if node + 1 >= len(self.offsets):
+            return ()
+        start, end = self.offsets[node], self.offsets[node + 1]
+        return zip(self.predicates[start:end], self.targets[start:end])
+
+    def __len__(self):
+        return len(self.targets)
+
+    def nbytes(self):
+        return sum(values.itemsize * len(values) for values in (self.offsets, self.predicates, self.targets))
+
+
+class GraphState:
+    """Graphe compact (trois CSR) et surcouche des sujets réécrits depuis sa construction.
+
+    `edges` relie un sujet à ses objets IRI, `incoming` est son inverse et
+    `literals` relie un sujet à ses valeurs (littéraux, nœuds anonymes).
+    Une écriture remplace toutes les arêtes sortantes d'un sujet : elles
+    sont rangées dans `rewritten`, qui masque la ligne des tableaux, et
+    `rewritten_in` en tient l'inverse.
+    """
+
+    def __init__(self, iris, values, triples):
+        self.iris = iris
+        self.values = values
+        self.rdf_type = iris.intern(RDF_TYPE)
+        self.rdfs_label = iris.intern(RDFS_LABEL)
+        edges = (array('I'), array('I'), array('I'))
+        literals = (array('I'), array('I'), array('I'))
+        for subject, predicate, target, is_iri in triples:
+            columns = edges if is_iri else literals
+            columns[0].append(subject)
+            columns[1].append(predicate)
+            columns[2].append(target)
+        node_count = len(iris)
+        self.edges = Csr(node_count, *edges)
+        self.incoming = Csr(node_count, edges[2], edges[1], edges[0])
+        self.literals = Csr(node_count, *literals)
+        self.rewritten = {}
+        self.rewritten_in = defaultdict(list)
+
+    def out_edges(self, node):
+        rewritten = self.rewritten.get(node)
+        return rewritten[0] if rewritten is not None else list(self.edges.row(node))
+
+    def literal_values(self, node):
+        rewritten = self.rewritten.get(node)
+        return rewritten[1] if rewritten is not None else list(self.literals.row(node))
+
+    def in_edges(self, node):
+        """(prédicat, sujet) des arêtes qui arrivent au nœud"""
+        rewritten = self.rewritten
+        edges = [(p, s) for p, s in self.incoming.row(node) if s not in rewritten]
+        edges.extend(self.rewritten_in.get(node, ()))
+        return edges
+
+    def replace_subject(self, node, edges, literals):
+        previous = self.rewritten.get(node)
+        if previous is not None:
+            for p, target in previous[0]:
+                self.rewritten_in[target].remove((p, node))
+        self.rewritten[node] = (edges, literals)
+        for p, target in edges:
+            self.rewritten_in[target].append((p, node))
+
+    def triples(self):
+        """(sujet, prédicat, cible, cible IRI ?) de l'état courant, surcouche comprise"""
+        for node in range(len(self.iris)):
+            for p, target in self.out_edges(node):
+                yield node, p, target, True
+            for p, value in self.literal_values(node):
+                yield node, p, value, False
+
+    def compacted(self):
+        """Nouvel état : la surcouche est fondue dans les tableaux"""
+        return GraphState(self.iris, self.values, list(self.triples()))
+
+    def subjects_of_type(self, type_iri):
+        node = self.iris.lookup(type_iri)
+        if node is None:
+            return []
+        return [s for p, s in self.in_edges(node) if p == self.rdf_type]
+
+    def label(self, node):
+        for p, value in self.literal_values(node):
+            if p == self.rdfs_label:
+                return self.values.values[value]
+        return short_name(self.iris.values[node])
+
+
+class GraphIndex:
+    """Graphe RDF en mémoire pour /api/ontology/graph, les voisinages et les statistiques.
+
+    Construit en une passe sur tous les triplets à sujet IRI. Les IRIs sont
+    internées en entiers et les arêtes rangées en CSR (`array('I')`), si bien
+    qu'une requête parcourt des tableaux compacts au lieu d'interroger le
+    store. Une écriture relit les triplets des sujets qu'elle peut toucher
+    et les range dans une surcouche, refondue dans les tableaux au-delà de
+    COMPACT_THRESHOLD sujets ; une écriture de portée inconnue (CLEAR...)
+    fait reconstruire l'index à la lecture suivante.
+    """
+
+    def __init__(self, store, hierarchy):
+        self.store = store
+        self.hierarchy = hierarchy
+        self._lock = threading.RLock()
+        self._state = None
+        self._stale = True
+        self._writes = 0
+        self.refreshed_at = None
+        self.full_refreshes = 0
+        self.incremental_updates = 0
+        self.compactions = 0
+
+    def _triples_query(self, subjects=None):
+        values = f"VALUES ?s {{ {' '.join(f'<{iri}>' for iri in subjects)} }}" if subjects is not None else ""
+        return f"""
+        SELECT ?s ?p ?o WHERE {{
+            {values}
+            ?s ?p ?o .
+            FILTER(isIRI(?s))
+        }}
+        """
+
+    def _load(self, iris, values, subjects=None):
+        """Triplets (sujet, prédicat, cible, cible IRI ?) internés"""
+        triples = []
+        for row in self.store.stream_query(self._triples_query(subjects), mode=RESULT_TYPED):
+            o = row['o']
+            if o.is_uri:
+                target = iris.intern(o.value)
+            else:
+                target = values.intern((o.value, o.type, o.datatype, o.lang), o.value)
+            triples.append((iris.intern(row['s'].value), iris.intern(row['p'].value), target, o.is_uri))
+        return triples
+
+    def refresh(self):
+        """Reconstruction complète de l'index (une requête sur le graphe)"""
+        with self._lock:
+            writes = self._writes
+        started = time.monotonic()
+        iris, values = TermTable(), TermTable()
+        state = GraphState(iris, values, self._load(iris, values))
+        with self._lock:
+            self._state = state
+            # Une écriture pendant la construction a pu être appliquée à l'ancien index
+            self._stale = writes != self._writes
+            self.refreshed_at = time.time()
+            self.full_refreshes += 1
+        print(f"Index du graphe: {len(iris)} IRI(s), {len(state.edges)} arête(s) en {time.monotonic() - started:.2f}s")
+
+    def start(self):
+        """Construction initiale ; en cas d'échec, elle est retentée à la première lecture"""
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"WARNING: Index du graphe indisponible: {str(e)}")
+
+    def on_update(self, update_query):
+        """Écouteur des mises à jour réussies : relit les sujets que l'écriture peut modifier"""
+        with self._lock:
+            self._writes += 1
+            if self._state is None or self._stale:
+                return
+            entities = written_entities(update_query)
+            if entities is None:
+                self._stale = True
+                return
+            try:
+                self._rewrite(entities)
+                self.incremental_updates += 1
+            except Exception as e:
+                print(f"WARNING: Mise à jour incrémentale de l'index du graphe impossible: {str(e)}")
+                self._stale = True
+
+    def _rewrite(self, entities):
+        state = self._state
+        # `?u ont:emploie <e>` modifie les sujets qui référencent l'entité citée
+        subjects = set(entities)
+        for entity in entities:
+            node = state.iris.lookup(entity)
+            if node is not None:
+                subjects.update(state.iris.values[s] for _, s in state.in_edges(node))
+        subjects = sorted(subjects)
+        rows = defaultdict(lambda: ([], []))
+        for start in range(0, len(subjects), REFRESH_BATCH_SIZE):
+            for s, p, target, is_iri in self._load(state.iris, state.values, subjects[start:start + REFRESH_BATCH_SIZE]):
+                rows[s][0 if is_iri else 1].append((p, target))
+        for subject in subjects:
+            node = state.iris.intern(subject)
+            state.replace_subject(node, *rows[node])
+        if len(state.rewritten) > COMPACT_THRESHOLD:
+            self._state = state.compacted()
+            self.compactions += 1
+
+    def _current(self):
+        with self._lock:
+            if self._state is None or self._stale:
+                self.refresh()
+            return self._state
+
+    def _node(self, state, node, types=()):
+        return {'id': state.iris.values[node], 'label': state.label(node), 'types': list(types), 'properties': {}}
+
+    def ontology_graph(self, class_names, limit):
+        """Individus des classes (sous-classes comprises), leurs valeurs et leurs liens.
+
+        Mêmes nœuds et arêtes que la requête SPARQL d'origine : un nœud par
+        individu et par cible IRI, les arêtes rdf:type exclues ; au plus
+        `limit` triplets sont parcourus.
+        """
+        with self._lock:
+            state = self._current()
+            iris = state.iris.values
+            focus_types = set()
+            for class_name in class_names:
+                focus_types.update(self.hierarchy.subclasses(class_name) or [ONTOLOGY_NS + class_name])
+            focus = defaultdict(list)
+            for type_iri in sorted(focus_types):
+                for subject in state.subjects_of_type(type_iri):
+                    focus[subject].append(type_iri)
+
+            nodes, edges, visited = {}, [], 0
+            for subject in sorted(focus, key=iris.__getitem__):
+                # Comme le LIMIT de la requête : aucun nœud au-delà du dernier triplet parcouru
+                if visited >= limit:
+                    break
+                node = nodes.get(subject)
+                if node is None:
+                    node = nodes[subject] = self._node(state, subject)
+                node['types'] = focus[subject]
+                for p, target in state.out_edges(subject):
+                    if visited >= limit:
+                        break
+                    visited += 1
+                    if target not in nodes:
+                        nodes[target] = self._node(state, target)
+                    if p != state.rdf_type:
+                        edges.append({'source': iris[subject], 'target': iris[target],
+                                      'predicate': iris[p], 'predicateLabel': state.label(p)})
+                for p, value in state.literal_values(subject):
+                    if visited >= limit:
+                        break
+                    visited += 1
+                    node['properties'].setdefault(iris[p], []).append(state.values.values[value])
+            return {'nodes': list(nodes.values()), 'edges': edges}
+
+    def neighborhood(self, iri, depth, limit):
+        """Nœuds à au plus `depth` arêtes de `iri` (dans les deux sens), None si l'IRI est inconnue"""
+        with self._lock:
+            state = self._current()
+            iris = state.iris.values
+            center = state.iris.lookup(iri)
+            if center is None or not (state.out_edges(center) or state.in_edges(center)
+                                      or state.literal_values(center)):
+                return None
+            distance = {center: 0}
+            frontier = [center]
+            edges = set()
+            truncated = False
+            for level in range(1, depth + 1):
+                next_frontier = []
+                for node in frontier:
+                    neighbours = [(node, p, t) for p, t in state.out_edges(node) if p != state.rdf_type]
+                    neighbours += [(s, p, node) for p, s in state.in_edges(node) if p != state.rdf_type]
+                    for s, p, t in neighbours:
+                        other = t if s == node else s
+                        if other not in distance:
+                            if len(distance) >= limit:
+                                truncated = True
+                                continue
+                            distance[other] = level
+                            next_frontier.append(other)
+                        edges.add((s, p, t))
+                frontier = next_frontier
+
+            nodes = []
+            for node, level in sorted(distance.items(), key=lambda item: (item[1], iris[item[0]])):
+                entry = self._node(state, node, sorted(iris[t] for p, t in state.out_edges(node)
+                                                       if p == state.rdf_type))
+                entry['distance'] = level
+                for p, value in state.literal_values(node):
+                    entry['properties'].setdefault(iris[p], []).append(state.values.values[value])
+                nodes.append(entry)
+            return {
+                'center': iri,
+                'depth': depth,
+                'nodes': nodes,
+                'edges': [{'source': iris[s], 'target': iris[t], 'predicate': iris[p],
+                           'predicateLabel': state.label(p)}
+                          for s, p, t in sorted(edges, key=lambda e: (iris[e[0]], iris[e[1]], iris[e[2]]))
+                          if s in distance and t in distance],
+                'truncated': truncated
+            }
+
+    def stats(self, top=10):
+        """Taille du graphe, arêtes par prédicat, degrés et nœuds les plus connectés"""
+        with self._lock:
+            state = self._current()
+            iris = state.iris.values
+            predicates = Counter()
+            types = Counter()
+            degree = Counter()
+            # Les IRIs internées qui ne figurent plus dans aucun triplet ne comptent pas
+            used = set()
+            literals = 0
+            for s, p, target, is_iri in state.triples():
+                used.update((s, p))
+                if not is_iri:
+                    literals += 1
+                    continue
+                used.add(target)
+                if p == state.rdf_type:
+                    types[target] += 1
+                else:
+                    predicates[p] += 1
+                    degree[s] += 1
+                    degree[target] += 1
+            links = sum(predicates.values())
+            return {
+                'iris': len(used),
+                'links': links,
+                'type_assertions': sum(types.values()),
+                'literal_values': literals,
+                'average_degree': round(2 * links / len(degree), 3) if degree else 0,
+                'predicates': [{'predicate': iris[p], 'label': state.label(p), 'count': count}
+                               for p, count in predicates.most_common()],
+                'classes': [{'class': iris[t], 'label': state.label(t), 'count': count}
+                            for t, count in types.most_common(top)],
+                'hubs': [{'id': iris[node], 'label': state.label(node), 'degree': count}
+                         for node, count in degree.most_common(top)]
+            }
+
+    def status(self):
+        with self._lock:
+            state = self._state
+            return {
+                "loaded": state is not None,
+                "stale": self._stale,
+                "iris": len(state.iris) if state is not None else 0,
+                "edges": len(state.edges) if state is not None else 0,
+                "literals": len(state.literals) if state is not None else 0,
+                "rewritten_subjects": len(state.rewritten) if state is not None else 0,
+                "array_bytes": sum(csr.nbytes() for csr in (state.edges, state.incoming, state.literals))
+                if state is not None else 0,
+                "refreshed_at": self.refreshed_at,
+                "full_refreshes": self.full_refreshes,
+                "incremental_updates": self.incremental_updates,
+                "compactions": self.compactions
+            }
+
+
+graph_index = GraphIndex(sparql_utils, class_hierarchy)
+sparql_utils.add_update_listener(graph_index.on_update)
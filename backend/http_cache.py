@@ -0,0 +1,162 @@
+"""Validation HTTP des lectures : ETag fort tiré de la version du jeu de données, 304 sans requête SPARQL"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from fnmatch import fnmatchcase
+
+from flask import Response, g, request
+
+from sparql_utils import sparql_utils
+
+HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Durée (secondes) pendant laquelle un client peut réutiliser les statistiques sans revalider
+STATS_MAX_AGE = int(os.getenv('HTTP_CACHE_STATS_MAX_AGE', '30'))
+# Données DBpedia : externes, leur fraîcheur ne dépend pas de la version du jeu de données
+DBPEDIA_MAX_AGE = int(os.getenv('HTTP_CACHE_DBPEDIA_MAX_AGE', '3600'))
+
+# Une version ne vaut que pour ce processus : un ETag émis avant un redémarrage ne doit plus correspondre
+BOOT_ID = uuid.uuid4().hex
+
+
+class CachePolicy:
+    """En-tête Cache-Control d'une route ; etag=False si la réponse ne dépend pas que des données"""
+
+    def __init__(self, cache_control, etag=True):
+        self.cache_control = cache_control
+        self.etag = etag
+
+
+# Par défaut le client garde la réponse mais la revalide à chaque usage (304 si rien n'a changé)
+DEFAULT_POLICY = CachePolicy('no-cache')
+NO_STORE = CachePolicy('no-store', etag=False)
+
+# Règle Flask (motif glob) -> politique ; la première qui correspond s'applique
+ROUTE_POLICIES = [
+    ('/api/health', NO_STORE),
+    ('/api/test', NO_STORE),
+    ('/api/cache/stats', NO_STORE),
+    ('/api/search/cache/stats', NO_STORE),
+    ('/api/*/dbpedia-enrich', CachePolicy(f'private, max-age={DBPEDIA_MAX_AGE}', etag=False)),
+    # took_ms diffère d'une réponse à l'autre : pas d'ETag fort, courte réutilisation pendant la saisie
+    ('/api/autocomplete', CachePolicy('private, max-age=30', etag=False)),
+    ('/api/ontology-stats', CachePolicy(f'public, max-age={STATS_MAX_AGE}, must-revalidate')),
+    ('/api/education-stats', CachePolicy(f'public, max-age={STATS_MAX_AGE}, must-revalidate')),
+    ('/api/*/stats', CachePolicy(f'public, max-age={STATS_MAX_AGE}, must-revalidate')),
+]
+
+
+def route_policy(rule):
+    for pattern, policy in ROUTE_POLICIES:
+        if fnmatchcase(rule, pattern):
+            return policy
+    return DEFAULT_POLICY
+
+
+def is_error_body(response):
+    """Réponse 200 portant {"error": ...} (certaines listes signalent ainsi un échec SPARQL)"""
+    if not response.is_json:
+        return False
+    body = response.get_data()
+    if not body.lstrip().startswith(b'{'):
+        return False
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return False
+    return isinstance(data, dict) and 'error' in data
+
+
+class HttpCache:
+    """ETag et Cache-Control des routes GET.
+
+    L'ETag d'une réponse est calculé avant d'exécuter la vue à partir de la
+    route, des paramètres, de l'en-tête Accept et de la version du jeu de
+    données ; un If-None-Match égal est donc traité par un 304 sans interroger
+    le store. La version est lue avant la vue : une écriture concurrente ne
+    peut que rendre l'ETag obsolète, jamais l'attacher à des données périmées.
+    Les écritures faites hors de l'API (scripts/load_data.py, chargement ou
+    --sync) sont signalées par POST /api/cache/refresh, qui incrémente la
+    version comme une écriture de l'API.
+
+    La version (comme BOOT_ID, les caches et les index dérivés) est propre au
+    processus : avec plusieurs workers, une écriture ou un /api/cache/refresh
+    n'atteint que le worker qui la reçoit, et un ETag émis par un autre worker
+    y reste valide (304 sur les anciennes données) jusqu'à son redémarrage.
+    """
+
+    def __init__(self, store, enabled=HTTP_CACHE_ENABLED):
+        self.store = store
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.not_modified = 0
+        self.tagged = 0
+
+    def init_app(self, app):
+        if self.enabled:
+            app.before_request(self._before_request)
+            app.after_request(self._after_request)
+
+    def etag(self, version):
+        key = '\0'.join([
+            BOOT_ID,
+            request.path,
+            '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True))),
+            request.headers.get('Accept', '')
+        ])
+        return f"{version}-{hashlib.blake2b(key.encode('utf-8'), digest_size=12).hexdigest()}"
+
+    def _before_request(self):
+        if request.method not in ('GET', 'HEAD') or request.url_rule is None:
+            return None
+        policy = route_policy(request.url_rule.rule)
+        g.http_cache_policy = policy
+        if not policy.etag:
+            return None
+        g.http_cache_etag = self.etag(self.store.dataset_version)
+        if request.if_none_match.contains_weak(g.http_cache_etag):
+            with self._lock:
+                self.not_modified += 1
+            response = Response(status=304)
+            response.set_etag(g.http_cache_etag)
+            return response
+        return None
+
+    def _after_request(self, response):
+        policy = g.get('http_cache_policy')
+        if policy is None or response.status_code == 304:
+            if policy is not None:
+                self._set_headers(response, policy)
+            return response
+        # Un flux n'est pas relu : une erreur peut survenir en cours de route, il n'a pas d'ETag
+        if response.status_code != 200 or (not response.is_streamed and is_error_body(response)):
+            response.headers['Cache-Control'] = 'no-store'
+            return response
+        etag = g.get('http_cache_etag')
+        if etag is not None and not response.is_streamed:
+            response.set_etag(etag)
+            with self._lock:
+                self.tagged += 1
+        self._set_headers(response, policy)
+        return response
+
+    @staticmethod
+    def _set_headers(response, policy):
+        response.headers['Cache-Control'] = policy.cache_control
+        if policy.etag:
+            # Accept choisit entre JSON et NDJSON : il fait partie de l'ETag
+            response.vary.add('Accept')
+
+    def status(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "dataset_version": self.store.dataset_version,
+                "not_modified": self.not_modified,
+                "tagged": self.tagged
+            }
+
+
+http_cache = HttpCache(sparql_utils)
@@ -0,0 +1,495 @@
+"""Statistiques matérialisées : agrégats calculés une fois puis tenus à jour à chaque écriture"""
+
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from class_hierarchy import HIERARCHY_UPDATE_MARKERS, class_hierarchy
+from query_cache import ONTOLOGY_NS, written_entities
+from sparql_utils import RESULT_TYPED, short_name, sparql_utils
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+OWL = "http://www.w3.org/2002/07/owl#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+NUMERIC_DATATYPES = {XSD + name for name in (
+    'integer', 'decimal', 'double', 'float', 'int', 'long', 'short', 'byte',
+    'nonNegativeInteger', 'positiveInteger', 'nonPositiveInteger', 'negativeInteger',
+    'unsignedInt', 'unsignedLong', 'unsignedShort', 'unsignedByte'
+)}
+INTEGER_DATATYPES = NUMERIC_DATATYPES - {XSD + 'decimal', XSD + 'double', XSD + 'float'}
+
+# Propriétés lues pour chaque entité ; les relations sont aussi indexées à l'envers
+VALUE_PROPERTIES = ('niveauEtude', 'grade', 'nomSpecialite', 'nomUniversite', 'nombreEtudiants',
+                    'rangNational', 'pays', 'ville')
+RELATION_PROPERTIES = ('faitPartieDe', 'specialiseEn', 'formePour', 'emploie', 'offre', 'adopteTechnologie')
+
+# Clé de réponse de /api/ontology-stats -> classe comptée
+INSTANCE_CLASSES = {
+    "personnes": "Personne",
+    "etudiants": "Etudiant",
+    "enseignants": "Enseignant",
+    "cours": "Cours",
+    "universites": "Universite",
+    "specialites": "Specialite",
+    "competences": "Competence",
+    "projets": "ProjetAcademique",
+    "ressources": "RessourcePedagogique",
+    "technologies": "TechnologieEducative"
+}
+
+ONTOLOGY_INFO_QUERY = """
+PREFIX edu: <http://www.education-intelligente.org/ontologie#>
+PREFIX terms: <http://purl.org/dc/terms/>
+
+SELECT ?title ?description ?version ?creator ?created
+WHERE {
+    ?ontology a owl:Ontology .
+    OPTIONAL { ?ontology terms:title ?title }
+    OPTIONAL { ?ontology terms:description ?description }
+    OPTIONAL { ?ontology owl:versionInfo ?version }
+    OPTIONAL { ?ontology terms:creator ?creator }
+    OPTIONAL { ?ontology terms:created ?created }
+}
+"""
+
+# Taille des blocs VALUES lors de la relecture d'entités après une écriture
+REFRESH_BATCH_SIZE = 500
+
+
+def _facts_query(entities=None):
+    """Triplets utiles aux statistiques, pour tout le graphe ou pour quelques entités"""
+    predicates = ', '.join(
+        [f'<{RDF_TYPE}>'] + [f'<{ONTOLOGY_NS}{name}>' for name in VALUE_PROPERTIES + RELATION_PROPERTIES]
+    )
+    values = f"VALUES ?entity {{ {' '.join(f'<{iri}>' for iri in entities)} }}" if entities is not None else ""
+    return f"""
+    SELECT ?entity ?p ?o WHERE {{
+        {values}
+        ?entity ?p ?o .
+        FILTER(?p IN ({predicates}))
+    }}
+    """
+
+
+class EntityFacts:
+    """Types et valeurs (Term) des propriétés suivies d'une entité"""
+    __slots__ = ('types', 'values')
+
+    def __init__(self):
+        self.types = set()
+        self.values = defaultdict(list)
+
+    def get(self, name):
+        return self.values.get(ONTOLOGY_NS + name, ())
+
+    def is_a(self, class_name):
+        return ONTOLOGY_NS + class_name in self.types
+
+
+class StatsState:
+    """Faits par entité, index inverse des relations et compteurs agrégés"""
+
+    def __init__(self):
+        self.facts = {}
+        self.referrers = defaultdict(set)
+        self.contributions = {}
+        # statistique -> Counter(clé -> nombre) ; une clé à 0 est supprimée
+        self.counts = defaultdict(Counter)
+
+    def set_facts(self, entity, facts):
+        previous = self.facts.pop(entity, None)
+        if previous is not None:
+            for name in RELATION_PROPERTIES:
+                for term in previous.get(name):
+                    self.referrers[term.value].discard(entity)
+        if facts is not None:
+            self.facts[entity] = facts
+            for name in RELATION_PROPERTIES:
+                for term in facts.get(name):
+                    self.referrers[term.value].add(entity)
+
+    def recount(self, entity, universite_types):
+        """Remplace la contribution d'une entité aux compteurs (+1/-1 par clé)"""
+        for stat, key, amount in self.contributions.pop(entity, ()):
+            self._add(stat, key, -amount)
+        facts = self.facts.get(entity)
+        if facts is None:
+            return
+        contribution = _contribution(entity, facts, self.facts, universite_types)
+        for stat, key, amount in contribution:
+            self._add(stat, key, amount)
+        if contribution:
+            self.contributions[entity] = contribution
+
+    def _add(self, stat, key, amount):
+        counter = self.counts[stat]
+        counter[key] += amount
+        if not counter[key]:
+            del counter[key]
+
+    def scalar(self, stat):
+        return self.counts[stat].get(None, 0)
+
+    def distinct(self, stat):
+        return len(self.counts[stat])
+
+
+def _contribution(entity, facts, all_facts, universite_types):
+    """Apport d'une entité à chaque agrégat : liste de (statistique, clé, quantité).
+
+    Reproduit la sémantique des requêtes COUNT/SUM/GROUP BY d'origine (lignes
+    multipliées par les OPTIONAL multi-valués comprises).
+    """
+    contribution = []
+    in_ontology = entity.startswith(ONTOLOGY_NS)
+    ontology_types = [t for t in facts.types if t.startswith(ONTOLOGY_NS)]
+
+    # /api/ontology-stats
+    if in_ontology and OWL + 'Class' in facts.types:
+        contribution.append(("classes", entity, 1))
+    for class_iri in ontology_types:
+        contribution.append(("classes", class_iri, 1))
+    if in_ontology and (OWL + 'ObjectProperty' in facts.types or OWL + 'DatatypeProperty' in facts.types):
+        contribution.append(("properties", None, 1))
+    if ontology_types:
+        contribution.append(("individuals", None, 1))
+    for key, class_name in INSTANCE_CLASSES.items():
+        if facts.is_a(class_name):
+            contribution.append(("instances:" + key, None, 1))
+
+    # /api/education-stats
+    if facts.is_a('Etudiant'):
+        for niveau in facts.get('niveauEtude') or [None]:
+            contribution.append(("etudiants_par_niveau", niveau and niveau.value, 1))
+    if facts.is_a('Enseignant'):
+        for grade in facts.get('grade') or [None]:
+            contribution.append(("enseignants_par_grade", grade and grade.value, 1))
+
+    def target(term):
+        return all_facts.get(term.value)
+
+    if facts.is_a('Cours'):
+        for specialite in facts.get('faitPartieDe'):
+            target_facts = target(specialite)
+            for nom in target_facts.get('nomSpecialite') if target_facts else ():
+                contribution.append(("cours_par_specialite", (specialite.value, nom.value), 1))
+
+    # /api/specialites/stats
+    def has_specialite(name):
+        return any((target(term) or EntityFacts()).is_a('Specialite') for term in facts.get(name))
+
+    if facts.is_a('Specialite'):
+        contribution.append(("specialites", None, 1))
+        for competence in facts.get('formePour'):
+            contribution.append(("specialite_competences", competence.value, 1))
+    if has_specialite('specialiseEn'):
+        contribution.append(("specialite_etudiants", None, 1))
+    if has_specialite('faitPartieDe'):
+        contribution.append(("specialite_cours", None, 1))
+
+    # /api/universites/stats
+    if any(t in universite_types for t in facts.types):
+        labels = {_universite_label(t) for t in facts.types if t in universite_types}
+        for label in labels:
+            contribution.append(("universites_par_type", label, 1))
+    if facts.is_a('Universite'):
+        contribution.append(("universites", None, 1))
+        # SUM sur le produit des OPTIONAL : chaque valeur compte une fois par ligne
+        rows = 1
+        for name in ('emploie', 'offre', 'adopteTechnologie'):
+            rows *= max(1, len(facts.get(name)))
+        for nombre in facts.get('nombreEtudiants'):
+            number = _number(nombre)
+            if number is None:
+                contribution.append(("universite_etudiants_invalides", None, 1))
+            else:
+                contribution.append(("universite_etudiants", None, number * rows))
+        for stat, name in (("universite_enseignants", 'emploie'), ("universite_specialites", 'offre'),
+                           ("universite_technologies", 'adopteTechnologie')):
+            for term in facts.get(name):
+                contribution.append((stat, term.value, 1))
+        for stat, name in (("universites_par_pays", 'pays'), ("universites_par_ville", 'ville')):
+            for value in {term.value for term in facts.get(name)}:
+                contribution.append((stat, value, 1))
+        if facts.get('nomUniversite') and any(_rang(term) is not None and _rang(term) <= 5
+                                              for term in facts.get('rangNational')):
+            contribution.append(("universites_top", entity, 1))
+    return contribution
+
+
+def _universite_label(type_iri):
+    if type_iri == ONTOLOGY_NS + 'UniversitePublique':
+        return "Publique"
+    if type_iri == ONTOLOGY_NS + 'UniversitePrivee':
+        return "Privée"
+    return "Générale"
+
+
+def _number(term):
+    """Valeur numérique d'un littéral typé, None si SUM le rejetterait"""
+    if term.datatype not in NUMERIC_DATATYPES:
+        return None
+    try:
+        value = float(term.value)
+    except ValueError:
+        return None
+    # La somme d'entiers reste entière, comme le SUM du serveur
+    return int(value) if term.datatype in INTEGER_DATATYPES else value
+
+
+def _rang(term):
+    """Équivalent de xsd:integer(?rangNational), None si la conversion échoue"""
+    try:
+        return int(term.value.strip())
+    except ValueError:
+        return None
+
+
+def _format_number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _grouped(counter, name, limit=None):
+    """Lignes {name, count} triées par effectif décroissant (clé None -> variable non liée)"""
+    rows = []
+    for key, count in sorted(counter.items(), key=lambda item: (-item[1], str(item[0]))):
+        row = {"count": str(count)}
+        if key is not None:
+            row[name] = short_name(key)
+        rows.append(row)
+    return rows[:limit] if limit else rows
+
+
+class MaterializedStats:
+    """Agrégats des endpoints de statistiques, servis sans requête SPARQL.
+
+    Un recalcul complet lit en une passe les triplets utiles et en déduit tous
+    les compteurs. Ensuite, chaque écriture relit seulement les entités
+    qu'elle cite (et celles qui les référencent) et applique la différence
+    (+1/-1 par classe, niveau, grade, spécialité...). Une écriture dont la
+    portée ne peut être déterminée (CLEAR, motif à sujet variable sur un
+    littéral, hiérarchie modifiée) marque les statistiques à recalculer à la
+    prochaine lecture. Un thread recalcule tout périodiquement pour corriger
+    une éventuelle dérive.
+    """
+
+    def __init__(self, store, hierarchy, interval):
+        self.store = store
+        self.hierarchy = hierarchy
+        self.interval = interval
+        self._lock = threading.RLock()
+        # Un seul recalcul complet à la fois à la lecture, hors de self._lock
+        self._refresh_lock = threading.Lock()
+        self._state = None
+        self._ontology_info = {}
+        self._stale = True
+        self._writes = 0
+        self._thread = None
+        self.refreshed_at = None
+        self.full_refreshes = 0
+        self.incremental_updates = 0
+
+    def _universite_types(self):
+        return frozenset(self.hierarchy.subclasses('Universite') or [ONTOLOGY_NS + 'Universite'])
+
+    def _load_facts(self, entities=None):
+        facts = {}
+        for row in self.store.stream_query(_facts_query(entities), mode=RESULT_TYPED):
+            entity = row['entity'].value
+            entity_facts = facts.get(entity)
+            if entity_facts is None:
+                entity_facts = facts[entity] = EntityFacts()
+            if row['p'].value == RDF_TYPE:
+                entity_facts.types.add(row['o'].value)
+            else:
+                entity_facts.values[row['p'].value].append(row['o'])
+        return facts
+
+    def refresh(self):
+        """Recalcul complet des agrégats (une requête sur le graphe)"""
+        with self._lock:
+            writes = self._writes
+        started = time.monotonic()
+        facts = self._load_facts()
+        universite_types = self._universite_types()
+        state = StatsState()
+        for entity, entity_facts in facts.items():
+            state.set_facts(entity, entity_facts)
+        for entity in facts:
+            state.recount(entity, universite_types)
+        info = self.store.execute_query(ONTOLOGY_INFO_QUERY)
+        with self._lock:
+            self._state = state
+            self._ontology_info = info[0] if isinstance(info, list) and info else {}
+            # Une écriture pendant le calcul a pu être appliquée à l'ancien état
+            self._stale = writes != self._writes
+            self.refreshed_at = time.time()
+            self.full_refreshes += 1
+        print(f"Statistiques matérialisées: {len(facts)} entité(s) en {time.monotonic() - started:.2f}s")
+
+    def on_update(self, update_query):
+        """Écouteur des mises à jour réussies : applique la différence des entités touchées"""
+        with self._lock:
+            self._writes += 1
+            if self._state is None or self._stale:
+                return
+            entities = written_entities(update_query)
+            if entities is None or any(marker in update_query for marker in HIERARCHY_UPDATE_MARKERS):
+                self._stale = True
+                return
+            try:
+                self._refresh_entities(entities)
+                self.incremental_updates += 1
+            except Exception as e:
+                print(f"WARNING: Mise à jour incrémentale des statistiques impossible: {str(e)}")
+                self._stale = True
+
+    def _refresh_entities(self, entities):
+        state = self._state
+        # Les entités qui référencent une entité modifiée dépendent de ses faits
+        affected = set(entities)
+        for entity in entities:
+            affected |= state.referrers.get(entity, set())
+        entities = sorted(entities)
+        facts = {}
+        for start in range(0, len(entities), REFRESH_BATCH_SIZE):
+            facts.update(self._load_facts(entities[start:start + REFRESH_BATCH_SIZE]))
+        for entity in entities:
+            state.set_facts(entity, facts.get(entity))
+        universite_types = self._universite_types()
+        for entity in affected:
+            state.recount(entity, universite_types)
+
+    def _current(self):
+        with self._lock:
+            if self._state is not None and not self._stale:
+                return self._state
+        # Comme le recalcul périodique, la requête sur tout le graphe s'exécute
+        # sans self._lock : les écouteurs des écritures ne l'attendent pas
+        with self._refresh_lock:
+            with self._lock:
+                stale = self._state is None or self._stale
+            if stale:
+                self.refresh()
+        with self._lock:
+            return self._state
+
+    def start(self):
+        """Calcul initial puis recalcul périodique en arrière-plan (STATS_RECOMPUTE_INTERVAL)"""
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"WARNING: Statistiques matérialisées indisponibles: {str(e)}")
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='stats-refresh', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"WARNING: Recalcul des statistiques impossible: {str(e)}")
+
+    # Réponses des endpoints
+
+    def ontology_stats(self):
+        state = self._current()
+        with self._lock:
+            return {
+                "ontology_info": dict(self._ontology_info),
+                "statistics": {
+                    "total_classes": str(state.distinct("classes")),
+                    "total_properties": str(state.scalar("properties")),
+                    "total_individuals": str(state.scalar("individuals"))
+                },
+                "instances": {key: str(state.scalar("instances:" + key)) for key in INSTANCE_CLASSES}
+            }
+
+    def education_stats(self):
+        state = self._current()
+        with self._lock:
+            cours_par_specialite = []
+            for (specialite, _), count in sorted(state.counts["cours_par_specialite"].items(),
+                                                 key=lambda item: (-item[1], item[0])):
+                cours_par_specialite.append({"specialite": short_name(specialite), "count": str(count)})
+            return {
+                "etudiants_par_niveau": _grouped(state.counts["etudiants_par_niveau"], "niveau"),
+                "enseignants_par_grade": _grouped(state.counts["enseignants_par_grade"], "grade"),
+                "cours_par_specialite": cours_par_specialite
+            }
+
+    def specialites_stats(self):
+        state = self._current()
+        with self._lock:
+            return {
+                "total_specialites": str(state.scalar("specialites")),
+                "total_etudiants": str(state.scalar("specialite_etudiants")),
+                "total_cours": str(state.scalar("specialite_cours")),
+                "total_competences": str(state.distinct("specialite_competences"))
+            }
+
+    def universites_stats(self):
+        state = self._current()
+        with self._lock:
+            stats = {
+                "total_universites": str(state.scalar("universites")),
+                "total_enseignants": str(state.distinct("universite_enseignants")),
+                "total_specialites": str(state.distinct("universite_specialites")),
+                "total_technologies": str(state.distinct("universite_technologies"))
+            }
+            # Une valeur non numérique fait échouer SUM : la variable reste non liée
+            if not state.scalar("universite_etudiants_invalides"):
+                stats["total_etudiants"] = _format_number(state.scalar("universite_etudiants"))
+            return {
+                "stats": stats,
+                "facets": {
+                    "by_type": _grouped(state.counts["universites_par_type"], "typeUniversite"),
+                    "by_pays": _grouped(state.counts["universites_par_pays"], "pays", limit=20),
+                    "by_ville": _grouped(state.counts["universites_par_ville"], "ville", limit=20),
+                    "top_rated": self._top_rated(state)
+                }
+            }
+
+    def _top_rated(self, state):
+        rows = []
+        for universite in state.counts["universites_top"]:
+            facts = state.facts[universite]
+            for nom in facts.get('nomUniversite'):
+                for rang in facts.get('rangNational'):
+                    value = _rang(rang)
+                    if value is None or value > 5:
+                        continue
+                    for ville in facts.get('ville') or [None]:
+                        for pays in facts.get('pays') or [None]:
+                            for nombre in facts.get('nombreEtudiants') or [None]:
+                                row = {"universite": universite, "nomUniversite": nom.value,
+                                       "rangNational": rang.value}
+                                for key, term in (("ville", ville), ("pays", pays), ("nombreEtudiants", nombre)):
+                                    if term is not None:
+                                        row[key] = term.value
+                                rows.append((value, row))
+        rows.sort(key=lambda item: item[0])
+        return [{key: short_name(value) for key, value in row.items()} for _, row in rows]
+
+    def status(self):
+        with self._lock:
+            return {
+                "loaded": self._state is not None,
+                "stale": self._stale,
+                "entities": len(self._state.facts) if self._state is not None else 0,
+                "refreshed_at": self.refreshed_at,
+                "full_refreshes": self.full_refreshes,
+                "incremental_updates": self.incremental_updates,
+                "recompute_interval": self.interval
+            }
+
+
+materialized_stats = MaterializedStats(
+    sparql_utils, class_hierarchy, float(os.getenv('STATS_RECOMPUTE_INTERVAL', '600'))
+)
+sparql_utils.add_update_listener(materialized_stats.on_update)
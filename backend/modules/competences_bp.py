@@ -2,6 +2,13 @@
 
 from flask import Blueprint, jsonify, request
 from sparql_utils import sparql_utils
+from streaming import requested_stream_format, stream_query_response
+from pagination import requested_page, paginated_query_response
+from class_hierarchy import class_hierarchy
+from query_templates import templates, Classes, IRI, LITERAL
+from bulk import bulk_create, insert_data_query
+from text_index import no_match, text_index, ranked, values_clause
+from facet_index import facet_index, LinkFacet, ValueFacet
 from modules.validators import validate_competence
 from modules.dbpedia_service import dbpedia_service
 import uuid
@@ -9,9 +16,16 @@ import uuid
 competences_bp = Blueprint('competences', __name__)
 PREFIX = "http://www.education-intelligente.org/ontologie#"
 
+# Facet dimensions, counted from the in-memory bitset index (drill-down via query args)
+COMPETENCES_FACETS = facet_index.register('Competence', [
+    ValueFacet('by_type', 'typeCompetence', 'typeCompetence'),
+    ValueFacet('by_niveau', 'niveauCompetence', 'niveauCompetence'),
+    LinkFacet('by_specialite', 'specialite', 'nomSpecialite', 'formePour', 'nomSpecialite', reverse=True)
+])
+
 def generate_competence_uri(nom: str) -> str:
     """Generate a unique URI for a competence"""
-    safe_nom = nom.upper().replace(' ', '_').replace("'", "")[:50]
+    safe_nom = IRI.segment(nom.upper().replace(' ', '_').replace("'", "")[:50])
     return f"{PREFIX}Competence_{safe_nom}_{uuid.uuid4().hex[:8]}"
 
 @competences_bp.route('/competences', methods=['GET'])
@@ -25,7 +39,7 @@ def get_all_competences():
            ?specialite ?nomSpecialite
     WHERE {{
         ?competence a ?type .
-        ?type rdfs:subClassOf* ont:Competence .
+        {class_hierarchy.type_values('type', 'Competence')}
         OPTIONAL {{ ?competence ont:nomCompetence ?nomCompetence . }}
         OPTIONAL {{ ?competence ont:typeCompetence ?typeCompetence . }}
         OPTIONAL {{ ?competence ont:niveauCompetence ?niveauCompetence . }}
@@ -38,76 +52,83 @@ def get_all_competences():
     }}
     ORDER BY ?nomCompetence
     """
+    page = requested_page()
+    if page:
+        return paginated_query_response(query, page, 'competence', 'nomCompetence')
+
+    stream_format = requested_stream_format()
+    if stream_format:
+        return stream_query_response(query, stream_format)
+    
     try:
         results = sparql_utils.execute_query(query)
         return jsonify(results)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@competences_bp.route('/competences/<competence_id>', methods=['GET'])
-def get_competence(competence_id):
-    """Get a specific competence"""
-    query = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+COMPETENCE_DETAIL_QUERY = templates.register('competences.detail', """
     SELECT ?competence ?nomCompetence ?typeCompetence ?niveauCompetence ?descriptionCompetence ?motsCles
            ?specialite ?nomSpecialite ?projet ?titreProjet
-    WHERE {{
-        <{competence_id}> a ?type .
-        ?type rdfs:subClassOf* ont:Competence .
-        OPTIONAL {{ <{competence_id}> ont:nomCompetence ?nomCompetence . }}
-        OPTIONAL {{ <{competence_id}> ont:typeCompetence ?typeCompetence . }}
-        OPTIONAL {{ <{competence_id}> ont:niveauCompetence ?niveauCompetence . }}
-        OPTIONAL {{ <{competence_id}> ont:descriptionCompetence ?descriptionCompetence . }}
-        OPTIONAL {{ <{competence_id}> ont:motsCles ?motsCles . }}
-        OPTIONAL {{
-            ?specialite ont:formePour <{competence_id}> .
+    WHERE {
+        $competence_id a ?type .
+        $types
+        OPTIONAL { $competence_id ont:nomCompetence ?nomCompetence . }
+        OPTIONAL { $competence_id ont:typeCompetence ?typeCompetence . }
+        OPTIONAL { $competence_id ont:niveauCompetence ?niveauCompetence . }
+        OPTIONAL { $competence_id ont:descriptionCompetence ?descriptionCompetence . }
+        OPTIONAL { $competence_id ont:motsCles ?motsCles . }
+        OPTIONAL {
+            ?specialite ont:formePour $competence_id .
             ?specialite ont:nomSpecialite ?nomSpecialite .
-        }}
-        OPTIONAL {{
-            ?projet ont:requiertCompetence <{competence_id}> .
+        }
+        OPTIONAL {
+            ?projet ont:requiertCompetence $competence_id .
             ?projet ont:titreProjet ?titreProjet .
-        }}
-    }}
-    """
+        }
+    }
+    """, competence_id=IRI, types=Classes('type', 'Competence'))
+
+@competences_bp.route('/competences/<competence_id>', methods=['GET'])
+def get_competence(competence_id):
+    """Get a specific competence"""
+    query = COMPETENCE_DETAIL_QUERY.bind(competence_id=competence_id)
     try:
         results = sparql_utils.execute_query(query)
         return jsonify(results[0] if results else {}), 404 if not results else 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@competences_bp.route('/competences', methods=['POST'])
-def create_competence():
-    """Create a new competence"""
-    data = request.json
-    
-    errors = validate_competence(data)
-    if errors:
-        return jsonify({"errors": errors}), 400
-    
+def build_competence_triples(data):
+    """Build the RDF triples of a new competence, returns (uri, triples)"""
     competence_uri = generate_competence_uri(data.get('nomCompetence'))
     
     insert_parts = [
-        f"<{competence_uri}> a ont:Competence",
-        f"; ont:nomCompetence \"{data.get('nomCompetence')}\""
+        f"{IRI.render(competence_uri)} a ont:Competence",
+        f"; ont:nomCompetence {LITERAL.render(data.get('nomCompetence'))}"
     ]
     
     if data.get('typeCompetence'):
-        insert_parts.append(f"; ont:typeCompetence \"{data.get('typeCompetence')}\"")
+        insert_parts.append(f"; ont:typeCompetence {LITERAL.render(data.get('typeCompetence'))}")
     if data.get('niveauCompetence'):
-        insert_parts.append(f"; ont:niveauCompetence \"{data.get('niveauCompetence')}\"")
+        insert_parts.append(f"; ont:niveauCompetence {LITERAL.render(data.get('niveauCompetence'))}")
     if data.get('descriptionCompetence'):
-        insert_parts.append(f"; ont:descriptionCompetence \"{data.get('descriptionCompetence')}\"")
+        insert_parts.append(f"; ont:descriptionCompetence {LITERAL.render(data.get('descriptionCompetence'))}")
     if data.get('motsCles'):
-        insert_parts.append(f"; ont:motsCles \"{data.get('motsCles')}\"")
+        insert_parts.append(f"; ont:motsCles {LITERAL.render(data.get('motsCles'))}")
     
-    query = f"""
-    PREFIX ont: <{PREFIX}>
-    INSERT DATA {{
-        {' '.join(insert_parts)} .
-    }}
-    """
+    return competence_uri, f"{' '.join(insert_parts)} ."
+
+@competences_bp.route('/competences', methods=['POST'])
+def create_competence():
+    """Create a new competence"""
+    data = request.json
+    
+    errors = validate_competence(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    
+    competence_uri, triples = build_competence_triples(data)
+    query = insert_data_query([triples])
     
     try:
         result = sparql_utils.execute_update(query)
@@ -117,6 +138,11 @@ def create_competence():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@competences_bp.route('/competences/bulk', methods=['POST'])
+def bulk_create_competences():
+    """Create many competences in a single SPARQL update"""
+    return bulk_create(request.json, validate_competence, build_competence_triples, "compétences")
+
 @competences_bp.route('/competences/<competence_id>', methods=['PUT'])
 def update_competence(competence_id):
     """Update a competence"""
@@ -126,29 +152,30 @@ def update_competence(competence_id):
     if errors:
         return jsonify({"errors": errors}), 400
     
+    subject = IRI.render(competence_id)
     delete_query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE {{
-        <{competence_id}> ?p ?o .
+        {subject} ?p ?o .
     }}
     WHERE {{
-        <{competence_id}> ?p ?o .
+        {subject} ?p ?o .
         FILTER(?p != ont:formePour && ?p != ont:requiertCompetence)
     }}
     """
     
-    insert_parts = [f"<{competence_id}> a ont:Competence"]
+    insert_parts = [f"{subject} a ont:Competence"]
     
     if data.get('nomCompetence'):
-        insert_parts.append(f"; ont:nomCompetence \"{data.get('nomCompetence')}\"")
+        insert_parts.append(f"; ont:nomCompetence {LITERAL.render(data.get('nomCompetence'))}")
     if data.get('typeCompetence'):
-        insert_parts.append(f"; ont:typeCompetence \"{data.get('typeCompetence')}\"")
+        insert_parts.append(f"; ont:typeCompetence {LITERAL.render(data.get('typeCompetence'))}")
     if data.get('niveauCompetence'):
-        insert_parts.append(f"; ont:niveauCompetence \"{data.get('niveauCompetence')}\"")
+        insert_parts.append(f"; ont:niveauCompetence {LITERAL.render(data.get('niveauCompetence'))}")
     if data.get('descriptionCompetence'):
-        insert_parts.append(f"; ont:descriptionCompetence \"{data.get('descriptionCompetence')}\"")
+        insert_parts.append(f"; ont:descriptionCompetence {LITERAL.render(data.get('descriptionCompetence'))}")
     if data.get('motsCles'):
-        insert_parts.append(f"; ont:motsCles \"{data.get('motsCles')}\"")
+        insert_parts.append(f"; ont:motsCles {LITERAL.render(data.get('motsCles'))}")
     
     insert_query = f"""
     PREFIX ont: <{PREFIX}>
@@ -158,8 +185,8 @@ def update_competence(competence_id):
     """
     
     try:
-        sparql_utils.execute_update(delete_query)
-        result = sparql_utils.execute_update(insert_query)
+        # DELETE and INSERT in one atomic request
+        result = sparql_utils.execute_update_batch([delete_query, insert_query])
         if "error" in result:
             return jsonify(result), 500
         return jsonify({"message": "Compétence mise à jour avec succès"}), 200
@@ -181,7 +208,7 @@ def delete_competence(competence_id):
     query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE WHERE {{
-        <{competence_uri}> ?p ?o .
+        {IRI.render(competence_uri)} ?p ?o .
     }}
     """
     
@@ -195,9 +222,15 @@ def delete_competence(competence_id):
 
 @competences_bp.route('/competences/search', methods=['POST'])
 def search_competences():
-    """Search competences"""
+    """Search competences (full-text index, then one query for the candidates)"""
     data = request.json
-    filters = []
+    matches = text_index.search({
+        'nomCompetence': data.get('nomCompetence'),
+        'typeCompetence': data.get('typeCompetence')
+    })
+    
+    if no_match(matches):
+        return jsonify([])
     
     query = f"""
     PREFIX ont: <{PREFIX}>
@@ -205,83 +238,34 @@ def search_competences():
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     SELECT ?competence ?nomCompetence ?typeCompetence ?niveauCompetence ?descriptionCompetence
     WHERE {{
+        {values_clause('competence', matches)}
         ?competence a ?type .
-        ?type rdfs:subClassOf* ont:Competence .
+        {class_hierarchy.type_values('type', 'Competence')}
         OPTIONAL {{ ?competence ont:nomCompetence ?nomCompetence . }}
         OPTIONAL {{ ?competence ont:typeCompetence ?typeCompetence . }}
         OPTIONAL {{ ?competence ont:niveauCompetence ?niveauCompetence . }}
         OPTIONAL {{ ?competence ont:descriptionCompetence ?descriptionCompetence . }}
+    }} ORDER BY ?nomCompetence
     """
     
-    if data.get('nomCompetence'):
-        filters.append(f'REGEX(?nomCompetence, "{data.get("nomCompetence")}", "i")')
-    if data.get('typeCompetence'):
-        filters.append(f'REGEX(?typeCompetence, "{data.get("typeCompetence")}", "i")')
-    
-    if filters:
-        query += " FILTER(" + " && ".join(filters) + ")"
-    
-    query += "} ORDER BY ?nomCompetence"
-    
     try:
         results = sparql_utils.execute_query(query)
-        return jsonify(results)
+        return jsonify(ranked(results, 'competence', matches))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @competences_bp.route('/competences/facets', methods=['GET'])
 def get_competences_facets():
     """Récupère les facettes pour la navigation filtrée"""
-    query_type = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT ?typeCompetence (COUNT(DISTINCT ?competence) as ?count)
-    WHERE {{
-        ?competence a ?type .
-        ?type rdfs:subClassOf* ont:Competence .
-        ?competence ont:typeCompetence ?typeCompetence .
-    }}
-    GROUP BY ?typeCompetence
-    ORDER BY DESC(?count)
-    """
-    query_niveau = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT ?niveauCompetence (COUNT(DISTINCT ?competence) as ?count)
-    WHERE {{
-        ?competence a ?type .
-        ?type rdfs:subClassOf* ont:Competence .
-        ?competence ont:niveauCompetence ?niveauCompetence .
-    }}
-    GROUP BY ?niveauCompetence
-    ORDER BY DESC(?count)
-    """
-    query_specialite = f"""
-    PREFIX ont: <{PREFIX}>
-    SELECT ?specialite ?nomSpecialite (COUNT(DISTINCT ?competence) as ?count)
-    WHERE {{
-        ?specialite ont:formePour ?competence .
-        ?specialite ont:nomSpecialite ?nomSpecialite .
-    }}
-    GROUP BY ?specialite ?nomSpecialite
-    ORDER BY DESC(?count)
-    LIMIT 20
-    """
     try:
-        facets = {
-            "by_type": sparql_utils.execute_query(query_type),
-            "by_niveau": sparql_utils.execute_query(query_niveau),
-            "by_specialite": sparql_utils.execute_query(query_specialite)
-        }
-        return jsonify(facets)
+        return jsonify(COMPETENCES_FACETS.counts(request.args))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @competences_bp.route('/competences/<path:competence_id>/dbpedia-enrich', methods=['GET'])
 def enrich_competence_with_dbpedia(competence_id):
     """Enrich competence data with DBpedia information"""
+    subject = IRI.render(competence_id)
     try:
         query = f"""
         PREFIX ont: <{PREFIX}>
@@ -289,10 +273,10 @@ def enrich_competence_with_dbpedia(competence_id):
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         SELECT ?nomCompetence ?typeCompetence
         WHERE {{
-            <{competence_id}> a ?type .
-            ?type rdfs:subClassOf* ont:Competence .
-            OPTIONAL {{ <{competence_id}> ont:nomCompetence ?nomCompetence . }}
-            OPTIONAL {{ <{competence_id}> ont:typeCompetence ?typeCompetence . }}
+            {subject} a ?type .
+            {class_hierarchy.type_values('type', 'Competence')}
+            OPTIONAL {{ {subject} ont:nomCompetence ?nomCompetence . }}
+            OPTIONAL {{ {subject} ont:typeCompetence ?typeCompetence . }}
         }}
         LIMIT 1
         """
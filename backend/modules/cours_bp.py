@@ -2,6 +2,13 @@
 
 from flask import Blueprint, jsonify, request
 from sparql_utils import sparql_utils
+from streaming import requested_stream_format, stream_query_response
+from pagination import requested_page, paginated_query_response
+from class_hierarchy import class_hierarchy
+from query_templates import templates, Classes, IRI, LITERAL
+from bulk import bulk_create, insert_data_query
+from text_index import no_match, text_index, ranked, values_clause
+from facet_index import facet_index, LinkFacet, ValueFacet
 from modules.validators import validate_cours
 from modules.dbpedia_service import dbpedia_service
 import uuid
@@ -9,9 +16,17 @@ import uuid
 cours_bp = Blueprint('cours', __name__)
 PREFIX = "http://www.education-intelligente.org/ontologie#"
 
+# Facet dimensions, counted from the in-memory bitset index (drill-down via query args)
+COURS_FACETS = facet_index.register('Cours', [
+    ValueFacet('by_semestre', 'semestre', 'semestre'),
+    ValueFacet('by_langue', 'langueCours', 'langueCours'),
+    LinkFacet('by_specialite', 'specialite', 'nomSpecialite', 'faitPartieDe', 'nomSpecialite'),
+    ValueFacet('by_credits', 'creditsECTS', 'creditsECTS')
+])
+
 def generate_cours_uri(code_cours: str) -> str:
     """Generate a unique URI for a cours"""
-    safe_code = code_cours.upper().replace(' ', '_')
+    safe_code = IRI.segment(code_cours.upper().replace(' ', '_'))
     return f"{PREFIX}Cours_{safe_code}_{uuid.uuid4().hex[:8]}"
 
 @cours_bp.route('/cours', methods=['GET'])
@@ -25,7 +40,7 @@ def get_all_cours():
            ?specialite ?nomSpecialite
     WHERE {{
         ?cours a ?type .
-        ?type rdfs:subClassOf* ont:Cours .
+        {class_hierarchy.type_values('type', 'Cours')}
         OPTIONAL {{ ?cours ont:intitule ?intitule . }}
         OPTIONAL {{ ?cours ont:codeCours ?codeCours . }}
         OPTIONAL {{ ?cours ont:creditsECTS ?creditsECTS . }}
@@ -39,88 +54,93 @@ def get_all_cours():
     }}
     ORDER BY ?codeCours
     """
+    page = requested_page()
+    if page:
+        return paginated_query_response(query, page, 'cours', 'codeCours')
+
+    stream_format = requested_stream_format()
+    if stream_format:
+        return stream_query_response(query, stream_format)
+    
     try:
         results = sparql_utils.execute_query(query)
         return jsonify(results)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@cours_bp.route('/cours/<cours_id>', methods=['GET'])
-def get_cours(cours_id):
-    """Get a specific course - includes all subclasses"""
-    query = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+COURS_DETAIL_QUERY = templates.register('cours.detail', """
     SELECT ?cours ?intitule ?codeCours ?creditsECTS ?semestre ?volumeHoraire ?langueCours
            ?specialite ?nomSpecialite ?enseignant ?nomEnseignant ?prenomEnseignant
-    WHERE {{
-        <{cours_id}> a ?type .
-        ?type rdfs:subClassOf* ont:Cours .
-        OPTIONAL {{ <{cours_id}> ont:intitule ?intitule . }}
-        OPTIONAL {{ <{cours_id}> ont:codeCours ?codeCours . }}
-        OPTIONAL {{ <{cours_id}> ont:creditsECTS ?creditsECTS . }}
-        OPTIONAL {{ <{cours_id}> ont:semestre ?semestre . }}
-        OPTIONAL {{ <{cours_id}> ont:volumeHoraire ?volumeHoraire . }}
-        OPTIONAL {{ <{cours_id}> ont:langueCours ?langueCours . }}
-        OPTIONAL {{
-            <{cours_id}> ont:faitPartieDe ?specialite .
+    WHERE {
+        $cours_id a ?type .
+        $types
+        OPTIONAL { $cours_id ont:intitule ?intitule . }
+        OPTIONAL { $cours_id ont:codeCours ?codeCours . }
+        OPTIONAL { $cours_id ont:creditsECTS ?creditsECTS . }
+        OPTIONAL { $cours_id ont:semestre ?semestre . }
+        OPTIONAL { $cours_id ont:volumeHoraire ?volumeHoraire . }
+        OPTIONAL { $cours_id ont:langueCours ?langueCours . }
+        OPTIONAL {
+            $cours_id ont:faitPartieDe ?specialite .
             ?specialite ont:nomSpecialite ?nomSpecialite .
-        }}
-        OPTIONAL {{
-            <{cours_id}> ont:enseignePar ?enseignant .
+        }
+        OPTIONAL {
+            $cours_id ont:enseignePar ?enseignant .
             ?enseignant ont:nom ?nomEnseignant .
             ?enseignant ont:prenom ?prenomEnseignant .
-        }}
-    }}
-    """
+        }
+    }
+    """, cours_id=IRI, types=Classes('type', 'Cours'))
+
+@cours_bp.route('/cours/<cours_id>', methods=['GET'])
+def get_cours(cours_id):
+    """Get a specific course - includes all subclasses"""
+    query = COURS_DETAIL_QUERY.bind(cours_id=cours_id)
     try:
         results = sparql_utils.execute_query(query)
         return jsonify(results[0] if results else {}), 404 if not results else 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@cours_bp.route('/cours', methods=['POST'])
-def create_cours():
-    """Create a new course"""
-    data = request.json
-    
-    # Validation
-    errors = validate_cours(data)
-    if errors:
-        return jsonify({"errors": errors}), 400
-    
-    # Generate URI
+def build_cours_triples(data):
+    """Build the RDF triples of a new course, returns (uri, triples)"""
     cours_uri = generate_cours_uri(data.get('codeCours'))
     
-    # Build INSERT query
     insert_parts = [
-        f"<{cours_uri}> a ont:Cours",
-        f"; ont:intitule \"{data.get('intitule')}\"",
-        f"; ont:codeCours \"{data.get('codeCours')}\""
+        f"{IRI.render(cours_uri)} a ont:Cours",
+        f"; ont:intitule {LITERAL.render(data.get('intitule'))}",
+        f"; ont:codeCours {LITERAL.render(data.get('codeCours'))}"
     ]
     
     if data.get('creditsECTS'):
         insert_parts.append(f"; ont:creditsECTS {int(data.get('creditsECTS'))}")
     
     if data.get('semestre'):
-        insert_parts.append(f"; ont:semestre \"{data.get('semestre')}\"")
+        insert_parts.append(f"; ont:semestre {LITERAL.render(data.get('semestre'))}")
     
     if data.get('volumeHoraire'):
         insert_parts.append(f"; ont:volumeHoraire {int(data.get('volumeHoraire'))}")
     
     if data.get('langueCours'):
-        insert_parts.append(f"; ont:langueCours \"{data.get('langueCours')}\"")
+        insert_parts.append(f"; ont:langueCours {LITERAL.render(data.get('langueCours'))}")
     
     if data.get('specialite'):
-        insert_parts.append(f"; ont:faitPartieDe <{data.get('specialite')}>")
+        insert_parts.append(f"; ont:faitPartieDe {IRI.render(data.get('specialite'))}")
     
-    query = f"""
-    PREFIX ont: <{PREFIX}>
-    INSERT DATA {{
-        {' '.join(insert_parts)} .
-    }}
-    """
+    return cours_uri, f"{' '.join(insert_parts)} ."
+
+@cours_bp.route('/cours', methods=['POST'])
+def create_cours():
+    """Create a new course"""
+    data = request.json
+    
+    # Validation
+    errors = validate_cours(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    
+    cours_uri, triples = build_cours_triples(data)
+    query = insert_data_query([triples])
     
     try:
         result = sparql_utils.execute_update(query)
@@ -130,6 +150,11 @@ def create_cours():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@cours_bp.route('/cours/bulk', methods=['POST'])
+def bulk_create_cours():
+    """Create many courses in a single SPARQL update"""
+    return bulk_create(request.json, validate_cours, build_cours_triples, "cours")
+
 @cours_bp.route('/cours/<cours_id>', methods=['PUT'])
 def update_cours(cours_id):
     """Update a course"""
@@ -141,32 +166,33 @@ def update_cours(cours_id):
         return jsonify({"errors": errors}), 400
     
     # Build DELETE and INSERT for update
+    subject = IRI.render(cours_id)
     delete_query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE {{
-        <{cours_id}> ?p ?o .
+        {subject} ?p ?o .
     }}
     WHERE {{
-        <{cours_id}> ?p ?o .
+        {subject} ?p ?o .
     }}
     """
     
-    insert_parts = [f"<{cours_id}> a ont:Cours"]
+    insert_parts = [f"{subject} a ont:Cours"]
     
     if data.get('intitule'):
-        insert_parts.append(f"; ont:intitule \"{data.get('intitule')}\"")
+        insert_parts.append(f"; ont:intitule {LITERAL.render(data.get('intitule'))}")
     if data.get('codeCours'):
-        insert_parts.append(f"; ont:codeCours \"{data.get('codeCours')}\"")
+        insert_parts.append(f"; ont:codeCours {LITERAL.render(data.get('codeCours'))}")
     if data.get('creditsECTS'):
         insert_parts.append(f"; ont:creditsECTS {int(data.get('creditsECTS'))}")
     if data.get('semestre'):
-        insert_parts.append(f"; ont:semestre \"{data.get('semestre')}\"")
+        insert_parts.append(f"; ont:semestre {LITERAL.render(data.get('semestre'))}")
     if data.get('volumeHoraire'):
         insert_parts.append(f"; ont:volumeHoraire {int(data.get('volumeHoraire'))}")
     if data.get('langueCours'):
-        insert_parts.append(f"; ont:langueCours \"{data.get('langueCours')}\"")
+        insert_parts.append(f"; ont:langueCours {LITERAL.render(data.get('langueCours'))}")
     if data.get('specialite'):
-        insert_parts.append(f"; ont:faitPartieDe <{data.get('specialite')}>")
+        insert_parts.append(f"; ont:faitPartieDe {IRI.render(data.get('specialite'))}")
     
     insert_query = f"""
     PREFIX ont: <{PREFIX}>
@@ -176,10 +202,8 @@ def update_cours(cours_id):
     """
     
     try:
-        # Execute delete
-        sparql_utils.execute_update(delete_query)
-        # Execute insert
-        result = sparql_utils.execute_update(insert_query)
+        # DELETE and INSERT in one atomic request
+        result = sparql_utils.execute_update_batch([delete_query, insert_query])
         if "error" in result:
             return jsonify(result), 500
         return jsonify({"message": "Cours mis à jour avec succès"}), 200
@@ -201,7 +225,7 @@ def delete_cours(cours_id):
     query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE WHERE {{
-        <{cours_uri}> ?p ?o .
+        {IRI.render(cours_uri)} ?p ?o .
     }}
     """
     
@@ -215,9 +239,16 @@ def delete_cours(cours_id):
 
 @cours_bp.route('/cours/search', methods=['POST'])
 def search_cours():
-    """Search courses by criteria"""
+    """Search courses by criteria (full-text index, then one query for the candidates)"""
     data = request.json
-    filters = []
+    matches = text_index.search({
+        'intitule': data.get('intitule'),
+        'codeCours': data.get('codeCours'),
+        'semestre': data.get('semestre')
+    })
+    
+    if no_match(matches):
+        return jsonify([])
     
     query = f"""
     PREFIX ont: <{PREFIX}>
@@ -225,107 +256,29 @@ def search_cours():
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     SELECT ?cours ?intitule ?codeCours ?creditsECTS ?semestre ?volumeHoraire ?langueCours
     WHERE {{
+        {values_clause('cours', matches)}
         ?cours a ?type .
-        ?type rdfs:subClassOf* ont:Cours .
+        {class_hierarchy.type_values('type', 'Cours')}
         OPTIONAL {{ ?cours ont:intitule ?intitule . }}
         OPTIONAL {{ ?cours ont:codeCours ?codeCours . }}
         OPTIONAL {{ ?cours ont:creditsECTS ?creditsECTS . }}
         OPTIONAL {{ ?cours ont:semestre ?semestre . }}
         OPTIONAL {{ ?cours ont:volumeHoraire ?volumeHoraire . }}
         OPTIONAL {{ ?cours ont:langueCours ?langueCours . }}
+    }} ORDER BY ?codeCours
     """
     
-    if data.get('intitule'):
-        filters.append(f'REGEX(?intitule, "{data.get("intitule")}", "i")')
-    if data.get('codeCours'):
-        filters.append(f'REGEX(?codeCours, "{data.get("codeCours")}", "i")')
-    if data.get('semestre'):
-        filters.append(f'REGEX(?semestre, "{data.get("semestre")}", "i")')
-    
-    if filters:
-        query += " FILTER(" + " && ".join(filters) + ")"
-    
-    query += "} ORDER BY ?codeCours"
-    
     try:
         results = sparql_utils.execute_query(query)
-        return jsonify(results)
+        return jsonify(ranked(results, 'cours', matches))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @cours_bp.route('/cours/facets', methods=['GET'])
 def get_cours_facets():
     """Récupère les facettes pour la navigation filtrée - comptages par catégorie"""
-    # Facettes par semestre
-    query_semestre = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT ?semestre (COUNT(DISTINCT ?cours) as ?count)
-    WHERE {{
-        ?cours a ?type .
-        ?type rdfs:subClassOf* ont:Cours .
-        ?cours ont:semestre ?semestre .
-    }}
-    GROUP BY ?semestre
-    ORDER BY DESC(?count)
-    """
-    
-    # Facettes par langue
-    query_langue = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT ?langueCours (COUNT(DISTINCT ?cours) as ?count)
-    WHERE {{
-        ?cours a ?type .
-        ?type rdfs:subClassOf* ont:Cours .
-        ?cours ont:langueCours ?langueCours .
-    }}
-    GROUP BY ?langueCours
-    ORDER BY DESC(?count)
-    """
-    
-    # Facettes par spécialité
-    query_specialite = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT ?specialite ?nomSpecialite (COUNT(DISTINCT ?cours) as ?count)
-    WHERE {{
-        ?cours a ?type .
-        ?type rdfs:subClassOf* ont:Cours .
-        ?cours ont:faitPartieDe ?specialite .
-        ?specialite ont:nomSpecialite ?nomSpecialite .
-    }}
-    GROUP BY ?specialite ?nomSpecialite
-    ORDER BY DESC(?count)
-    LIMIT 20
-    """
-    
-    # Facettes par crédits ECTS
-    query_credits = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT ?creditsECTS (COUNT(DISTINCT ?cours) as ?count)
-    WHERE {{
-        ?cours a ?type .
-        ?type rdfs:subClassOf* ont:Cours .
-        ?cours ont:creditsECTS ?creditsECTS .
-    }}
-    GROUP BY ?creditsECTS
-    ORDER BY DESC(?count)
-    """
-    
     try:
-        facets = {
-            "by_semestre": sparql_utils.execute_query(query_semestre),
-            "by_langue": sparql_utils.execute_query(query_langue),
-            "by_specialite": sparql_utils.execute_query(query_specialite),
-            "by_credits": sparql_utils.execute_query(query_credits)
-        }
-        return jsonify(facets)
+        return jsonify(COURS_FACETS.counts(request.args))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -336,6 +289,7 @@ def enrich_cours_with_dbpedia(cours_id):
     Accepts optional 'term' query parameter to search for specific term
     If no term provided, uses the cours intitule
     """
+    subject = IRI.render(cours_id)
     try:
         # Get the cours data
         query = f"""
@@ -344,12 +298,12 @@ def enrich_cours_with_dbpedia(cours_id):
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         SELECT ?intitule ?codeCours ?nomSpecialite
         WHERE {{
-            <{cours_id}> a ?type .
-            ?type rdfs:subClassOf* ont:Cours .
-            OPTIONAL {{ <{cours_id}> ont:intitule ?intitule . }}
-            OPTIONAL {{ <{cours_id}> ont:codeCours ?codeCours . }}
+            {subject} a ?type .
+            {class_hierarchy.type_values('type', 'Cours')}
+            OPTIONAL {{ {subject} ont:intitule ?intitule . }}
+            OPTIONAL {{ {subject} ont:codeCours ?codeCours . }}
             OPTIONAL {{
-                <{cours_id}> ont:faitPartieDe ?specialite .
+                {subject} ont:faitPartieDe ?specialite .
                 ?specialite ont:nomSpecialite ?nomSpecialite .
             }}
         }}
@@ -4,8 +4,10 @@ Enables federated SPARQL queries to enrich local data with DBpedia information
 """
 from SPARQLWrapper import SPARQLWrapper, JSON, POST
 import requests
+import json
 import xml.etree.ElementTree as ET
 import os
+from async_http import get_client, httpx
 
 class DBpediaService:
     """Service for querying DBpedia and enriching local ontology data"""
@@ -57,110 +59,12 @@ class DBpediaService:
             
             response.raise_for_status()
             
-            # Parse the Lookup API response (returns XML by default)
-            references = []
-            content_type = response.headers.get('Content-Type', '').lower()
-            
-            if 'xml' in content_type or 'text' in content_type:
-                # Parse XML response
-                try:
-                    root = ET.fromstring(response.content)
-                    print(f"DEBUG: Parsing XML response, root tag: {root.tag}")
-                    
-                    # Look for results in XML (common structure: ArrayOfResult -> Result -> Label/URI)
-                    for result in root.findall('.//Result'):
-                        label_elem = result.find('Label')
-                        uri_elem = result.find('URI')
-                        
-                        if label_elem is not None and uri_elem is not None:
-                            label = label_elem.text
-                            uri = uri_elem.text
-                            
-                            if label and uri:
-                                references.append({
-                                    "title": label,
-                                    "uri": uri
-                                })
-                    
-                    # Alternative XML structure
-                    if not references:
-                        for result in root.findall('.//result'):
-                            label = result.findtext('label') or result.findtext('Label')
-                            uri = result.findtext('uri') or result.findtext('URI') or result.findtext('resource')
-                            
-                            if label and uri:
-                                references.append({
-                                    "title": label,
-                                    "uri": uri
-                                })
-                    
-                    print(f"DEBUG: Parsed {len(references)} results from XML")
-                    
-                except ET.ParseError as e:
-                    print(f"DEBUG: XML parsing error: {str(e)}")
-                    return {
-                        "search_text": search_text,
-                        "error": f"Failed to parse XML response: {str(e)}"
-                    }
-            else:
-                # Try to parse as JSON
-                try:
-                    data = response.json()
-                    print(f"DEBUG: Parsed JSON keys: {list(data.keys()) if isinstance(data, dict) else 'not a dict'}")
-                    
-                    # The Lookup API returns results in different formats depending on version
-                    results = []
-                    if isinstance(data, dict):
-                        results = data.get('results', []) or data.get('docs', []) or data.get('data', [])
-                    elif isinstance(data, list):
-                        results = data
-                    
-                    print(f"DEBUG: Found {len(results)} raw results")
-                    
-                    for result in results:
-                        if isinstance(result, dict):
-                            label = result.get('label') or result.get('Label') or result.get('name') or result.get('Name')
-                            uri = result.get('uri') or result.get('URI') or result.get('resource') or result.get('@URI')
-                            
-                            if not uri:
-                                resource = result.get('resource') or result.get('Resource')
-                                if resource:
-                                    if isinstance(resource, str):
-                                        uri = resource
-                                    elif isinstance(resource, dict):
-                                        uri = resource.get('uri') or resource.get('URI')
-                            
-                            if uri and label:
-                                references.append({
-                                    "title": label,
-                                    "uri": uri
-                                })
-                        elif isinstance(result, str):
-                            references.append({
-                                "title": result.split('/')[-1].replace('_', ' '),
-                                "uri": result
-                            })
-                except ValueError as e:
-                    print(f"DEBUG: JSON parsing error: {str(e)}")
-                    return {
-                        "search_text": search_text,
-                        "error": f"Failed to parse response (not XML or JSON): {str(e)}"
-                    }
-            
-            print(f"DEBUG: Found {len(references)} parsed results")
-            
-            if references:
-                return {
-                    "search_text": search_text,
-                    "results": references[:10],  # Limit to top 10
-                    "count": len(references[:10])
-                }
-            else:
-                # Return the raw response for debugging
-                return {
-                    "search_text": search_text,
-                    "error": f"No results found for '{search_text}'. API response: {str(data)[:200]}"
-                }
+            return self._parse_lookup_response(
+                search_text,
+                response.headers.get('Content-Type', ''),
+                response.content,
+                response.text
+            )
                 
         except requests.exceptions.Timeout:
             print(f"DEBUG: Lookup API request timed out for: {search_text}")
@@ -183,6 +87,161 @@ class DBpediaService:
                 "error": f"DBpedia lookup failed: {str(e)}"
             }
     
+    async def search_entities_async(self, search_text):
+        """
+        search_entities for the asyncio search path: the Lookup API call
+        goes through the shared httpx client instead of blocking a thread.
+        """
+        if not search_text or not search_text.strip():
+            return {"error": "Search text is required"}
+        
+        search_text = search_text.strip()
+        
+        try:
+            response = await get_client().get(
+                self.dbpedia_lookup_api,
+                params={'QueryString': search_text, 'MaxHits': 10},
+                headers={'Accept': 'application/json'},
+                timeout=10
+            )
+            response.raise_for_status()
+            
+            return self._parse_lookup_response(
+                search_text,
+                response.headers.get('Content-Type', ''),
+                response.content,
+                response.text
+            )
+        
+        except httpx.TimeoutException:
+            print(f"DEBUG: Lookup API request timed out for: {search_text}")
+            return {
+                "search_text": search_text,
+                "error": f"DBpedia lookup request timed out. Try a shorter search term."
+            }
+        except httpx.HTTPError as e:
+            print(f"DEBUG: Lookup API request failed: {str(e)}")
+            return {
+                "search_text": search_text,
+                "error": f"DBpedia lookup failed: {str(e)}"
+            }
+        except Exception as e:
+            print(f"Error querying DBpedia Lookup API: {str(e)}")
+            return {
+                "search_text": search_text,
+                "error": f"DBpedia lookup failed: {str(e)}"
+            }
+    
+    def _parse_lookup_response(self, search_text, content_type, content, text):
+        """
+        Turn a raw Lookup API response (XML or JSON) into the search_entities result.
+        Shared by the blocking and the asyncio code paths.
+        """
+        # Parse the Lookup API response (returns XML by default)
+        references = []
+        content_type = content_type.lower()
+
+        if 'xml' in content_type or 'text' in content_type:
+            # Parse XML response
+            try:
+                root = ET.fromstring(content)
+                print(f"DEBUG: Parsing XML response, root tag: {root.tag}")
+
+                # Look for results in XML (common structure: ArrayOfResult -> Result -> Label/URI)
+                for result in root.findall('.//Result'):
+                    label_elem = result.find('Label')
+                    uri_elem = result.find('URI')
+
+                    if label_elem is not None and uri_elem is not None:
+                        label = label_elem.text
+                        uri = uri_elem.text
+
+                        if label and uri:
+                            references.append({
+                                "title": label,
+                                "uri": uri
+                            })
+
+                # Alternative XML structure
+                if not references:
+                    for result in root.findall('.//result'):
+                        label = result.findtext('label') or result.findtext('Label')
+                        uri = result.findtext('uri') or result.findtext('URI') or result.findtext('resource')
+
+                        if label and uri:
+                            references.append({
+                                "title": label,
+                                "uri": uri
+                            })
+
+                print(f"DEBUG: Parsed {len(references)} results from XML")
+
+            except ET.ParseError as e:
+                print(f"DEBUG: XML parsing error: {str(e)}")
+                return {
+                    "search_text": search_text,
+                    "error": f"Failed to parse XML response: {str(e)}"
+                }
+        else:
+            # Try to parse as JSON
+            try:
+                data = json.loads(text)
+                print(f"DEBUG: Parsed JSON keys: {list(data.keys()) if isinstance(data, dict) else 'not a dict'}")
+
+                # The Lookup API returns results in different formats depending on version
+                results = []
+                if isinstance(data, dict):
+                    results = data.get('results', []) or data.get('docs', []) or data.get('data', [])
+                elif isinstance(data, list):
+                    results = data
+
+                print(f"DEBUG: Found {len(results)} raw results")
+
+                for result in results:
+                    if isinstance(result, dict):
+                        label = result.get('label') or result.get('Label') or result.get('name') or result.get('Name')
+                        uri = result.get('uri') or result.get('URI') or result.get('resource') or result.get('@URI')
+
+                        if not uri:
+                            resource = result.get('resource') or result.get('Resource')
+                            if resource:
+                                if isinstance(resource, str):
+                                    uri = resource
+                                elif isinstance(resource, dict):
+                                    uri = resource.get('uri') or resource.get('URI')
+
+                        if uri and label:
+                            references.append({
+                                "title": label,
+                                "uri": uri
+                            })
+                    elif isinstance(result, str):
+                        references.append({
+                            "title": result.split('/')[-1].replace('_', ' '),
+                            "uri": result
+                        })
+            except ValueError as e:
+                print(f"DEBUG: JSON parsing error: {str(e)}")
+                return {
+                    "search_text": search_text,
+                    "error": f"Failed to parse response (not XML or JSON): {str(e)}"
+                }
+
+        print(f"DEBUG: Found {len(references)} parsed results")
+
+        if references:
+            return {
+                "search_text": search_text,
+                "results": references[:10],  # Limit to top 10
+                "count": len(references[:10])
+            }
+        else:
+            # Return the raw response for debugging
+            return {
+                "search_text": search_text,
+                "error": f"No results found for '{search_text}'. API response: {text[:200]}"
+            }
+    
     def enrich_entity(self, search_term, entity_type=None):
         """
         Generic method to enrich any entity from DBpedia (backward compatibility)
@@ -1,7 +1,13 @@
 """CRUD endpoints for Evaluations"""
 
 from flask import Blueprint, jsonify, request
-from sparql_utils import sparql_utils
+from sparql_utils import escape_literal, sparql_utils
+from streaming import requested_stream_format, stream_query_response
+from pagination import requested_page, paginated_query_response
+from class_hierarchy import class_hierarchy
+from query_templates import templates, Classes, IRI, LITERAL, DATE
+from bulk import bulk_create, insert_data_query
+from text_index import no_match, text_index, ranked, values_clause
 from modules.validators import validate_evaluation
 from modules.dbpedia_service import dbpedia_service
 import uuid
@@ -11,8 +17,8 @@ PREFIX = "http://www.education-intelligente.org/ontologie#"
 
 def generate_evaluation_uri(type_eval: str, date_eval: str = None) -> str:
     """Generate a unique URI for an evaluation"""
-    safe_type = type_eval.upper().replace(' ', '_')[:30]
-    date_part = date_eval.replace('-', '') if date_eval else ''
+    safe_type = IRI.segment(type_eval.upper().replace(' ', '_')[:30])
+    date_part = IRI.segment(date_eval.replace('-', '')) if date_eval else ''
     return f"{PREFIX}Evaluation_{safe_type}_{date_part}_{uuid.uuid4().hex[:8]}"
 
 @evaluations_bp.route('/evaluations', methods=['GET'])
@@ -27,7 +33,7 @@ def get_all_evaluations():
            ?technologie ?nomTechnologie
     WHERE {{
         ?evaluation a ?type .
-        ?type rdfs:subClassOf* ont:Evaluation .
+        {class_hierarchy.type_values('type', 'Evaluation')}
         OPTIONAL {{ ?evaluation ont:typeEvaluation ?typeEvaluation . }}
         OPTIONAL {{ ?evaluation ont:dateEvaluation ?dateEvaluation . }}
         OPTIONAL {{
@@ -45,89 +51,95 @@ def get_all_evaluations():
     }}
     ORDER BY DESC(?dateEvaluation)
     """
+    page = requested_page()
+    if page:
+        return paginated_query_response(query, page, 'evaluation', 'dateEvaluation', descending=True)
+
+    stream_format = requested_stream_format()
+    if stream_format:
+        return stream_query_response(query, stream_format)
+    
     try:
         results = sparql_utils.execute_query(query)
         return jsonify(results)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@evaluations_bp.route('/evaluations/<evaluation_id>', methods=['GET'])
-def get_evaluation(evaluation_id):
-    """Get a specific evaluation"""
-    query = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+EVALUATION_DETAIL_QUERY = templates.register('evaluations.detail', """
     SELECT ?evaluation ?typeEvaluation ?dateEvaluation
            ?cours ?intitule ?projet ?titreProjet
            ?competence ?nomCompetence
            ?technologie ?nomTechnologie
-    WHERE {{
-        <{evaluation_id}> a ?type .
-        ?type rdfs:subClassOf* ont:Evaluation .
-        OPTIONAL {{ <{evaluation_id}> ont:typeEvaluation ?typeEvaluation . }}
-        OPTIONAL {{ <{evaluation_id}> ont:dateEvaluation ?dateEvaluation . }}
-        OPTIONAL {{
-            <{evaluation_id}> ont:porteSur ?cours .
+    WHERE {
+        $evaluation_id a ?type .
+        $types
+        OPTIONAL { $evaluation_id ont:typeEvaluation ?typeEvaluation . }
+        OPTIONAL { $evaluation_id ont:dateEvaluation ?dateEvaluation . }
+        OPTIONAL {
+            $evaluation_id ont:porteSur ?cours .
             ?cours ont:intitule ?intitule .
-        }}
-        OPTIONAL {{
-            <{evaluation_id}> ont:porteSur ?projet .
+        }
+        OPTIONAL {
+            $evaluation_id ont:porteSur ?projet .
             ?projet ont:titreProjet ?titreProjet .
-        }}
-        OPTIONAL {{
-            <{evaluation_id}> ont:mesureCompetence ?competence .
+        }
+        OPTIONAL {
+            $evaluation_id ont:mesureCompetence ?competence .
             ?competence ont:nomCompetence ?nomCompetence .
-        }}
-        OPTIONAL {{
-            <{evaluation_id}> ont:faciliteePar ?technologie .
+        }
+        OPTIONAL {
+            $evaluation_id ont:faciliteePar ?technologie .
             ?technologie ont:nomTechnologie ?nomTechnologie .
-        }}
-    }}
-    """
+        }
+    }
+    """, evaluation_id=IRI, types=Classes('type', 'Evaluation'))
+
+@evaluations_bp.route('/evaluations/<evaluation_id>', methods=['GET'])
+def get_evaluation(evaluation_id):
+    """Get a specific evaluation"""
+    query = EVALUATION_DETAIL_QUERY.bind(evaluation_id=evaluation_id)
     try:
         results = sparql_utils.execute_query(query)
         return jsonify(results[0] if results else {}), 404 if not results else 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@evaluations_bp.route('/evaluations', methods=['POST'])
-def create_evaluation():
-    """Create a new evaluation"""
-    data = request.json
-    
-    errors = validate_evaluation(data)
-    if errors:
-        return jsonify({"errors": errors}), 400
-    
+def build_evaluation_triples(data):
+    """Build the RDF triples of a new evaluation, returns (uri, triples)"""
     evaluation_uri = generate_evaluation_uri(
         data.get('typeEvaluation', ''),
         data.get('dateEvaluation', '')
     )
     
     insert_parts = [
-        f"<{evaluation_uri}> a ont:Evaluation",
-        f"; ont:typeEvaluation \"{data.get('typeEvaluation')}\""
+        f"{IRI.render(evaluation_uri)} a ont:Evaluation",
+        f"; ont:typeEvaluation {LITERAL.render(data.get('typeEvaluation'))}"
     ]
     
     if data.get('dateEvaluation'):
-        insert_parts.append(f"; ont:dateEvaluation \"{data.get('dateEvaluation')}\"^^xsd:date")
+        insert_parts.append(f"; ont:dateEvaluation {DATE.render(data.get('dateEvaluation'))}")
     if data.get('cours'):
-        insert_parts.append(f"; ont:porteSur <{data.get('cours')}>")
+        insert_parts.append(f"; ont:porteSur {IRI.render(data.get('cours'))}")
     if data.get('projet'):
-        insert_parts.append(f"; ont:porteSur <{data.get('projet')}>")
+        insert_parts.append(f"; ont:porteSur {IRI.render(data.get('projet'))}")
     if data.get('competence'):
-        insert_parts.append(f"; ont:mesureCompetence <{data.get('competence')}>")
+        insert_parts.append(f"; ont:mesureCompetence {IRI.render(data.get('competence'))}")
     if data.get('technologie'):
-        insert_parts.append(f"; ont:faciliteePar <{data.get('technologie')}>")
+        insert_parts.append(f"; ont:faciliteePar {IRI.render(data.get('technologie'))}")
     
-    query = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
-    INSERT DATA {{
-        {' '.join(insert_parts)} .
-    }}
-    """
+    return evaluation_uri, f"{' '.join(insert_parts)} ."
+
+@evaluations_bp.route('/evaluations', methods=['POST'])
+def create_evaluation():
+    """Create a new evaluation"""
+    data = request.json
+    
+    errors = validate_evaluation(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    
+    evaluation_uri, triples = build_evaluation_triples(data)
+    query = insert_data_query([triples])
     
     try:
         result = sparql_utils.execute_update(query)
@@ -137,6 +149,11 @@ def create_evaluation():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@evaluations_bp.route('/evaluations/bulk', methods=['POST'])
+def bulk_create_evaluations():
+    """Create many evaluations in a single SPARQL update"""
+    return bulk_create(request.json, validate_evaluation, build_evaluation_triples, "évaluations")
+
 @evaluations_bp.route('/evaluations/<evaluation_id>', methods=['PUT'])
 def update_evaluation(evaluation_id):
     """Update an evaluation"""
@@ -146,30 +163,31 @@ def update_evaluation(evaluation_id):
     if errors:
         return jsonify({"errors": errors}), 400
     
+    subject = IRI.render(evaluation_id)
     delete_query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE {{
-        <{evaluation_id}> ?p ?o .
+        {subject} ?p ?o .
     }}
     WHERE {{
-        <{evaluation_id}> ?p ?o .
+        {subject} ?p ?o .
     }}
     """
     
-    insert_parts = [f"<{evaluation_id}> a ont:Evaluation"]
+    insert_parts = [f"{subject} a ont:Evaluation"]
     
     if data.get('typeEvaluation'):
-        insert_parts.append(f"; ont:typeEvaluation \"{data.get('typeEvaluation')}\"")
+        insert_parts.append(f"; ont:typeEvaluation {LITERAL.render(data.get('typeEvaluation'))}")
     if data.get('dateEvaluation'):
-        insert_parts.append(f"; ont:dateEvaluation \"{data.get('dateEvaluation')}\"^^xsd:date")
+        insert_parts.append(f"; ont:dateEvaluation {DATE.render(data.get('dateEvaluation'))}")
     if data.get('cours'):
-        insert_parts.append(f"; ont:porteSur <{data.get('cours')}>")
+        insert_parts.append(f"; ont:porteSur {IRI.render(data.get('cours'))}")
     if data.get('projet'):
-        insert_parts.append(f"; ont:porteSur <{data.get('projet')}>")
+        insert_parts.append(f"; ont:porteSur {IRI.render(data.get('projet'))}")
     if data.get('competence'):
-        insert_parts.append(f"; ont:mesureCompetence <{data.get('competence')}>")
+        insert_parts.append(f"; ont:mesureCompetence {IRI.render(data.get('competence'))}")
     if data.get('technologie'):
-        insert_parts.append(f"; ont:faciliteePar <{data.get('technologie')}>")
+        insert_parts.append(f"; ont:faciliteePar {IRI.render(data.get('technologie'))}")
     
     insert_query = f"""
     PREFIX ont: <{PREFIX}>
@@ -180,8 +198,8 @@ def update_evaluation(evaluation_id):
     """
     
     try:
-        sparql_utils.execute_update(delete_query)
-        result = sparql_utils.execute_update(insert_query)
+        # DELETE and INSERT in one atomic request
+        result = sparql_utils.execute_update_batch([delete_query, insert_query])
         if "error" in result:
             return jsonify(result), 500
         return jsonify({"message": "Évaluation mise à jour avec succès"}), 200
@@ -203,7 +221,7 @@ def delete_evaluation(evaluation_id):
     delete_query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE WHERE {{
-        <{evaluation_uri}> ?p ?o .
+        {IRI.render(evaluation_uri)} ?p ?o .
     }}
     """
     
@@ -217,9 +235,14 @@ def delete_evaluation(evaluation_id):
 
 @evaluations_bp.route('/evaluations/search', methods=['POST'])
 def search_evaluations():
-    """Search evaluations"""
-    data = request.json
-    filters = []
+    """Search evaluations (full-text index, then one query for the candidates)"""
+    data = request.json or {}
+    matches = text_index.search({'typeEvaluation': data.get('typeEvaluation')})
+    if no_match(matches):
+        return jsonify([])
+    date_filter = ""
+    if data.get('dateEvaluation'):
+        date_filter = f'FILTER(?dateEvaluation = "{escape_literal(data.get("dateEvaluation"))}"^^xsd:date)'
     
     query = f"""
     PREFIX ont: <{PREFIX}>
@@ -228,25 +251,18 @@ def search_evaluations():
     PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
     SELECT ?evaluation ?typeEvaluation ?dateEvaluation
     WHERE {{
+        {values_clause('evaluation', matches)}
         ?evaluation a ?type .
-        ?type rdfs:subClassOf* ont:Evaluation .
+        {class_hierarchy.type_values('type', 'Evaluation')}
         OPTIONAL {{ ?evaluation ont:typeEvaluation ?typeEvaluation . }}
         OPTIONAL {{ ?evaluation ont:dateEvaluation ?dateEvaluation . }}
+        {date_filter}
+    }} ORDER BY DESC(?dateEvaluation)
     """
     
-    if data and data.get('typeEvaluation'):
-        filters.append(f'REGEX(?typeEvaluation, "{data.get("typeEvaluation")}", "i")')
-    if data and data.get('dateEvaluation'):
-        filters.append(f'?dateEvaluation = "{data.get("dateEvaluation")}"^^xsd:date')
-    
-    if filters:
-        query += "\n        FILTER(" + " && ".join(filters) + ")"
-    
-    query += "\n    } ORDER BY DESC(?dateEvaluation)"
-    
     try:
         results = sparql_utils.execute_query(query)
-        return jsonify(results)
+        return jsonify(ranked(results, 'evaluation', matches))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -260,7 +276,7 @@ def get_evaluations_facets():
     SELECT ?typeEvaluation (COUNT(DISTINCT ?evaluation) as ?count)
     WHERE {{
         ?evaluation a ?type .
-        ?type rdfs:subClassOf* ont:Evaluation .
+        {class_hierarchy.type_values('type', 'Evaluation')}
         ?evaluation ont:typeEvaluation ?typeEvaluation .
     }}
     GROUP BY ?typeEvaluation
@@ -273,7 +289,7 @@ def get_evaluations_facets():
     SELECT ?cours ?intitule (COUNT(DISTINCT ?evaluation) as ?count)
     WHERE {{
         ?evaluation a ?type .
-        ?type rdfs:subClassOf* ont:Evaluation .
+        {class_hierarchy.type_values('type', 'Evaluation')}
         ?evaluation ont:porteSur ?cours .
         ?cours ont:intitule ?intitule .
     }}
@@ -288,7 +304,7 @@ def get_evaluations_facets():
     SELECT ?competence ?nomCompetence (COUNT(DISTINCT ?evaluation) as ?count)
     WHERE {{
         ?evaluation a ?type .
-        ?type rdfs:subClassOf* ont:Evaluation .
+        {class_hierarchy.type_values('type', 'Evaluation')}
         ?evaluation ont:mesureCompetence ?competence .
         ?competence ont:nomCompetence ?nomCompetence .
     }}
@@ -297,11 +313,11 @@ def get_evaluations_facets():
     LIMIT 20
     """
     try:
-        facets = {
-            "by_type": sparql_utils.execute_query(query_type),
-            "by_cours": sparql_utils.execute_query(query_cours),
-            "by_competence": sparql_utils.execute_query(query_competence)
-        }
+        facets = sparql_utils.execute_many({
+            "by_type": query_type,
+            "by_cours": query_cours,
+            "by_competence": query_competence
+        })
         return jsonify(facets)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -309,6 +325,7 @@ def get_evaluations_facets():
 @evaluations_bp.route('/evaluations/<path:evaluation_id>/dbpedia-enrich', methods=['GET'])
 def enrich_evaluation_with_dbpedia(evaluation_id):
     """Enrich evaluation data with DBpedia information"""
+    subject = IRI.render(evaluation_id)
     try:
         query = f"""
         PREFIX ont: <{PREFIX}>
@@ -316,11 +333,11 @@ def enrich_evaluation_with_dbpedia(evaluation_id):
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         SELECT ?typeEvaluation ?intituleCours
         WHERE {{
-            <{evaluation_id}> a ?type .
-            ?type rdfs:subClassOf* ont:Evaluation .
-            OPTIONAL {{ <{evaluation_id}> ont:typeEvaluation ?typeEvaluation . }}
+            {subject} a ?type .
+            {class_hierarchy.type_values('type', 'Evaluation')}
+            OPTIONAL {{ {subject} ont:typeEvaluation ?typeEvaluation . }}
             OPTIONAL {{
-                <{evaluation_id}> ont:evalue ?cours .
+                {subject} ont:evalue ?cours .
                 ?cours ont:intitule ?intituleCours .
             }}
         }}
@@ -55,13 +55,15 @@ class GeminiSPARQLTransformer:
             print(f"Gemini API error: {e}")
             return self._get_fallback_query(question)
     
-    def transform_taln_analysis_to_sparql(self, taln_analysis: Dict[str, Any]) -> str:
+    def transform_taln_analysis_to_sparql(self, taln_analysis: Dict[str, Any], fallback: bool = True) -> str:
         """
         Transform TALN analysis result to SPARQL using Gemini.
         This is the new method that works with TALN extracted data.
         
         Args:
             taln_analysis: Dictionary containing TALN analysis results
+            fallback: If False, raise when Gemini fails or returns no SELECT
+                query instead of answering with a fallback query
             
         Returns:
             Generated SPARQL query string
@@ -87,6 +89,7 @@ class GeminiSPARQLTransformer:
             
             print(f"DEBUG: Gemini response received: {len(response.text)} characters")
             sparql_query = self._extract_sparql_query(response.text)
+            self._check_generated(sparql_query, fallback)
             print(f"DEBUG: Extracted SPARQL query: {len(sparql_query)} characters")
             print(f"DEBUG: Query preview: {sparql_query[:200]}...")
             
@@ -97,6 +100,8 @@ class GeminiSPARQLTransformer:
             
         except Exception as e:
             print(f"ERROR: Gemini API error with TALN analysis: {e}")
+            if not fallback:
+                raise
             print(f"DEBUG: Falling back to original question method")
             # Fallback to original question if available
             original_question = taln_analysis.get('original_question', '')
@@ -104,6 +109,54 @@ class GeminiSPARQLTransformer:
                 return self.transform_question_to_sparql(original_question)
             return self._get_fallback_query("personnes")
     
+    async def transform_question_to_sparql_async(self, question: str) -> str:
+        """transform_question_to_sparql for the asyncio search path (Gemini async API)"""
+        try:
+            response = await self.model.generate_content_async(
+                self._build_prompt(question),
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.1,
+                    top_p=0.8,
+                    top_k=40,
+                    max_output_tokens=1000,
+                )
+            )
+            
+            sparql_query = self._extract_sparql_query(response.text)
+            return self._validate_and_clean_query(sparql_query)
+            
+        except Exception as e:
+            print(f"Gemini API error: {e}")
+            return self._get_fallback_query(question)
+    
+    async def transform_taln_analysis_to_sparql_async(self, taln_analysis: Dict[str, Any],
+                                                      fallback: bool = True) -> str:
+        """transform_taln_analysis_to_sparql for the asyncio search path (Gemini async API)"""
+        try:
+            response = await self.model.generate_content_async(
+                self._build_taln_prompt(taln_analysis),
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.1,
+                    top_p=0.8,
+                    top_k=40,
+                    max_output_tokens=1200,
+                )
+            )
+            
+            sparql_query = self._extract_sparql_query(response.text)
+            self._check_generated(sparql_query, fallback)
+            return self._validate_and_clean_query(sparql_query)
+            
+        except Exception as e:
+            print(f"ERROR: Gemini API error with TALN analysis: {e}")
+            if not fallback:
+                raise
+            print(f"DEBUG: Falling back to original question method")
+            original_question = taln_analysis.get('original_question', '')
+            if original_question:
+                return await self.transform_question_to_sparql_async(original_question)
+            return self._get_fallback_query("personnes")
+    
     def _build_prompt(self, question: str) -> str:
         """Build the prompt for Gemini - Education domain only"""
         return f"""You are a SPARQL query generator for an educational platform. Convert the natural language question to a valid SPARQL query.
@@ -427,6 +480,11 @@ SPARQL QUERY:"""
             
         return query
     
+    def _check_generated(self, query: str, fallback: bool):
+        """Without fallback, a response with no SELECT query is an error (not the fallback query)"""
+        if not fallback and (not query or 'SELECT' not in query):
+            raise ValueError("Gemini response contains no SELECT query")
+    
     def _validate_and_clean_query(self, query: str) -> str:
         """Validate and clean the SPARQL query"""
         # Basic validation
@@ -2,6 +2,12 @@
 
 from flask import Blueprint, jsonify, request
 from sparql_utils import sparql_utils
+from streaming import requested_stream_format, stream_query_response
+from pagination import requested_page, paginated_query_response
+from class_hierarchy import class_hierarchy
+from query_templates import templates, Classes, IRI, LITERAL, DATE
+from bulk import bulk_create, insert_data_query
+from text_index import no_match, text_index, ranked, values_clause
 from modules.validators import validate_orientation
 from modules.dbpedia_service import dbpedia_service
 import uuid
@@ -11,104 +17,133 @@ PREFIX = "http://www.education-intelligente.org/ontologie#"
 
 def generate_orientation_uri(objectif: str) -> str:
     """Generate a unique URI for an orientation"""
-    safe_objectif = objectif.upper().replace(' ', '_').replace("'", "")[:50]
+    safe_objectif = IRI.segment(objectif.upper().replace(' ', '_').replace("'", "")[:50])
     return f"{PREFIX}OrientationAcademique_{safe_objectif}_{uuid.uuid4().hex[:8]}"
 
+ORIENTATIONS_LIST_QUERY = templates.register('orientations.list', """
+    SELECT ?orientation ?objectifOrientation ?typeOrientation ?dateOrientation
+           ?personne ?nomPersonne ?prenomPersonne ?specialite ?nomSpecialite
+           ?cours ?intitule ?projet ?titreProjet
+    WHERE {
+        ?orientation a ?type .
+        $types
+        OPTIONAL { ?orientation ont:objectifOrientation ?objectifOrientation . }
+        OPTIONAL { ?orientation ont:typeOrientation ?typeOrientation . }
+        OPTIONAL { ?orientation ont:dateOrientation ?dateOrientation . }
+        OPTIONAL { ?personne ont:participeA ?orientation . ?personne ont:nom ?nomPersonne . ?personne ont:prenom ?prenomPersonne . }
+        OPTIONAL { ?orientation ont:recommandeSpecialite ?specialite . ?specialite ont:nomSpecialite ?nomSpecialite . }
+        OPTIONAL { ?orientation ont:recommandeCours ?cours . ?cours ont:intitule ?intitule . }
+        OPTIONAL { ?orientation ont:proposeStage ?projet . ?projet ont:titreProjet ?titreProjet . }
+    }
+    ORDER BY DESC(?dateOrientation)
+    """, types=Classes('type', 'OrientationAcademique'))
+
 @orientations_bp.route('/orientations-academiques', methods=['GET'])
 def get_all_orientations():
     """Get all academic orientations"""
-    # Build query as a single continuous line - ensure no newlines or extra whitespace
-    query = f"PREFIX ont: <{PREFIX}> PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#> SELECT ?orientation ?objectifOrientation ?typeOrientation ?dateOrientation ?personne ?nomPersonne ?prenomPersonne ?specialite ?nomSpecialite ?cours ?intitule ?projet ?titreProjet WHERE {{ ?orientation a ?type . ?type rdfs:subClassOf* ont:OrientationAcademique . OPTIONAL {{ ?orientation ont:objectifOrientation ?objectifOrientation . }} OPTIONAL {{ ?orientation ont:typeOrientation ?typeOrientation . }} OPTIONAL {{ ?orientation ont:dateOrientation ?dateOrientation . }} OPTIONAL {{ ?personne ont:participeA ?orientation . ?personne ont:nom ?nomPersonne . ?personne ont:prenom ?prenomPersonne . }} OPTIONAL {{ ?orientation ont:recommandeSpecialite ?specialite . ?specialite ont:nomSpecialite ?nomSpecialite . }} OPTIONAL {{ ?orientation ont:recommandeCours ?cours . ?cours ont:intitule ?intitule . }} OPTIONAL {{ ?orientation ont:proposeStage ?projet . ?projet ont:titreProjet ?titreProjet . }} }} ORDER BY DESC(?dateOrientation)"
-    # Remove any potential newlines and normalize whitespace
-    query = query.replace('\n', ' ').replace('\r', ' ').strip()
-    # Replace multiple spaces with single space
-    while '  ' in query:
-        query = query.replace('  ', ' ')
+    query = ORIENTATIONS_LIST_QUERY.bind()
+    
+    page = requested_page()
+    if page:
+        return paginated_query_response(query, page, 'orientation', 'dateOrientation', descending=True)
+
+    stream_format = requested_stream_format()
+    if stream_format:
+        return stream_query_response(query, stream_format)
+    
     try:
         results = sparql_utils.execute_query(query)
         return jsonify(results)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+ORIENTATION_DETAIL_QUERY = templates.register('orientations.detail', """
+    SELECT ?orientation ?objectifOrientation ?typeOrientation ?dateOrientation
+           ?personne ?nomPersonne ?prenomPersonne ?specialite ?nomSpecialite
+           ?cours ?intitule ?projet ?titreProjet
+    WHERE {
+        $orientation_id a ?type .
+        $types
+        OPTIONAL { $orientation_id ont:objectifOrientation ?objectifOrientation . }
+        OPTIONAL { $orientation_id ont:typeOrientation ?typeOrientation . }
+        OPTIONAL { $orientation_id ont:dateOrientation ?dateOrientation . }
+        OPTIONAL { ?personne ont:participeA $orientation_id . ?personne ont:nom ?nomPersonne . ?personne ont:prenom ?prenomPersonne . }
+        OPTIONAL { $orientation_id ont:recommandeSpecialite ?specialite . ?specialite ont:nomSpecialite ?nomSpecialite . }
+        OPTIONAL { $orientation_id ont:recommandeCours ?cours . ?cours ont:intitule ?intitule . }
+        OPTIONAL { $orientation_id ont:proposeStage ?projet . ?projet ont:titreProjet ?titreProjet . }
+    }
+    """, orientation_id=IRI, types=Classes('type', 'OrientationAcademique'))
+
 @orientations_bp.route('/orientations-academiques/<orientation_id>', methods=['GET'])
 def get_orientation(orientation_id):
     """Get a specific orientation"""
-    # Build query as a single continuous line - ensure no newlines or extra whitespace
-    query = f"PREFIX ont: <{PREFIX}> PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#> SELECT ?orientation ?objectifOrientation ?typeOrientation ?dateOrientation ?personne ?nomPersonne ?prenomPersonne ?specialite ?nomSpecialite ?cours ?intitule ?projet ?titreProjet WHERE {{ <{orientation_id}> a ?type . ?type rdfs:subClassOf* ont:OrientationAcademique . OPTIONAL {{ <{orientation_id}> ont:objectifOrientation ?objectifOrientation . }} OPTIONAL {{ <{orientation_id}> ont:typeOrientation ?typeOrientation . }} OPTIONAL {{ <{orientation_id}> ont:dateOrientation ?dateOrientation . }} OPTIONAL {{ ?personne ont:participeA <{orientation_id}> . ?personne ont:nom ?nomPersonne . ?personne ont:prenom ?prenomPersonne . }} OPTIONAL {{ <{orientation_id}> ont:recommandeSpecialite ?specialite . ?specialite ont:nomSpecialite ?nomSpecialite . }} OPTIONAL {{ <{orientation_id}> ont:recommandeCours ?cours . ?cours ont:intitule ?intitule . }} OPTIONAL {{ <{orientation_id}> ont:proposeStage ?projet . ?projet ont:titreProjet ?titreProjet . }} }}"
-    # Remove any potential newlines and normalize whitespace
-    query = query.replace('\n', ' ').replace('\r', ' ').strip()
-    # Replace multiple spaces with single space
-    while '  ' in query:
-        query = query.replace('  ', ' ')
+    query = ORIENTATION_DETAIL_QUERY.bind(orientation_id=orientation_id)
     try:
         results = sparql_utils.execute_query(query)
         return jsonify(results[0] if results else {}), 404 if not results else 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@orientations_bp.route('/orientations-academiques', methods=['POST'])
-def create_orientation():
-    """Create a new orientation"""
-    data = request.json
-    
-    errors = validate_orientation(data)
-    if errors:
-        return jsonify({"errors": errors}), 400
-    
+def build_orientation_triples(data):
+    """Build the RDF triples of a new orientation and its relationships, returns (uri, triples)"""
     orientation_uri = generate_orientation_uri(data.get('objectifOrientation'))
     
-    # Escape quotes in string values
-    def escape_sparql_string(value):
-        if value is None:
-            return None
-        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ').replace('\r', ' ')
-    
-    objectif = escape_sparql_string(data.get('objectifOrientation'))
-    type_orient = escape_sparql_string(data.get('typeOrientation')) if data.get('typeOrientation') else None
+    objectif = data.get('objectifOrientation')
+    type_orient = data.get('typeOrientation')
     date_orient = data.get('dateOrientation')
     
+    subject = IRI.render(orientation_uri)
     insert_parts = [
-        f"<{orientation_uri}> a ont:OrientationAcademique",
-        f"; ont:objectifOrientation \"{objectif}\""
+        f"{subject} a ont:OrientationAcademique",
+        f"; ont:objectifOrientation {LITERAL.render(objectif)}"
     ]
     
     if type_orient:
-        insert_parts.append(f"; ont:typeOrientation \"{type_orient}\"")
+        insert_parts.append(f"; ont:typeOrientation {LITERAL.render(type_orient)}")
     if date_orient:
-        insert_parts.append(f"; ont:dateOrientation \"{date_orient}\"^^xsd:date")
+        insert_parts.append(f"; ont:dateOrientation {DATE.render(date_orient)}")
     
-    # Build the query - ensure it's a single line for INSERT DATA
-    data_line = ' '.join(insert_parts) + ' .'
+    triples = [' '.join(insert_parts) + ' .']
     
-    query = f"""PREFIX ont: <{PREFIX}>
-PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
-INSERT DATA {{
-    {data_line}
-}}"""
-    
-    # Handle relationships separately
-    relationship_queries = []
+    # Relationships
     if data.get('personne'):
-        relationship_queries.append(f"PREFIX ont: <{PREFIX}>\nINSERT DATA {{ <{data.get('personne')}> ont:participeA <{orientation_uri}> . }}")
+        triples.append(f"{IRI.render(data.get('personne'))} ont:participeA {subject} .")
     if data.get('specialite'):
-        relationship_queries.append(f"PREFIX ont: <{PREFIX}>\nINSERT DATA {{ <{orientation_uri}> ont:recommandeSpecialite <{data.get('specialite')}> . }}")
+        triples.append(f"{subject} ont:recommandeSpecialite {IRI.render(data.get('specialite'))} .")
     if data.get('cours'):
-        relationship_queries.append(f"PREFIX ont: <{PREFIX}>\nINSERT DATA {{ <{orientation_uri}> ont:recommandeCours <{data.get('cours')}> . }}")
+        triples.append(f"{subject} ont:recommandeCours {IRI.render(data.get('cours'))} .")
     if data.get('projet'):
-        relationship_queries.append(f"PREFIX ont: <{PREFIX}>\nINSERT DATA {{ <{orientation_uri}> ont:proposeStage <{data.get('projet')}> . }}")
+        triples.append(f"{subject} ont:proposeStage {IRI.render(data.get('projet'))} .")
+    
+    return orientation_uri, ' '.join(triples)
+
+@orientations_bp.route('/orientations-academiques', methods=['POST'])
+def create_orientation():
+    """Create a new orientation"""
+    data = request.json
+    
+    errors = validate_orientation(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    
+    # Properties and relationships are inserted in the same request
+    orientation_uri, triples = build_orientation_triples(data)
+    query = insert_data_query([triples])
     
     try:
         result = sparql_utils.execute_update(query)
         if "error" in result:
             return jsonify(result), 500
         
-        for rel_query in relationship_queries:
-            sparql_utils.execute_update(rel_query)
-        
         return jsonify({"message": "Orientation créée avec succès", "uri": orientation_uri}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@orientations_bp.route('/orientations-academiques/bulk', methods=['POST'])
+def bulk_create_orientations():
+    """Create many orientations in a single SPARQL update"""
+    return bulk_create(request.json, validate_orientation, build_orientation_triples, "orientations")
+
 @orientations_bp.route('/orientations-academiques/<orientation_id>', methods=['PUT'])
 def update_orientation(orientation_id):
     """Update an orientation"""
@@ -119,34 +154,29 @@ def update_orientation(orientation_id):
         return jsonify({"errors": errors}), 400
     
     # Delete all properties of the orientation (using DELETE WHERE)
-    delete_properties_query = f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ <{orientation_id}> ?p ?o . }}"
+    subject = IRI.render(orientation_id)
+    delete_properties_query = f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ {subject} ?p ?o . }}"
     
     # Delete reverse relationships separately
     delete_relationships_queries = [
-        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ ?personne ont:participeA <{orientation_id}> . }}",
-        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ <{orientation_id}> ont:recommandeSpecialite ?specialite . }}",
-        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ <{orientation_id}> ont:recommandeCours ?cours . }}",
-        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ <{orientation_id}> ont:proposeStage ?projet . }}"
+        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ ?personne ont:participeA {subject} . }}",
+        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ {subject} ont:recommandeSpecialite ?specialite . }}",
+        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ {subject} ont:recommandeCours ?cours . }}",
+        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ {subject} ont:proposeStage ?projet . }}"
     ]
     
-    # Escape quotes in string values
-    def escape_sparql_string(value):
-        if value is None:
-            return None
-        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ').replace('\r', ' ')
-    
-    objectif = escape_sparql_string(data.get('objectifOrientation')) if data.get('objectifOrientation') else None
-    type_orient = escape_sparql_string(data.get('typeOrientation')) if data.get('typeOrientation') else None
+    objectif = data.get('objectifOrientation')
+    type_orient = data.get('typeOrientation')
     date_orient = data.get('dateOrientation')
     
-    insert_parts = [f"<{orientation_id}> a ont:OrientationAcademique"]
+    insert_parts = [f"{subject} a ont:OrientationAcademique"]
     
     if objectif:
-        insert_parts.append(f"; ont:objectifOrientation \"{objectif}\"")
+        insert_parts.append(f"; ont:objectifOrientation {LITERAL.render(objectif)}")
     if type_orient:
-        insert_parts.append(f"; ont:typeOrientation \"{type_orient}\"")
+        insert_parts.append(f"; ont:typeOrientation {LITERAL.render(type_orient)}")
     if date_orient:
-        insert_parts.append(f"; ont:dateOrientation \"{date_orient}\"^^xsd:date")
+        insert_parts.append(f"; ont:dateOrientation {DATE.render(date_orient)}")
     
     # Build the query - ensure it's a single line for INSERT DATA
     data_line = ' '.join(insert_parts) + ' .'
@@ -159,37 +189,23 @@ INSERT DATA {{
     
     relationship_queries = []
     if data.get('personne'):
-        relationship_queries.append(f"PREFIX ont: <{PREFIX}>\nINSERT DATA {{ <{data.get('personne')}> ont:participeA <{orientation_id}> . }}")
+        relationship_queries.append(f"PREFIX ont: <{PREFIX}>\nINSERT DATA {{ {IRI.render(data.get('personne'))} ont:participeA {subject} . }}")
     if data.get('specialite'):
-        relationship_queries.append(f"PREFIX ont: <{PREFIX}>\nINSERT DATA {{ <{orientation_id}> ont:recommandeSpecialite <{data.get('specialite')}> . }}")
+        relationship_queries.append(f"PREFIX ont: <{PREFIX}>\nINSERT DATA {{ {subject} ont:recommandeSpecialite {IRI.render(data.get('specialite'))} . }}")
     if data.get('cours'):
-        relationship_queries.append(f"PREFIX ont: <{PREFIX}>\nINSERT DATA {{ <{orientation_id}> ont:recommandeCours <{data.get('cours')}> . }}")
+        relationship_queries.append(f"PREFIX ont: <{PREFIX}>\nINSERT DATA {{ {subject} ont:recommandeCours {IRI.render(data.get('cours'))} . }}")
     if data.get('projet'):
-        relationship_queries.append(f"PREFIX ont: <{PREFIX}>\nINSERT DATA {{ <{orientation_id}> ont:proposeStage <{data.get('projet')}> . }}")
+        relationship_queries.append(f"PREFIX ont: <{PREFIX}>\nINSERT DATA {{ {subject} ont:proposeStage {IRI.render(data.get('projet'))} . }}")
     
     try:
-        # Delete existing properties and relationships
-        result = sparql_utils.execute_update(delete_properties_query)
+        # Delete existing properties and relationships, then insert the new
+        # ones, in a single atomic request
+        result = sparql_utils.execute_update_batch(
+            [delete_properties_query] + delete_relationships_queries + [insert_query] + relationship_queries
+        )
         if "error" in result:
             return jsonify(result), 500
         
-        # Delete all relationships
-        for del_query in delete_relationships_queries:
-            result = sparql_utils.execute_update(del_query)
-            if "error" in result:
-                return jsonify(result), 500
-        
-        # Insert updated properties
-        result = sparql_utils.execute_update(insert_query)
-        if "error" in result:
-            return jsonify(result), 500
-        
-        # Insert new relationships
-        for rel_query in relationship_queries:
-            result = sparql_utils.execute_update(rel_query)
-            if "error" in result:
-                return jsonify(result), 500
-        
         return jsonify({"message": "Orientation mise à jour avec succès"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -207,26 +223,22 @@ def delete_orientation(orientation_id):
             orientation_uri = f"{PREFIX}{orientation_id}"
     
     # Delete triples where orientation is subject
-    query1 = f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ <{orientation_uri}> ?p ?o . }}"
+    subject = IRI.render(orientation_uri)
+    query1 = f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ {subject} ?p ?o . }}"
     
     # Delete triples with reverse relationships (personne participates in orientation)
     # and forward relationships (orientation recommends specialite/cours/projet)
     queries = [
-        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ ?personne ont:participeA <{orientation_uri}> . }}",
-        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ <{orientation_uri}> ont:recommandeSpecialite ?specialite . }}",
-        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ <{orientation_uri}> ont:recommandeCours ?cours . }}",
-        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ <{orientation_uri}> ont:proposeStage ?projet . }}"
+        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ ?personne ont:participeA {subject} . }}",
+        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ {subject} ont:recommandeSpecialite ?specialite . }}",
+        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ {subject} ont:recommandeCours ?cours . }}",
+        f"PREFIX ont: <{PREFIX}>\nDELETE WHERE {{ {subject} ont:proposeStage ?projet . }}"
     ]
     
     try:
-        result1 = sparql_utils.execute_update(query1)
-        if "error" in result1:
-            return jsonify(result1), 500
-        
-        for query in queries:
-            result = sparql_utils.execute_update(query)
-            if "error" in result:
-                return jsonify(result), 500
+        result = sparql_utils.execute_update_batch([query1] + queries)
+        if "error" in result:
+            return jsonify(result), 500
         
         return jsonify({"message": "Orientation supprimée avec succès"}), 200
     except Exception as e:
@@ -234,9 +246,15 @@ def delete_orientation(orientation_id):
 
 @orientations_bp.route('/orientations-academiques/search', methods=['POST'])
 def search_orientations():
-    """Search orientations"""
+    """Search orientations (full-text index, then one query for the candidates)"""
     data = request.json
-    filters = []
+    matches = text_index.search({
+        'objectifOrientation': data.get('objectifOrientation'),
+        'typeOrientation': data.get('typeOrientation')
+    })
+    
+    if no_match(matches):
+        return jsonify([])
     
     query = f"""
     PREFIX ont: <{PREFIX}>
@@ -244,26 +262,18 @@ def search_orientations():
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     SELECT ?orientation ?objectifOrientation ?typeOrientation ?dateOrientation
     WHERE {{
+        {values_clause('orientation', matches)}
         ?orientation a ?type .
-        ?type rdfs:subClassOf* ont:OrientationAcademique .
+        {class_hierarchy.type_values('type', 'OrientationAcademique')}
         OPTIONAL {{ ?orientation ont:objectifOrientation ?objectifOrientation . }}
         OPTIONAL {{ ?orientation ont:typeOrientation ?typeOrientation . }}
         OPTIONAL {{ ?orientation ont:dateOrientation ?dateOrientation . }}
+    }} ORDER BY DESC(?dateOrientation)
     """
     
-    if data.get('objectifOrientation'):
-        filters.append(f'REGEX(?objectifOrientation, "{data.get("objectifOrientation")}", "i")')
-    if data.get('typeOrientation'):
-        filters.append(f'REGEX(?typeOrientation, "{data.get("typeOrientation")}", "i")')
-    
-    if filters:
-        query += " FILTER(" + " && ".join(filters) + ")"
-    
-    query += "} ORDER BY DESC(?dateOrientation)"
-    
     try:
         results = sparql_utils.execute_query(query)
-        return jsonify(results)
+        return jsonify(ranked(results, 'orientation', matches))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -277,7 +287,7 @@ def get_orientations_facets():
     SELECT ?typeOrientation (COUNT(DISTINCT ?orientation) as ?count)
     WHERE {{
         ?orientation a ?type .
-        ?type rdfs:subClassOf* ont:OrientationAcademique .
+        {class_hierarchy.type_values('type', 'OrientationAcademique')}
         ?orientation ont:typeOrientation ?typeOrientation .
     }}
     GROUP BY ?typeOrientation
@@ -290,7 +300,7 @@ def get_orientations_facets():
     SELECT ?specialite ?nomSpecialite (COUNT(DISTINCT ?orientation) as ?count)
     WHERE {{
         ?orientation a ?type .
-        ?type rdfs:subClassOf* ont:OrientationAcademique .
+        {class_hierarchy.type_values('type', 'OrientationAcademique')}
         ?orientation ont:recommandeSpecialite ?specialite .
         ?specialite ont:nomSpecialite ?nomSpecialite .
     }}
@@ -299,10 +309,10 @@ def get_orientations_facets():
     LIMIT 20
     """
     try:
-        facets = {
-            "by_type": sparql_utils.execute_query(query_type),
-            "by_specialite": sparql_utils.execute_query(query_specialite)
-        }
+        facets = sparql_utils.execute_many({
+            "by_type": query_type,
+            "by_specialite": query_specialite
+        })
         return jsonify(facets)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -310,6 +320,7 @@ def get_orientations_facets():
 @orientations_bp.route('/orientations-academiques/<path:orientation_id>/dbpedia-enrich', methods=['GET'])
 def enrich_orientation_with_dbpedia(orientation_id):
     """Enrich orientation data with DBpedia information"""
+    subject = IRI.render(orientation_id)
     try:
         query = f"""
         PREFIX ont: <{PREFIX}>
@@ -317,10 +328,10 @@ def enrich_orientation_with_dbpedia(orientation_id):
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         SELECT ?objectifOrientation ?typeOrientation
         WHERE {{
-            <{orientation_id}> a ?type .
-            ?type rdfs:subClassOf* ont:OrientationAcademique .
-            OPTIONAL {{ <{orientation_id}> ont:objectifOrientation ?objectifOrientation . }}
-            OPTIONAL {{ <{orientation_id}> ont:typeOrientation ?typeOrientation . }}
+            {subject} a ?type .
+            {class_hierarchy.type_values('type', 'OrientationAcademique')}
+            OPTIONAL {{ {subject} ont:objectifOrientation ?objectifOrientation . }}
+            OPTIONAL {{ {subject} ont:typeOrientation ?typeOrientation . }}
         }}
         LIMIT 1
         """
@@ -1,5 +1,11 @@
 from flask import Blueprint, jsonify, request
 from sparql_utils import sparql_utils
+from streaming import requested_stream_format, stream_query_response
+from pagination import requested_page, paginated_query_response
+from class_hierarchy import class_hierarchy
+from query_templates import templates, IRI, LITERAL, DATE
+from bulk import bulk_create, insert_data_query
+from text_index import no_match, text_index, ranked, values_clause
 from modules.validators import validate_personne
 from modules.dbpedia_service import dbpedia_service
 import uuid
@@ -10,29 +16,35 @@ PREFIX = "http://www.education-intelligente.org/ontologie#"
 @personne_bp.route('/personnes', methods=['GET'])
 def get_all_personnes():
     """Récupère toutes les personnes"""
-    query = """
+    query = f"""
     
 
 PREFIX ont: <http://www.education-intelligente.org/ontologie#>
     PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
 
     SELECT ?personne ?type ?nom ?prenom ?email ?telephone ?role
-    WHERE {
+    WHERE {{
       ?personne rdf:type ?type .
-      FILTER(?type IN (ont:Personne, ont:Etudiant, ont:Enseignant, ont:Professeur, 
-                       ont:Assistant, ont:Encadrant, ont:EtudiantLicence, 
-                       ont:EtudiantMaster, ont:EtudiantDoctorat))
-      OPTIONAL { ?personne ont:nom ?nom }
-      OPTIONAL { ?personne ont:prenom ?prenom }
-      OPTIONAL { ?personne ont:email ?email }
-      OPTIONAL { ?personne ont:telephone ?telephone }
-      OPTIONAL { ?personne ont:role ?role }
-    }
+      {class_hierarchy.type_values('type', 'Personne')}
+      OPTIONAL {{ ?personne ont:nom ?nom }}
+      OPTIONAL {{ ?personne ont:prenom ?prenom }}
+      OPTIONAL {{ ?personne ont:email ?email }}
+      OPTIONAL {{ ?personne ont:telephone ?telephone }}
+      OPTIONAL {{ ?personne ont:role ?role }}
+    }}
     ORDER BY ?type ?nom
 
 
 
     """
+    page = requested_page()
+    if page:
+        return paginated_query_response(query, page, 'personne', 'nom')
+
+    stream_format = requested_stream_format()
+    if stream_format:
+        return stream_query_response(query, stream_format)
+    
     results = sparql_utils.execute_query(query)
     
     # Debug détaillé
@@ -47,93 +59,95 @@ PREFIX ont: <http://www.education-intelligente.org/ontologie#>
 
 
 
-@personne_bp.route('/personnes/<personne_id>', methods=['GET'])
-def get_personne(personne_id):
-    """Récupère une personne spécifique avec tous ses détails"""
-    query = f"""
-    PREFIX edu: <http://www.education-intelligente.org/ontologie#>
+PERSONNE_DETAIL_QUERY = templates.register('personnes.detail', """
     SELECT ?personne ?nom ?prenom ?email ?telephone ?dateNaissance ?role ?universite ?nomUniversite
            ?specialite ?nomSpecialite ?cours ?intituleCours
-    WHERE {{
-        <{personne_id}> a edu:Personne ;
-               edu:nom ?nom ;
-               edu:prenom ?prenom .
+    WHERE {
+        $personne_id a ont:Personne ;
+               ont:nom ?nom ;
+               ont:prenom ?prenom .
         
-        OPTIONAL {{ <{personne_id}> edu:email ?email . }}
-        OPTIONAL {{ <{personne_id}> edu:telephone ?telephone . }}
-        OPTIONAL {{ <{personne_id}> edu:dateNaissance ?dateNaissance . }}
-        OPTIONAL {{ <{personne_id}> edu:role ?role . }}
+        OPTIONAL { $personne_id ont:email ?email . }
+        OPTIONAL { $personne_id ont:telephone ?telephone . }
+        OPTIONAL { $personne_id ont:dateNaissance ?dateNaissance . }
+        OPTIONAL { $personne_id ont:role ?role . }
         
         # Informations sur l'université
-        OPTIONAL {{ 
-            <{personne_id}> edu:appartientA ?universite .
-            ?universite edu:nomUniversite ?nomUniversite .
-        }}
+        OPTIONAL { 
+            $personne_id ont:appartientA ?universite .
+            ?universite ont:nomUniversite ?nomUniversite .
+        }
         
         # Informations sur la spécialité (pour les étudiants)
-        OPTIONAL {{
-            <{personne_id}> edu:specialiseEn ?specialite .
-            ?specialite edu:nomSpecialite ?nomSpecialite .
-        }}
+        OPTIONAL {
+            $personne_id ont:specialiseEn ?specialite .
+            ?specialite ont:nomSpecialite ?nomSpecialite .
+        }
         
         # Informations sur les cours suivis/enseignés
-        OPTIONAL {{
-            <{personne_id}> edu:suitCours ?cours .
-            ?cours edu:intitule ?intituleCours .
-        }}
-        OPTIONAL {{
-            <{personne_id}> edu:enseigne ?cours .
-            ?cours edu:intitule ?intituleCours .
-        }}
-    }}
-    """
+        OPTIONAL {
+            $personne_id ont:suitCours ?cours .
+            ?cours ont:intitule ?intituleCours .
+        }
+        OPTIONAL {
+            $personne_id ont:enseigne ?cours .
+            ?cours ont:intitule ?intituleCours .
+        }
+    }
+    """, personne_id=IRI)
+
+@personne_bp.route('/personnes/<personne_id>', methods=['GET'])
+def get_personne(personne_id):
+    """Récupère une personne spécifique avec tous ses détails"""
+    query = PERSONNE_DETAIL_QUERY.bind(personne_id=personne_id)
     results = sparql_utils.execute_query(query)
     return jsonify(results[0] if results else {})
 
 @personne_bp.route('/personnes/search', methods=['POST'])
 def search_personnes():
-    """Recherche de personnes par critères"""
+    """Recherche de personnes par critères (index plein texte, puis lecture des candidats)"""
     data = request.json
-    nom = data.get('nom', '')
-    prenom = data.get('prenom', '')
-    role = data.get('role', '')
-    universite = data.get('universite', '')
+    personnes = text_index.search({
+        'nom': data.get('nom', ''),
+        'prenom': data.get('prenom', ''),
+        'role': data.get('role', '')
+    })
+    universites = text_index.search({'nomUniversite': data.get('universite', '')})
     
-    query = """
+    if no_match(personnes, universites):
+        return jsonify([])
+    
+    if universites is None:
+        universite_pattern = """
+        OPTIONAL { 
+            ?personne edu:appartientA ?universite .
+            ?universite edu:nomUniversite ?nomUniversite .
+        }"""
+    else:
+        universite_pattern = f"""
+        {values_clause('universite', universites)}
+        ?personne edu:appartientA ?universite .
+        ?universite edu:nomUniversite ?nomUniversite ."""
+    
+    query = f"""
     PREFIX edu: <http://www.education-intelligente.org/ontologie#>
     SELECT ?personne ?nom ?prenom ?email ?telephone ?dateNaissance ?role ?universite ?nomUniversite
-    WHERE {
+    WHERE {{
+        {values_clause('personne', personnes)}
         ?personne a edu:Personne ;
                edu:nom ?nom ;
                edu:prenom ?prenom .
         
-        OPTIONAL { ?personne edu:email ?email . }
-        OPTIONAL { ?personne edu:telephone ?telephone . }
-        OPTIONAL { ?personne edu:dateNaissance ?dateNaissance . }
-        OPTIONAL { ?personne edu:role ?role . }
-        OPTIONAL { 
-            ?personne edu:appartientA ?universite .
-            ?universite edu:nomUniversite ?nomUniversite .
-        }
+        OPTIONAL {{ ?personne edu:email ?email . }}
+        OPTIONAL {{ ?personne edu:telephone ?telephone . }}
+        OPTIONAL {{ ?personne edu:dateNaissance ?dateNaissance . }}
+        OPTIONAL {{ ?personne edu:role ?role . }}
+        {universite_pattern}
+    }} ORDER BY ?nom ?prenom
     """
     
-    filters = []
-    if nom:
-        filters.append(f'REGEX(?nom, "{nom}", "i")')
-    if prenom:
-        filters.append(f'REGEX(?prenom, "{prenom}", "i")')
-    if role:
-        filters.append(f'REGEX(?role, "{role}", "i")')
-    if universite:
-        filters.append(f'REGEX(?nomUniversite, "{universite}", "i")')
-    
-    if filters:
-        query += " FILTER(" + " && ".join(filters) + ")"
-    
-    query += "} ORDER BY ?nom ?prenom"
-    
     results = sparql_utils.execute_query(query)
-    return jsonify(results)
+    return jsonify(ranked(results, 'personne', personnes))
 
 @personne_bp.route('/personnes/etudiants', methods=['GET'])
 def get_etudiants():
@@ -159,6 +173,14 @@ def get_etudiants():
     }
     ORDER BY ?nom ?prenom
     """
+    page = requested_page()
+    if page:
+        return paginated_query_response(query, page, 'etudiant', 'nom')
+
+    stream_format = requested_stream_format()
+    if stream_format:
+        return stream_query_response(query, stream_format)
+    
     results = sparql_utils.execute_query(query)
     return jsonify(results)
 
@@ -185,48 +207,50 @@ def get_enseignants():
     }
     ORDER BY ?nom ?prenom
     """
+    page = requested_page()
+    if page:
+        return paginated_query_response(query, page, 'enseignant', 'nom')
+
+    stream_format = requested_stream_format()
+    if stream_format:
+        return stream_query_response(query, stream_format)
+    
     results = sparql_utils.execute_query(query)
     return jsonify(results)
 
-@personne_bp.route('/personnes/<personne_id>/cours', methods=['GET'])
-def get_personne_cours(personne_id):
-    """Récupère les cours associés à une personne (suivis ou enseignés)"""
-    query = f"""
-    PREFIX edu: <http://www.education-intelligente.org/ontologie#>
+PERSONNE_COURS_QUERY = templates.register('personnes.cours', """
     SELECT ?cours ?intitule ?codeCours ?creditsECTS ?semestre ?volumeHoraire
-    WHERE {{
-        {{
-            <{personne_id}> edu:suitCours ?cours .
-        }} UNION {{
-            <{personne_id}> edu:enseigne ?cours .
-        }}
+    WHERE {
+        {
+            $personne_id ont:suitCours ?cours .
+        } UNION {
+            $personne_id ont:enseigne ?cours .
+        }
         
-        ?cours edu:intitule ?intitule .
-        OPTIONAL {{ ?cours edu:codeCours ?codeCours . }}
-        OPTIONAL {{ ?cours edu:creditsECTS ?creditsECTS . }}
-        OPTIONAL {{ ?cours edu:semestre ?semestre . }}
-        OPTIONAL {{ ?cours edu:volumeHoraire ?volumeHoraire . }}
-    }}
+        ?cours ont:intitule ?intitule .
+        OPTIONAL { ?cours ont:codeCours ?codeCours . }
+        OPTIONAL { ?cours ont:creditsECTS ?creditsECTS . }
+        OPTIONAL { ?cours ont:semestre ?semestre . }
+        OPTIONAL { ?cours ont:volumeHoraire ?volumeHoraire . }
+    }
     ORDER BY ?semestre
-    """
+    """, personne_id=IRI)
+
+@personne_bp.route('/personnes/<personne_id>/cours', methods=['GET'])
+def get_personne_cours(personne_id):
+    """Récupère les cours associés à une personne (suivis ou enseignés)"""
+    query = PERSONNE_COURS_QUERY.bind(personne_id=personne_id)
     results = sparql_utils.execute_query(query)
     return jsonify(results)
 
 def generate_personne_uri(nom: str, prenom: str) -> str:
     """Generate a unique URI for a personne"""
-    safe_nom = nom.upper().replace(' ', '_')[:30]
-    safe_prenom = prenom.upper().replace(' ', '_')[:30]
+    safe_nom = IRI.segment(nom.upper().replace(' ', '_')[:30])
+    safe_prenom = IRI.segment(prenom.upper().replace(' ', '_')[:30])
     return f"{PREFIX}Personne_{safe_nom}_{safe_prenom}_{uuid.uuid4().hex[:8]}"
 
-@personne_bp.route('/personnes', methods=['POST'])
-def create_personne():
-    """Create a new person"""
-    data = request.json
-    
-    errors = validate_personne(data)
-    if errors:
-        return jsonify({"errors": errors}), 400
-    
+def build_personne_triples(data):
+    """Build the RDF triples of a new person, returns (uri, triples)"""
     personne_uri = generate_personne_uri(data.get('nom'), data.get('prenom'))
     role = data.get('role', 'Personne')
     
@@ -241,41 +265,47 @@ def create_personne():
     person_type = type_mapping.get(role, 'ont:Personne')
     
     insert_parts = [
-        f"<{personne_uri}> a {person_type}",
-        f"; ont:nom \"{data.get('nom')}\"",
-        f"; ont:prenom \"{data.get('prenom')}\""
+        f"{IRI.render(personne_uri)} a {person_type}",
+        f"; ont:nom {LITERAL.render(data.get('nom'))}",
+        f"; ont:prenom {LITERAL.render(data.get('prenom'))}"
     ]
     
     if data.get('email'):
-        insert_parts.append(f"; ont:email \"{data.get('email')}\"")
+        insert_parts.append(f"; ont:email {LITERAL.render(data.get('email'))}")
     if data.get('telephone'):
-        insert_parts.append(f"; ont:telephone \"{data.get('telephone')}\"")
+        insert_parts.append(f"; ont:telephone {LITERAL.render(data.get('telephone'))}")
     if data.get('dateNaissance'):
-        insert_parts.append(f"; ont:dateNaissance \"{data.get('dateNaissance')}\"^^xsd:date")
+        insert_parts.append(f"; ont:dateNaissance {DATE.render(data.get('dateNaissance'))}")
     if data.get('role'):
-        insert_parts.append(f"; ont:role \"{data.get('role')}\"")
+        insert_parts.append(f"; ont:role {LITERAL.render(data.get('role'))}")
     if data.get('universite'):
-        insert_parts.append(f"; ont:appartientA <{data.get('universite')}>")
+        insert_parts.append(f"; ont:appartientA {IRI.render(data.get('universite'))}")
     if data.get('specialite'):
-        insert_parts.append(f"; ont:specialiseEn <{data.get('specialite')}>")
+        insert_parts.append(f"; ont:specialiseEn {IRI.render(data.get('specialite'))}")
     if data.get('numeroMatricule'):
-        insert_parts.append(f"; ont:numeroMatricule \"{data.get('numeroMatricule')}\"")
+        insert_parts.append(f"; ont:numeroMatricule {LITERAL.render(data.get('numeroMatricule'))}")
     if data.get('niveauEtude'):
-        insert_parts.append(f"; ont:niveauEtude \"{data.get('niveauEtude')}\"")
+        insert_parts.append(f"; ont:niveauEtude {LITERAL.render(data.get('niveauEtude'))}")
     if data.get('moyenneGenerale'):
         insert_parts.append(f"; ont:moyenneGenerale {float(data.get('moyenneGenerale'))}")
     if data.get('grade'):
-        insert_parts.append(f"; ont:grade \"{data.get('grade')}\"")
+        insert_parts.append(f"; ont:grade {LITERAL.render(data.get('grade'))}")
     if data.get('anciennete'):
-        insert_parts.append(f"; ont:anciennete \"{data.get('anciennete')}\"")
+        insert_parts.append(f"; ont:anciennete {LITERAL.render(data.get('anciennete'))}")
     
-    query = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
-    INSERT DATA {{
-        {' '.join(insert_parts)} .
-    }}
-    """
+    return personne_uri, f"{' '.join(insert_parts)} ."
+
+@personne_bp.route('/personnes', methods=['POST'])
+def create_personne():
+    """Create a new person"""
+    data = request.json
+    
+    errors = validate_personne(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    
+    personne_uri, triples = build_personne_triples(data)
+    query = insert_data_query([triples])
     
     try:
         result = sparql_utils.execute_update(query)
@@ -285,6 +315,11 @@ def create_personne():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@personne_bp.route('/personnes/bulk', methods=['POST'])
+def bulk_create_personnes():
+    """Create many persons in a single SPARQL update"""
+    return bulk_create(request.json, validate_personne, build_personne_triples, "personnes")
+
 @personne_bp.route('/personnes/<personne_id>', methods=['PUT'])
 def update_personne(personne_id):
     """Update a person"""
@@ -294,45 +329,46 @@ def update_personne(personne_id):
     if errors:
         return jsonify({"errors": errors}), 400
     
+    subject = IRI.render(personne_id)
     delete_query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE {{
-        <{personne_id}> ?p ?o .
+        {subject} ?p ?o .
     }}
     WHERE {{
-        <{personne_id}> ?p ?o .
+        {subject} ?p ?o .
         FILTER(?p != ont:suitCours && ?p != ont:enseigne)
     }}
     """
     
-    insert_parts = [f"<{personne_id}> a ont:Personne"]
+    insert_parts = [f"{subject} a ont:Personne"]
     
     if data.get('nom'):
-        insert_parts.append(f"; ont:nom \"{data.get('nom')}\"")
+        insert_parts.append(f"; ont:nom {LITERAL.render(data.get('nom'))}")
     if data.get('prenom'):
-        insert_parts.append(f"; ont:prenom \"{data.get('prenom')}\"")
+        insert_parts.append(f"; ont:prenom {LITERAL.render(data.get('prenom'))}")
     if data.get('email'):
-        insert_parts.append(f"; ont:email \"{data.get('email')}\"")
+        insert_parts.append(f"; ont:email {LITERAL.render(data.get('email'))}")
     if data.get('telephone'):
-        insert_parts.append(f"; ont:telephone \"{data.get('telephone')}\"")
+        insert_parts.append(f"; ont:telephone {LITERAL.render(data.get('telephone'))}")
     if data.get('dateNaissance'):
-        insert_parts.append(f"; ont:dateNaissance \"{data.get('dateNaissance')}\"^^xsd:date")
+        insert_parts.append(f"; ont:dateNaissance {DATE.render(data.get('dateNaissance'))}")
     if data.get('role'):
-        insert_parts.append(f"; ont:role \"{data.get('role')}\"")
+        insert_parts.append(f"; ont:role {LITERAL.render(data.get('role'))}")
     if data.get('universite'):
-        insert_parts.append(f"; ont:appartientA <{data.get('universite')}>")
+        insert_parts.append(f"; ont:appartientA {IRI.render(data.get('universite'))}")
     if data.get('specialite'):
-        insert_parts.append(f"; ont:specialiseEn <{data.get('specialite')}>")
+        insert_parts.append(f"; ont:specialiseEn {IRI.render(data.get('specialite'))}")
     if data.get('numeroMatricule'):
-        insert_parts.append(f"; ont:numeroMatricule \"{data.get('numeroMatricule')}\"")
+        insert_parts.append(f"; ont:numeroMatricule {LITERAL.render(data.get('numeroMatricule'))}")
     if data.get('niveauEtude'):
-        insert_parts.append(f"; ont:niveauEtude \"{data.get('niveauEtude')}\"")
+        insert_parts.append(f"; ont:niveauEtude {LITERAL.render(data.get('niveauEtude'))}")
     if data.get('moyenneGenerale'):
         insert_parts.append(f"; ont:moyenneGenerale {float(data.get('moyenneGenerale'))}")
     if data.get('grade'):
-        insert_parts.append(f"; ont:grade \"{data.get('grade')}\"")
+        insert_parts.append(f"; ont:grade {LITERAL.render(data.get('grade'))}")
     if data.get('anciennete'):
-        insert_parts.append(f"; ont:anciennete \"{data.get('anciennete')}\"")
+        insert_parts.append(f"; ont:anciennete {LITERAL.render(data.get('anciennete'))}")
     
     insert_query = f"""
     PREFIX ont: <{PREFIX}>
@@ -343,8 +379,8 @@ def update_personne(personne_id):
     """
     
     try:
-        sparql_utils.execute_update(delete_query)
-        result = sparql_utils.execute_update(insert_query)
+        # DELETE and INSERT in one atomic request
+        result = sparql_utils.execute_update_batch([delete_query, insert_query])
         if "error" in result:
             return jsonify(result), 500
         return jsonify({"message": "Personne mise à jour avec succès"}), 200
@@ -366,7 +402,7 @@ def delete_personne(personne_id):
     query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE WHERE {{
-        <{personne_uri}> ?p ?o .
+        {IRI.render(personne_uri)} ?p ?o .
     }}
     """
     
@@ -418,11 +454,11 @@ def get_personnes_facets():
     LIMIT 20
     """
     try:
-        facets = {
-            "by_role": sparql_utils.execute_query(query_role),
-            "by_universite": sparql_utils.execute_query(query_universite),
-            "by_specialite": sparql_utils.execute_query(query_specialite)
-        }
+        facets = sparql_utils.execute_many({
+            "by_role": query_role,
+            "by_universite": query_universite,
+            "by_specialite": query_specialite
+        })
         # Clean up type URIs for frontend
         for facet in facets["by_role"]:
             if "typePersonne" in facet:
@@ -438,17 +474,18 @@ def get_personnes_facets():
 @personne_bp.route('/personnes/<path:personne_id>/dbpedia-enrich', methods=['GET'])
 def enrich_personne_with_dbpedia(personne_id):
     """Enrich personne data with DBpedia information"""
+    subject = IRI.render(personne_id)
     try:
         query = f"""
         PREFIX ont: <{PREFIX}>
         PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
         SELECT ?nom ?prenom ?role
         WHERE {{
-            <{personne_id}> rdf:type ?type .
-            FILTER(?type IN (ont:Personne, ont:Etudiant, ont:Enseignant, ont:Professeur, ont:Assistant, ont:Encadrant))
-            OPTIONAL {{ <{personne_id}> ont:nom ?nom . }}
-            OPTIONAL {{ <{personne_id}> ont:prenom ?prenom . }}
-            OPTIONAL {{ <{personne_id}> ont:role ?role . }}
+            {subject} rdf:type ?type .
+            {class_hierarchy.type_values('type', 'Personne')}
+            OPTIONAL {{ {subject} ont:nom ?nom . }}
+            OPTIONAL {{ {subject} ont:prenom ?prenom . }}
+            OPTIONAL {{ {subject} ont:role ?role . }}
         }}
         LIMIT 1
         """
@@ -2,6 +2,13 @@
 
 from flask import Blueprint, jsonify, request
 from sparql_utils import sparql_utils
+from streaming import requested_stream_format, stream_query_response
+from pagination import requested_page, paginated_query_response
+from class_hierarchy import class_hierarchy
+from query_templates import templates, Classes, IRI, LITERAL
+from bulk import bulk_create, insert_data_query
+from text_index import no_match, text_index, ranked, values_clause
+from facet_index import facet_index, LinkFacet, ValueFacet
 from modules.validators import validate_projet
 from modules.dbpedia_service import dbpedia_service
 import uuid
@@ -9,9 +16,16 @@ import uuid
 projets_bp = Blueprint('projets', __name__)
 PREFIX = "http://www.education-intelligente.org/ontologie#"
 
+# Facet dimensions, counted from the in-memory bitset index (drill-down via query args)
+PROJETS_FACETS = facet_index.register('ProjetAcademique', [
+    ValueFacet('by_type', 'typeProjet', 'typeProjet'),
+    ValueFacet('by_domaine', 'domaineProjet', 'domaineProjet'),
+    LinkFacet('by_universite', 'universite', 'nomUniversite', 'estOrganisePar', 'nomUniversite')
+])
+
 def generate_projet_uri(titre: str) -> str:
     """Generate a unique URI for a projet"""
-    safe_titre = titre.upper().replace(' ', '_').replace("'", "")[:50]
+    safe_titre = IRI.segment(titre.upper().replace(' ', '_').replace("'", "")[:50])
     return f"{PREFIX}ProjetAcademique_{safe_titre}_{uuid.uuid4().hex[:8]}"
 
 @projets_bp.route('/projets-academiques', methods=['GET'])
@@ -25,7 +39,7 @@ def get_all_projets():
            ?universite ?nomUniversite
     WHERE {{
         ?projet a ?type .
-        ?type rdfs:subClassOf* ont:ProjetAcademique .
+        {class_hierarchy.type_values('type', 'ProjetAcademique')}
         OPTIONAL {{ ?projet ont:titreProjet ?titreProjet . }}
         OPTIONAL {{ ?projet ont:domaineProjet ?domaineProjet . }}
         OPTIONAL {{ ?projet ont:typeProjet ?typeProjet . }}
@@ -42,6 +56,14 @@ def get_all_projets():
     }}
     ORDER BY ?titreProjet
     """
+    page = requested_page()
+    if page:
+        return paginated_query_response(query, page, 'projet', 'titreProjet')
+
+    stream_format = requested_stream_format()
+    if stream_format:
+        return stream_query_response(query, stream_format)
+    
     try:
         results = sparql_utils.execute_query(query)
         return jsonify(results)
@@ -59,79 +81,78 @@ def normalize_projet_id(projet_id):
     
     return projet_id
 
-@projets_bp.route('/projets-academiques/<path:projet_id>', methods=['GET'])
-def get_projet(projet_id):
-    """Get a specific project"""
-    projet_id = normalize_projet_id(projet_id)
-    query = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+PROJET_DETAIL_QUERY = templates.register('projets.detail', """
     SELECT ?projet ?titreProjet ?domaineProjet ?typeProjet ?noteProjet
            ?etudiant ?nomEtudiant ?prenomEtudiant
            ?competence ?nomCompetence
            ?orientation ?objectifOrientation
-    WHERE {{
-        <{projet_id}> a ?type .
-        ?type rdfs:subClassOf* ont:ProjetAcademique .
-        OPTIONAL {{ <{projet_id}> ont:titreProjet ?titreProjet . }}
-        OPTIONAL {{ <{projet_id}> ont:domaineProjet ?domaineProjet . }}
-        OPTIONAL {{ <{projet_id}> ont:typeProjet ?typeProjet . }}
-        OPTIONAL {{ <{projet_id}> ont:noteProjet ?noteProjet . }}
-        OPTIONAL {{
-            <{projet_id}> ont:realisePar ?etudiant .
+    WHERE {
+        $projet_id a ?type .
+        $types
+        OPTIONAL { $projet_id ont:titreProjet ?titreProjet . }
+        OPTIONAL { $projet_id ont:domaineProjet ?domaineProjet . }
+        OPTIONAL { $projet_id ont:typeProjet ?typeProjet . }
+        OPTIONAL { $projet_id ont:noteProjet ?noteProjet . }
+        OPTIONAL {
+            $projet_id ont:realisePar ?etudiant .
             ?etudiant ont:nom ?nomEtudiant .
             ?etudiant ont:prenom ?prenomEtudiant .
-        }}
-        OPTIONAL {{
-            <{projet_id}> ont:requiertCompetence ?competence .
+        }
+        OPTIONAL {
+            $projet_id ont:requiertCompetence ?competence .
             ?competence ont:nomCompetence ?nomCompetence .
-        }}
-        OPTIONAL {{
-            ?orientation ont:proposeStage <{projet_id}> .
+        }
+        OPTIONAL {
+            ?orientation ont:proposeStage $projet_id .
             ?orientation ont:objectifOrientation ?objectifOrientation .
-        }}
-    }}
-    """
+        }
+    }
+    """, projet_id=IRI, types=Classes('type', 'ProjetAcademique'))
+
+@projets_bp.route('/projets-academiques/<path:projet_id>', methods=['GET'])
+def get_projet(projet_id):
+    """Get a specific project"""
+    projet_id = normalize_projet_id(projet_id)
+    query = PROJET_DETAIL_QUERY.bind(projet_id=projet_id)
     try:
         results = sparql_utils.execute_query(query)
         return jsonify(results[0] if results else {}), 404 if not results else 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@projets_bp.route('/projets-academiques', methods=['POST'])
-def create_projet():
-    """Create a new project"""
-    data = request.json
-    
-    errors = validate_projet(data)
-    if errors:
-        return jsonify({"errors": errors}), 400
-    
+def build_projet_triples(data):
+    """Build the RDF triples of a new project, returns (uri, triples)"""
     projet_uri = generate_projet_uri(data.get('titreProjet'))
     
     insert_parts = [
-        f"<{projet_uri}> a ont:ProjetAcademique",
-        f"; ont:titreProjet \"{data.get('titreProjet')}\""
+        f"{IRI.render(projet_uri)} a ont:ProjetAcademique",
+        f"; ont:titreProjet {LITERAL.render(data.get('titreProjet'))}"
     ]
     
     if data.get('domaineProjet'):
-        insert_parts.append(f"; ont:domaineProjet \"{data.get('domaineProjet')}\"")
+        insert_parts.append(f"; ont:domaineProjet {LITERAL.render(data.get('domaineProjet'))}")
     if data.get('typeProjet'):
-        insert_parts.append(f"; ont:typeProjet \"{data.get('typeProjet')}\"")
+        insert_parts.append(f"; ont:typeProjet {LITERAL.render(data.get('typeProjet'))}")
     if data.get('noteProjet'):
         insert_parts.append(f"; ont:noteProjet {float(data.get('noteProjet'))}")
     if data.get('etudiant'):
-        insert_parts.append(f"; ont:realisePar <{data.get('etudiant')}>")
+        insert_parts.append(f"; ont:realisePar {IRI.render(data.get('etudiant'))}")
     if data.get('competence'):
-        insert_parts.append(f"; ont:requiertCompetence <{data.get('competence')}>")
+        insert_parts.append(f"; ont:requiertCompetence {IRI.render(data.get('competence'))}")
     
-    query = f"""
-    PREFIX ont: <{PREFIX}>
-    INSERT DATA {{
-        {' '.join(insert_parts)} .
-    }}
-    """
+    return projet_uri, f"{' '.join(insert_parts)} ."
+
+@projets_bp.route('/projets-academiques', methods=['POST'])
+def create_projet():
+    """Create a new project"""
+    data = request.json
+    
+    errors = validate_projet(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    
+    projet_uri, triples = build_projet_triples(data)
+    query = insert_data_query([triples])
     
     try:
         result = sparql_utils.execute_update(query)
@@ -141,6 +162,11 @@ def create_projet():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@projets_bp.route('/projets-academiques/bulk', methods=['POST'])
+def bulk_create_projets():
+    """Create many projects in a single SPARQL update"""
+    return bulk_create(request.json, validate_projet, build_projet_triples, "projets")
+
 @projets_bp.route('/projets-academiques/<path:projet_id>', methods=['PUT'])
 def update_projet(projet_id):
     """Update a project"""
@@ -151,31 +177,32 @@ def update_projet(projet_id):
     if errors:
         return jsonify({"errors": errors}), 400
     
+    subject = IRI.render(projet_id)
     delete_query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE {{
-        <{projet_id}> ?p ?o .
+        {subject} ?p ?o .
     }}
     WHERE {{
-        <{projet_id}> ?p ?o .
+        {subject} ?p ?o .
         FILTER(?p != ont:realisePar && ?p != ont:requiertCompetence)
     }}
     """
     
-    insert_parts = [f"<{projet_id}> a ont:ProjetAcademique"]
+    insert_parts = [f"{subject} a ont:ProjetAcademique"]
     
     if data.get('titreProjet'):
-        insert_parts.append(f"; ont:titreProjet \"{data.get('titreProjet')}\"")
+        insert_parts.append(f"; ont:titreProjet {LITERAL.render(data.get('titreProjet'))}")
     if data.get('domaineProjet'):
-        insert_parts.append(f"; ont:domaineProjet \"{data.get('domaineProjet')}\"")
+        insert_parts.append(f"; ont:domaineProjet {LITERAL.render(data.get('domaineProjet'))}")
     if data.get('typeProjet'):
-        insert_parts.append(f"; ont:typeProjet \"{data.get('typeProjet')}\"")
+        insert_parts.append(f"; ont:typeProjet {LITERAL.render(data.get('typeProjet'))}")
     if data.get('noteProjet'):
         insert_parts.append(f"; ont:noteProjet {float(data.get('noteProjet'))}")
     if data.get('etudiant'):
-        insert_parts.append(f"; ont:realisePar <{data.get('etudiant')}>")
+        insert_parts.append(f"; ont:realisePar {IRI.render(data.get('etudiant'))}")
     if data.get('competence'):
-        insert_parts.append(f"; ont:requiertCompetence <{data.get('competence')}>")
+        insert_parts.append(f"; ont:requiertCompetence {IRI.render(data.get('competence'))}")
     
     insert_query = f"""
     PREFIX ont: <{PREFIX}>
@@ -185,8 +212,8 @@ def update_projet(projet_id):
     """
     
     try:
-        sparql_utils.execute_update(delete_query)
-        result = sparql_utils.execute_update(insert_query)
+        # DELETE and INSERT in one atomic request
+        result = sparql_utils.execute_update_batch([delete_query, insert_query])
         if "error" in result:
             return jsonify(result), 500
         return jsonify({"message": "Projet mis à jour avec succès"}), 200
@@ -209,7 +236,7 @@ def delete_projet(projet_id):
     query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE WHERE {{
-        <{projet_uri}> ?p ?o .
+        {IRI.render(projet_uri)} ?p ?o .
     }}
     """
     
@@ -223,9 +250,16 @@ def delete_projet(projet_id):
 
 @projets_bp.route('/projets-academiques/search', methods=['POST'])
 def search_projets():
-    """Search projects"""
+    """Search projects (full-text index, then one query for the candidates)"""
     data = request.json
-    filters = []
+    matches = text_index.search({
+        'titreProjet': data.get('titreProjet'),
+        'domaineProjet': data.get('domaineProjet'),
+        'typeProjet': data.get('typeProjet')
+    })
+    
+    if no_match(matches):
+        return jsonify([])
     
     query = f"""
     PREFIX ont: <{PREFIX}>
@@ -233,89 +267,34 @@ def search_projets():
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     SELECT ?projet ?titreProjet ?domaineProjet ?typeProjet ?noteProjet
     WHERE {{
+        {values_clause('projet', matches)}
         ?projet a ?type .
-        ?type rdfs:subClassOf* ont:ProjetAcademique .
+        {class_hierarchy.type_values('type', 'ProjetAcademique')}
         OPTIONAL {{ ?projet ont:titreProjet ?titreProjet . }}
         OPTIONAL {{ ?projet ont:domaineProjet ?domaineProjet . }}
         OPTIONAL {{ ?projet ont:typeProjet ?typeProjet . }}
         OPTIONAL {{ ?projet ont:noteProjet ?noteProjet . }}
+    }} ORDER BY ?titreProjet
     """
     
-    if data.get('titreProjet'):
-        filters.append(f'REGEX(?titreProjet, "{data.get("titreProjet")}", "i")')
-    if data.get('domaineProjet'):
-        filters.append(f'REGEX(?domaineProjet, "{data.get("domaineProjet")}", "i")')
-    if data.get('typeProjet'):
-        filters.append(f'REGEX(?typeProjet, "{data.get("typeProjet")}", "i")')
-    
-    if filters:
-        query += " FILTER(" + " && ".join(filters) + ")"
-    
-    query += "} ORDER BY ?titreProjet"
-    
     try:
         results = sparql_utils.execute_query(query)
-        return jsonify(results)
+        return jsonify(ranked(results, 'projet', matches))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @projets_bp.route('/projets-academiques/facets', methods=['GET'])
 def get_projets_facets():
     """Récupère les facettes pour la navigation filtrée"""
-    query_type = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT ?typeProjet (COUNT(DISTINCT ?projet) as ?count)
-    WHERE {{
-        ?projet a ?type .
-        ?type rdfs:subClassOf* ont:ProjetAcademique .
-        ?projet ont:typeProjet ?typeProjet .
-    }}
-    GROUP BY ?typeProjet
-    ORDER BY DESC(?count)
-    """
-    query_domaine = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT ?domaineProjet (COUNT(DISTINCT ?projet) as ?count)
-    WHERE {{
-        ?projet a ?type .
-        ?type rdfs:subClassOf* ont:ProjetAcademique .
-        ?projet ont:domaineProjet ?domaineProjet .
-    }}
-    GROUP BY ?domaineProjet
-    ORDER BY DESC(?count)
-    """
-    query_universite = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT ?universite ?nomUniversite (COUNT(DISTINCT ?projet) as ?count)
-    WHERE {{
-        ?projet a ?type .
-        ?type rdfs:subClassOf* ont:ProjetAcademique .
-        ?projet ont:estOrganisePar ?universite .
-        ?universite ont:nomUniversite ?nomUniversite .
-    }}
-    GROUP BY ?universite ?nomUniversite
-    ORDER BY DESC(?count)
-    LIMIT 20
-    """
     try:
-        facets = {
-            "by_type": sparql_utils.execute_query(query_type),
-            "by_domaine": sparql_utils.execute_query(query_domaine),
-            "by_universite": sparql_utils.execute_query(query_universite)
-        }
-        return jsonify(facets)
+        return jsonify(PROJETS_FACETS.counts(request.args))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @projets_bp.route('/projets-academiques/<path:projet_id>/dbpedia-enrich', methods=['GET'])
 def enrich_projet_with_dbpedia(projet_id):
     """Enrich projet data with DBpedia information via university city (Linked Data integration)"""
+    subject = IRI.render(projet_id)
     try:
         projet_id = normalize_projet_id(projet_id)
         
@@ -326,11 +305,11 @@ def enrich_projet_with_dbpedia(projet_id):
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         SELECT ?titreProjet ?ville ?pays ?nomUniversite
         WHERE {{
-            <{projet_id}> a ?type .
-            ?type rdfs:subClassOf* ont:ProjetAcademique .
-            OPTIONAL {{ <{projet_id}> ont:titreProjet ?titreProjet . }}
+            {subject} a ?type .
+            {class_hierarchy.type_values('type', 'ProjetAcademique')}
+            OPTIONAL {{ {subject} ont:titreProjet ?titreProjet . }}
             OPTIONAL {{
-                <{projet_id}> ont:estOrganisePar ?universite .
+                {subject} ont:estOrganisePar ?universite .
                 ?universite ont:nomUniversite ?nomUniversite .
                 OPTIONAL {{ ?universite ont:ville ?ville . }}
                 OPTIONAL {{ ?universite ont:pays ?pays . }}
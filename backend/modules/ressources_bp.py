@@ -1,7 +1,14 @@
 """CRUD endpoints for RessourcesPedagogiques"""
 
 from flask import Blueprint, jsonify, request
-from sparql_utils import sparql_utils
+from sparql_utils import escape_literal, sparql_utils
+from streaming import requested_stream_format, stream_query_response
+from pagination import requested_page, paginated_query_response
+from class_hierarchy import class_hierarchy
+from query_templates import templates, Classes, IRI, LITERAL
+from bulk import bulk_create, insert_data_query
+from text_index import no_match, text_index, ranked, values_clause
+from facet_index import facet_index, LinkFacet, ValueFacet
 from modules.validators import validate_ressource
 from modules.dbpedia_service import dbpedia_service
 import uuid
@@ -9,9 +16,15 @@ import uuid
 ressources_bp = Blueprint('ressources', __name__)
 PREFIX = "http://www.education-intelligente.org/ontologie#"
 
+# Facet dimensions, counted from the in-memory bitset index (drill-down via query args)
+RESSOURCES_FACETS = facet_index.register('RessourcePedagogique', [
+    ValueFacet('by_type', 'typeRessource', 'typeRessource'),
+    LinkFacet('by_technologie', 'technologie', 'nomTechnologie', 'hebergeRessource', 'nomTechnologie', reverse=True)
+])
+
 def generate_ressource_uri(titre: str) -> str:
     """Generate a unique URI for a ressource"""
-    safe_titre = titre.upper().replace(' ', '_').replace("'", "")[:50]
+    safe_titre = IRI.segment(titre.upper().replace(' ', '_').replace("'", "")[:50])
     return f"{PREFIX}RessourcePedagogique_{safe_titre}_{uuid.uuid4().hex[:8]}"
 
 @ressources_bp.route('/ressources-pedagogiques', methods=['GET'])
@@ -25,7 +38,7 @@ def get_all_ressources():
            ?technologie ?nomTechnologie
     WHERE {{
         ?ressource a ?type .
-        ?type rdfs:subClassOf* ont:RessourcePedagogique .
+        {class_hierarchy.type_values('type', 'RessourcePedagogique')}
         OPTIONAL {{ ?ressource ont:titreRessource ?titreRessource . }}
         OPTIONAL {{ ?ressource ont:typeRessource ?typeRessource . }}
         OPTIONAL {{ ?ressource ont:formatRessource ?formatRessource . }}
@@ -37,67 +50,78 @@ def get_all_ressources():
     }}
     ORDER BY ?titreRessource
     """
+    page = requested_page()
+    if page:
+        return paginated_query_response(query, page, 'ressource', 'titreRessource')
+
+    stream_format = requested_stream_format()
+    if stream_format:
+        return stream_query_response(query, stream_format)
+    
     try:
         results = sparql_utils.execute_query(query)
         return jsonify(results)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@ressources_bp.route('/ressources-pedagogiques/<ressource_id>', methods=['GET'])
-def get_ressource(ressource_id):
-    """Get a specific pedagogical resource"""
-    query = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+RESSOURCE_DETAIL_QUERY = templates.register('ressources.detail', """
     SELECT ?ressource ?titreRessource ?typeRessource ?formatRessource ?urlRessource
            ?technologie ?nomTechnologie
-    WHERE {{
-        <{ressource_id}> a ?type .
-        ?type rdfs:subClassOf* ont:RessourcePedagogique .
-        OPTIONAL {{ <{ressource_id}> ont:titreRessource ?titreRessource . }}
-        OPTIONAL {{ <{ressource_id}> ont:typeRessource ?typeRessource . }}
-        OPTIONAL {{ <{ressource_id}> ont:formatRessource ?formatRessource . }}
-        OPTIONAL {{ <{ressource_id}> ont:urlRessource ?urlRessource . }}
-        OPTIONAL {{
-            <{ressource_id}> ont:estHebergePar ?technologie .
+    WHERE {
+        $ressource_id a ?type .
+        $types
+        OPTIONAL { $ressource_id ont:titreRessource ?titreRessource . }
+        OPTIONAL { $ressource_id ont:typeRessource ?typeRessource . }
+        OPTIONAL { $ressource_id ont:formatRessource ?formatRessource . }
+        OPTIONAL { $ressource_id ont:urlRessource ?urlRessource . }
+        OPTIONAL {
+            $ressource_id ont:estHebergePar ?technologie .
             ?technologie ont:nomTechnologie ?nomTechnologie .
-        }}
-    }}
-    """
+        }
+    }
+    """, ressource_id=IRI, types=Classes('type', 'RessourcePedagogique'))
+
+@ressources_bp.route('/ressources-pedagogiques/<ressource_id>', methods=['GET'])
+def get_ressource(ressource_id):
+    """Get a specific pedagogical resource"""
+    query = RESSOURCE_DETAIL_QUERY.bind(ressource_id=ressource_id)
     try:
         results = sparql_utils.execute_query(query)
         return jsonify(results[0] if results else {}), 404 if not results else 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@ressources_bp.route('/ressources-pedagogiques', methods=['POST'])
-def create_ressource():
-    """Create a new pedagogical resource"""
-    data = request.json
-    errors = validate_ressource(data)
-    if errors:
-        return jsonify({"errors": errors}), 400
-    
+def build_ressource_triples(data):
+    """Build the RDF triples of a new pedagogical resource, returns (uri, triples)"""
     ressource_uri = generate_ressource_uri(data.get('titreRessource'))
     
-    query = f"""
-    PREFIX ont: <{PREFIX}>
-    INSERT DATA {{
-        <{ressource_uri}> a ont:RessourcePedagogique .
-        <{ressource_uri}> ont:titreRessource "{data.get('titreRessource')}" .
+    subject = IRI.render(ressource_uri)
+    triples = f"""
+        {subject} a ont:RessourcePedagogique .
+        {subject} ont:titreRessource {LITERAL.render(data.get('titreRessource'))} .
     """
     
     if data.get('typeRessource'):
-        query += f'        <{ressource_uri}> ont:typeRessource "{data.get("typeRessource")}" .\n'
+        triples += f'        {subject} ont:typeRessource {LITERAL.render(data.get("typeRessource"))} .\n'
     if data.get('formatRessource'):
-        query += f'        <{ressource_uri}> ont:formatRessource "{data.get("formatRessource")}" .\n'
+        triples += f'        {subject} ont:formatRessource {LITERAL.render(data.get("formatRessource"))} .\n'
     if data.get('urlRessource'):
-        query += f'        <{ressource_uri}> ont:urlRessource <{data.get("urlRessource")}> .\n'
+        triples += f'        {subject} ont:urlRessource {IRI.render(data.get("urlRessource"))} .\n'
     if data.get('technologie'):
-        query += f'        <{ressource_uri}> ont:estHebergePar <{data.get("technologie")}> .\n'
+        triples += f'        {subject} ont:estHebergePar {IRI.render(data.get("technologie"))} .\n'
     
-    query += "    }"
+    return ressource_uri, triples
+
+@ressources_bp.route('/ressources-pedagogiques', methods=['POST'])
+def create_ressource():
+    """Create a new pedagogical resource"""
+    data = request.json
+    errors = validate_ressource(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    
+    ressource_uri, triples = build_ressource_triples(data)
+    query = insert_data_query([triples])
     
     try:
         result = sparql_utils.execute_update(query)
@@ -107,6 +131,11 @@ def create_ressource():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@ressources_bp.route('/ressources-pedagogiques/bulk', methods=['POST'])
+def bulk_create_ressources():
+    """Create many pedagogical resources in a single SPARQL update"""
+    return bulk_create(request.json, validate_ressource, build_ressource_triples, "ressources")
+
 @ressources_bp.route('/ressources-pedagogiques/<ressource_id>', methods=['PUT'])
 def update_ressource(ressource_id):
     """Update a pedagogical resource"""
@@ -116,13 +145,14 @@ def update_ressource(ressource_id):
         return jsonify({"errors": errors}), 400
     
     # Delete existing properties
+    subject = IRI.render(ressource_id)
     delete_query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE {{
-        <{ressource_id}> ?p ?o .
+        {subject} ?p ?o .
     }}
     WHERE {{
-        <{ressource_id}> ?p ?o .
+        {subject} ?p ?o .
     }}
     """
     
@@ -130,31 +160,26 @@ def update_ressource(ressource_id):
     insert_query = f"""
     PREFIX ont: <{PREFIX}>
     INSERT DATA {{
-        <{ressource_id}> a ont:RessourcePedagogique .
-        <{ressource_id}> ont:titreRessource "{data.get('titreRessource')}" .
+        {subject} a ont:RessourcePedagogique .
+        {subject} ont:titreRessource {LITERAL.render(data.get('titreRessource'))} .
     """
     
     if data.get('typeRessource'):
-        insert_query += f'        <{ressource_id}> ont:typeRessource "{data.get("typeRessource")}" .\n'
+        insert_query += f'        {subject} ont:typeRessource {LITERAL.render(data.get("typeRessource"))} .\n'
     if data.get('formatRessource'):
-        insert_query += f'        <{ressource_id}> ont:formatRessource "{data.get("formatRessource")}" .\n'
+        insert_query += f'        {subject} ont:formatRessource {LITERAL.render(data.get("formatRessource"))} .\n'
     if data.get('urlRessource'):
-        insert_query += f'        <{ressource_id}> ont:urlRessource <{data.get("urlRessource")}> .\n'
+        insert_query += f'        {subject} ont:urlRessource {IRI.render(data.get("urlRessource"))} .\n'
     if data.get('technologie'):
-        insert_query += f'        <{ressource_id}> ont:estHebergePar <{data.get("technologie")}> .\n'
+        insert_query += f'        {subject} ont:estHebergePar {IRI.render(data.get("technologie"))} .\n'
     
     insert_query += "    }"
     
     try:
-        # Execute delete first
-        delete_result = sparql_utils.execute_update(delete_query)
-        if "error" in delete_result:
-            return jsonify(delete_result), 500
-        
-        # Then insert new data
-        insert_result = sparql_utils.execute_update(insert_query)
-        if "error" in insert_result:
-            return jsonify(insert_result), 500
+        # Delete then insert in one atomic request
+        result = sparql_utils.execute_update_batch([delete_query, insert_query])
+        if "error" in result:
+            return jsonify(result), 500
         
         return jsonify({"message": "Ressource mise à jour avec succès"}), 200
     except Exception as e:
@@ -163,13 +188,14 @@ def update_ressource(ressource_id):
 @ressources_bp.route('/ressources-pedagogiques/<ressource_id>', methods=['DELETE'])
 def delete_ressource(ressource_id):
     """Delete a pedagogical resource"""
+    subject = IRI.render(ressource_id)
     query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE {{
-        <{ressource_id}> ?p ?o .
+        {subject} ?p ?o .
     }}
     WHERE {{
-        <{ressource_id}> ?p ?o .
+        {subject} ?p ?o .
     }}
     """
     
@@ -183,9 +209,14 @@ def delete_ressource(ressource_id):
 
 @ressources_bp.route('/ressources-pedagogiques/search', methods=['POST'])
 def search_ressources():
-    """Search resources by criteria"""
+    """Search resources by criteria (full-text index, then one query for the candidates)"""
     data = request.json
-    filters = []
+    matches = text_index.search({'titreRessource': data.get('titreRessource')})
+    if no_match(matches):
+        return jsonify([])
+    type_filter = ""
+    if data.get('typeRessource'):
+        type_filter = f'?ressource ont:typeRessource "{escape_literal(data.get("typeRessource"))}" .'
     
     query = f"""
     PREFIX ont: <{PREFIX}>
@@ -193,73 +224,36 @@ def search_ressources():
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     SELECT ?ressource ?titreRessource ?typeRessource ?formatRessource ?urlRessource
     WHERE {{
+        {values_clause('ressource', matches)}
         ?ressource a ?type .
-        ?type rdfs:subClassOf* ont:RessourcePedagogique .
-    """
-    
-    if data.get('titreRessource'):
-        filters.append(f'FILTER(CONTAINS(LCASE(?titreRessource), LCASE("{data.get("titreRessource")}")))')
-    
-    if data.get('typeRessource'):
-        filters.append(f'?ressource ont:typeRessource "{data.get("typeRessource")}" .')
-    
-    if filters:
-        query += "        " + " .\n        ".join(filters) + " .\n"
-    
-    query += """
-        OPTIONAL { ?ressource ont:titreRessource ?titreRessource . }
-        OPTIONAL { ?ressource ont:typeRessource ?typeRessource . }
-        OPTIONAL { ?ressource ont:formatRessource ?formatRessource . }
-        OPTIONAL { ?ressource ont:urlRessource ?urlRessource . }
-    }
+        {class_hierarchy.type_values('type', 'RessourcePedagogique')}
+        {type_filter}
+        OPTIONAL {{ ?ressource ont:titreRessource ?titreRessource . }}
+        OPTIONAL {{ ?ressource ont:typeRessource ?typeRessource . }}
+        OPTIONAL {{ ?ressource ont:formatRessource ?formatRessource . }}
+        OPTIONAL {{ ?ressource ont:urlRessource ?urlRessource . }}
+    }}
     ORDER BY ?titreRessource
     """
     
     try:
         results = sparql_utils.execute_query(query)
-        return jsonify(results)
+        return jsonify(ranked(results, 'ressource', matches))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @ressources_bp.route('/ressources-pedagogiques/facets', methods=['GET'])
 def get_ressources_facets():
     """Récupère les facettes pour la navigation filtrée"""
-    query_type = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT ?typeRessource (COUNT(DISTINCT ?ressource) as ?count)
-    WHERE {{
-        ?ressource a ?type .
-        ?type rdfs:subClassOf* ont:RessourcePedagogique .
-        ?ressource ont:typeRessource ?typeRessource .
-    }}
-    GROUP BY ?typeRessource
-    ORDER BY DESC(?count)
-    """
-    query_technologie = f"""
-    PREFIX ont: <{PREFIX}>
-    SELECT ?technologie ?nomTechnologie (COUNT(DISTINCT ?ressource) as ?count)
-    WHERE {{
-        ?technologie ont:hebergeRessource ?ressource .
-        ?technologie ont:nomTechnologie ?nomTechnologie .
-    }}
-    GROUP BY ?technologie ?nomTechnologie
-    ORDER BY DESC(?count)
-    LIMIT 20
-    """
     try:
-        facets = {
-            "by_type": sparql_utils.execute_query(query_type),
-            "by_technologie": sparql_utils.execute_query(query_technologie)
-        }
-        return jsonify(facets)
+        return jsonify(RESSOURCES_FACETS.counts(request.args))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @ressources_bp.route('/ressources-pedagogiques/<path:ressource_id>/dbpedia-enrich', methods=['GET'])
 def enrich_ressource_with_dbpedia(ressource_id):
     """Enrich ressource data with DBpedia information"""
+    subject = IRI.render(ressource_id)
     try:
         query = f"""
         PREFIX ont: <{PREFIX}>
@@ -267,10 +261,10 @@ def enrich_ressource_with_dbpedia(ressource_id):
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         SELECT ?titreRessource ?typeRessource
         WHERE {{
-            <{ressource_id}> a ?type .
-            ?type rdfs:subClassOf* ont:RessourcePedagogique .
-            OPTIONAL {{ <{ressource_id}> ont:titreRessource ?titreRessource . }}
-            OPTIONAL {{ <{ressource_id}> ont:typeRessource ?typeRessource . }}
+            {subject} a ?type .
+            {class_hierarchy.type_values('type', 'RessourcePedagogique')}
+            OPTIONAL {{ {subject} ont:titreRessource ?titreRessource . }}
+            OPTIONAL {{ {subject} ont:typeRessource ?typeRessource . }}
         }}
         LIMIT 1
         """
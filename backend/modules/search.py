@@ -4,6 +4,8 @@ from modules.taln_service import TALNService, GeminiTALNService
 from modules.gemini_sparql_service import GeminiSPARQLTransformer
 from modules.search_templates import template_engine
 from modules.dbpedia_service import dbpedia_service
+from search_cache import search_cache
+import asyncio
 import os
 
 search_bp = Blueprint('search', __name__)
@@ -20,6 +22,10 @@ taln_service = TALNService()
 
 gemini_transformer = GeminiSPARQLTransformer()
 
+def is_degraded_analysis(taln_analysis):
+    """Pattern-matching analysis used while the TALN API fails: not cached, the API may be back next time"""
+    return taln_analysis.get("analysis_metadata", {}).get("api_version") == "fallback"
+
 @search_bp.route('/dbpedia/search', methods=['POST'])
 def dbpedia_search():
     """Simple DBpedia search endpoint that returns a list of references"""
@@ -55,26 +61,47 @@ def semantic_search():
         
         print(f"🔍 Processing question: {question}")
         
+        # Which cache levels answered this request ("hit", "miss" or "disabled")
+        cache_info = dict.fromkeys(("analysis", "sparql", "results"), "disabled" if search_cache is None else "miss")
+        
         # Step 1: TALN Analysis - Extract entities, relationships, intent
         print("📝 Step 1: TALN Analysis...")
-        taln_analysis = taln_service.analyze_question(question)
-        print(f"✅ TALN Analysis completed. Entities: {len(taln_analysis.get('entities', []))}")
+        taln_analysis = search_cache.get_analysis(question) if search_cache else None
+        if taln_analysis is not None:
+            cache_info["analysis"] = "hit"
+            print("✅ TALN Analysis served from cache")
+        else:
+            taln_analysis = taln_service.analyze_question(question)
+            print(f"✅ TALN Analysis completed. Entities: {len(taln_analysis.get('entities', []))}")
+            if search_cache and not is_degraded_analysis(taln_analysis):
+                search_cache.put_analysis(question, taln_analysis)
         
         # Step 2: Gemini SPARQL Generation - Generate query from TALN analysis
         print("🤖 Step 2: Gemini SPARQL Generation...")
         sparql_query = None
         method_used = "unknown"
         
-        try:
-            sparql_query = gemini_transformer.transform_taln_analysis_to_sparql(taln_analysis)
+        cached_sparql = search_cache.get_sparql(taln_analysis) if search_cache else None
+        if cached_sparql is not None:
+            sparql_query = cached_sparql
             method_used = "gemini_taln"
-            print(f"✅ SPARQL Query generated via Gemini: {len(sparql_query)} characters")
-        except Exception as e:
-            print(f"⚠️ Gemini generation failed: {e}, falling back to template engine")
-            sparql_query = template_engine.generate_query(question)
-            method_used = "template_fallback"
-            if sparql_query:
-                print(f"✅ SPARQL Query generated via template: {len(sparql_query)} characters")
+            cache_info["sparql"] = "hit"
+            print("✅ SPARQL Query served from cache")
+        else:
+            try:
+                # Without fallback, a Gemini failure raises instead of returning a canned query
+                sparql_query = gemini_transformer.transform_taln_analysis_to_sparql(taln_analysis, fallback=False)
+                method_used = "gemini_taln"
+                print(f"✅ SPARQL Query generated via Gemini: {len(sparql_query)} characters")
+                # Only Gemini output is cached: template fallbacks are not, Gemini may be back next time
+                if search_cache and sparql_query:
+                    search_cache.put_sparql(taln_analysis, sparql_query)
+            except Exception as e:
+                print(f"⚠️ Gemini generation failed: {e}, falling back to template engine")
+                sparql_query = template_engine.generate_query(question)
+                method_used = "template_fallback"
+                if sparql_query:
+                    print(f"✅ SPARQL Query generated via template: {len(sparql_query)} characters")
         
         if not sparql_query:
             return jsonify({
@@ -82,15 +109,24 @@ def semantic_search():
                 "taln_analysis": taln_analysis,
                 "pipeline_info": {
                     "method": method_used,
-                    "status": "failed"
+                    "status": "failed",
+                    "cache": cache_info
                 }
             }), 500
         
         # Step 3: Execute SPARQL query
         print("⚡ Step 3: Executing SPARQL query...")
         try:
-            query_results = sparql_utils.execute_query(sparql_query)
-            print(f"✅ Query executed. Results: {len(query_results)}")
+            query_results = search_cache.get_results(sparql_query) if search_cache else None
+            if query_results is not None:
+                cache_info["results"] = "hit"
+                print(f"✅ Query results served from cache. Results: {len(query_results)}")
+            else:
+                query_results = sparql_utils.execute_query(sparql_query)
+                print(f"✅ Query executed. Results: {len(query_results)}")
+                # Errors come back as a dict and must not be cached
+                if search_cache and isinstance(query_results, list):
+                    search_cache.put_results(sparql_query, query_results)
             
             return jsonify({
                 "results": query_results,
@@ -99,7 +135,8 @@ def semantic_search():
                 "pipeline_info": {
                     "method": method_used,
                     "status": "success",
-                    "results_count": len(query_results)
+                    "results_count": len(query_results),
+                    "cache": cache_info
                 }
             })
         except Exception as e:
@@ -110,7 +147,8 @@ def semantic_search():
                 "sparql_query": sparql_query,
                 "pipeline_info": {
                     "method": method_used,
-                    "status": "sparql_error"
+                    "status": "sparql_error",
+                    "cache": cache_info
                 }
             }), 500
             
@@ -120,6 +158,99 @@ def semantic_search():
         traceback.print_exc()
         return jsonify({"error": f"Erreur dans la recherche sémantique: {str(e)}"}), 500
 
+async def _off_loop(function, *args):
+    """Blocking call (SQLite search cache) run in the default thread pool, off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+async def semantic_search_async(question):
+    """
+    Same TALN → Gemini → SPARQL pipeline as semantic_search, for the ASGI
+    server (backend/asgi.py): every external call is awaited, so one worker
+    holds many searches in flight. Returns (payload, status).
+    """
+    if not question:
+        return {"error": "Question vide"}, 400
+    
+    cache_info = dict.fromkeys(("analysis", "sparql", "results"), "disabled" if search_cache is None else "miss")
+    
+    taln_analysis = await _off_loop(search_cache.get_analysis, question) if search_cache else None
+    if taln_analysis is not None:
+        cache_info["analysis"] = "hit"
+    else:
+        taln_analysis = await taln_service.analyze_question_async(question)
+        if search_cache and not is_degraded_analysis(taln_analysis):
+            await _off_loop(search_cache.put_analysis, question, taln_analysis)
+    
+    sparql_query = await _off_loop(search_cache.get_sparql, taln_analysis) if search_cache else None
+    method_used = "gemini_taln"
+    if sparql_query is not None:
+        cache_info["sparql"] = "hit"
+    else:
+        try:
+            sparql_query = await gemini_transformer.transform_taln_analysis_to_sparql_async(taln_analysis, fallback=False)
+            if search_cache and sparql_query:
+                await _off_loop(search_cache.put_sparql, taln_analysis, sparql_query)
+        except Exception as e:
+            print(f"⚠️ Gemini generation failed: {e}, falling back to template engine")
+            sparql_query = template_engine.generate_query(question)
+            method_used = "template_fallback"
+    
+    if not sparql_query:
+        return {
+            "error": "Impossible de générer une requête SPARQL",
+            "taln_analysis": taln_analysis,
+            "pipeline_info": {"method": method_used, "status": "failed", "cache": cache_info}
+        }, 500
+    
+    query_results = await _off_loop(search_cache.get_results, sparql_query) if search_cache else None
+    if query_results is not None:
+        cache_info["results"] = "hit"
+    else:
+        query_results = await sparql_utils.execute_query_async(sparql_query)
+        if isinstance(query_results, dict) and "error" in query_results:
+            return {
+                "error": f"Erreur lors de l'exécution de la requête SPARQL: {query_results['error']}",
+                "taln_analysis": taln_analysis,
+                "sparql_query": sparql_query,
+                "pipeline_info": {"method": method_used, "status": "sparql_error", "cache": cache_info}
+            }, 500
+        if search_cache:
+            await _off_loop(search_cache.put_results, sparql_query, query_results)
+    
+    return {
+        "results": query_results,
+        "taln_analysis": taln_analysis,
+        "sparql_query": sparql_query,
+        "pipeline_info": {
+            "method": method_used,
+            "status": "success",
+            "results_count": len(query_results),
+            "cache": cache_info
+        }
+    }, 200
+
+async def dbpedia_search_async(search_text):
+    """dbpedia_search for the ASGI server, returns (payload, status)"""
+    search_text = (search_text or '').strip()
+    if not search_text:
+        return {"error": "Search text is required"}, 400
+    return await dbpedia_service.search_entities_async(search_text), 200
+
+@search_bp.route('/search/cache/stats', methods=['GET'])
+def get_search_cache_stats():
+    """Per-level counters of the semantic search cache"""
+    if search_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **search_cache.stats()})
+
+@search_bp.route('/search/cache', methods=['DELETE'])
+def clear_search_cache():
+    """Drop every cached analysis, SPARQL query and result"""
+    if search_cache is None:
+        return jsonify({"enabled": False})
+    search_cache.invalidate()
+    return jsonify({"message": "Cache de recherche vidé"})
+
 def ai_search():
     """Recherche IA - Utilise Gemini pour générer directement une requête SPARQL"""
     try:
@@ -3,6 +3,7 @@ Deterministic SPARQL Template Engine for Semantic Search Fallback
 Maps keywords to SPARQL query templates when AI pipeline fails
 """
 import re
+from class_hierarchy import class_hierarchy
 
 class SearchTemplateEngine:
     """Template-based SPARQL query generator for education domain"""
@@ -180,7 +181,7 @@ class SearchTemplateEngine:
         SELECT ?personne ?nom ?prenom ?type ?email
         WHERE {{
             ?personne a ?type .
-            FILTER(?type IN (ont:Personne, ont:Etudiant, ont:Enseignant, ont:Administrateur))
+            {class_hierarchy.type_values('type', 'Personne')}
             OPTIONAL {{ ?personne ont:nom ?nom . }}
             OPTIONAL {{ ?personne ont:prenom ?prenom . }}
             OPTIONAL {{ ?personne ont:email ?email . }}
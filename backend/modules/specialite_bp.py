@@ -1,5 +1,14 @@
 from flask import Blueprint, jsonify, request
 from sparql_utils import sparql_utils
+from streaming import requested_stream_format, stream_query_response
+from pagination import requested_page, paginated_query_response
+from class_hierarchy import class_hierarchy
+from query_templates import IRI, LITERAL
+from entity_loader import Frame, Relation, ENTITY_ID
+from bulk import bulk_create, insert_data_query
+from text_index import no_match, text_index, ranked, values_clause
+from facet_index import facet_index, LinkFacet, TypeFacet, ValueFacet
+from materialized_stats import materialized_stats
 from modules.validators import validate_specialite
 from modules.dbpedia_service import dbpedia_service
 import uuid
@@ -7,38 +16,54 @@ import uuid
 specialite_bp = Blueprint('specialite', __name__)
 PREFIX = "http://www.education-intelligente.org/ontologie#"
 
+# Facet dimensions, counted from the in-memory bitset index (drill-down via query args)
+SPECIALITES_FACETS = facet_index.register('Specialite', [
+    TypeFacet('by_type', 'typeSpecialite', [
+        'Specialite', 'SpecialiteInformatique', 'SpecialiteDataScience', 'SpecialiteIngenierie',
+        'SpecialiteSciences', 'SpecialiteMedecine', 'SpecialiteEconomie', 'SpecialiteDroit', 'SpecialiteLettres'
+    ]),
+    ValueFacet('by_niveau', 'niveauDiplome', 'niveauDiplome'),
+    LinkFacet('by_universite', 'universite', 'nomUniversite', 'estOffertePar', 'nomUniversite')
+], include_subclasses=False)
+
 @specialite_bp.route('/specialites', methods=['GET'])
 def get_all_specialites():
     """Récupère toutes les spécialités"""
-    query = """
+    query = f"""
     PREFIX ont: <http://www.education-intelligente.org/ontologie#>
     PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
 
     SELECT ?specialite ?type ?nomSpecialite ?codeSpecialite ?description 
            ?dureeFormation ?niveauDiplome ?nombreModules ?universite ?nomUniversite
-    WHERE {
+    WHERE {{
       ?specialite rdf:type ?type .
-      FILTER(?type IN (ont:Specialite, ont:SpecialiteInformatique, ont:SpecialiteDataScience, 
-                       ont:SpecialiteIngenierie, ont:SpecialiteSciences, ont:SpecialiteMedecine,
-                       ont:SpecialiteEconomie, ont:SpecialiteDroit, ont:SpecialiteLettres))
+      {class_hierarchy.type_values('type', 'Specialite')}
       
-      OPTIONAL { ?specialite ont:nomSpecialite ?nomSpecialite }
-      OPTIONAL { ?specialite ont:codeSpecialite ?codeSpecialite }
-      OPTIONAL { ?specialite ont:description ?description }
-      OPTIONAL { ?specialite ont:dureeFormation ?dureeFormation }
-      OPTIONAL { ?specialite ont:niveauDiplome ?niveauDiplome }
-      OPTIONAL { ?specialite ont:nombreModules ?nombreModules }
+      OPTIONAL {{ ?specialite ont:nomSpecialite ?nomSpecialite }}
+      OPTIONAL {{ ?specialite ont:codeSpecialite ?codeSpecialite }}
+      OPTIONAL {{ ?specialite ont:description ?description }}
+      OPTIONAL {{ ?specialite ont:dureeFormation ?dureeFormation }}
+      OPTIONAL {{ ?specialite ont:niveauDiplome ?niveauDiplome }}
+      OPTIONAL {{ ?specialite ont:nombreModules ?nombreModules }}
       
       # Informations sur l'université qui offre cette spécialité
-      OPTIONAL { 
+      OPTIONAL {{ 
         ?specialite ont:estOffertePar ?universite .
         ?universite ont:nomUniversite ?nomUniversite 
-      }
-    }
+      }}
+    }}
     ORDER BY ?nomSpecialite
     """
     
+    page = requested_page()
+    if page:
+        return paginated_query_response(query, page, 'specialite', 'nomSpecialite')
+
+    stream_format = requested_stream_format()
+    if stream_format:
+        return stream_query_response(query, stream_format)
+    
     try:
         results = sparql_utils.execute_query(query)
         
@@ -63,123 +88,44 @@ def normalize_specialite_id(specialite_id):
     
     return specialite_id
 
+# Détail d'une spécialité : l'entité et ses collections liées en un seul CONSTRUCT
+SPECIALITE_FRAME = Frame('specialites.detail', 'Specialite', section='info_generale', fields={
+    'specialite': ENTITY_ID,
+    'nomSpecialite': 'nomSpecialite',
+    'codeSpecialite': 'codeSpecialite',
+    'description': 'description',
+    'dureeFormation': 'dureeFormation',
+    'niveauDiplome': 'niveauDiplome',
+    'nombreModules': 'nombreModules'
+}, required=('nomSpecialite', 'codeSpecialite'), include_subclasses=False, relations={
+    # Informations sur l'université
+    'universite': Relation('estOffertePar', 'universite', {
+        'nomUniversite': 'nomUniversite', 'ville': 'ville', 'pays': 'pays'
+    }, required=('nomUniversite',), many=False),
+    # Cours associés à cette spécialité
+    'cours': Relation('faitPartieDe', 'cours', {
+        'intituleCours': 'intitule', 'codeCours': 'codeCours', 'creditsECTS': 'creditsECTS'
+    }, required=('intituleCours',), reverse=True),
+    # Compétences développées dans cette spécialité
+    'competences': Relation('formePour', 'competence', {
+        'nomCompetence': 'nomCompetence', 'typeCompetence': 'typeCompetence'
+    }, required=('nomCompetence',)),
+    # Étudiants inscrits dans cette spécialité
+    'etudiants': Relation('specialiseEn', 'etudiant', {
+        'nomEtudiant': 'nom', 'prenomEtudiant': 'prenom'
+    }, required=('nomEtudiant', 'prenomEtudiant'), reverse=True)
+})
+
 @specialite_bp.route('/specialites/<path:specialite_id>', methods=['GET'])
 def get_specialite(specialite_id):
     """Récupère une spécialité spécifique avec tous ses détails"""
     specialite_id = normalize_specialite_id(specialite_id)
-    query = f"""
-    PREFIX ont: <http://www.education-intelligente.org/ontologie#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-
-    SELECT ?specialite ?nomSpecialite ?codeSpecialite ?description ?dureeFormation 
-           ?niveauDiplome ?nombreModules ?universite ?nomUniversite ?ville ?pays
-           ?cours ?intituleCours ?codeCours ?creditsECTS
-           ?competence ?nomCompetence ?typeCompetence
-           ?etudiant ?nomEtudiant ?prenomEtudiant
-    WHERE {{
-        <{specialite_id}> a ont:Specialite ;
-               ont:nomSpecialite ?nomSpecialite ;
-               ont:codeSpecialite ?codeSpecialite .
-        
-        OPTIONAL {{ <{specialite_id}> ont:description ?description . }}
-        OPTIONAL {{ <{specialite_id}> ont:dureeFormation ?dureeFormation . }}
-        OPTIONAL {{ <{specialite_id}> ont:niveauDiplome ?niveauDiplome . }}
-        OPTIONAL {{ <{specialite_id}> ont:nombreModules ?nombreModules . }}
-        
-        # Informations sur l'université
-        OPTIONAL {{ 
-            <{specialite_id}> ont:estOffertePar ?universite .
-            ?universite ont:nomUniversite ?nomUniversite .
-            OPTIONAL {{ ?universite ont:ville ?ville . }}
-            OPTIONAL {{ ?universite ont:pays ?pays . }}
-        }}
-        
-        # Cours associés à cette spécialité
-        OPTIONAL {{
-            ?cours ont:faitPartieDe <{specialite_id}> .
-            ?cours ont:intitule ?intituleCours .
-            OPTIONAL {{ ?cours ont:codeCours ?codeCours . }}
-            OPTIONAL {{ ?cours ont:creditsECTS ?creditsECTS . }}
-        }}
-        
-        # Compétences développées dans cette spécialité
-        OPTIONAL {{
-            <{specialite_id}> ont:formePour ?competence .
-            ?competence ont:nomCompetence ?nomCompetence .
-            OPTIONAL {{ ?competence ont:typeCompetence ?typeCompetence . }}
-        }}
-        
-        # Étudiants inscrits dans cette spécialité
-        OPTIONAL {{
-            ?etudiant ont:specialiseEn <{specialite_id}> .
-            ?etudiant ont:nom ?nomEtudiant .
-            ?etudiant ont:prenom ?prenomEtudiant .
-        }}
-    }}
-    """
+    query = SPECIALITE_FRAME.bind(specialite_id)
     
     try:
-        results = sparql_utils.execute_query(query)
-        
-        if not results:
+        specialite_data = SPECIALITE_FRAME.frame(sparql_utils.construct(query), specialite_id)
+        if specialite_data is None:
             return jsonify({"error": "Spécialité non trouvée"}), 404
-            
-        # Structurer les données pour une meilleure organisation
-        specialite_data = {
-            "info_generale": {},
-            "universite": {},
-            "cours": [],
-            "competences": [],
-            "etudiants": []
-        }
-        
-        for result in results:
-            # Informations générales
-            if not specialite_data["info_generale"]:
-                specialite_data["info_generale"] = {
-                    "specialite": result.get("specialite"),
-                    "nomSpecialite": result.get("nomSpecialite"),
-                    "codeSpecialite": result.get("codeSpecialite"),
-                    "description": result.get("description"),
-                    "dureeFormation": result.get("dureeFormation"),
-                    "niveauDiplome": result.get("niveauDiplome"),
-                    "nombreModules": result.get("nombreModules")
-                }
-            
-            # Université
-            if result.get("universite") and not specialite_data["universite"]:
-                specialite_data["universite"] = {
-                    "universite": result.get("universite"),
-                    "nomUniversite": result.get("nomUniversite"),
-                    "ville": result.get("ville"),
-                    "pays": result.get("pays")
-                }
-            
-            # Cours
-            if result.get("cours") and result.get("cours") not in [c["cours"] for c in specialite_data["cours"]]:
-                specialite_data["cours"].append({
-                    "cours": result.get("cours"),
-                    "intituleCours": result.get("intituleCours"),
-                    "codeCours": result.get("codeCours"),
-                    "creditsECTS": result.get("creditsECTS")
-                })
-            
-            # Compétences
-            if result.get("competence") and result.get("competence") not in [c["competence"] for c in specialite_data["competences"]]:
-                specialite_data["competences"].append({
-                    "competence": result.get("competence"),
-                    "nomCompetence": result.get("nomCompetence"),
-                    "typeCompetence": result.get("typeCompetence")
-                })
-            
-            # Étudiants
-            if result.get("etudiant") and result.get("etudiant") not in [e["etudiant"] for e in specialite_data["etudiants"]]:
-                specialite_data["etudiants"].append({
-                    "etudiant": result.get("etudiant"),
-                    "nomEtudiant": result.get("nomEtudiant"),
-                    "prenomEtudiant": result.get("prenomEtudiant")
-                })
-        
         return jsonify(specialite_data)
         
     except Exception as e:
@@ -188,50 +134,51 @@ def get_specialite(specialite_id):
 
 @specialite_bp.route('/specialites/search', methods=['POST'])
 def search_specialites():
-    """Recherche de spécialités par critères"""
+    """Recherche de spécialités par critères (index plein texte, puis lecture des candidats)"""
     data = request.json
-    nom = data.get('nom', '')
-    domaine = data.get('domaine', '')
-    universite = data.get('universite', '')
-    niveau = data.get('niveau', '')
+    specialites = text_index.search({
+        'nomSpecialite': data.get('nom', ''),
+        # Recherche dans la description pour le domaine
+        'description': data.get('domaine', ''),
+        'niveauDiplome': data.get('niveau', '')
+    })
+    universites = text_index.search({'nomUniversite': data.get('universite', '')})
     
-    query = """
+    if no_match(specialites, universites):
+        return jsonify([])
+    
+    if universites is None:
+        universite_pattern = """
+        OPTIONAL { 
+            ?specialite ont:estOffertePar ?universite .
+            ?universite ont:nomUniversite ?nomUniversite .
+        }"""
+    else:
+        universite_pattern = f"""
+        {values_clause('universite', universites)}
+        ?specialite ont:estOffertePar ?universite .
+        ?universite ont:nomUniversite ?nomUniversite ."""
+    
+    query = f"""
     PREFIX ont: <http://www.education-intelligente.org/ontologie#>
     SELECT ?specialite ?nomSpecialite ?codeSpecialite ?description ?dureeFormation 
            ?niveauDiplome ?universite ?nomUniversite
-    WHERE {
+    WHERE {{
+        {values_clause('specialite', specialites)}
         ?specialite a ont:Specialite ;
                ont:nomSpecialite ?nomSpecialite .
         
-        OPTIONAL { ?specialite ont:codeSpecialite ?codeSpecialite . }
-        OPTIONAL { ?specialite ont:description ?description . }
-        OPTIONAL { ?specialite ont:dureeFormation ?dureeFormation . }
-        OPTIONAL { ?specialite ont:niveauDiplome ?niveauDiplome . }
-        OPTIONAL { 
-            ?specialite ont:estOffertePar ?universite .
-            ?universite ont:nomUniversite ?nomUniversite .
-        }
+        OPTIONAL {{ ?specialite ont:codeSpecialite ?codeSpecialite . }}
+        OPTIONAL {{ ?specialite ont:description ?description . }}
+        OPTIONAL {{ ?specialite ont:dureeFormation ?dureeFormation . }}
+        OPTIONAL {{ ?specialite ont:niveauDiplome ?niveauDiplome . }}
+        {universite_pattern}
+    }} ORDER BY ?nomSpecialite
     """
     
-    filters = []
-    if nom:
-        filters.append(f'REGEX(?nomSpecialite, "{nom}", "i")')
-    if domaine:
-        # Recherche dans la description pour le domaine
-        filters.append(f'REGEX(?description, "{domaine}", "i")')
-    if universite:
-        filters.append(f'REGEX(?nomUniversite, "{universite}", "i")')
-    if niveau:
-        filters.append(f'REGEX(?niveauDiplome, "{niveau}", "i")')
-    
-    if filters:
-        query += " FILTER(" + " && ".join(filters) + ")"
-    
-    query += "} ORDER BY ?nomSpecialite"
-    
     try:
         results = sparql_utils.execute_query(query)
-        return jsonify(results)
+        return jsonify(ranked(results, 'specialite', specialites))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -243,7 +190,7 @@ def get_specialite_cours(specialite_id):
     SELECT ?cours ?intitule ?codeCours ?creditsECTS ?semestre ?volumeHoraire 
            ?langueCours ?enseignant ?nomEnseignant ?prenomEnseignant
     WHERE {{
-        ?cours ont:faitPartieDe <{specialite_id}> ;
+        ?cours ont:faitPartieDe {IRI.render(specialite_id)} ;
                ont:intitule ?intitule .
         
         OPTIONAL {{ ?cours ont:codeCours ?codeCours . }}
@@ -277,7 +224,7 @@ def get_specialite_etudiants(specialite_id):
     SELECT ?etudiant ?nom ?prenom ?email ?telephone ?dateNaissance 
            ?numeroMatricule ?niveauEtude ?moyenneGenerale ?universite ?nomUniversite
     WHERE {{
-        ?etudiant ont:specialiseEn <{specialite_id}> ;
+        ?etudiant ont:specialiseEn {IRI.render(specialite_id)} ;
                ont:nom ?nom ;
                ont:prenom ?prenom .
         
@@ -310,7 +257,7 @@ def get_specialite_competences(specialite_id):
     SELECT ?competence ?nomCompetence ?typeCompetence ?niveauCompetence 
            ?descriptionCompetence ?motsCles
     WHERE {{
-        <{specialite_id}> ont:formePour ?competence .
+        {IRI.render(specialite_id)} ont:formePour ?competence .
         ?competence ont:nomCompetence ?nomCompetence .
         
         OPTIONAL {{ ?competence ont:typeCompetence ?typeCompetence . }}
@@ -329,84 +276,17 @@ def get_specialite_competences(specialite_id):
 
 @specialite_bp.route('/specialites/stats', methods=['GET'])
 def get_specialites_stats():
-    """Récupère les statistiques des spécialités"""
-    query = """
-    PREFIX ont: <http://www.education-intelligente.org/ontologie#>
-    
-    SELECT 
-        (COUNT(DISTINCT ?specialite) as ?total_specialites)
-        (COUNT(DISTINCT ?etudiant) as ?total_etudiants)
-        (COUNT(DISTINCT ?cours) as ?total_cours)
-        (COUNT(DISTINCT ?competence) as ?total_competences)
-    WHERE {
-        ?specialite a ont:Specialite .
-        OPTIONAL { ?etudiant ont:specialiseEn ?specialite . }
-        OPTIONAL { ?cours ont:faitPartieDe ?specialite . }
-        OPTIONAL { ?specialite ont:formePour ?competence . }
-    }
-    """
-    
+    """Récupère les statistiques des spécialités (agrégats matérialisés)"""
     try:
-        results = sparql_utils.execute_query(query)
-        return jsonify(results[0] if results else {})
+        return jsonify(materialized_stats.specialites_stats())
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @specialite_bp.route('/specialites/facets', methods=['GET'])
 def get_specialites_facets():
     """Récupère les facettes pour la navigation filtrée - comptages par catégorie"""
-    # Facettes par type de spécialité
-    query_type = """
-    PREFIX ont: <http://www.education-intelligente.org/ontologie#>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    
-    SELECT ?typeSpecialite (COUNT(DISTINCT ?specialite) as ?count)
-    WHERE {
-        ?specialite rdf:type ?typeSpecialite .
-        FILTER(?typeSpecialite IN (ont:Specialite, ont:SpecialiteInformatique, 
-                                   ont:SpecialiteDataScience, ont:SpecialiteIngenierie, 
-                                   ont:SpecialiteSciences, ont:SpecialiteMedecine,
-                                   ont:SpecialiteEconomie, ont:SpecialiteDroit, 
-                                   ont:SpecialiteLettres))
-    }
-    GROUP BY ?typeSpecialite
-    ORDER BY DESC(?count)
-    """
-    
-    # Facettes par niveau de diplôme
-    query_niveau = """
-    PREFIX ont: <http://www.education-intelligente.org/ontologie#>
-    
-    SELECT ?niveauDiplome (COUNT(DISTINCT ?specialite) as ?count)
-    WHERE {
-        ?specialite a ont:Specialite .
-        ?specialite ont:niveauDiplome ?niveauDiplome .
-    }
-    GROUP BY ?niveauDiplome
-    ORDER BY DESC(?count)
-    """
-    
-    # Facettes par université
-    query_universite = """
-    PREFIX ont: <http://www.education-intelligente.org/ontologie#>
-    
-    SELECT ?universite ?nomUniversite (COUNT(DISTINCT ?specialite) as ?count)
-    WHERE {
-        ?specialite a ont:Specialite .
-        ?specialite ont:estOffertePar ?universite .
-        ?universite ont:nomUniversite ?nomUniversite .
-    }
-    GROUP BY ?universite ?nomUniversite
-    ORDER BY DESC(?count)
-    LIMIT 20
-    """
-    
     try:
-        facets = {
-            "by_type": sparql_utils.execute_query(query_type),
-            "by_niveau": sparql_utils.execute_query(query_niveau),
-            "by_universite": sparql_utils.execute_query(query_universite)
-        }
+        facets = SPECIALITES_FACETS.counts(request.args)
         
         # Clean up type URIs for frontend
         for facet in facets["by_type"]:
@@ -469,44 +349,44 @@ def get_specialites_par_universite():
 
 def generate_specialite_uri(nom: str) -> str:
     """Generate a unique URI for a specialite"""
-    safe_nom = nom.upper().replace(' ', '_').replace("'", "")[:50]
+    safe_nom = IRI.segment(nom.upper().replace(' ', '_').replace("'", "")[:50])
     return f"{PREFIX}Specialite_{safe_nom}_{uuid.uuid4().hex[:8]}"
 
-@specialite_bp.route('/specialites', methods=['POST'])
-def create_specialite():
-    """Create a new specialite"""
-    data = request.json
-    
-    errors = validate_specialite(data)
-    if errors:
-        return jsonify({"errors": errors}), 400
-    
+def build_specialite_triples(data):
+    """Build the RDF triples of a new specialite, returns (uri, triples)"""
     specialite_uri = generate_specialite_uri(data.get('nomSpecialite'))
     
     insert_parts = [
-        f"<{specialite_uri}> a ont:Specialite",
-        f"; ont:nomSpecialite \"{data.get('nomSpecialite')}\""
+        f"{IRI.render(specialite_uri)} a ont:Specialite",
+        f"; ont:nomSpecialite {LITERAL.render(data.get('nomSpecialite'))}"
     ]
     
     if data.get('codeSpecialite'):
-        insert_parts.append(f"; ont:codeSpecialite \"{data.get('codeSpecialite')}\"")
+        insert_parts.append(f"; ont:codeSpecialite {LITERAL.render(data.get('codeSpecialite'))}")
     if data.get('description'):
-        insert_parts.append(f"; ont:description \"{data.get('description')}\"")
+        insert_parts.append(f"; ont:description {LITERAL.render(data.get('description'))}")
     if data.get('dureeFormation'):
-        insert_parts.append(f"; ont:dureeFormation \"{data.get('dureeFormation')}\"")
+        insert_parts.append(f"; ont:dureeFormation {LITERAL.render(data.get('dureeFormation'))}")
     if data.get('niveauDiplome'):
-        insert_parts.append(f"; ont:niveauDiplome \"{data.get('niveauDiplome')}\"")
+        insert_parts.append(f"; ont:niveauDiplome {LITERAL.render(data.get('niveauDiplome'))}")
     if data.get('nombreModules'):
         insert_parts.append(f"; ont:nombreModules {int(data.get('nombreModules'))}")
     if data.get('universite'):
-        insert_parts.append(f"; ont:estOffertePar <{data.get('universite')}>")
+        insert_parts.append(f"; ont:estOffertePar {IRI.render(data.get('universite'))}")
     
-    query = f"""
-    PREFIX ont: <{PREFIX}>
-    INSERT DATA {{
-        {' '.join(insert_parts)} .
-    }}
-    """
+    return specialite_uri, f"{' '.join(insert_parts)} ."
+
+@specialite_bp.route('/specialites', methods=['POST'])
+def create_specialite():
+    """Create a new specialite"""
+    data = request.json
+    
+    errors = validate_specialite(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    
+    specialite_uri, triples = build_specialite_triples(data)
+    query = insert_data_query([triples])
     
     try:
         result = sparql_utils.execute_update(query)
@@ -516,6 +396,11 @@ def create_specialite():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@specialite_bp.route('/specialites/bulk', methods=['POST'])
+def bulk_create_specialites():
+    """Create many specialites in a single SPARQL update"""
+    return bulk_create(request.json, validate_specialite, build_specialite_triples, "spécialités")
+
 @specialite_bp.route('/specialites/<path:specialite_id>', methods=['PUT'])
 def update_specialite(specialite_id):
     """Update a specialite"""
@@ -526,33 +411,34 @@ def update_specialite(specialite_id):
     if errors:
         return jsonify({"errors": errors}), 400
     
+    subject = IRI.render(specialite_id)
     delete_query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE {{
-        <{specialite_id}> ?p ?o .
+        {subject} ?p ?o .
     }}
     WHERE {{
-        <{specialite_id}> ?p ?o .
+        {subject} ?p ?o .
         FILTER(?p != ont:formePour && ?p != ont:faitPartieDe)
     }}
     """
     
-    insert_parts = [f"<{specialite_id}> a ont:Specialite"]
+    insert_parts = [f"{subject} a ont:Specialite"]
     
     if data.get('nomSpecialite'):
-        insert_parts.append(f"; ont:nomSpecialite \"{data.get('nomSpecialite')}\"")
+        insert_parts.append(f"; ont:nomSpecialite {LITERAL.render(data.get('nomSpecialite'))}")
     if data.get('codeSpecialite'):
-        insert_parts.append(f"; ont:codeSpecialite \"{data.get('codeSpecialite')}\"")
+        insert_parts.append(f"; ont:codeSpecialite {LITERAL.render(data.get('codeSpecialite'))}")
     if data.get('description'):
-        insert_parts.append(f"; ont:description \"{data.get('description')}\"")
+        insert_parts.append(f"; ont:description {LITERAL.render(data.get('description'))}")
     if data.get('dureeFormation'):
-        insert_parts.append(f"; ont:dureeFormation \"{data.get('dureeFormation')}\"")
+        insert_parts.append(f"; ont:dureeFormation {LITERAL.render(data.get('dureeFormation'))}")
     if data.get('niveauDiplome'):
-        insert_parts.append(f"; ont:niveauDiplome \"{data.get('niveauDiplome')}\"")
+        insert_parts.append(f"; ont:niveauDiplome {LITERAL.render(data.get('niveauDiplome'))}")
     if data.get('nombreModules'):
         insert_parts.append(f"; ont:nombreModules {int(data.get('nombreModules'))}")
     if data.get('universite'):
-        insert_parts.append(f"; ont:estOffertePar <{data.get('universite')}>")
+        insert_parts.append(f"; ont:estOffertePar {IRI.render(data.get('universite'))}")
     
     insert_query = f"""
     PREFIX ont: <{PREFIX}>
@@ -562,8 +448,8 @@ def update_specialite(specialite_id):
     """
     
     try:
-        sparql_utils.execute_update(delete_query)
-        result = sparql_utils.execute_update(insert_query)
+        # DELETE and INSERT in one atomic request
+        result = sparql_utils.execute_update_batch([delete_query, insert_query])
         if "error" in result:
             return jsonify(result), 500
         return jsonify({"message": "Spécialité mise à jour avec succès"}), 200
@@ -587,7 +473,7 @@ def delete_specialite(specialite_id):
     query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE WHERE {{
-        <{specialite_uri}> ?p ?o .
+        {IRI.render(specialite_uri)} ?p ?o .
     }}
     """
     
@@ -606,6 +492,7 @@ def enrich_specialite_with_dbpedia(specialite_id):
     Accepts optional 'term' query parameter to search for specific term
     If no term provided, uses the specialité name
     """
+    subject = IRI.render(specialite_id)
     try:
         specialite_id = normalize_specialite_id(specialite_id)
         
@@ -615,14 +502,12 @@ def enrich_specialite_with_dbpedia(specialite_id):
         PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
         SELECT ?nomSpecialite ?ville ?pays ?nomUniversite ?description
         WHERE {{
-            <{specialite_id}> rdf:type ?type .
-            FILTER(?type IN (ont:Specialite, ont:SpecialiteInformatique, ont:SpecialiteDataScience, 
-                             ont:SpecialiteIngenierie, ont:SpecialiteSciences, ont:SpecialiteMedecine,
-                             ont:SpecialiteEconomie, ont:SpecialiteDroit, ont:SpecialiteLettres))
-            OPTIONAL {{ <{specialite_id}> ont:nomSpecialite ?nomSpecialite . }}
-            OPTIONAL {{ <{specialite_id}> ont:description ?description . }}
+            {subject} rdf:type ?type .
+            {class_hierarchy.type_values('type', 'Specialite')}
+            OPTIONAL {{ {subject} ont:nomSpecialite ?nomSpecialite . }}
+            OPTIONAL {{ {subject} ont:description ?description . }}
             OPTIONAL {{
-                <{specialite_id}> ont:estOffertePar ?universite .
+                {subject} ont:estOffertePar ?universite .
                 ?universite ont:nomUniversite ?nomUniversite .
                 OPTIONAL {{ ?universite ont:ville ?ville . }}
                 OPTIONAL {{ ?universite ont:pays ?pays . }}
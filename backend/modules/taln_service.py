@@ -3,6 +3,7 @@ import requests
 import json
 from typing import Dict, List, Optional, Any
 from dotenv import load_dotenv
+from async_http import get_client
 
 load_dotenv()
 
@@ -56,27 +57,8 @@ class TALNService:
         
         try:
             print(f"DEBUG: Attempting TALN API call...")
-            # Prepare the request payload
-            payload = {
-                "text": question,
-                "language": "fr",  # French language
-                "features": {
-                    "entities": True,
-                    "relationships": True,
-                    "intent": True,
-                    "keywords": True,
-                    "semantic_roles": True,
-                    "temporal_expressions": True,
-                    "location_expressions": True
-                },
-                "domain": "education",  # Education domain analysis
-                "ontology_mapping": True
-            }
-            
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
+            payload = self._build_request_payload(question)
+            headers = self._build_request_headers()
             
             print(f"DEBUG: Sending request to TALN API...")
             # Make API request
@@ -104,6 +86,59 @@ class TALNService:
             print(f"DEBUG: Falling back to local analysis")
             return self._fallback_analysis(question)
     
+    def _build_request_payload(self, question: str) -> Dict[str, Any]:
+        """Payload of the TALN /analyze request"""
+        return {
+            "text": question,
+            "language": "fr",  # French language
+            "features": {
+                "entities": True,
+                "relationships": True,
+                "intent": True,
+                "keywords": True,
+                "semantic_roles": True,
+                "temporal_expressions": True,
+                "location_expressions": True
+            },
+            "domain": "education",  # Education domain analysis
+            "ontology_mapping": True
+        }
+    
+    def _build_request_headers(self) -> Dict[str, str]:
+        """Headers of the TALN /analyze request"""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    async def analyze_question_async(self, question: str) -> Dict[str, Any]:
+        """
+        Same analysis as analyze_question, for the asyncio search path:
+        the TALN API call goes through the shared httpx client and does not block the event loop.
+        """
+        if self.use_fallback:
+            return self._fallback_analysis(question)
+        
+        try:
+            response = await get_client().post(
+                f"{self.base_url}/analyze",
+                json=self._build_request_payload(question),
+                headers=self._build_request_headers(),
+                timeout=10
+            )
+            
+            print(f"DEBUG: TALN API response status: {response.status_code}")
+            
+            if response.status_code == 200:
+                return self._process_taln_response(response.json(), question)
+            print(f"ERROR: TALN API error: {response.status_code} - {response.text}")
+            return self._fallback_analysis(question)
+        
+        except Exception as e:
+            print(f"ERROR: TALN API request failed: {e}")
+            print(f"DEBUG: Falling back to local analysis")
+            return self._fallback_analysis(question)
+    
     def _process_taln_response(self, taln_result: Dict, original_question: str) -> Dict[str, Any]:
         """
         Process the TALN API response and structure it for Gemini consumption.
@@ -670,6 +705,31 @@ class GeminiTALNService(TALNService):
             print(f"DEBUG: Falling back to local analysis")
             return self._fallback_analysis(question)
     
+    async def analyze_question_async(self, question: str) -> Dict[str, Any]:
+        """
+        Same analysis as analyze_question, awaiting Gemini's async API
+        so the event loop keeps serving other searches meanwhile.
+        """
+        if self.use_fallback or not self.model:
+            return self._fallback_analysis(question)
+        
+        try:
+            response = await self.model.generate_content_async(
+                self._build_gemini_analysis_prompt(question),
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.2,
+                    top_p=0.8,
+                    top_k=40,
+                    max_output_tokens=1500,
+                )
+            )
+            return self._parse_gemini_analysis_response(response.text, question)
+        
+        except Exception as e:
+            print(f"ERROR: Gemini NLP analysis failed: {e}")
+            print(f"DEBUG: Falling back to local analysis")
+            return self._fallback_analysis(question)
+    
     def _build_gemini_analysis_prompt(self, question: str) -> str:
         """Build prompt for Gemini to extract structured NLP information"""
         return f"""You are an expert NLP analyst for an educational platform. Analyze the following French question and extract structured information in JSON format.
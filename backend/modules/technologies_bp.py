@@ -2,6 +2,13 @@
 
 from flask import Blueprint, jsonify, request
 from sparql_utils import sparql_utils
+from streaming import requested_stream_format, stream_query_response
+from pagination import requested_page, paginated_query_response
+from class_hierarchy import class_hierarchy
+from query_templates import templates, Classes, IRI, LITERAL
+from bulk import bulk_create, insert_data_query
+from text_index import no_match, text_index, ranked, values_clause
+from facet_index import facet_index, LinkFacet, ValueFacet
 from modules.validators import validate_technologie
 from modules.dbpedia_service import dbpedia_service
 import uuid
@@ -9,9 +16,15 @@ import uuid
 technologies_bp = Blueprint('technologies', __name__)
 PREFIX = "http://www.education-intelligente.org/ontologie#"
 
+# Facet dimensions, counted from the in-memory bitset index (drill-down via query args)
+TECHNOLOGIES_FACETS = facet_index.register('TechnologieEducative', [
+    ValueFacet('by_type', 'typeTechnologie', 'typeTechnologie'),
+    LinkFacet('by_universite', 'universite', 'nomUniversite', 'adopteTechnologie', 'nomUniversite', reverse=True)
+])
+
 def generate_technologie_uri(nom: str) -> str:
     """Generate a unique URI for a technologie"""
-    safe_nom = nom.upper().replace(' ', '_').replace("'", "")[:50]
+    safe_nom = IRI.segment(nom.upper().replace(' ', '_').replace("'", "")[:50])
     return f"{PREFIX}TechnologieEducative_{safe_nom}_{uuid.uuid4().hex[:8]}"
 
 @technologies_bp.route('/technologies-educatives', methods=['GET'])
@@ -25,7 +38,7 @@ def get_all_technologies():
            ?ressource ?titreRessource
     WHERE {{
         ?technologie a ?type .
-        ?type rdfs:subClassOf* ont:TechnologieEducative .
+        {class_hierarchy.type_values('type', 'TechnologieEducative')}
         OPTIONAL {{ ?technologie ont:nomTechnologie ?nomTechnologie . }}
         OPTIONAL {{ ?technologie ont:typeTechnologie ?typeTechnologie . }}
         OPTIONAL {{
@@ -39,48 +52,74 @@ def get_all_technologies():
     }}
     ORDER BY ?nomTechnologie
     """
+    page = requested_page()
+    if page:
+        return paginated_query_response(query, page, 'technologie', 'nomTechnologie')
+
+    stream_format = requested_stream_format()
+    if stream_format:
+        return stream_query_response(query, stream_format)
+    
     try:
         results = sparql_utils.execute_query(query)
         return jsonify(results)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@technologies_bp.route('/technologies-educatives/<technologie_id>', methods=['GET'])
-def get_technologie(technologie_id):
-    """Get a specific technology"""
-    query = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+TECHNOLOGIE_DETAIL_QUERY = templates.register('technologies.detail', """
     SELECT ?technologie ?nomTechnologie ?typeTechnologie
            ?universite ?nomUniversite
            ?ressource ?titreRessource
            ?cours ?intitule
-    WHERE {{
-        <{technologie_id}> a ?type .
-        ?type rdfs:subClassOf* ont:TechnologieEducative .
-        OPTIONAL {{ <{technologie_id}> ont:nomTechnologie ?nomTechnologie . }}
-        OPTIONAL {{ <{technologie_id}> ont:typeTechnologie ?typeTechnologie . }}
-        OPTIONAL {{
-            ?universite ont:adopteTechnologie <{technologie_id}> .
+    WHERE {
+        $technologie_id a ?type .
+        $types
+        OPTIONAL { $technologie_id ont:nomTechnologie ?nomTechnologie . }
+        OPTIONAL { $technologie_id ont:typeTechnologie ?typeTechnologie . }
+        OPTIONAL {
+            ?universite ont:adopteTechnologie $technologie_id .
             ?universite ont:nomUniversite ?nomUniversite .
-        }}
-        OPTIONAL {{
-            <{technologie_id}> ont:hebergeRessource ?ressource .
+        }
+        OPTIONAL {
+            $technologie_id ont:hebergeRessource ?ressource .
             ?ressource ont:titreRessource ?titreRessource .
-        }}
-        OPTIONAL {{
-            ?cours ont:integreTechnologie <{technologie_id}> .
+        }
+        OPTIONAL {
+            ?cours ont:integreTechnologie $technologie_id .
             ?cours ont:intitule ?intitule .
-        }}
-    }}
-    """
+        }
+    }
+    """, technologie_id=IRI, types=Classes('type', 'TechnologieEducative'))
+
+@technologies_bp.route('/technologies-educatives/<technologie_id>', methods=['GET'])
+def get_technologie(technologie_id):
+    """Get a specific technology"""
+    query = TECHNOLOGIE_DETAIL_QUERY.bind(technologie_id=technologie_id)
     try:
         results = sparql_utils.execute_query(query)
         return jsonify(results[0] if results else {}), 404 if not results else 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def build_technologie_triples(data):
+    """Build the RDF triples of a new technology, returns (uri, triples)"""
+    technologie_uri = generate_technologie_uri(data.get('nomTechnologie'))
+    
+    subject = IRI.render(technologie_uri)
+    insert_parts = [
+        f"{subject} a ont:TechnologieEducative",
+        f"; ont:nomTechnologie {LITERAL.render(data.get('nomTechnologie'))}"
+    ]
+    
+    if data.get('typeTechnologie'):
+        insert_parts.append(f"; ont:typeTechnologie {LITERAL.render(data.get('typeTechnologie'))}")
+    
+    triples = f"{' '.join(insert_parts)} ."
+    if data.get('universite'):
+        triples += f" {IRI.render(data.get('universite'))} ont:adopteTechnologie {subject} ."
+    
+    return technologie_uri, triples
+
 @technologies_bp.route('/technologies-educatives', methods=['POST'])
 def create_technologie():
     """Create a new technology"""
@@ -90,24 +129,8 @@ def create_technologie():
     if errors:
         return jsonify({"errors": errors}), 400
     
-    technologie_uri = generate_technologie_uri(data.get('nomTechnologie'))
-    
-    insert_parts = [
-        f"<{technologie_uri}> a ont:TechnologieEducative",
-        f"; ont:nomTechnologie \"{data.get('nomTechnologie')}\""
-    ]
-    
-    if data.get('typeTechnologie'):
-        insert_parts.append(f"; ont:typeTechnologie \"{data.get('typeTechnologie')}\"")
-    if data.get('universite'):
-        insert_parts.append(f"<{data.get('universite')}> ont:adopteTechnologie <{technologie_uri}> .")
-    
-    query = f"""
-    PREFIX ont: <{PREFIX}>
-    INSERT DATA {{
-        {' '.join(insert_parts)} .
-    }}
-    """
+    technologie_uri, triples = build_technologie_triples(data)
+    query = insert_data_query([triples])
     
     try:
         result = sparql_utils.execute_update(query)
@@ -117,6 +140,11 @@ def create_technologie():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@technologies_bp.route('/technologies-educatives/bulk', methods=['POST'])
+def bulk_create_technologies():
+    """Create many technologies in a single SPARQL update"""
+    return bulk_create(request.json, validate_technologie, build_technologie_triples, "technologies")
+
 @technologies_bp.route('/technologies-educatives/<technologie_id>', methods=['PUT'])
 def update_technologie(technologie_id):
     """Update a technology"""
@@ -126,34 +154,36 @@ def update_technologie(technologie_id):
     if errors:
         return jsonify({"errors": errors}), 400
     
+    subject = IRI.render(technologie_id)
     delete_query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE {{
-        <{technologie_id}> ?p ?o .
-        ?univ ont:adopteTechnologie <{technologie_id}> .
+        {subject} ?p ?o .
+        ?univ ont:adopteTechnologie {subject} .
     }}
     WHERE {{
-        <{technologie_id}> ?p ?o .
-        OPTIONAL {{ ?univ ont:adopteTechnologie <{technologie_id}> . }}
+        {subject} ?p ?o .
+        OPTIONAL {{ ?univ ont:adopteTechnologie {subject} . }}
     }}
     """
     
-    insert_parts = [f"<{technologie_id}> a ont:TechnologieEducative"]
+    insert_parts = [f"{subject} a ont:TechnologieEducative"]
     
     if data.get('nomTechnologie'):
-        insert_parts.append(f"; ont:nomTechnologie \"{data.get('nomTechnologie')}\"")
+        insert_parts.append(f"; ont:nomTechnologie {LITERAL.render(data.get('nomTechnologie'))}")
     if data.get('typeTechnologie'):
-        insert_parts.append(f"; ont:typeTechnologie \"{data.get('typeTechnologie')}\"")
+        insert_parts.append(f"; ont:typeTechnologie {LITERAL.render(data.get('typeTechnologie'))}")
     
     query_parts = [f"PREFIX ont: <{PREFIX}>\nINSERT DATA {{ {' '.join(insert_parts)} . }}"]
     
     if data.get('universite'):
-        query_parts.append(f"INSERT DATA {{ <{data.get('universite')}> ont:adopteTechnologie <{technologie_id}> . }}")
+        query_parts.append(f"PREFIX ont: <{PREFIX}>\nINSERT DATA {{ {IRI.render(data.get('universite'))} ont:adopteTechnologie {subject} . }}")
     
     try:
-        sparql_utils.execute_update(delete_query)
-        for insert_q in query_parts:
-            sparql_utils.execute_update(insert_q)
+        # DELETE and INSERTs in one atomic request
+        result = sparql_utils.execute_update_batch([delete_query] + query_parts)
+        if "error" in result:
+            return jsonify(result), 500
         return jsonify({"message": "Technologie mise à jour avec succès"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -171,10 +201,11 @@ def delete_technologie(technologie_id):
             technologie_uri = f"{PREFIX}{technologie_id}"
     
     # Delete triples where technologie is subject
+    subject = IRI.render(technologie_uri)
     query1 = f"""
     PREFIX ont: <{PREFIX}>
     DELETE WHERE {{
-        <{technologie_uri}> ?p ?o .
+        {subject} ?p ?o .
     }}
     """
     
@@ -182,29 +213,21 @@ def delete_technologie(technologie_id):
     query2 = f"""
     PREFIX ont: <{PREFIX}>
     DELETE WHERE {{
-        ?univ ont:adopteTechnologie <{technologie_uri}> .
+        ?univ ont:adopteTechnologie {subject} .
     }}
     """
     
     query3 = f"""
     PREFIX ont: <{PREFIX}>
     DELETE WHERE {{
-        ?cours ont:integreTechnologie <{technologie_uri}> .
+        ?cours ont:integreTechnologie {subject} .
     }}
     """
     
     try:
-        result1 = sparql_utils.execute_update(query1)
-        if "error" in result1:
-            return jsonify(result1), 500
-        
-        result2 = sparql_utils.execute_update(query2)
-        if "error" in result2:
-            return jsonify(result2), 500
-        
-        result3 = sparql_utils.execute_update(query3)
-        if "error" in result3:
-            return jsonify(result3), 500
+        result = sparql_utils.execute_update_batch([query1, query2, query3])
+        if "error" in result:
+            return jsonify(result), 500
         
         return jsonify({"message": "Technologie supprimée avec succès"}), 200
     except Exception as e:
@@ -212,9 +235,15 @@ def delete_technologie(technologie_id):
 
 @technologies_bp.route('/technologies-educatives/search', methods=['POST'])
 def search_technologies():
-    """Search technologies"""
+    """Search technologies (full-text index, then one query for the candidates)"""
     data = request.json
-    filters = []
+    matches = text_index.search({
+        'nomTechnologie': data.get('nomTechnologie'),
+        'typeTechnologie': data.get('typeTechnologie')
+    })
+    
+    if no_match(matches):
+        return jsonify([])
     
     query = f"""
     PREFIX ont: <{PREFIX}>
@@ -222,67 +251,32 @@ def search_technologies():
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     SELECT ?technologie ?nomTechnologie ?typeTechnologie
     WHERE {{
+        {values_clause('technologie', matches)}
         ?technologie a ?type .
-        ?type rdfs:subClassOf* ont:TechnologieEducative .
+        {class_hierarchy.type_values('type', 'TechnologieEducative')}
         OPTIONAL {{ ?technologie ont:nomTechnologie ?nomTechnologie . }}
         OPTIONAL {{ ?technologie ont:typeTechnologie ?typeTechnologie . }}
+    }} ORDER BY ?nomTechnologie
     """
     
-    if data.get('nomTechnologie'):
-        filters.append(f'REGEX(?nomTechnologie, "{data.get("nomTechnologie")}", "i")')
-    if data.get('typeTechnologie'):
-        filters.append(f'REGEX(?typeTechnologie, "{data.get("typeTechnologie")}", "i")')
-    
-    if filters:
-        query += " FILTER(" + " && ".join(filters) + ")"
-    
-    query += "} ORDER BY ?nomTechnologie"
-    
     try:
         results = sparql_utils.execute_query(query)
-        return jsonify(results)
+        return jsonify(ranked(results, 'technologie', matches))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @technologies_bp.route('/technologies-educatives/facets', methods=['GET'])
 def get_technologies_facets():
     """Récupère les facettes pour la navigation filtrée"""
-    query_type = f"""
-    PREFIX ont: <{PREFIX}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    SELECT ?typeTechnologie (COUNT(DISTINCT ?technologie) as ?count)
-    WHERE {{
-        ?technologie a ?type .
-        ?type rdfs:subClassOf* ont:TechnologieEducative .
-        ?technologie ont:typeTechnologie ?typeTechnologie .
-    }}
-    GROUP BY ?typeTechnologie
-    ORDER BY DESC(?count)
-    """
-    query_universite = f"""
-    PREFIX ont: <{PREFIX}>
-    SELECT ?universite ?nomUniversite (COUNT(DISTINCT ?technologie) as ?count)
-    WHERE {{
-        ?universite ont:adopteTechnologie ?technologie .
-        ?universite ont:nomUniversite ?nomUniversite .
-    }}
-    GROUP BY ?universite ?nomUniversite
-    ORDER BY DESC(?count)
-    LIMIT 20
-    """
     try:
-        facets = {
-            "by_type": sparql_utils.execute_query(query_type),
-            "by_universite": sparql_utils.execute_query(query_universite)
-        }
-        return jsonify(facets)
+        return jsonify(TECHNOLOGIES_FACETS.counts(request.args))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @technologies_bp.route('/technologies-educatives/<path:technologie_id>/dbpedia-enrich', methods=['GET'])
 def enrich_technologie_with_dbpedia(technologie_id):
     """Enrich technologie data with DBpedia information"""
+    subject = IRI.render(technologie_id)
     try:
         query = f"""
         PREFIX ont: <{PREFIX}>
@@ -290,10 +284,10 @@ def enrich_technologie_with_dbpedia(technologie_id):
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         SELECT ?nomTechnologie ?typeTechnologie
         WHERE {{
-            <{technologie_id}> a ?type .
-            ?type rdfs:subClassOf* ont:TechnologieEducative .
-            OPTIONAL {{ <{technologie_id}> ont:nomTechnologie ?nomTechnologie . }}
-            OPTIONAL {{ <{technologie_id}> ont:typeTechnologie ?typeTechnologie . }}
+            {subject} a ?type .
+            {class_hierarchy.type_values('type', 'TechnologieEducative')}
+            OPTIONAL {{ {subject} ont:nomTechnologie ?nomTechnologie . }}
+            OPTIONAL {{ {subject} ont:typeTechnologie ?typeTechnologie . }}
         }}
         LIMIT 1
         """
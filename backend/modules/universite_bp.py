@@ -1,5 +1,13 @@
 from flask import Blueprint, jsonify, request
 from sparql_utils import sparql_utils
+from streaming import requested_stream_format, stream_query_response
+from pagination import requested_page, paginated_query_response
+from class_hierarchy import class_hierarchy
+from query_templates import IRI, LITERAL
+from entity_loader import Frame, Relation, TypeLabel, ENTITY_ID
+from bulk import bulk_create, insert_data_query
+from text_index import fold_text, no_match, text_index, ranked, values_clause
+from materialized_stats import materialized_stats
 from modules.validators import validate_universite
 from modules.dbpedia_service import dbpedia_service
 import uuid
@@ -10,24 +18,24 @@ PREFIX = "http://www.education-intelligente.org/ontologie#"
 @universite_bp.route('/universites', methods=['GET'])
 def get_all_universites():
     """Récupère toutes les universités"""
-    query = """
+    query = f"""
     PREFIX ont: <http://www.education-intelligente.org/ontologie#>
     PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
 
     SELECT ?universite ?type ?nomUniversite ?anneeFondation ?ville ?pays 
            ?nombreEtudiants ?rangNational ?siteWeb ?typeUniversite
-    WHERE {
+    WHERE {{
       ?universite rdf:type ?type .
-      FILTER(?type IN (ont:Universite, ont:UniversitePublique, ont:UniversitePrivee))
+      {class_hierarchy.type_values('type', 'Universite')}
       
-      OPTIONAL { ?universite ont:nomUniversite ?nomUniversite }
-      OPTIONAL { ?universite ont:anneeFondation ?anneeFondation }
-      OPTIONAL { ?universite ont:ville ?ville }
-      OPTIONAL { ?universite ont:pays ?pays }
-      OPTIONAL { ?universite ont:nombreEtudiants ?nombreEtudiants }
-      OPTIONAL { ?universite ont:rangNational ?rangNational }
-      OPTIONAL { ?universite ont:siteWeb ?siteWeb }
+      OPTIONAL {{ ?universite ont:nomUniversite ?nomUniversite }}
+      OPTIONAL {{ ?universite ont:anneeFondation ?anneeFondation }}
+      OPTIONAL {{ ?universite ont:ville ?ville }}
+      OPTIONAL {{ ?universite ont:pays ?pays }}
+      OPTIONAL {{ ?universite ont:nombreEtudiants ?nombreEtudiants }}
+      OPTIONAL {{ ?universite ont:rangNational ?rangNational }}
+      OPTIONAL {{ ?universite ont:siteWeb ?siteWeb }}
       
       # Déterminer le type d'université
       BIND(
@@ -35,10 +43,18 @@ def get_all_universites():
           IF(?type = ont:UniversitePrivee, "Privée", "Générale")
         ) AS ?typeUniversite
       )
-    }
+    }}
     ORDER BY ?nomUniversite
     """
     
+    page = requested_page()
+    if page:
+        return paginated_query_response(query, page, 'universite', 'nomUniversite')
+
+    stream_format = requested_stream_format()
+    if stream_format:
+        return stream_query_response(query, stream_format)
+    
     try:
         results = sparql_utils.execute_query(query)
         
@@ -52,164 +68,50 @@ def get_all_universites():
         print(f"Error fetching universites: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# Détail d'une université : l'entité et ses collections liées en un seul CONSTRUCT
+UNIVERSITE_FRAME = Frame('universites.detail', 'Universite', section='info_generale', fields={
+    'universite': ENTITY_ID,
+    'nomUniversite': 'nomUniversite',
+    'anneeFondation': 'anneeFondation',
+    'ville': 'ville',
+    'pays': 'pays',
+    'nombreEtudiants': 'nombreEtudiants',
+    'rangNational': 'rangNational',
+    'siteWeb': 'siteWeb',
+    'typeUniversite': TypeLabel({'UniversitePublique': 'Publique', 'UniversitePrivee': 'Privée'})
+}, required=('nomUniversite',), relations={
+    # Spécialités offertes par cette université
+    'specialites': Relation('offre', 'specialite', {
+        'nomSpecialite': 'nomSpecialite', 'codeSpecialite': 'codeSpecialite', 'niveauDiplome': 'niveauDiplome'
+    }, required=('nomSpecialite',)),
+    # Enseignants employés par cette université
+    'enseignants': Relation('emploie', 'enseignant', {
+        'nomEnseignant': 'nom', 'prenomEnseignant': 'prenom', 'grade': 'grade', 'email': 'email'
+    }, required=('nomEnseignant', 'prenomEnseignant')),
+    # Étudiants inscrits dans cette université
+    'etudiants': Relation('appartientA', 'etudiant', {
+        'nomEtudiant': 'nom', 'prenomEtudiant': 'prenom', 'niveauEtude': 'niveauEtude', 'moyenneGenerale': 'moyenneGenerale'
+    }, required=('nomEtudiant', 'prenomEtudiant'), reverse=True),
+    # Technologies adoptées par cette université
+    'technologies': Relation('adopteTechnologie', 'technologie', {
+        'nomTechnologie': 'nomTechnologie', 'typeTechnologie': 'typeTechnologie'
+    }, required=('nomTechnologie',)),
+    # Projets organisés par cette université
+    'projets': Relation('estOrganisePar', 'projet', {
+        'titreProjet': 'titreProjet', 'typeProjet': 'typeProjet'
+    }, required=('titreProjet',), reverse=True)
+})
+
 @universite_bp.route('/universites/<path:universite_id>', methods=['GET'])
 def get_universite(universite_id):
     """Récupère une université spécifique avec tous ses détails"""
     universite_id = normalize_universite_id(universite_id)
-    
-    query = f"""
-    PREFIX ont: <http://www.education-intelligente.org/ontologie#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-
-    SELECT ?universite ?nomUniversite ?anneeFondation ?ville ?pays 
-           ?nombreEtudiants ?rangNational ?siteWeb ?typeUniversite
-           ?specialite ?nomSpecialite ?codeSpecialite ?niveauDiplome
-           ?enseignant ?nomEnseignant ?prenomEnseignant ?grade ?email
-           ?etudiant ?nomEtudiant ?prenomEtudiant ?niveauEtude ?moyenneGenerale
-           ?technologie ?nomTechnologie ?typeTechnologie
-           ?projet ?titreProjet ?typeProjet
-    WHERE {{
-        <{universite_id}> rdf:type ?type .
-        FILTER(?type IN (ont:Universite, ont:UniversitePublique, ont:UniversitePrivee))
-        <{universite_id}> ont:nomUniversite ?nomUniversite .
-        
-        OPTIONAL {{ <{universite_id}> ont:anneeFondation ?anneeFondation . }}
-        OPTIONAL {{ <{universite_id}> ont:ville ?ville . }}
-        OPTIONAL {{ <{universite_id}> ont:pays ?pays . }}
-        OPTIONAL {{ <{universite_id}> ont:nombreEtudiants ?nombreEtudiants . }}
-        OPTIONAL {{ <{universite_id}> ont:rangNational ?rangNational . }}
-        OPTIONAL {{ <{universite_id}> ont:siteWeb ?siteWeb . }}
-        
-        # Déterminer le type d'université
-        OPTIONAL {{
-            <{universite_id}> a ?type .
-            FILTER(?type IN (ont:UniversitePublique, ont:UniversitePrivee))
-            BIND(
-              IF(?type = ont:UniversitePublique, "Publique",
-                IF(?type = ont:UniversitePrivee, "Privée", "Générale")
-              ) AS ?typeUniversite
-            )
-        }}
-        
-        # Spécialités offertes par cette université
-        OPTIONAL {{
-            <{universite_id}> ont:offre ?specialite .
-            ?specialite ont:nomSpecialite ?nomSpecialite .
-            OPTIONAL {{ ?specialite ont:codeSpecialite ?codeSpecialite . }}
-            OPTIONAL {{ ?specialite ont:niveauDiplome ?niveauDiplome . }}
-        }}
-        
-        # Enseignants employés par cette université
-        OPTIONAL {{
-            <{universite_id}> ont:emploie ?enseignant .
-            ?enseignant ont:nom ?nomEnseignant .
-            ?enseignant ont:prenom ?prenomEnseignant .
-            OPTIONAL {{ ?enseignant ont:grade ?grade . }}
-            OPTIONAL {{ ?enseignant ont:email ?email . }}
-        }}
-        
-        # Étudiants inscrits dans cette université
-        OPTIONAL {{
-            ?etudiant ont:appartientA <{universite_id}> .
-            ?etudiant ont:nom ?nomEtudiant .
-            ?etudiant ont:prenom ?prenomEtudiant .
-            OPTIONAL {{ ?etudiant ont:niveauEtude ?niveauEtude . }}
-            OPTIONAL {{ ?etudiant ont:moyenneGenerale ?moyenneGenerale . }}
-        }}
-        
-        # Technologies adoptées par cette université
-        OPTIONAL {{
-            <{universite_id}> ont:adopteTechnologie ?technologie .
-            ?technologie ont:nomTechnologie ?nomTechnologie .
-            OPTIONAL {{ ?technologie ont:typeTechnologie ?typeTechnologie . }}
-        }}
-        
-        # Projets organisés par cette université
-        OPTIONAL {{
-            ?projet ont:estOrganisePar <{universite_id}> .
-            ?projet ont:titreProjet ?titreProjet .
-            OPTIONAL {{ ?projet ont:typeProjet ?typeProjet . }}
-        }}
-    }}
-    """
+    query = UNIVERSITE_FRAME.bind(universite_id)
     
     try:
-        results = sparql_utils.execute_query(query)
-        
-        if not results:
+        universite_data = UNIVERSITE_FRAME.frame(sparql_utils.construct(query), universite_id)
+        if universite_data is None:
             return jsonify({"error": "Université non trouvée"}), 404
-            
-        # Structurer les données pour une meilleure organisation
-        universite_data = {
-            "info_generale": {},
-            "specialites": [],
-            "enseignants": [],
-            "etudiants": [],
-            "technologies": [],
-            "projets": []
-        }
-        
-        for result in results:
-            # Informations générales
-            if not universite_data["info_generale"]:
-                universite_data["info_generale"] = {
-                    "universite": result.get("universite"),
-                    "nomUniversite": result.get("nomUniversite"),
-                    "anneeFondation": result.get("anneeFondation"),
-                    "ville": result.get("ville"),
-                    "pays": result.get("pays"),
-                    "nombreEtudiants": result.get("nombreEtudiants"),
-                    "rangNational": result.get("rangNational"),
-                    "siteWeb": result.get("siteWeb"),
-                    "typeUniversite": result.get("typeUniversite")
-                }
-            
-            # Spécialités
-            if result.get("specialite") and result.get("specialite") not in [s["specialite"] for s in universite_data["specialites"]]:
-                universite_data["specialites"].append({
-                    "specialite": result.get("specialite"),
-                    "nomSpecialite": result.get("nomSpecialite"),
-                    "codeSpecialite": result.get("codeSpecialite"),
-                    "niveauDiplome": result.get("niveauDiplome")
-                })
-            
-            # Enseignants
-            if result.get("enseignant") and result.get("enseignant") not in [e["enseignant"] for e in universite_data["enseignants"]]:
-                universite_data["enseignants"].append({
-                    "enseignant": result.get("enseignant"),
-                    "nomEnseignant": result.get("nomEnseignant"),
-                    "prenomEnseignant": result.get("prenomEnseignant"),
-                    "grade": result.get("grade"),
-                    "email": result.get("email")
-                })
-            
-            # Étudiants
-            if result.get("etudiant") and result.get("etudiant") not in [e["etudiant"] for e in universite_data["etudiants"]]:
-                universite_data["etudiants"].append({
-                    "etudiant": result.get("etudiant"),
-                    "nomEtudiant": result.get("nomEtudiant"),
-                    "prenomEtudiant": result.get("prenomEtudiant"),
-                    "niveauEtude": result.get("niveauEtude"),
-                    "moyenneGenerale": result.get("moyenneGenerale")
-                })
-            
-            # Technologies
-            if result.get("technologie") and result.get("technologie") not in [t["technologie"] for t in universite_data["technologies"]]:
-                universite_data["technologies"].append({
-                    "technologie": result.get("technologie"),
-                    "nomTechnologie": result.get("nomTechnologie"),
-                    "typeTechnologie": result.get("typeTechnologie")
-                })
-            
-            # Projets
-            if result.get("projet") and result.get("projet") not in [p["projet"] for p in universite_data["projets"]]:
-                universite_data["projets"].append({
-                    "projet": result.get("projet"),
-                    "titreProjet": result.get("titreProjet"),
-                    "typeProjet": result.get("typeProjet")
-                })
-        
         return jsonify(universite_data)
         
     except Exception as e:
@@ -218,29 +120,35 @@ def get_universite(universite_id):
 
 @universite_bp.route('/universites/search', methods=['POST'])
 def search_universites():
-    """Recherche d'universités par critères"""
+    """Recherche d'universités par critères (index plein texte, puis lecture des candidats)"""
     data = request.json
-    nom = data.get('nom', '')
-    ville = data.get('ville', '')
-    pays = data.get('pays', '')
     type_universite = data.get('type', '')
+    universites = text_index.search({
+        'nomUniversite': data.get('nom', ''),
+        'ville': data.get('ville', ''),
+        'pays': data.get('pays', '')
+    })
     
-    query = """
+    if no_match(universites):
+        return jsonify([])
+    
+    query = f"""
     PREFIX ont: <http://www.education-intelligente.org/ontologie#>
     SELECT ?universite ?nomUniversite ?ville ?pays ?typeUniversite 
            ?nombreEtudiants ?rangNational ?anneeFondation
-    WHERE {
+    WHERE {{
+        {values_clause('universite', universites)}
         ?universite a ont:Universite ;
                ont:nomUniversite ?nomUniversite .
         
-        OPTIONAL { ?universite ont:ville ?ville . }
-        OPTIONAL { ?universite ont:pays ?pays . }
-        OPTIONAL { ?universite ont:nombreEtudiants ?nombreEtudiants . }
-        OPTIONAL { ?universite ont:rangNational ?rangNational . }
-        OPTIONAL { ?universite ont:anneeFondation ?anneeFondation . }
+        OPTIONAL {{ ?universite ont:ville ?ville . }}
+        OPTIONAL {{ ?universite ont:pays ?pays . }}
+        OPTIONAL {{ ?universite ont:nombreEtudiants ?nombreEtudiants . }}
+        OPTIONAL {{ ?universite ont:rangNational ?rangNational . }}
+        OPTIONAL {{ ?universite ont:anneeFondation ?anneeFondation . }}
         
         # Déterminer le type d'université
-        OPTIONAL {
+        OPTIONAL {{
             ?universite a ?type .
             FILTER(?type IN (ont:UniversitePublique, ont:UniversitePrivee))
             BIND(
@@ -248,27 +156,17 @@ def search_universites():
                 IF(?type = ont:UniversitePrivee, "Privée", "Générale")
               ) AS ?typeUniversite
             )
-        }
+        }}
+    }} ORDER BY ?nomUniversite
     """
     
-    filters = []
-    if nom:
-        filters.append(f'REGEX(?nomUniversite, "{nom}", "i")')
-    if ville:
-        filters.append(f'REGEX(?ville, "{ville}", "i")')
-    if pays:
-        filters.append(f'REGEX(?pays, "{pays}", "i")')
-    if type_universite:
-        filters.append(f'REGEX(?typeUniversite, "{type_universite}", "i")')
-    
-    if filters:
-        query += " FILTER(" + " && ".join(filters) + ")"
-    
-    query += "} ORDER BY ?nomUniversite"
-    
     try:
         results = sparql_utils.execute_query(query)
-        return jsonify(results)
+        if type_universite and isinstance(results, list):
+            # Le type est calculé par la requête : filtré ici, sans tenir compte des accents
+            wanted = fold_text(type_universite)
+            results = [row for row in results if wanted in fold_text(row.get('typeUniversite', ''))]
+        return jsonify(ranked(results, 'universite', universites))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -298,7 +196,7 @@ def get_universite_specialites(universite_id):
     SELECT ?specialite ?nomSpecialite ?codeSpecialite ?description 
            ?dureeFormation ?niveauDiplome ?nombreModules
     WHERE {{
-        <{universite_id}> ont:offre ?specialite .
+        {IRI.render(universite_id)} ont:offre ?specialite .
         ?specialite ont:nomSpecialite ?nomSpecialite .
         
         OPTIONAL {{ ?specialite ont:codeSpecialite ?codeSpecialite . }}
@@ -325,7 +223,7 @@ def get_universite_enseignants(universite_id):
     SELECT ?enseignant ?nom ?prenom ?email ?telephone ?dateNaissance 
            ?grade ?anciennete ?cours ?intituleCours
     WHERE {{
-        <{universite_id}> ont:emploie ?enseignant .
+        {IRI.render(universite_id)} ont:emploie ?enseignant .
         ?enseignant ont:nom ?nom ;
                    ont:prenom ?prenom .
         
@@ -359,7 +257,7 @@ def get_universite_etudiants(universite_id):
     SELECT ?etudiant ?nom ?prenom ?email ?telephone ?dateNaissance 
            ?numeroMatricule ?niveauEtude ?moyenneGenerale ?specialite ?nomSpecialite
     WHERE {{
-        ?etudiant ont:appartientA <{universite_id}> ;
+        ?etudiant ont:appartientA {IRI.render(universite_id)} ;
                ont:nom ?nom ;
                ont:prenom ?prenom .
         
@@ -394,7 +292,7 @@ def get_universite_technologies(universite_id):
     SELECT ?technologie ?nomTechnologie ?typeTechnologie ?version 
            ?editeur ?anneeImpl ?nbUtilisateurs
     WHERE {{
-        <{universite_id}> ont:adopteTechnologie ?technologie .
+        {IRI.render(universite_id)} ont:adopteTechnologie ?technologie .
         ?technologie ont:nomTechnologie ?nomTechnologie .
         
         OPTIONAL {{ ?technologie ont:typeTechnologie ?typeTechnologie . }}
@@ -421,7 +319,7 @@ def get_universite_projets(universite_id):
     SELECT ?projet ?titreProjet ?typeProjet ?domaineProjet ?anneeRealisation 
            ?noteProjet ?etudiant ?nomEtudiant ?encadrant ?nomEncadrant
     WHERE {{
-        ?projet ont:estOrganisePar <{universite_id}> ;
+        ?projet ont:estOrganisePar {IRI.render(universite_id)} ;
                ont:titreProjet ?titreProjet .
         
         OPTIONAL {{ ?projet ont:typeProjet ?typeProjet . }}
@@ -452,103 +350,9 @@ def get_universite_projets(universite_id):
 
 @universite_bp.route('/universites/stats', methods=['GET'])
 def get_universites_stats():
-    """Récupère les statistiques des universités avec facettes"""
-    # Stats générales
-    query_stats = """
-    PREFIX ont: <http://www.education-intelligente.org/ontologie#>
-    
-    SELECT 
-        (COUNT(DISTINCT ?universite) as ?total_universites)
-        (SUM(?nbEtudiants) as ?total_etudiants)
-        (COUNT(DISTINCT ?enseignant) as ?total_enseignants)
-        (COUNT(DISTINCT ?specialite) as ?total_specialites)
-        (COUNT(DISTINCT ?technologie) as ?total_technologies)
-    WHERE {
-        ?universite a ont:Universite .
-        OPTIONAL { ?universite ont:nombreEtudiants ?nbEtudiants . }
-        OPTIONAL { ?universite ont:emploie ?enseignant . }
-        OPTIONAL { ?universite ont:offre ?specialite . }
-        OPTIONAL { ?universite ont:adopteTechnologie ?technologie . }
-    }
-    """
-    
-    # Facettes par type
-    query_type = """
-    PREFIX ont: <http://www.education-intelligente.org/ontologie#>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    
-    SELECT ?typeUniversite (COUNT(DISTINCT ?universite) as ?count)
-    WHERE {
-        ?universite rdf:type ?type .
-        FILTER(?type IN (ont:Universite, ont:UniversitePublique, ont:UniversitePrivee))
-        BIND(
-          IF(?type = ont:UniversitePublique, "Publique",
-            IF(?type = ont:UniversitePrivee, "Privée", "Générale")
-          ) AS ?typeUniversite
-        )
-    }
-    GROUP BY ?typeUniversite
-    ORDER BY DESC(?count)
-    """
-    
-    # Facettes par pays
-    query_pays = """
-    PREFIX ont: <http://www.education-intelligente.org/ontologie#>
-    
-    SELECT ?pays (COUNT(DISTINCT ?universite) as ?count)
-    WHERE {
-        ?universite a ont:Universite .
-        ?universite ont:pays ?pays .
-    }
-    GROUP BY ?pays
-    ORDER BY DESC(?count)
-    LIMIT 20
-    """
-    
-    # Facettes par ville
-    query_ville = """
-    PREFIX ont: <http://www.education-intelligente.org/ontologie#>
-    
-    SELECT ?ville (COUNT(DISTINCT ?universite) as ?count)
-    WHERE {
-        ?universite a ont:Universite .
-        ?universite ont:ville ?ville .
-    }
-    GROUP BY ?ville
-    ORDER BY DESC(?count)
-    LIMIT 20
-    """
-    
-    # Top-rated universities (rang <= 5) - Inference layer
-    query_top_rated = """
-    PREFIX ont: <http://www.education-intelligente.org/ontologie#>
-    
-    SELECT ?universite ?nomUniversite ?ville ?pays ?rangNational ?nombreEtudiants
-    WHERE {
-        ?universite a ont:Universite .
-        ?universite ont:nomUniversite ?nomUniversite .
-        ?universite ont:rangNational ?rangNational .
-        FILTER(xsd:integer(?rangNational) <= 5)
-        OPTIONAL { ?universite ont:ville ?ville . }
-        OPTIONAL { ?universite ont:pays ?pays . }
-        OPTIONAL { ?universite ont:nombreEtudiants ?nombreEtudiants . }
-    }
-    ORDER BY xsd:integer(?rangNational)
-    """
-    
+    """Récupère les statistiques des universités avec facettes (agrégats matérialisés)"""
     try:
-        stats = sparql_utils.execute_query(query_stats)
-        facets = {
-            "by_type": sparql_utils.execute_query(query_type),
-            "by_pays": sparql_utils.execute_query(query_pays),
-            "by_ville": sparql_utils.execute_query(query_ville),
-            "top_rated": sparql_utils.execute_query(query_top_rated)
-        }
-        
-        return jsonify({
-            "stats": stats[0] if stats else {},
-            "facets": facets
-        })
+        return jsonify(materialized_stats.universites_stats())
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -591,18 +395,11 @@ def get_universites_ranking():
 
 def generate_universite_uri(nom: str) -> str:
     """Generate a unique URI for a universite"""
-    safe_nom = nom.upper().replace(' ', '_').replace("'", "")[:50]
+    safe_nom = IRI.segment(nom.upper().replace(' ', '_').replace("'", "")[:50])
     return f"{PREFIX}Universite_{safe_nom}_{uuid.uuid4().hex[:8]}"
 
-@universite_bp.route('/universites', methods=['POST'])
-def create_universite():
-    """Create a new universite"""
-    data = request.json
-    
-    errors = validate_universite(data)
-    if errors:
-        return jsonify({"errors": errors}), 400
-    
+def build_universite_triples(data):
+    """Build the RDF triples of a new universite, returns (uri, triples)"""
     universite_uri = generate_universite_uri(data.get('nomUniversite'))
     type_univ = data.get('type', 'Universite')
     
@@ -613,29 +410,36 @@ def create_universite():
     univ_type = type_mapping.get(type_univ, 'ont:Universite')
     
     insert_parts = [
-        f"<{universite_uri}> a {univ_type}",
-        f"; ont:nomUniversite \"{data.get('nomUniversite')}\""
+        f"{IRI.render(universite_uri)} a {univ_type}",
+        f"; ont:nomUniversite {LITERAL.render(data.get('nomUniversite'))}"
     ]
     
     if data.get('anneeFondation'):
         insert_parts.append(f"; ont:anneeFondation {int(data.get('anneeFondation'))}")
     if data.get('ville'):
-        insert_parts.append(f"; ont:ville \"{data.get('ville')}\"")
+        insert_parts.append(f"; ont:ville {LITERAL.render(data.get('ville'))}")
     if data.get('pays'):
-        insert_parts.append(f"; ont:pays \"{data.get('pays')}\"")
+        insert_parts.append(f"; ont:pays {LITERAL.render(data.get('pays'))}")
     if data.get('nombreEtudiants'):
         insert_parts.append(f"; ont:nombreEtudiants {int(data.get('nombreEtudiants'))}")
     if data.get('rangNational'):
         insert_parts.append(f"; ont:rangNational {int(data.get('rangNational'))}")
     if data.get('siteWeb'):
-        insert_parts.append(f"; ont:siteWeb \"{data.get('siteWeb')}\"")
+        insert_parts.append(f"; ont:siteWeb {LITERAL.render(data.get('siteWeb'))}")
     
-    query = f"""
-    PREFIX ont: <{PREFIX}>
-    INSERT DATA {{
-        {' '.join(insert_parts)} .
-    }}
-    """
+    return universite_uri, f"{' '.join(insert_parts)} ."
+
+@universite_bp.route('/universites', methods=['POST'])
+def create_universite():
+    """Create a new universite"""
+    data = request.json
+    
+    errors = validate_universite(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    
+    universite_uri, triples = build_universite_triples(data)
+    query = insert_data_query([triples])
     
     try:
         result = sparql_utils.execute_update(query)
@@ -645,6 +449,11 @@ def create_universite():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@universite_bp.route('/universites/bulk', methods=['POST'])
+def bulk_create_universites():
+    """Create many universites in a single SPARQL update"""
+    return bulk_create(request.json, validate_universite, build_universite_triples, "universités")
+
 @universite_bp.route('/universites/<path:universite_id>', methods=['PUT'])
 def update_universite(universite_id):
     """Update a universite"""
@@ -655,33 +464,34 @@ def update_universite(universite_id):
     if errors:
         return jsonify({"errors": errors}), 400
     
+    subject = IRI.render(universite_id)
     delete_query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE {{
-        <{universite_id}> ?p ?o .
+        {subject} ?p ?o .
     }}
     WHERE {{
-        <{universite_id}> ?p ?o .
+        {subject} ?p ?o .
         FILTER(?p != ont:offre && ?p != ont:emploie && ?p != ont:adopteTechnologie)
     }}
     """
     
-    insert_parts = [f"<{universite_id}> a ont:Universite"]
+    insert_parts = [f"{subject} a ont:Universite"]
     
     if data.get('nomUniversite'):
-        insert_parts.append(f"; ont:nomUniversite \"{data.get('nomUniversite')}\"")
+        insert_parts.append(f"; ont:nomUniversite {LITERAL.render(data.get('nomUniversite'))}")
     if data.get('anneeFondation'):
         insert_parts.append(f"; ont:anneeFondation {int(data.get('anneeFondation'))}")
     if data.get('ville'):
-        insert_parts.append(f"; ont:ville \"{data.get('ville')}\"")
+        insert_parts.append(f"; ont:ville {LITERAL.render(data.get('ville'))}")
     if data.get('pays'):
-        insert_parts.append(f"; ont:pays \"{data.get('pays')}\"")
+        insert_parts.append(f"; ont:pays {LITERAL.render(data.get('pays'))}")
     if data.get('nombreEtudiants'):
         insert_parts.append(f"; ont:nombreEtudiants {int(data.get('nombreEtudiants'))}")
     if data.get('rangNational'):
         insert_parts.append(f"; ont:rangNational {int(data.get('rangNational'))}")
     if data.get('siteWeb'):
-        insert_parts.append(f"; ont:siteWeb \"{data.get('siteWeb')}\"")
+        insert_parts.append(f"; ont:siteWeb {LITERAL.render(data.get('siteWeb'))}")
     
     insert_query = f"""
     PREFIX ont: <{PREFIX}>
@@ -691,8 +501,8 @@ def update_universite(universite_id):
     """
     
     try:
-        sparql_utils.execute_update(delete_query)
-        result = sparql_utils.execute_update(insert_query)
+        # DELETE and INSERT in one atomic request
+        result = sparql_utils.execute_update_batch([delete_query, insert_query])
         if "error" in result:
             return jsonify(result), 500
         return jsonify({"message": "Université mise à jour avec succès"}), 200
@@ -715,7 +525,7 @@ def delete_universite(universite_id):
     query = f"""
     PREFIX ont: <{PREFIX}>
     DELETE WHERE {{
-        <{universite_uri}> ?p ?o .
+        {IRI.render(universite_uri)} ?p ?o .
     }}
     """
     
@@ -730,6 +540,7 @@ def delete_universite(universite_id):
 @universite_bp.route('/universites/<path:universite_id>/dbpedia-enrich', methods=['GET'])
 def enrich_universite_with_dbpedia(universite_id):
     """Enrich university data with DBpedia information (Linked Data integration)"""
+    subject = IRI.render(universite_id)
     try:
         universite_id = normalize_universite_id(universite_id)
         
@@ -740,11 +551,11 @@ def enrich_universite_with_dbpedia(universite_id):
         PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
         SELECT ?nomUniversite ?ville ?pays
         WHERE {{
-            <{universite_id}> rdf:type ?type .
-            FILTER(?type IN (ont:Universite, ont:UniversitePublique, ont:UniversitePrivee))
-            OPTIONAL {{ <{universite_id}> ont:nomUniversite ?nomUniversite . }}
-            OPTIONAL {{ <{universite_id}> ont:ville ?ville . }}
-            OPTIONAL {{ <{universite_id}> ont:pays ?pays . }}
+            {subject} rdf:type ?type .
+            {class_hierarchy.type_values('type', 'Universite')}
+            OPTIONAL {{ {subject} ont:nomUniversite ?nomUniversite . }}
+            OPTIONAL {{ {subject} ont:ville ?ville . }}
+            OPTIONAL {{ {subject} ont:pays ?pays . }}
         }}
         """
         
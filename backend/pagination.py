@@ -0,0 +1,153 @@
+"""Pagination par curseur (keyset) des endpoints de liste : ?limit=&cursor="""
+
+import base64
+import json
+import re
+from flask import jsonify, request
+from sparql_utils import sparql_utils, format_binding
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+SELECT_RE = re.compile(r'\bSELECT\b', re.IGNORECASE)
+WHERE_RE = re.compile(r'\bWHERE\b', re.IGNORECASE)
+
+CURSOR_KEY_VAR = "_cursorKey"
+SORT_VALUE_VAR = "_sortValue"
+
+
+class PaginationError(ValueError):
+    """Paramètres de pagination invalides (limit ou cursor)"""
+
+
+def encode_cursor(key, entity):
+    """Jeton opaque à partir de la clé de tri et de l'IRI de la dernière entité d'une page"""
+    raw = json.dumps([key, entity], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Retourne (clé de tri, IRI) à partir d'un jeton produit par encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        key, entity = json.loads(raw.decode('utf-8'))
+    except Exception:
+        raise PaginationError("Curseur invalide")
+    if not isinstance(key, str) or not isinstance(entity, str):
+        raise PaginationError("Curseur invalide")
+    return key, entity
+
+
+def requested_page():
+    """Paramètres (limit, cursor) demandés par le client, ou None si la liste est complète.
+
+    La pagination n'est activée que si ?limit= ou ?cursor= est présent, afin que
+    les appels existants continuent de recevoir la liste entière.
+    """
+    limit = request.args.get('limit')
+    token = request.args.get('cursor')
+    if limit is None and token is None:
+        return None
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise PaginationError("Le paramètre limit doit être un entier")
+        if limit < 1:
+            raise PaginationError("Le paramètre limit doit être positif")
+        limit = min(limit, MAX_PAGE_SIZE)
+    cursor = decode_cursor(token) if token else None
+    return limit, cursor
+
+
+def _split_select(query):
+    """Découpe une requête SELECT en (préfixes, projection, corps du WHERE)"""
+    select = SELECT_RE.search(query)
+    where = WHERE_RE.search(query, select.end()) if select else None
+    if not select or not where:
+        raise PaginationError("Requête non paginable")
+    start = query.index('{', where.end())
+    depth = 0
+    for index in range(start, len(query)):
+        if query[index] == '{':
+            depth += 1
+        elif query[index] == '}':
+            depth -= 1
+            if depth == 0:
+                return query[:select.start()], query[select.end():where.start()], query[start + 1:index]
+    raise PaginationError("Requête non paginable")
+
+
+def build_page_query(query, entity_var, sort_var, limit, cursor=None, descending=False):
+    """Réécrit une requête de liste pour n'en retourner qu'une page d'entités.
+
+    La page est sélectionnée par une sous-requête qui trie les entités sur
+    (clé de tri, IRI) et reprend strictement après le curseur : aucune ligne
+    n'est sautée par OFFSET. Les lignes multiples d'une même entité (OPTIONAL
+    multi-valués) restent toutes sur la même page. Une entité de plus que
+    `limit` est demandée pour savoir s'il existe une page suivante.
+    """
+    prefixes, projection, body = _split_select(query)
+    order = "DESC" if descending else "ASC"
+    keyset = ""
+    if cursor:
+        key, entity = cursor
+        op = "<" if descending else ">"
+        key, entity = json.dumps(key, ensure_ascii=False), json.dumps(entity, ensure_ascii=False)
+        # Sur l'agrégat : une entité à clé multi-valuée garde une seule position
+        keyset = (f"HAVING(MIN(?{SORT_VALUE_VAR}) {op} {key} || "
+                  f"(MIN(?{SORT_VALUE_VAR}) = {key} && STR(?{entity_var}) {op} {entity}))")
+    return f"""{prefixes}
+    SELECT {projection.strip()} ?{CURSOR_KEY_VAR}
+    WHERE {{
+        {{
+            SELECT ?{entity_var} (MIN(?{SORT_VALUE_VAR}) AS ?{CURSOR_KEY_VAR})
+            WHERE {{
+                {body}
+                BIND(COALESCE(STR(?{sort_var}), "") AS ?{SORT_VALUE_VAR})
+            }}
+            GROUP BY ?{entity_var}
+            {keyset}
+            ORDER BY {order}(?{CURSOR_KEY_VAR}) {order}(STR(?{entity_var}))
+            LIMIT {limit + 1}
+        }}
+        {body}
+    }}
+    ORDER BY {order}(?{CURSOR_KEY_VAR}) {order}(STR(?{entity_var}))
+    """
+
+
+def paginated_query_response(query, page, entity_var, sort_var, descending=False):
+    """Réponse Flask d'une page : {"items", "next_cursor", "limit"}.
+
+    `entity_var` identifie l'entité listée et `sort_var` la clé du ORDER BY
+    d'origine ; une entité à clé multi-valuée est classée sur sa plus petite valeur.
+    """
+    limit, cursor = page
+    page_query = build_page_query(query, entity_var, sort_var, limit, cursor, descending)
+    try:
+        bindings = sparql_utils.query_raw(page_query)["results"]["bindings"]
+    except Exception as e:
+        print(f"Erreur lors de la pagination: {e}")
+        return jsonify({"error": f"Erreur SPARQL: {str(e)}"}), 500
+
+    items = []
+    entities = 0
+    last_entity = last_key = next_cursor = None
+    for binding in bindings:
+        entity = binding.get(entity_var, {}).get("value")
+        if entity != last_entity:
+            if entities == limit:
+                # Entité sentinelle : il existe une page suivante
+                next_cursor = encode_cursor(last_key, last_entity)
+                break
+            entities += 1
+            last_entity = entity
+            last_key = binding.get(CURSOR_KEY_VAR, {}).get("value", "")
+        row = format_binding(binding)
+        row.pop(CURSOR_KEY_VAR, None)
+        items.append(row)
+
+    return jsonify({"items": items, "next_cursor": next_cursor, "limit": limit})
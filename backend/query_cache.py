@@ -0,0 +1,170 @@
+"""Cache des résultats SPARQL avec TTL, borne LRU et invalidation ciblée sur écriture"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, List, Optional, Set
+
+ONTOLOGY_NS = "http://www.education-intelligente.org/ontologie#"
+
+PREFIX_DECL_RE = re.compile(r'PREFIX\s+(\w*):\s*<([^>]*)>', re.IGNORECASE)
+FULL_IRI_RE = re.compile(r'<' + re.escape(ONTOLOGY_NS) + r'([\w\-]+)>')
+# Triple pattern dont le prédicat est une variable : sujet ?p objet
+TERM = r'(?:\?\w+|<[^>\s]*>|[\w\-]*:[\w\-]+|"|\d)'
+VARIABLE_PREDICATE_RE = re.compile(r'(' + TERM + r')\s+\?\w+\s+' + TERM)
+# Motif dont le sujet est une variable : ?s prédicat objet (capture l'objet)
+VARIABLE_SUBJECT_RE = re.compile(r'[{.]\s*\?\w+\s+\S+\s+(\S+)')
+IRI_RE = re.compile(r'<([^<>\s"]+)>')
+# Opérations sur des graphes entiers
+GRAPH_OPERATION_RE = re.compile(r'(?:^|;)\s*(?:CLEAR|DROP|LOAD|ADD|MOVE|COPY|CREATE)\b', re.IGNORECASE)
+
+
+def normalize_query(query: str) -> str:
+    """Normalise le texte d'une requête (espaces, fins de ligne) pour servir de clé"""
+    return ' '.join(query.replace('\r', '').split())
+
+
+def ontology_terms(query: str) -> Set[str]:
+    """Noms locaux de l'ontologie (classes, propriétés, individus) cités dans une requête"""
+    prefixes = [name for name, ns in PREFIX_DECL_RE.findall(query) if ns == ONTOLOGY_NS]
+    terms = set(FULL_IRI_RE.findall(query))
+    for name in prefixes:
+        terms.update(re.findall(r'(?<![\w<])' + re.escape(name) + r':([\w\-]+)', query))
+    return terms
+
+
+def _body(query: str) -> str:
+    """Partie de la requête après la première accolade (ignore la projection SELECT)"""
+    index = query.find('{')
+    return query[index:] if index >= 0 else query
+
+
+def query_dependencies(query: str) -> Optional[FrozenSet[str]]:
+    """Termes de l'ontologie dont dépend une requête de lecture.
+
+    Retourne None quand la requête peut dépendre de n'importe quel triplet
+    (prédicat variable, aucun terme de l'ontologie cité).
+    """
+    if VARIABLE_PREDICATE_RE.search(_body(query)):
+        return None
+    terms = ontology_terms(query)
+    return frozenset(terms) if terms else None
+
+
+def update_scope(update_query: str, describe: Callable[[str], Set[str]]) -> Optional[FrozenSet[str]]:
+    """Termes de l'ontologie touchés par une requête d'écriture.
+
+    Les motifs `<sujet> ?p ?o` (suppression de toutes les propriétés d'une
+    entité) sont résolus via `describe`, appelé AVANT l'écriture, qui renvoie
+    les prédicats et types actuels du sujet. Retourne None si la portée ne peut
+    pas être déterminée : tout le cache doit alors être invalidé.
+    """
+    terms = ontology_terms(update_query)
+    for match in VARIABLE_PREDICATE_RE.finditer(_body(update_query)):
+        subject = match.group(1)
+        if not (subject.startswith('<') and subject.endswith('>')):
+            return None
+        described = describe(subject[1:-1])
+        if described is None:
+            return None
+        terms.update(described)
+    return frozenset(terms) if terms else None
+
+
+def written_entities(update_query: Optional[str]) -> Optional[Set[str]]:
+    """IRIs des entités dont une écriture peut modifier les triplets (sujet ou objet).
+
+    Retourne None si elle peut toucher des entités non citées : opération sur
+    un graphe entier, motif à sujet variable dont l'objet n'est pas une IRI
+    (`?s ont:grade "PR"`), ou modification faite hors de l'API (update_query
+    None). Avec un objet IRI (`?u ont:emploie <e>`), les sujets concernés
+    sont ceux qui référencent l'IRI citée.
+    """
+    if update_query is None:
+        return None
+    body = PREFIX_DECL_RE.sub('', update_query)
+    if GRAPH_OPERATION_RE.search(body):
+        return None
+    if any(not obj.startswith('<') for obj in VARIABLE_SUBJECT_RE.findall(body)):
+        return None
+    return set(IRI_RE.findall(body))
+
+
+class QueryCache:
+    """Cache LRU des résultats de requêtes SPARQL, invalidé par les écritures"""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Incrémenté à chaque invalidation : un résultat lu avant une écriture
+        # concurrente ne doit pas être mis en cache après celle-ci
+        self.generation = 0
+
+    def get(self, query: str) -> Optional[List[Dict]]:
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, _, results = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Copie : certains endpoints enrichissent les lignes retournées
+        return [dict(row) for row in results]
+
+    def put(self, query: str, results: List[Dict], generation: Optional[int] = None):
+        key = normalize_query(query)
+        entry = (time.monotonic() + self.ttl, query_dependencies(query), [dict(row) for row in results])
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, terms: Optional[FrozenSet[str]] = None):
+        """Supprime les entrées qui dépendent des termes écrits (toutes si terms est None)"""
+        with self._lock:
+            self.generation += 1
+            if terms is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                stale = [key for key, (_, deps, _) in self._entries.items()
+                         if deps is None or deps & terms]
+                for key in stale:
+                    del self._entries[key]
+                removed = len(stale)
+            self.invalidations += removed
+
+    def clear(self):
+        self.invalidate(None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "entries": size,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
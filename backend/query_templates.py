@@ -0,0 +1,205 @@
+"""Registre de requêtes SPARQL nommées : texte préparé une fois, paramètres typés validés et échappés à la liaison"""
+
+import math
+import os
+import re
+import threading
+
+from class_hierarchy import class_hierarchy
+from query_cache import ONTOLOGY_NS
+from sparql_utils import escape_literal, sparql_utils
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+# Préfixes ajoutés au texte d'un modèle qui les utilise
+STANDARD_PREFIXES = {
+    'ont': ONTOLOGY_NS,
+    'rdf': "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    'rdfs': "http://www.w3.org/2000/01/rdf-schema#",
+    'xsd': XSD
+}
+
+# "inline" : la valeur remplace le paramètre dans le texte ;
+# "values" : le texte reste constant, les valeurs arrivent dans un bloc VALUES
+TEMPLATE_BINDING = os.getenv("QUERY_TEMPLATE_BINDING", "inline").lower()
+
+PLACEHOLDER_RE = re.compile(r'\$(\w+)')
+IRI_REF_RE = re.compile(r'<[^<>\s]*>')
+WHERE_RE = re.compile(r'\bWHERE\s*\{', re.IGNORECASE)
+UPDATE_RE = re.compile(r'^\s*(INSERT|DELETE|CLEAR|DROP|LOAD|CREATE|ADD|MOVE|COPY|WITH)\b', re.IGNORECASE | re.MULTILINE)
+# Caractères interdits dans une IRI SPARQL (IRIREF)
+IRI_FORBIDDEN_RE = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+NUMBER_RE = re.compile(r'^[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?$')
+
+
+class TemplateBindingError(ValueError):
+    """Paramètre manquant, inconnu ou dont la valeur n'a pas le type attendu"""
+
+
+class Iri:
+    """Paramètre IRI : écrit entre chevrons après contrôle des caractères"""
+    bound = True
+
+    def render(self, value):
+        if not isinstance(value, str) or not value or IRI_FORBIDDEN_RE.search(value):
+            raise TemplateBindingError(f"IRI invalide: {value!r}")
+        return f"<{value}>"
+
+    def segment(self, text):
+        """Fragment d'IRI tiré d'un texte libre (nom, titre) : caractères interdits remplacés par `_`"""
+        return IRI_FORBIDDEN_RE.sub('_', str(text))
+
+
+class Literal:
+    """Paramètre littéral, éventuellement typé (datatype) ; le contenu est échappé"""
+    bound = True
+
+    def __init__(self, datatype=None):
+        self.datatype = datatype
+
+    def render(self, value):
+        if value is None or isinstance(value, (dict, list)):
+            raise TemplateBindingError(f"Littéral invalide: {value!r}")
+        literal = f'"{escape_literal(value)}"'
+        return f"{literal}^^<{self.datatype}>" if self.datatype else literal
+
+
+class Number:
+    """Paramètre numérique : entier ou décimal, écrit sans guillemets"""
+    bound = True
+
+    def render(self, value):
+        if isinstance(value, bool):
+            raise TemplateBindingError(f"Nombre invalide: {value!r}")
+        if isinstance(value, int):
+            return str(value)
+        if isinstance(value, float) and math.isfinite(value):
+            return repr(value)
+        if isinstance(value, str) and NUMBER_RE.match(value.strip()):
+            return value.strip()
+        raise TemplateBindingError(f"Nombre invalide: {value!r}")
+
+
+class Classes:
+    """Fragment fixe : `VALUES ?var { ... }` des classes données et de leurs sous-classes.
+
+    Il n'est pas fourni par l'appelant ; il est recalculé à chaque liaison
+    puisque la hiérarchie peut changer après une écriture sur l'ontologie.
+    """
+    bound = False
+
+    def __init__(self, var, *class_names):
+        self.var = var
+        self.class_names = class_names
+
+    def render(self):
+        return class_hierarchy.type_values(self.var, *self.class_names)
+
+
+IRI = Iri()
+LITERAL = Literal()
+NUMBER = Number()
+DATE = Literal(XSD + 'date')
+
+
+def _split(text):
+    """Alternance texte / nom de paramètre (indices impairs) d'un fragment de modèle"""
+    return PLACEHOLDER_RE.split(text)
+
+
+class QueryTemplate:
+    """Requête nommée, préparée à l'enregistrement.
+
+    Le texte est normalisé (indentation, lignes vides), complété des seuls
+    préfixes utilisés et découpé autour de ses paramètres `$nom` ; une liaison
+    se réduit à valider les valeurs et à concaténer les morceaux.
+    """
+
+    def __init__(self, store, name, text, params):
+        self.store = store
+        self.name = name
+        self.params = params
+
+        body = '\n'.join(line.strip() for line in text.strip().splitlines() if line.strip())
+        without_iris = IRI_REF_RE.sub('', body)
+        prologue = [f"PREFIX {prefix}: <{iri}>" for prefix, iri in STANDARD_PREFIXES.items()
+                    if re.search(rf'(?<![\w:]){prefix}:', without_iris)]
+        self.text = '\n'.join(prologue + [body])
+
+        placeholders = set(PLACEHOLDER_RE.findall(self.text))
+        if placeholders != set(params):
+            raise ValueError(f"Modèle {name}: paramètres déclarés {sorted(params)}, utilisés {sorted(placeholders)}")
+        for param in params:
+            # En mode VALUES le paramètre devient la variable ?param : elle ne doit pas déjà exister
+            if re.search(rf'\?{param}\b', self.text):
+                raise ValueError(f"Modèle {name}: le paramètre ${param} masque la variable ?{param}")
+
+        self.terms = [param for param, kind in params.items() if kind.bound]
+        where = None if UPDATE_RE.search(body) else WHERE_RE.search(self.text)
+        if where is None:
+            self._head, self._tail = _split(self.text), None
+        else:
+            self._head, self._tail = _split(self.text[:where.end()]), _split(self.text[where.end():])
+
+    def bind(self, binding=None, **values):
+        """Texte SPARQL du modèle lié aux valeurs données (TemplateBindingError si invalide)"""
+        unknown = sorted(set(values) - set(self.terms))
+        missing = sorted(set(self.terms) - set(values))
+        if unknown or missing:
+            raise TemplateBindingError(
+                f"Modèle {self.name}: paramètre(s) manquant(s) {missing}, inconnu(s) {unknown}"
+            )
+        rendered = {param: kind.render(values[param]) if kind.bound else kind.render()
+                    for param, kind in self.params.items()}
+
+        if (binding or TEMPLATE_BINDING) == "values" and self._tail is not None and self.terms:
+            # Le texte ne varie plus avec les valeurs : le serveur peut réutiliser son plan
+            substitutions = {param: f"?{param}" if param in self.terms else fragment
+                             for param, fragment in rendered.items()}
+            variables = ' '.join(f"?{param}" for param in self.terms)
+            row = ' '.join(rendered[param] for param in self.terms)
+            values_block = f"\nVALUES ({variables}) {{ ({row}) }}"
+            return self._join(self._head, substitutions) + values_block + self._join(self._tail, substitutions)
+
+        text = self._join(self._head, rendered)
+        if self._tail is not None:
+            text += self._join(self._tail, rendered)
+        return text
+
+    @staticmethod
+    def _join(parts, substitutions):
+        return ''.join(substitutions[part] if index % 2 else part for index, part in enumerate(parts))
+
+    def query(self, mode=None, **values):
+        """Exécute le modèle lié (SELECT) via sparql_utils.execute_query"""
+        query = self.bind(**values)
+        return self.store.execute_query(query) if mode is None else self.store.execute_query(query, mode=mode)
+
+
+class TemplateRegistry:
+    """Modèles de requêtes du processus, enregistrés une fois à l'import des blueprints"""
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._templates = {}
+
+    def register(self, name, text, **params):
+        """Prépare et enregistre un modèle ; `params` associe chaque `$nom` à son type (IRI, LITERAL, ...)"""
+        template = QueryTemplate(self.store, name, text, params)
+        with self._lock:
+            existing = self._templates.get(name)
+            if existing is not None and existing.text != template.text:
+                raise ValueError(f"Modèle {name} déjà enregistré avec un autre texte")
+            self._templates[name] = template
+        return template
+
+    def get(self, name):
+        return self._templates[name]
+
+    def status(self):
+        with self._lock:
+            return {"binding": TEMPLATE_BINDING, "templates": sorted(self._templates)}
+
+
+templates = TemplateRegistry(sparql_utils)
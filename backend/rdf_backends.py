@@ -0,0 +1,374 @@
+"""Backends d'exécution SPARQL : serveur Fuseki (HTTP) ou store rdflib embarqué"""
+
+import asyncio
+import codecs
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import requests
+from rdflib import BNode, Graph, Literal
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.util import guess_format
+from requests.adapters import HTTPAdapter
+
+import rdf_snapshot
+from async_http import get_client, request_timeout
+
+SPARQL_RESULTS_JSON = "application/sparql-results+json"
+# Format des réponses CONSTRUCT : un triplet par ligne, sans en-tête ni imbrication
+N_TRIPLES = "application/n-triples"
+# Taille des blocs lus sur la réponse Fuseki en mode streaming
+STREAM_CHUNK_SIZE = 64 * 1024
+BINDINGS_START_RE = re.compile(r'"results"\s*:\s*\{\s*"bindings"\s*:\s*\[')
+
+BACKEND_FUSEKI = "fuseki"
+BACKEND_EMBEDDED = "embedded"
+
+DEFAULT_DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'educationInfin.rdf')
+
+
+def iter_bindings(chunks):
+    """Décode au fil de l'eau les bindings d'une réponse SPARQL JSON.
+
+    `chunks` est un itérable de fragments de texte ; seul le binding en cours
+    de lecture est gardé en mémoire.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    for chunk in chunks:
+        buffer += chunk
+        if not started:
+            match = BINDINGS_START_RE.search(buffer)
+            if not match:
+                continue
+            buffer = buffer[match.end():]
+            started = True
+
+        pos = 0
+        length = len(buffer)
+        while True:
+            while pos < length and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= length:
+                break
+            if buffer[pos] == ']':
+                return
+            try:
+                binding, pos_end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Binding incomplet : attendre le bloc suivant
+                break
+            yield binding
+            pos = pos_end
+        buffer = buffer[pos:]
+
+
+class FusekiBackend:
+    """Requêtes envoyées à Fuseki via un pool de connexions keep-alive"""
+
+    def __init__(self, endpoint, pool_size, timeout):
+        self.endpoint = endpoint
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = self._create_session()
+
+    def _create_session(self):
+        """Crée une session HTTP avec un pool de connexions persistantes vers Fuseki"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            pool_block=True,
+            max_retries=int(os.getenv('FUSEKI_MAX_RETRIES', '1'))
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+        return session
+
+    def query(self, query, timeout=None):
+        # Use POST for all queries to avoid URL length limits
+        response = self.session.post(
+            self.endpoint + "/query",
+            data={'query': query},
+            headers={'Accept': SPARQL_RESULTS_JSON},
+            timeout=timeout or self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def query_async(self, query, timeout=None):
+        """Même requête que query(), sans bloquer la boucle asyncio (client httpx partagé)"""
+        connect, read = timeout or self.timeout
+        response = await get_client().post(
+            self.endpoint + "/query",
+            data={'query': query},
+            headers={'Accept': SPARQL_RESULTS_JSON},
+            timeout=request_timeout(connect, read)
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def stream(self, query, timeout=None):
+        """Bindings de la réponse, décodés au fil de l'eau (mémoire constante)"""
+        with self.session.post(
+            self.endpoint + "/query",
+            data={'query': query},
+            headers={'Accept': SPARQL_RESULTS_JSON},
+            timeout=timeout or self.timeout,
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            chunks = (decoder.decode(chunk) for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+            yield from iter_bindings(chunks)
+
+    def construct(self, query, timeout=None):
+        """Triplets d'une requête CONSTRUCT, lus en N-Triples au fil de la réponse"""
+        sink = TripleSink()
+        with self.session.post(
+            self.endpoint + "/query",
+            data={'query': query},
+            headers={'Accept': N_TRIPLES},
+            timeout=timeout or self.timeout,
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            W3CNTriplesParser(sink).parse(response.raw)
+        return sink.triples
+
+    def update(self, update_query, timeout=None):
+        response = self.session.post(
+            self.endpoint + "/update",
+            data={'update': update_query},
+            timeout=timeout or self.timeout
+        )
+        # Fuseki répond 200 ou 204 en cas de succès
+        response.raise_for_status()
+
+    def export(self, mimetype, timeout=None):
+        """Contenu complet du dataset sérialisé au format demandé"""
+        response = self.session.get(
+            self.endpoint + "/data",
+            headers={'Accept': mimetype},
+            timeout=timeout or (self.timeout[0], 60)
+        )
+        response.raise_for_status()
+        return response.content
+
+    def describe(self):
+        return {"backend": BACKEND_FUSEKI, "endpoint": self.endpoint}
+
+    def close(self):
+        self.session.close()
+
+
+@lru_cache(maxsize=256)
+def _prepare(query):
+    """Analyse (coûteuse) d'une requête rdflib, réutilisée pour un même texte"""
+    return prepareQuery(query)
+
+
+def _term_binding(term):
+    """Terme rdflib -> valeur au format SPARQL Results JSON"""
+    if isinstance(term, Literal):
+        binding = {"type": "literal", "value": str(term)}
+        if term.language:
+            binding["xml:lang"] = term.language
+        elif term.datatype:
+            binding["datatype"] = str(term.datatype)
+        return binding
+    if isinstance(term, BNode):
+        return {"type": "bnode", "value": str(term)}
+    return {"type": "uri", "value": str(term)}
+
+
+class TripleSink:
+    """Collecte les triplets produits par le parseur N-Triples, au format SPARQL Results JSON"""
+
+    def __init__(self):
+        self.triples = []
+
+    def triple(self, s, p, o):
+        self.triples.append((_term_binding(s), _term_binding(p), _term_binding(o)))
+
+
+class OrderedGraph(Graph):
+    """Graphe qui retient l'ordre d'arrivée des triplets analysés.
+
+    L'instantané est écrit dans cet ordre : un démarrage depuis l'instantané
+    remplit le store comme l'analyse du fichier, et les requêtes énumèrent
+    leurs résultats dans le même ordre quel que soit le démarrage.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.parsed = []
+
+    def add(self, triple):
+        if self.parsed is not None:
+            self.parsed.append(triple)
+        return super().add(triple)
+
+
+def parse_in_order(data_file):
+    """Analyse le fichier dans un OrderedGraph ; `graph.parsed` garde l'ordre d'analyse"""
+    graph = OrderedGraph()
+    graph.parse(data_file, format=guess_format(data_file) or 'xml')
+    return graph
+
+
+class EmbeddedBackend:
+    """Store RDF en mémoire (rdflib) chargé au démarrage.
+
+    Le fichier source est lu depuis son instantané binaire (rdf_snapshot)
+    tant que celui-ci est à jour ; sinon il est analysé puis l'instantané
+    est réécrit pour le démarrage suivant. Les écritures sont appliquées au
+    graphe puis ajoutées à un journal (une mise à jour SPARQL par ligne
+    JSON) rejoué au démarrage suivant : le fichier RDF source n'est jamais
+    réécrit.
+    """
+
+    def __init__(self, data_file, log_file, snapshot_file=None):
+        self.data_file = data_file
+        self.log_file = log_file
+        self.snapshot_file = snapshot_file
+        # rdflib n'est pas sûr en lecture pendant une écriture
+        self._lock = threading.RLock()
+        started = time.perf_counter()
+        self.graph = Graph()
+        self.loaded_from = self._load_source()
+        self.load_seconds = time.perf_counter() - started
+        self.replayed = self._replay_log()
+        print(f"Store embarqué: {len(self.graph)} triplets chargés depuis {self.loaded_from} "
+              f"en {self.load_seconds * 1000:.0f} ms ({self.replayed} mise(s) à jour rejouée(s))")
+
+    def _load_source(self):
+        """Remplit le graphe avec le fichier source ; retourne le fichier effectivement lu"""
+        if self.snapshot_file and rdf_snapshot.is_fresh(self.snapshot_file, self.data_file):
+            try:
+                with rdf_snapshot.Snapshot(self.snapshot_file) as snapshot:
+                    snapshot.fill(self.graph)
+                return self.snapshot_file
+            except (OSError, rdf_snapshot.SnapshotError) as e:
+                print(f"WARNING: Instantané ignoré ({str(e)}), lecture de {self.data_file}")
+                self.graph = Graph()
+        if not self.snapshot_file:
+            self.graph.parse(self.data_file, format=guess_format(self.data_file) or 'xml')
+            return self.data_file
+        self.graph = parse_in_order(self.data_file)
+        parsed, self.graph.parsed = self.graph.parsed, None
+        try:
+            rdf_snapshot.write_snapshot(parsed, self.snapshot_file, self.data_file)
+        except OSError as e:
+            print(f"WARNING: Instantané non écrit ({str(e)})")
+        return self.data_file
+
+    def _replay_log(self):
+        if not os.path.exists(self.log_file):
+            return 0
+        replayed = 0
+        with open(self.log_file, encoding='utf-8') as log:
+            for line_number, line in enumerate(log, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Dernière ligne tronquée par un arrêt brutal
+                    print(f"WARNING: Entrée illisible ignorée dans {self.log_file}:{line_number}")
+                    continue
+                self.graph.update(entry["update"])
+                replayed += 1
+        return replayed
+
+    def _execute(self, query):
+        with self._lock:
+            result = self.graph.query(_prepare(query))
+            if result.type == 'ASK':
+                return {"head": {}, "boolean": bool(result.askAnswer)}
+            variables = [str(var) for var in result.vars]
+            bindings = []
+            for row in result:
+                binding = {}
+                for var, term in zip(variables, row):
+                    if term is not None:
+                        binding[var] = _term_binding(term)
+                bindings.append(binding)
+        return {"head": {"vars": variables}, "results": {"bindings": bindings}}
+
+    def query(self, query, timeout=None):
+        return self._execute(query)
+
+    def construct(self, query, timeout=None):
+        with self._lock:
+            result = self.graph.query(_prepare(query))
+            return [tuple(_term_binding(term) for term in triple) for triple in result.graph]
+
+    async def query_async(self, query, timeout=None):
+        """rdflib est synchrone : la requête s'exécute dans un thread du pool par défaut"""
+        return await asyncio.get_running_loop().run_in_executor(None, self._execute, query)
+
+    def stream(self, query, timeout=None):
+        """Le résultat est calculé sous le verrou puis produit binding par binding"""
+        yield from self._execute(query)["results"]["bindings"]
+
+    def update(self, update_query, timeout=None):
+        entry = json.dumps({
+            "time": datetime.now(timezone.utc).isoformat(),
+            "update": update_query
+        }, ensure_ascii=False)
+        with self._lock:
+            # Une mise à jour invalide lève ici et n'est pas journalisée
+            self.graph.update(update_query)
+            with open(self.log_file, 'a', encoding='utf-8') as log:
+                log.write(entry + "\n")
+                log.flush()
+                os.fsync(log.fileno())
+
+    def export(self, mimetype, timeout=None):
+        formats = {
+            'application/rdf+xml': 'xml',
+            'text/turtle': 'turtle',
+            'application/n-triples': 'nt',
+            'application/ld+json': 'json-ld'
+        }
+        with self._lock:
+            return self.graph.serialize(format=formats.get(mimetype, 'xml'), encoding='utf-8')
+
+    def describe(self):
+        return {
+            "backend": BACKEND_EMBEDDED,
+            "data_file": self.data_file,
+            "log_file": self.log_file,
+            "snapshot_file": self.snapshot_file,
+            "loaded_from": self.loaded_from,
+            "load_ms": round(self.load_seconds * 1000, 1),
+            "triples": len(self.graph)
+        }
+
+    def close(self):
+        pass
+
+
+def create_backend(pool_size, timeout):
+    """Backend choisi par SPARQL_BACKEND (fuseki par défaut, ou embedded)"""
+    mode = os.getenv('SPARQL_BACKEND', BACKEND_FUSEKI).lower()
+    if mode == BACKEND_EMBEDDED:
+        data_file = os.getenv('EMBEDDED_DATA_FILE', DEFAULT_DATA_FILE)
+        log_file = os.getenv('EMBEDDED_LOG_FILE', os.path.splitext(data_file)[0] + '.updates.log')
+        # Chaîne vide : pas d'instantané, le fichier source est analysé à chaque démarrage
+        snapshot_file = os.getenv('EMBEDDED_SNAPSHOT_FILE', rdf_snapshot.default_snapshot_file(data_file))
+        return EmbeddedBackend(data_file, log_file, snapshot_file or None)
+    if mode != BACKEND_FUSEKI:
+        raise ValueError(f"SPARQL_BACKEND inconnu: {mode} (attendu: {BACKEND_FUSEKI} ou {BACKEND_EMBEDDED})")
+    endpoint = os.getenv('FUSEKI_ENDPOINT', 'http://localhost:3030/educationInfin')
+    return FusekiBackend(endpoint, pool_size, timeout)
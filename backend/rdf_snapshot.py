@@ -0,0 +1,240 @@
+"""Instantané binaire d'un graphe RDF, pour démarrer sans analyser le RDF/XML.
+
+Format (petit-boutiste, sections alignées sur 8 octets) :
+
+    en-tête   MAGIC, version, nombre de termes, nombre de triplets, taille
+              et mtime (ns) du fichier source, position de chaque section
+    kinds     uint8[termes]          IRI, nœud anonyme, littéral,
+                                     littéral avec langue, étiquette de langue
+    extra     uint32[termes]         terme du datatype ou de la langue d'un
+                                     littéral (NO_TERM sinon)
+    offsets   uint32[termes + 1]     début de chaque valeur dans `values`
+    values    UTF-8                  valeurs des termes, à la suite
+    triples   uint32[3 × triplets]   sujet, prédicat, objet (n° de terme)
+
+Le fichier est projeté en mémoire (mmap) : les tableaux sont des vues sans
+copie et un terme n'est décodé que lorsqu'on le demande.
+
+    python rdf_snapshot.py [source.rdf] [instantané]
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from rdflib import BNode, Literal, URIRef
+
+MAGIC = b"WSRDFSNP"
+VERSION = 1
+# magic, version, termes, triplets, taille source, mtime source, 5 sections
+HEADER = struct.Struct("<8sIIQQq5Q")
+NO_TERM = 0xFFFFFFFF
+
+KIND_IRI = 0
+KIND_BNODE = 1
+KIND_LITERAL = 2
+KIND_LANG_LITERAL = 3
+KIND_LANG = 4
+
+
+class SnapshotError(Exception):
+    """Instantané illisible (format, version ou fichier tronqué)"""
+
+
+def default_snapshot_file(data_file):
+    return os.path.splitext(data_file)[0] + '.snapshot'
+
+
+def _source_signature(source_file):
+    stat = os.stat(source_file)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _align(size):
+    return (size + 7) & ~7
+
+
+def _little_endian(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_snapshot(triples, snapshot_file, source_file=None):
+    """Écrit l'instantané des triplets rdflib `triples` (écriture atomique).
+
+    `source_file` est le fichier dont ils proviennent : sa taille et sa date
+    permettent à `is_fresh` de savoir si l'instantané est encore à jour.
+    Les triplets sont écrits dans l'ordre donné, sans les doublons.
+    Retourne le nombre de triplets écrits.
+    """
+    ids = {}
+    kinds = array('B')
+    extra = array('I')
+    offsets = array('I', [0])
+    values = bytearray()
+
+    def intern(kind, value, extra_id=NO_TERM):
+        key = (kind, value, extra_id)
+        term_id = ids.get(key)
+        if term_id is None:
+            term_id = ids[key] = len(kinds)
+            kinds.append(kind)
+            extra.append(extra_id)
+            values.extend(value.encode('utf-8'))
+            offsets.append(len(values))
+        return term_id
+
+    def term_id(term):
+        if isinstance(term, Literal):
+            if term.language:
+                return intern(KIND_LANG_LITERAL, str(term), intern(KIND_LANG, term.language))
+            datatype = intern(KIND_IRI, str(term.datatype)) if term.datatype else NO_TERM
+            return intern(KIND_LITERAL, str(term), datatype)
+        if isinstance(term, BNode):
+            return intern(KIND_BNODE, str(term))
+        return intern(KIND_IRI, str(term))
+
+    spo = array('I')
+    seen = set()
+    for s, p, o in triples:
+        triple = (term_id(s), term_id(p), term_id(o))
+        if triple not in seen:
+            seen.add(triple)
+            spo.extend(triple)
+
+    sections = [kinds.tobytes(), _little_endian(extra), _little_endian(offsets), bytes(values), _little_endian(spo)]
+    positions = []
+    position = HEADER.size
+    for section in sections:
+        positions.append(position)
+        position = _align(position + len(section))
+    source_size, source_mtime = _source_signature(source_file) if source_file else (0, 0)
+
+    temp_file = snapshot_file + '.tmp'
+    with open(temp_file, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(kinds), len(spo) // 3, source_size, source_mtime, *positions))
+        for section_position, section in zip(positions, sections):
+            f.write(b"\0" * (section_position - f.tell()))
+            f.write(section)
+    os.replace(temp_file, snapshot_file)
+    return len(spo) // 3
+
+
+def is_fresh(snapshot_file, source_file):
+    """L'instantané existe et a été produit à partir de la version actuelle du fichier source"""
+    try:
+        with open(snapshot_file, 'rb') as f:
+            header = f.read(HEADER.size)
+        signature = _source_signature(source_file)
+    except OSError:
+        return False
+    if len(header) < HEADER.size:
+        return False
+    magic, version, _, _, source_size, source_mtime = HEADER.unpack(header)[:6]
+    return magic == MAGIC and version == VERSION and (source_size, source_mtime) == signature
+
+
+class Snapshot:
+    """Instantané projeté en mémoire : triplets en entiers, termes décodés à la demande"""
+
+    def __init__(self, snapshot_file):
+        self.snapshot_file = snapshot_file
+        with open(snapshot_file, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self):
+        if len(self._mmap) < HEADER.size:
+            raise SnapshotError(f"{self.snapshot_file}: fichier tronqué")
+        (magic, version, self.term_count, self.triple_count,
+         self.source_size, self.source_mtime, *positions) = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError(f"{self.snapshot_file}: format ou version inconnus")
+        kinds_at, extra_at, offsets_at, values_at, triples_at = positions
+        if triples_at + 12 * self.triple_count > len(self._mmap):
+            raise SnapshotError(f"{self.snapshot_file}: fichier tronqué")
+
+        self._view = memoryview(self._mmap)
+        self.kinds = self._view[kinds_at:kinds_at + self.term_count]
+        self.extra = self._uint32(extra_at, self.term_count)
+        self.offsets = self._uint32(offsets_at, self.term_count + 1)
+        self.values = self._view[values_at:values_at + self.offsets[self.term_count]]
+        self.triples = self._uint32(triples_at, 3 * self.triple_count)
+        self._terms = [None] * self.term_count
+
+    def _uint32(self, position, count):
+        view = self._view[position:position + 4 * count]
+        if sys.byteorder == 'little':
+            return view.cast('I')
+        # Machine gros-boutiste : copie retournée, l'accès n'est plus sans copie
+        values = array('I')
+        values.frombytes(view)
+        values.byteswap()
+        return values
+
+    def value(self, term_id):
+        return str(self.values[self.offsets[term_id]:self.offsets[term_id + 1]], 'utf-8')
+
+    def term(self, term_id):
+        """Terme rdflib n° `term_id` (décodé une fois puis conservé)"""
+        term = self._terms[term_id]
+        if term is None:
+            kind, value, extra_id = self.kinds[term_id], self.value(term_id), self.extra[term_id]
+            if kind == KIND_IRI:
+                term = URIRef(value)
+            elif kind == KIND_BNODE:
+                term = BNode(value)
+            elif kind == KIND_LANG_LITERAL:
+                term = Literal(value, lang=self.value(extra_id))
+            elif kind == KIND_LITERAL:
+                term = Literal(value, datatype=self.term(extra_id) if extra_id != NO_TERM else None)
+            else:
+                raise SnapshotError(f"{self.snapshot_file}: terme {term_id} de genre {kind} dans un triplet")
+            self._terms[term_id] = term
+        return term
+
+    def __len__(self):
+        return self.triple_count
+
+    def __iter__(self):
+        term, triples = self.term, self.triples
+        for index in range(0, 3 * self.triple_count, 3):
+            yield term(triples[index]), term(triples[index + 1]), term(triples[index + 2])
+
+    def fill(self, graph):
+        """Ajoute tous les triplets de l'instantané au graphe rdflib"""
+        graph.addN((s, p, o, graph) for s, p, o in self)
+        return graph
+
+    def close(self):
+        # Les vues doivent être libérées avant de fermer la projection
+        for name in ('kinds', 'extra', 'offsets', 'values', 'triples', '_view'):
+            view = self.__dict__.pop(name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        self._terms = None
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == '__main__':
+    from rdf_backends import DEFAULT_DATA_FILE, parse_in_order
+
+    source = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DATA_FILE
+    target = sys.argv[2] if len(sys.argv) > 2 else default_snapshot_file(source)
+    # Même ordre que l'instantané écrit au démarrage par EmbeddedBackend
+    count = write_snapshot(parse_in_order(source).parsed, target, source)
+    print(f"✓ {count} triplets écrits dans {target} ({os.path.getsize(target)} octets)")
@@ -0,0 +1,165 @@
+"""Cache persistant (SQLite) du pipeline de recherche sémantique : question -> analyse TALN -> SPARQL -> résultats"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from query_cache import normalize_query
+from text_index import fold_text
+from sparql_utils import sparql_utils
+
+LEVEL_ANALYSIS = "analysis"
+LEVEL_SPARQL = "sparql"
+LEVEL_RESULTS = "results"
+LEVELS = (LEVEL_ANALYSIS, LEVEL_SPARQL, LEVEL_RESULTS)
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'search_cache.sqlite3')
+
+# Mots sans incidence sur la requête générée : "Liste des universités ?" et
+# "liste les universites" doivent partager la même entrée
+STOP_WORDS = frozenset({
+    'le', 'la', 'les', 'l', 'un', 'une', 'des', 'du', 'de', 'd',
+    'svp', 'stp', 'merci', 'please'
+})
+NON_WORD_RE = re.compile(r'[^\w]+')
+
+# Champs de l'analyse TALN qui varient sans changer le SPARQL à générer
+VOLATILE_ANALYSIS_FIELDS = ('analysis_metadata',)
+
+
+def normalize_question(question: str) -> str:
+    """Forme canonique d'une question : minuscules, sans accents, ponctuation ni mots vides"""
+    words = [word for word in NON_WORD_RE.split(fold_text(question)) if word and word not in STOP_WORDS]
+    return ' '.join(words)
+
+
+def analysis_key(analysis: Dict[str, Any]) -> str:
+    """Empreinte d'une analyse TALN, indépendante de la formulation exacte de la question"""
+    stable = {key: value for key, value in analysis.items() if key not in VOLATILE_ANALYSIS_FIELDS}
+    stable['original_question'] = normalize_question(analysis.get('original_question', ''))
+    raw = json.dumps(stable, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class SearchCache:
+    """Trois niveaux de cache, chacun avec son TTL, stockés dans un fichier SQLite.
+
+    - analysis : question normalisée -> analyse TALN
+    - sparql   : empreinte de l'analyse -> requête SPARQL générée
+    - results  : requête SPARQL normalisée -> résultats, vidé à chaque écriture
+
+    Le fichier survit aux redémarrages ; une entrée expirée est ignorée puis
+    remplacée à la prochaine écriture du même niveau.
+    """
+
+    def __init__(self, path: str, ttls: Dict[str, float]):
+        self.path = path
+        self.ttls = ttls
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            " level TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL,"
+            " PRIMARY KEY (level, key))"
+        )
+        self._connection.commit()
+        self.hits = dict.fromkeys(LEVELS, 0)
+        self.misses = dict.fromkeys(LEVELS, 0)
+
+    def get(self, level: str, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM search_cache WHERE level = ? AND key = ? AND expires_at > ?",
+                (level, key, time.time())
+            ).fetchone()
+            if row is None:
+                self.misses[level] += 1
+                return None
+            self.hits[level] += 1
+        return json.loads(row[0])
+
+    def put(self, level: str, key: str, value: Any):
+        raw = json.dumps(value, ensure_ascii=False, default=str)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO search_cache (level, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (level, key, raw, time.time() + self.ttls[level])
+            )
+            self._connection.commit()
+
+    def invalidate(self, level: Optional[str] = None):
+        """Supprime un niveau (tous si level est None) ainsi que les entrées expirées"""
+        with self._lock:
+            if level is None:
+                self._connection.execute("DELETE FROM search_cache")
+            else:
+                self._connection.execute(
+                    "DELETE FROM search_cache WHERE level = ? OR expires_at <= ?", (level, time.time())
+                )
+            self._connection.commit()
+
+    # Accès par niveau, avec les clés propres à chacun
+
+    def get_analysis(self, question: str):
+        return self.get(LEVEL_ANALYSIS, normalize_question(question))
+
+    def put_analysis(self, question: str, analysis: Dict[str, Any]):
+        self.put(LEVEL_ANALYSIS, normalize_question(question), analysis)
+
+    def get_sparql(self, analysis: Dict[str, Any]):
+        return self.get(LEVEL_SPARQL, analysis_key(analysis))
+
+    def put_sparql(self, analysis: Dict[str, Any], sparql_query: str):
+        self.put(LEVEL_SPARQL, analysis_key(analysis), sparql_query)
+
+    def get_results(self, sparql_query: str):
+        return self.get(LEVEL_RESULTS, normalize_query(sparql_query))
+
+    def put_results(self, sparql_query: str, results):
+        self.put(LEVEL_RESULTS, normalize_query(sparql_query), results)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = dict(self._connection.execute(
+                "SELECT level, COUNT(*) FROM search_cache WHERE expires_at > ? GROUP BY level", (time.time(),)
+            ).fetchall())
+        return {
+            "file": self.path,
+            "levels": {
+                level: {
+                    "entries": counts.get(level, 0),
+                    "ttl": self.ttls[level],
+                    "hits": self.hits[level],
+                    "misses": self.misses[level]
+                }
+                for level in LEVELS
+            }
+        }
+
+
+def create_search_cache() -> Optional[SearchCache]:
+    """Cache configuré par SEARCH_CACHE_* ; None si SEARCH_CACHE_ENABLED=false"""
+    if os.getenv('SEARCH_CACHE_ENABLED', 'true').lower() not in ('1', 'true', 'yes'):
+        return None
+    ttls = {
+        LEVEL_ANALYSIS: float(os.getenv('SEARCH_CACHE_ANALYSIS_TTL', '86400')),
+        LEVEL_SPARQL: float(os.getenv('SEARCH_CACHE_SPARQL_TTL', '604800')),
+        LEVEL_RESULTS: float(os.getenv('SEARCH_CACHE_RESULTS_TTL', '300'))
+    }
+    path = os.getenv('SEARCH_CACHE_FILE', DEFAULT_CACHE_FILE)
+    try:
+        return SearchCache(path, ttls)
+    except sqlite3.Error as e:
+        print(f"WARNING: Cache de recherche désactivé ({path}): {str(e)}")
+        return None
+
+
+search_cache = create_search_cache()
+if search_cache is not None:
+    # Les résultats dépendent des données : toute écriture les rend obsolètes
+    sparql_utils.add_update_listener(lambda update_query: search_cache.invalidate(LEVEL_RESULTS))
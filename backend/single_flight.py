@@ -0,0 +1,91 @@
+"""Regroupement (single-flight) des requêtes identiques exécutées simultanément"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict
+
+
+class SingleFlight:
+    """Une seule exécution à la fois par clé ; les appels concurrents partagent son résultat.
+
+    Le premier appelant (leader) exécute la fonction, les suivants attendent
+    le même Future et reçoivent le même résultat ou la même exception. La clé
+    est libérée dès la fin de l'exécution : ce n'est pas un cache. Après une
+    écriture, `invalidate()` empêche les nouveaux appelants de rejoindre une
+    exécution démarrée avant celle-ci.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[tuple, Future] = {}
+        self._async_calls: Dict[tuple, asyncio.Future] = {}
+        self._epoch = 0
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable):
+        flight_key = (self._epoch, key)
+        with self._lock:
+            future = self._calls.get(flight_key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[flight_key] = future
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(flight_key, None)
+
+    async def do_async(self, key: str, fn: Callable):
+        """Variante asyncio : `fn` retourne une coroutine, partagée par les appelants de la même boucle"""
+        flight_key = (self._epoch, asyncio.get_running_loop(), key)
+        future = self._async_calls.get(flight_key)
+        if future is not None:
+            with self._lock:
+                self.coalesced += 1
+            # shield : l'annulation d'un appelant n'annule pas les autres
+            return await asyncio.shield(future)
+
+        with self._lock:
+            self.executed += 1
+        future = asyncio.ensure_future(fn())
+        self._async_calls[flight_key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._async_calls.pop(flight_key, None)
+            else:
+                future.add_done_callback(lambda _: self._async_calls.pop(flight_key, None))
+
+    def invalidate(self):
+        """Les appels suivants démarrent une nouvelle exécution (données modifiées)"""
+        with self._lock:
+            self._epoch += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            in_flight = len(self._calls)
+        in_flight += len(self._async_calls)
+        calls = self.executed + self.coalesced
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / calls, 3) if calls else 0.0,
+            "in_flight": in_flight
+        }
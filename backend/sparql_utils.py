@@ -1,75 +1,297 @@
-from SPARQLWrapper import SPARQLWrapper, JSON, POST
-
-from SPARQLWrapper import SPARQLWrapper, JSON
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
+from query_cache import QueryCache, ONTOLOGY_NS, normalize_query, update_scope
+from rdf_backends import create_backend
+from single_flight import SingleFlight
 
 load_dotenv()
 
+# Modes de résultat de execute_query
+RESULT_FORMATTED = "formatted"  # lignes dict, URIs réduites à leur nom local (historique)
+RESULT_TYPED = "typed"          # lignes dict de Term (URI/littéral, datatype, langue)
+RESULT_COLUMNS = "columns"      # une liste de Term par variable, sans dict par ligne
+
+def short_name(value):
+    """Nom local d'une URI (après '#' ou le dernier '/')"""
+    if '#' in value:
+        return value.split('#')[-1]
+    if '/' in value:
+        return value.split('/')[-1]
+    return value
+
+def escape_literal(value):
+    """Contenu d'un littéral SPARQL entre guillemets (antislash, guillemets, sauts de ligne échappés)"""
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+class Term:
+    """Valeur typée d'un binding SPARQL ; le nom court est calculé à la demande"""
+    __slots__ = ('value', 'type', 'datatype', 'lang', '_short')
+
+    def __init__(self, binding):
+        self.value = binding['value']
+        self.type = binding['type']
+        self.datatype = binding.get('datatype')
+        self.lang = binding.get('xml:lang')
+        self._short = None
+
+    @property
+    def is_uri(self):
+        return self.type == 'uri'
+
+    @property
+    def is_literal(self):
+        return self.type in ('literal', 'typed-literal')
+
+    @property
+    def short(self):
+        """Nom local pour une URI, valeur brute pour un littéral"""
+        if self._short is None:
+            self._short = short_name(self.value) if self.type == 'uri' else self.value
+        return self._short
+
+    def to_dict(self):
+        term = {"type": self.type, "value": self.value}
+        if self.datatype:
+            term["datatype"] = self.datatype
+        if self.lang:
+            term["xml:lang"] = self.lang
+        return term
+
+    def __eq__(self, other):
+        return isinstance(other, Term) and self.value == other.value and self.type == other.type
+
+    def __hash__(self):
+        return hash((self.value, self.type))
+
+    def __str__(self):
+        return self.value
+
+    def __repr__(self):
+        return f"Term({self.type}, {self.value!r})"
+
+def format_binding(binding):
+    """Binding SPARQL JSON -> dict variable -> valeur, URLs réduites pour l'affichage"""
+    formatted_result = {}
+    for key, value in binding.items():
+        # Nettoyer les URLs pour un affichage plus lisible
+        if 'value' in value:
+            formatted_result[key] = short_name(value['value'])
+    return formatted_result
+
+def typed_rows(results):
+    """Résultats SPARQL JSON -> liste de dict variable -> Term"""
+    return [{key: Term(value) for key, value in binding.items()}
+            for binding in results["results"]["bindings"]]
+
+def columns(results):
+    """Résultats SPARQL JSON -> {"vars", "rows", "columns": {variable: [Term | None]}}"""
+    variables = results.get("head", {}).get("vars", [])
+    bindings = results["results"]["bindings"]
+    data = {}
+    for var in variables:
+        data[var] = [Term(binding[var]) if var in binding else None for binding in bindings]
+    return {"vars": variables, "rows": len(bindings), "columns": data}
+
 class SPARQLUtils:
     def __init__(self):
         self.endpoint = os.getenv('FUSEKI_ENDPOINT', 'http://localhost:3030/educationInfin')
-        self.sparql = SPARQLWrapper(self.endpoint + "/query")
-        self.sparql.setReturnFormat(JSON)
-    
-    def execute_query(self, query):
-        """Exécute une requête SPARQL et retourne les résultats"""
+        # Taille du pool de connexions keep-alive partagé par tous les blueprints
+        self.pool_size = int(os.getenv('FUSEKI_POOL_SIZE', '20'))
+        # Timeouts (secondes) : connexion et lecture, par requête
+        self.connect_timeout = float(os.getenv('FUSEKI_CONNECT_TIMEOUT', '5'))
+        self.read_timeout = float(os.getenv('FUSEKI_READ_TIMEOUT', '60'))
+        # Délai global (secondes) d'un lot de requêtes exécutées en parallèle
+        self.batch_timeout = float(os.getenv('FUSEKI_BATCH_TIMEOUT', '30'))
+        # Fuseki (HTTP) ou store rdflib embarqué, selon SPARQL_BACKEND
+        self.backend = create_backend(self.pool_size, self.timeout)
+        # Pool de threads borné par la taille du pool de connexions
+        self.executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='sparql')
+        # Cache des résultats de lecture, invalidé par execute_update
+        self.cache = None
+        if os.getenv('QUERY_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes'):
+            self.cache = QueryCache(
+                max_entries=int(os.getenv('QUERY_CACHE_MAX_ENTRIES', '512')),
+                ttl=float(os.getenv('QUERY_CACHE_TTL', '300'))
+            )
+        # Requêtes identiques simultanées : une seule envoyée, résultat partagé
+        self.single_flight = None
+        if os.getenv('SINGLE_FLIGHT_ENABLED', 'true').lower() in ('1', 'true', 'yes'):
+            self.single_flight = SingleFlight()
+        # Appelés avec le texte de chaque mise à jour réussie (index dérivés des données)
+        self.update_listeners = []
+        # Version du jeu de données : incrémentée après chaque mise à jour réussie (ETag HTTP)
+        self.dataset_version = 0
+        self._version_lock = threading.Lock()
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def query_raw(self, query, timeout=None):
+        """Exécute une requête SPARQL et retourne le JSON brut (format SPARQL Results)"""
+        # Normalize line endings but keep intended formatting (SPARQL comments rely on newlines)
+        query = query.replace('\r', '').strip()
+
+        # Debug: log query details and verify it's complete
+        if len(query) > 900:
+            print(f"DEBUG: Executing long query ({len(query)} chars) via POST")
+            print(f"DEBUG: Query starts: {query[:100]}...")
+            print(f"DEBUG: Query ends: ...{query[-50:]}")
+            # Verify query is complete (ends with DESC or appropriate closing)
+            if not (query.endswith('DESC') or query.endswith('ASC') or query.endswith('}')):
+                print(f"WARNING: Query may be incomplete! Ends with: {query[-20:]}")
+
+        if self.single_flight is None:
+            return self.backend.query(query, timeout)
+        # Le JSON retourné est partagé entre les appelants regroupés : ne pas le modifier
+        return self.single_flight.do(normalize_query(query), lambda: self.backend.query(query, timeout))
+
+    def execute_query(self, query, mode=RESULT_FORMATTED):
+        """Exécute une requête SPARQL et retourne les résultats
+
+        mode=RESULT_TYPED conserve le type de chaque valeur (Term) et
+        mode=RESULT_COLUMNS retourne une liste par variable pour les gros
+        résultats. Seul le mode par défaut passe par le cache.
+        """
+        if mode != RESULT_FORMATTED:
+            try:
+                results = self.query_raw(query)
+                return typed_rows(results) if mode == RESULT_TYPED else columns(results)
+            except Exception as e:
+                print(f"Erreur SPARQL: {str(e)}")
+                print(f"Requête: {query}")
+                return {"error": f"Erreur SPARQL: {str(e)}"}
+
+        generation = None
+        if self.cache is not None:
+            cached = self.cache.get(query)
+            if cached is not None:
+                return cached
+            generation = self.cache.generation
+
         try:
-            # Normalize line endings but keep intended formatting (SPARQL comments rely on newlines)
-            query = query.replace('\r', '').strip()
-
-            # Use POST for all queries to avoid URL length limits
-            # Create a fresh wrapper instance to ensure method is set correctly
-            query_wrapper = SPARQLWrapper(self.endpoint + "/query")
-            query_wrapper.setReturnFormat(JSON)
-            query_wrapper.setMethod(POST)
-            query_wrapper.setQuery(query)
-            
-            # Debug: log query details and verify it's complete
-            if len(query) > 900:
-                print(f"DEBUG: Executing long query ({len(query)} chars) via POST")
-                print(f"DEBUG: Query starts: {query[:100]}...")
-                print(f"DEBUG: Query ends: ...{query[-50:]}")
-                # Verify query is complete (ends with DESC or appropriate closing)
-                if not (query.endswith('DESC') or query.endswith('ASC') or query.endswith('}')):
-                    print(f"WARNING: Query may be incomplete! Ends with: {query[-20:]}")
-            
-            results = query_wrapper.query().convert()
-            
+            results = self.query_raw(query)
+
             # Formater les résultats
-            formatted_results = []
-            for result in results["results"]["bindings"]:
-                formatted_result = {}
-                for key, value in result.items():
-                    # Nettoyer les URLs pour un affichage plus lisible
-                    if 'value' in value:
-                        clean_value = value['value']
-                        if '#' in clean_value:
-                            clean_value = clean_value.split('#')[-1]
-                        elif '/' in clean_value:
-                            clean_value = clean_value.split('/')[-1]
-                        formatted_result[key] = clean_value
-                formatted_results.append(formatted_result)
-            
+            formatted_results = [format_binding(result) for result in results["results"]["bindings"]]
+
+            if self.cache is not None:
+                self.cache.put(query, formatted_results, generation)
+            return formatted_results
+
+        except Exception as e:
+            print(f"Erreur SPARQL: {str(e)}")
+            print(f"Requête: {query}")
+            return {"error": f"Erreur SPARQL: {str(e)}"}
+
+    async def execute_query_async(self, query):
+        """Équivalent asyncio de execute_query (mode par défaut, même cache).
+
+        Avec Fuseki la requête passe par le client httpx partagé : la boucle
+        n'est pas bloquée pendant l'attente de la réponse.
+        """
+        generation = None
+        if self.cache is not None:
+            cached = self.cache.get(query)
+            if cached is not None:
+                return cached
+            generation = self.cache.generation
+
+        try:
+            query_text = query.replace('\r', '').strip()
+            if self.single_flight is None:
+                results = await self.backend.query_async(query_text)
+            else:
+                results = await self.single_flight.do_async(
+                    normalize_query(query_text), lambda: self.backend.query_async(query_text)
+                )
+            formatted_results = [format_binding(result) for result in results["results"]["bindings"]]
+            if self.cache is not None:
+                self.cache.put(query, formatted_results, generation)
             return formatted_results
-            
         except Exception as e:
             print(f"Erreur SPARQL: {str(e)}")
             print(f"Requête: {query}")
             return {"error": f"Erreur SPARQL: {str(e)}"}
 
-    def execute_update(self, update_query):
+    def stream_query(self, query, mode=RESULT_FORMATTED, timeout=None):
+        """Exécute une requête SPARQL et produit les lignes au fur et à mesure de la réponse.
+
+        La mémoire reste constante quelle que soit la taille du résultat ; les
+        erreurs HTTP sont levées au premier next(). Pas de cache dans ce mode.
+        """
+        query = query.replace('\r', '').strip()
+        for binding in self.backend.stream(query, timeout):
+            if mode == RESULT_TYPED:
+                yield {key: Term(value) for key, value in binding.items()}
+            else:
+                yield format_binding(binding)
+
+    def construct(self, query, timeout=None):
+        """Exécute une requête CONSTRUCT ; retourne les triplets en lignes {"s", "p", "o"} de Term.
+
+        Les triplets passent par le même cache que execute_query ; les erreurs
+        sont levées.
+        """
+        generation = None
+        if self.cache is not None:
+            cached = self.cache.get(query)
+            if cached is not None:
+                return cached
+            generation = self.cache.generation
+
+        triples = [{"s": Term(s), "p": Term(p), "o": Term(o)}
+                   for s, p, o in self.backend.construct(query.replace('\r', '').strip(), timeout)]
+        if self.cache is not None:
+            self.cache.put(query, triples, generation)
+        return triples
+
+    def execute_many(self, queries, timeout=None):
+        """Exécute plusieurs requêtes SPARQL indépendantes en parallèle.
+
+        `queries` est un dict nom -> requête. Retourne un dict nom -> résultats.
+        Une requête en échec ou non terminée avant le délai du lot donne
+        {"error": ...} sans affecter les autres.
+        """
+        deadline = timeout or self.batch_timeout
+        futures = {name: self.executor.submit(self.execute_query, query) for name, query in queries.items()}
+        done, _ = wait(futures.values(), timeout=deadline)
+
+        results = {}
+        for name, future in futures.items():
+            if future in done:
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    results[name] = {"error": f"Erreur SPARQL: {str(e)}"}
+            else:
+                future.cancel()
+                results[name] = {"error": f"Délai dépassé ({deadline}s)"}
+
+        failed = [name for name, result in results.items() if isinstance(result, dict) and "error" in result]
+        if failed:
+            print(f"WARNING: {len(failed)}/{len(queries)} requête(s) en échec dans le lot: {', '.join(failed)}")
+
+        return results
+
+    def execute_update(self, update_query, timeout=None):
         """Exécute une requête SPARQL Update (INSERT/DELETE)."""
         try:
-            update_endpoint = self.endpoint + "/update"
-            sparql_upd = SPARQLWrapper(update_endpoint)
-            sparql_upd.setMethod(POST)
-            sparql_upd.setQuery(update_query)
-            response = sparql_upd.query()
-            
-            # Check if response indicates success (200, 204, or None for some implementations)
-            # SPARQLWrapper doesn't always expose status codes, so we check for exceptions
-            # If we get here without exception, the update was likely successful
+            # La portée doit être calculée avant l'écriture (les triplets supprimés disparaissent)
+            scope = update_scope(update_query, self._describe_subject) if self.cache is not None else None
+            self.backend.update(update_query, timeout)
+            if self.cache is not None:
+                self.cache.invalidate(scope)
+            if self.single_flight is not None:
+                self.single_flight.invalidate()
+            self._notify_update(update_query)
+            # En dernier : une réponse étiquetée avec la nouvelle version ne peut pas
+            # avoir été lue dans un cache ou un index pas encore mis à jour
+            with self._version_lock:
+                self.dataset_version += 1
             return {"status": "success"}
         except Exception as e:
             error_msg = str(e)
@@ -77,5 +299,76 @@ class SPARQLUtils:
             print(f"Update: {update_query}")
             return {"error": f"Erreur SPARQL Update: {error_msg}"}
 
+    def execute_update_batch(self, operations, timeout=None):
+        """Exécute plusieurs opérations SPARQL Update en une seule requête.
+
+        Les opérations (chacune avec ses PREFIX) sont jointes par `;` : le
+        serveur les applique dans une même transaction, donc toutes ou aucune,
+        sans fenêtre où seule une partie est visible (ex. DELETE puis INSERT).
+        """
+        operations = [operation.strip() for operation in operations if operation and operation.strip()]
+        if not operations:
+            return {"status": "success"}
+        return self.execute_update(" ;\n".join(operations), timeout)
+
+    def notify_external_update(self):
+        """Données modifiées hors de l'API (ex. load_data.py --sync) : caches vidés, index à recalculer.
+
+        Les écouteurs reçoivent None, une écriture de portée inconnue.
+        Retourne la nouvelle version du jeu de données.
+        """
+        if self.cache is not None:
+            self.cache.invalidate(None)
+        if self.single_flight is not None:
+            self.single_flight.invalidate()
+        self._notify_update(None)
+        with self._version_lock:
+            self.dataset_version += 1
+            return self.dataset_version
+
+    def add_update_listener(self, listener):
+        """Enregistre une fonction appelée après chaque mise à jour réussie (None : modification hors de l'API)"""
+        self.update_listeners.append(listener)
+
+    def _notify_update(self, update_query):
+        # L'écriture a réussi : un index dérivé en échec ne doit pas la faire échouer
+        for listener in self.update_listeners:
+            try:
+                listener(update_query)
+            except Exception as e:
+                print(f"WARNING: Échec de la mise à jour d'un index dérivé: {str(e)}")
+
+    def _describe_subject(self, subject):
+        """Prédicats et types de l'ontologie portés actuellement par une entité"""
+        query = f"""
+        SELECT DISTINCT ?p ?type WHERE {{
+            {{ <{subject}> ?p ?o }} UNION {{ <{subject}> a ?type }}
+        }}
+        """
+        try:
+            results = self.query_raw(query)
+        except Exception as e:
+            print(f"WARNING: Impossible de déterminer la portée de l'écriture sur {subject}: {str(e)}")
+            return None
+
+        terms = set()
+        if subject.startswith(ONTOLOGY_NS):
+            terms.add(subject[len(ONTOLOGY_NS):])
+        for binding in results["results"]["bindings"]:
+            for var in ('p', 'type'):
+                value = binding.get(var, {}).get('value', '')
+                if value.startswith(ONTOLOGY_NS):
+                    terms.add(value[len(ONTOLOGY_NS):])
+        return terms
+
+    def export_dataset(self, mimetype):
+        """Dataset complet sérialisé (application/rdf+xml, text/turtle, ...)"""
+        return self.backend.export(mimetype)
+
+    def close(self):
+        """Ferme les connexions du pool"""
+        self.executor.shutdown(wait=False)
+        self.backend.close()
+
 # Instance globale
-sparql_utils = SPARQLUtils()
\ No newline at end of file
+sparql_utils = SPARQLUtils()
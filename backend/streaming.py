@@ -0,0 +1,60 @@
+"""Réponses HTTP en streaming (NDJSON ou tableau JSON chunké) pour les gros résultats SPARQL"""
+
+import json
+from flask import Response, request, stream_with_context
+from sparql_utils import sparql_utils, RESULT_FORMATTED, RESULT_TYPED
+
+STREAM_NDJSON = "ndjson"
+STREAM_JSON_ARRAY = "json"
+
+
+def requested_stream_format(data=None):
+    """Format de streaming demandé par le client, ou None pour une réponse classique.
+
+    Activé par ?stream=ndjson|json, par le champ "stream" d'un corps JSON
+    ou par l'en-tête Accept: application/x-ndjson.
+    """
+    stream_format = request.args.get('stream') or (data or {}).get('stream') or ''
+    stream_format = str(stream_format).lower()
+    if stream_format in (STREAM_NDJSON, STREAM_JSON_ARRAY):
+        return stream_format
+    if 'application/x-ndjson' in request.headers.get('Accept', ''):
+        return STREAM_NDJSON
+    return None
+
+
+def _encode_row(row, typed):
+    if typed:
+        row = {key: term.to_dict() for key, term in row.items()}
+    return json.dumps(row, ensure_ascii=False)
+
+
+def _ndjson_lines(rows, typed):
+    try:
+        for row in rows:
+            yield _encode_row(row, typed) + "\n"
+    except Exception as e:
+        # Les en-têtes sont déjà partis : l'erreur est signalée dans le flux
+        yield json.dumps({"error": f"Erreur SPARQL: {str(e)}"}, ensure_ascii=False) + "\n"
+
+
+def _json_array_chunks(rows, typed):
+    yield "["
+    first = True
+    try:
+        for row in rows:
+            yield ("" if first else ",") + _encode_row(row, typed)
+            first = False
+    except Exception as e:
+        yield ("" if first else ",") + json.dumps({"error": f"Erreur SPARQL: {str(e)}"}, ensure_ascii=False)
+    yield "]"
+
+
+def stream_query_response(query, stream_format, typed=False):
+    """Réponse Flask qui transmet les lignes d'une requête SPARQL au fur et à mesure"""
+    rows = sparql_utils.stream_query(query, mode=RESULT_TYPED if typed else RESULT_FORMATTED)
+    if stream_format == STREAM_NDJSON:
+        body, mimetype = _ndjson_lines(rows, typed), 'application/x-ndjson'
+    else:
+        body, mimetype = _json_array_chunks(rows, typed), 'application/json'
+    return Response(stream_with_context(body), mimetype=mimetype)
@@ -0,0 +1,272 @@
+"""Index plein texte local des libellés (nom, intitulé, titre...) : recherche par préfixe classée par BM25"""
+
+import math
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from query_cache import ONTOLOGY_NS, written_entities
+from sparql_utils import RESULT_TYPED, short_name, sparql_utils
+
+# Propriétés littérales indexées : celles sur lesquelles portent les endpoints /search
+TEXT_PROPERTIES = (
+    'nom', 'prenom', 'role',
+    'nomUniversite', 'ville', 'pays',
+    'nomSpecialite', 'description', 'niveauDiplome',
+    'intitule', 'codeCours', 'semestre',
+    'titreProjet', 'domaineProjet', 'typeProjet',
+    'typeEvaluation',
+    'titreRessource',
+    'nomTechnologie', 'typeTechnologie',
+    'nomCompetence', 'typeCompetence',
+    'objectifOrientation', 'typeOrientation'
+)
+
+# Paramètres BM25 usuels
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Taille des blocs VALUES lors de la relecture d'entités après une écriture
+REFRESH_BATCH_SIZE = 500
+
+WORD_RE = re.compile(r'\w+')
+
+
+def fold_text(text):
+    """Minuscules sans accents : "Université" -> "universite" """
+    folded = unicodedata.normalize('NFKD', str(text).lower())
+    return ''.join(char for char in folded if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    return WORD_RE.findall(fold_text(text))
+
+
+class FieldIndex:
+    """Listes inversées d'une propriété : terme -> {entité: fréquence}.
+
+    Les termes sont aussi tenus dans une liste triée, ce qui ramène la
+    recherche par préfixe à une recherche dichotomique.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.terms = []
+        self.lengths = {}
+        self.document_terms = {}
+        self.total_length = 0
+
+    def add(self, entity, tokens):
+        self.remove(entity)
+        if not tokens:
+            return
+        self.lengths[entity] = len(tokens)
+        self.document_terms[entity] = set(tokens)
+        self.total_length += len(tokens)
+        for token in tokens:
+            postings = self.postings[token]
+            if not postings:
+                insort(self.terms, token)
+            postings[entity] = postings.get(entity, 0) + 1
+
+    def remove(self, entity):
+        length = self.lengths.pop(entity, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for token in self.document_terms.pop(entity):
+            del self.postings[token][entity]
+            if not self.postings[token]:
+                del self.postings[token]
+                self.terms.pop(bisect_left(self.terms, token))
+
+    def expand(self, prefix):
+        """Termes commençant par `prefix`"""
+        start = bisect_left(self.terms, prefix)
+        end = start
+        while end < len(self.terms) and self.terms[end].startswith(prefix):
+            end += 1
+        return self.terms[start:end]
+
+    def search(self, tokens):
+        """Scores BM25 des entités dont le texte contient un terme préfixé par chaque jeton"""
+        documents = len(self.lengths)
+        if not documents:
+            return {}
+        average_length = self.total_length / documents
+        scores = None
+        for token in tokens:
+            token_scores = {}
+            for term in self.expand(token):
+                postings = self.postings[term]
+                idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+                for entity, frequency in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[entity] / average_length)
+                    score = idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                    # Un jeton développé en plusieurs termes compte pour son meilleur terme
+                    if score > token_scores.get(entity, 0):
+                        token_scores[entity] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {entity: score + token_scores[entity]
+                          for entity, score in scores.items() if entity in token_scores}
+            if not scores:
+                return {}
+        return scores or {}
+
+
+class TextIndex:
+    """Index plein texte construit au démarrage et mis à jour à chaque écriture.
+
+    Les endpoints /search y résolvent les IRIs candidates (tous les jetons du
+    critère doivent préfixer un mot du libellé, accents et casse ignorés), puis
+    lisent leurs propriétés en une requête SPARQL liée par VALUES au lieu de
+    filtrer chaque littéral du graphe par REGEX.
+    """
+
+    def __init__(self, store, properties):
+        self.store = store
+        self.properties = [ONTOLOGY_NS + name for name in properties]
+        self._lock = threading.RLock()
+        self._fields = None
+        self._stale = True
+        self._writes = 0
+        self.refreshed_at = None
+        self.full_refreshes = 0
+        self.incremental_updates = 0
+
+    def _literals_query(self, entities=None):
+        predicates = ', '.join(f'<{p}>' for p in self.properties)
+        values = f"VALUES ?s {{ {' '.join(f'<{iri}>' for iri in entities)} }}" if entities is not None else ""
+        return f"""
+        SELECT ?s ?p ?o WHERE {{
+            {values}
+            ?s ?p ?o .
+            FILTER(?p IN ({predicates}) && isLiteral(?o))
+        }}
+        """
+
+    def _load(self, entities=None):
+        """Textes par (propriété, entité)"""
+        texts = defaultdict(lambda: defaultdict(list))
+        for row in self.store.stream_query(self._literals_query(entities), mode=RESULT_TYPED):
+            texts[row['p'].value][row['s'].value].append(row['o'].value)
+        return texts
+
+    def refresh(self):
+        """Reconstruction complète de l'index (une requête sur le graphe)"""
+        with self._lock:
+            writes = self._writes
+        started = time.monotonic()
+        fields = defaultdict(FieldIndex)
+        documents = 0
+        for prop, entities in self._load().items():
+            for entity, values in entities.items():
+                fields[prop].add(entity, [token for value in values for token in tokenize(value)])
+                documents += 1
+        with self._lock:
+            self._fields = fields
+            # Une écriture pendant la construction a pu être appliquée à l'ancien index
+            self._stale = writes != self._writes
+            self.refreshed_at = time.time()
+            self.full_refreshes += 1
+        print(f"Index plein texte: {documents} libellé(s) en {time.monotonic() - started:.2f}s")
+
+    def start(self):
+        """Construction initiale ; en cas d'échec, elle est retentée à la première recherche"""
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"WARNING: Index plein texte indisponible: {str(e)}")
+
+    def on_update(self, update_query):
+        """Écouteur des mises à jour réussies : réindexe les entités citées"""
+        with self._lock:
+            self._writes += 1
+            if self._fields is None or self._stale:
+                return
+            entities = written_entities(update_query)
+            if entities is None:
+                self._stale = True
+                return
+            try:
+                self._reindex(sorted(entities))
+                self.incremental_updates += 1
+            except Exception as e:
+                print(f"WARNING: Mise à jour incrémentale de l'index plein texte impossible: {str(e)}")
+                self._stale = True
+
+    def _reindex(self, entities):
+        texts = defaultdict(lambda: defaultdict(list))
+        for start in range(0, len(entities), REFRESH_BATCH_SIZE):
+            for prop, values in self._load(entities[start:start + REFRESH_BATCH_SIZE]).items():
+                texts[prop].update(values)
+        for prop in self.properties:
+            field = self._fields[prop]
+            for entity in entities:
+                values = texts[prop].get(entity, ())
+                field.add(entity, [token for value in values for token in tokenize(value)])
+
+    def search(self, criteria):
+        """Entités correspondant à tous les critères {propriété: texte}, classées par score BM25.
+
+        Retourne un dict IRI -> score (score décroissant), vide si rien ne
+        correspond, ou None si aucun critère n'est renseigné (pas de restriction).
+        """
+        active = {prop: tokenize(text) for prop, text in criteria.items() if text and str(text).strip()}
+        active = {prop: tokens for prop, tokens in active.items() if tokens}
+        if not active:
+            return None
+        with self._lock:
+            if self._fields is None or self._stale:
+                self.refresh()
+            scores = None
+            for prop, tokens in active.items():
+                field = self._fields.get(ONTOLOGY_NS + prop)
+                prop_scores = field.search(tokens) if field is not None else {}
+                if scores is None:
+                    scores = prop_scores
+                else:
+                    scores = {entity: score + prop_scores[entity]
+                              for entity, score in scores.items() if entity in prop_scores}
+        return dict(sorted(scores.items(), key=lambda item: -item[1]))
+
+    def status(self):
+        with self._lock:
+            fields = self._fields or {}
+            return {
+                "loaded": self._fields is not None,
+                "stale": self._stale,
+                "documents": sum(len(field.lengths) for field in fields.values()),
+                "terms": sum(len(field.terms) for field in fields.values()),
+                "refreshed_at": self.refreshed_at,
+                "full_refreshes": self.full_refreshes,
+                "incremental_updates": self.incremental_updates
+            }
+
+
+def no_match(*matches):
+    """Vrai si un critère renseigné ne correspond à aucune entité : inutile d'interroger le graphe"""
+    return any(found is not None and not found for found in matches)
+
+
+def values_clause(var, matches):
+    """`VALUES ?var { ... }` limitant ?var aux entités trouvées ; vide si aucune restriction"""
+    if matches is None:
+        return ""
+    return f"VALUES ?{var} {{ {' '.join(f'<{iri}>' for iri in matches)} }}"
+
+
+def ranked(results, var, matches):
+    """Trie les lignes par score de leur entité (?var), l'ordre SPARQL départageant les ex aequo"""
+    if matches is None or not isinstance(results, list):
+        return results
+    scores = {short_name(iri): score for iri, score in matches.items()}
+    return sorted(results, key=lambda row: -scores.get(row.get(var), 0))
+
+
+text_index = TextIndex(sparql_utils, TEXT_PROPERTIES)
+sparql_utils.add_update_listener(text_index.on_update)
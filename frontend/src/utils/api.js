@@ -18,6 +18,19 @@ api.interceptors.response.use(
   }
 );
 
+// Pagination par curseur des listes : params { limit, cursor } -> { items, next_cursor }
+export const fetchAllPages = async (fetchPage, limit = 100, onPage = null) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const { data } = await fetchPage(cursor ? { limit, cursor } : { limit });
+    items.push(...data.items);
+    if (onPage) onPage(data.items);
+    cursor = data.next_cursor;
+  } while (cursor);
+  return items;
+};
+
 export const searchAPI = {
   semanticSearch: (question) => api.post('/search', { question }),
   dbpediaSearch: (text) => api.post('/dbpedia/search', { text }),
@@ -45,7 +58,7 @@ export const eventsAPI = {
 
 export const personnesAPI = {
   // Récupérer toutes les personnes
-  getAll: () => api.get('/personnes'),
+  getAll: (params = {}) => api.get('/personnes', { params }),
   
   // Récupérer une personne spécifique par ID
   getById: (id) => api.get(`/personnes/${id}`),
@@ -54,10 +67,10 @@ export const personnesAPI = {
   search: (filters) => api.post('/personnes/search', filters),
   
   // Récupérer tous les étudiants
-  getEtudiants: () => api.get('/personnes/etudiants'),
+  getEtudiants: (params = {}) => api.get('/personnes/etudiants', { params }),
   
   // Récupérer tous les enseignants
-  getEnseignants: () => api.get('/personnes/enseignants'),
+  getEnseignants: (params = {}) => api.get('/personnes/enseignants', { params }),
   
   // Récupérer les cours d'une personne
   getCoursByPersonne: (id) => api.get(`/personnes/${id}/cours`),
@@ -89,7 +102,7 @@ export const personnesAPI = {
 // NEW: Specialité API endpoints
 export const specialitesAPI = {
   // Récupérer toutes les spécialités
-  getAll: () => api.get('/specialites'),
+  getAll: (params = {}) => api.get('/specialites', { params }),
   
   // Récupérer une spécialité spécifique par ID
   getById: (id) => api.get(`/specialites/${id}`),
@@ -141,7 +154,7 @@ export const specialitesAPI = {
 // NEW: Université API endpoints
 export const universitesAPI = {
   // Récupérer toutes les universités
-  getAll: () => api.get('/universites'),
+  getAll: (params = {}) => api.get('/universites', { params }),
   
   // Récupérer une université spécifique par ID
   getById: (id) => api.get(`/universites/${id}`),
@@ -253,7 +266,7 @@ export const healthAPI = {
 
 // Cours API endpoints
 export const coursAPI = {
-  getAll: () => api.get('/cours'),
+  getAll: (params = {}) => api.get('/cours', { params }),
   getById: (id) => api.get(`/cours/${id}`),
   search: (filters) => api.post('/cours/search', filters),
   create: (data) => api.post('/cours', data),
@@ -269,7 +282,7 @@ export const coursAPI = {
 
 // Competences API endpoints
 export const competencesAPI = {
-  getAll: () => api.get('/competences'),
+  getAll: (params = {}) => api.get('/competences', { params }),
   getById: (id) => api.get(`/competences/${id}`),
   search: (filters) => api.post('/competences/search', filters),
   create: (data) => api.post('/competences', data),
@@ -285,7 +298,7 @@ export const competencesAPI = {
 
   // Projets Academiques API endpoints
 export const projetsAPI = {
-  getAll: () => api.get('/projets-academiques'),
+  getAll: (params = {}) => api.get('/projets-academiques', { params }),
   getById: (id) => api.get(`/projets-academiques/${id}`),
   search: (filters) => api.post('/projets-academiques/search', filters),
   create: (data) => api.post('/projets-academiques', data),
@@ -299,7 +312,7 @@ export const projetsAPI = {
 
 // Ressources Pedagogiques API endpoints
 export const ressourcesAPI = {
-  getAll: () => api.get('/ressources-pedagogiques'),
+  getAll: (params = {}) => api.get('/ressources-pedagogiques', { params }),
   getById: (id) => api.get(`/ressources-pedagogiques/${id}`),
   search: (filters) => api.post('/ressources-pedagogiques/search', filters),
   create: (data) => api.post('/ressources-pedagogiques', data),
@@ -315,7 +328,7 @@ export const ressourcesAPI = {
 
 // Technologies Educatives API endpoints
 export const technologiesAPI = {
-  getAll: () => api.get('/technologies-educatives'),
+  getAll: (params = {}) => api.get('/technologies-educatives', { params }),
   getById: (id) => api.get(`/technologies-educatives/${id}`),
   search: (filters) => api.post('/technologies-educatives/search', filters),
   create: (data) => api.post('/technologies-educatives', data),
@@ -331,7 +344,7 @@ export const technologiesAPI = {
 
 // Evaluations API endpoints
 export const evaluationsAPI = {
-  getAll: () => api.get('/evaluations'),
+  getAll: (params = {}) => api.get('/evaluations', { params }),
   getById: (id) => api.get(`/evaluations/${id}`),
   search: (filters) => api.post('/evaluations/search', filters),
   create: (data) => api.post('/evaluations', data),
@@ -347,7 +360,7 @@ export const evaluationsAPI = {
 
 // Orientations Academiques API endpoints
 export const orientationsAPI = {
-  getAll: () => api.get('/orientations-academiques'),
+  getAll: (params = {}) => api.get('/orientations-academiques', { params }),
   getById: (id) => api.get(`/orientations-academiques/${id}`),
   search: (filters) => api.post('/orientations-academiques/search', filters),
   create: (data) => api.post('/orientations-academiques', data),
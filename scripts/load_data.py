@@ -1,7 +1,46 @@
-from rdflib import Graph
-import requests
+"""Chargement de l'ontologie dans Fuseki.
+
+Le fichier RDF est lu une seule fois, en flux : les triplets sont regroupés
+en lots N-Triples envoyés en parallèle sur un pool de connexions. Chaque lot
+terminé est noté dans un fichier de reprise ; relancé après une
+interruption, le script reprend là où il s'était arrêté.
+
+Avec --sync, le dataset n'est pas vidé : seules les différences entre le
+fichier et la dernière version synchronisée sont appliquées (DELETE DATA /
+INSERT DATA), les écritures faites par l'API sont conservées.
+
+Après un chargement ou une synchronisation, l'API (API_URL) est prévenue
+par POST /api/cache/refresh : sans cela, elle servirait les anciennes
+données jusqu'à son redémarrage.
+
+Avec --profile, rien n'est chargé : le fichier (ou, avec --live, le
+dataset) est décrit par un rapport JSON — instances par classe,
+cardinalités des propriétés, types de littéraux. Après un chargement, le
+profil de Fuseki est comparé à celui du fichier.
+
+    python load_data.py [fichier] [--chunk-size 50000] [--workers 4] [--restart]
+    python load_data.py [fichier] --sync [--prune]
+    python load_data.py [fichier] --profile [--live] [--report profil.json]
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import queue
+import threading
 import time
-import sys
+from collections import Counter, defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+from rdflib import BNode, Graph, Literal, OWL, RDF, RDFS, URIRef
+from rdflib.compare import to_canonical_graph
+from rdflib.parser import create_input_source
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+from rdflib.plugins.parsers.rdfxml import RDFXMLParser
 
 # Configuration Fuseki
 FUSEKI_ENDPOINT = "http://localhost:3030"
@@ -9,6 +48,20 @@ FUSEKI_DATASET = "educationInfin"
 FUSEKI_DATA = f"{FUSEKI_ENDPOINT}/{FUSEKI_DATASET}/data"
 FUSEKI_UPDATE = f"{FUSEKI_ENDPOINT}/{FUSEKI_DATASET}/update"
 FUSEKI_QUERY = f"{FUSEKI_ENDPOINT}/{FUSEKI_DATASET}/query"
+# API à prévenir après un chargement : ses caches et index dérivés ne voient pas les écritures faites ici
+API_ENDPOINT = os.getenv('API_URL', 'http://localhost:5000')
+API_REFRESH = f"{API_ENDPOINT}/api/cache/refresh"
+
+DEFAULT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'educationInfin.rdf')
+# Triplets par lot envoyé à Fuseki
+CHUNK_SIZE = int(os.getenv('LOAD_CHUNK_SIZE', '50000'))
+# Envois simultanés (taille du pool de connexions)
+WORKERS = int(os.getenv('LOAD_WORKERS', '4'))
+UPLOAD_TIMEOUT = 120
+# Structures à nœuds anonymes par requête : les parseurs SPARQL récursifs (rdflib)
+# n'acceptent que quelques dizaines d'opérations dans une même requête
+BLANK_STRUCTURES_PER_UPDATE = 16
+MAX_RETRIES = 3
 
 def test_fuseki_connection():
     """Tester la connexion à Fuseki"""
@@ -24,6 +77,18 @@ def test_fuseki_connection():
         print(f"✗ Impossible de se connecter à Fuseki: {str(e)}")
         return False
 
+def refresh_api():
+    """Prévenir l'API que le dataset a changé (caches vidés, index recalculés, ETags renouvelés)"""
+    try:
+        response = requests.post(API_REFRESH, timeout=30)
+        response.raise_for_status()
+        print(f"✓ API rafraîchie (version du jeu de données: {response.json()['dataset_version']})")
+        return True
+    except (requests.RequestException, ValueError, KeyError) as e:
+        print(f"⚠️  Impossible de rafraîchir l'API ({API_REFRESH}): {str(e)}")
+        print("   Si elle est démarrée, redémarrez-la pour qu'elle serve les nouvelles données.")
+        return False
+
 def clear_dataset():
     """Vider le dataset avant de charger les nouvelles données"""
     try:
@@ -43,410 +108,864 @@ def clear_dataset():
         print(f"✗ Erreur lors du vidage: {str(e)}")
         return False
 
-def analyze_rdf_file(file_path):
-    """Analyser le fichier RDF avant chargement pour voir ce qui est présent"""
-    try:
-        print("\n📋 Analyse du fichier RDF avant chargement...")
-        g = Graph()
-        g.parse(file_path, format="xml")
-        print(f"✓ Fichier RDF parsé: {len(g)} triplets trouvés")
-        
-        # Analyser les types d'entités présents
-        ontology_prefix = "http://www.education-intelligente.org/ontologie#"
-        entity_types_map = {
-            "Personnes": f"{ontology_prefix}Personne",
-            "Universites": f"{ontology_prefix}Universite",
-            "Specialites": f"{ontology_prefix}Specialite",
-            "Cours": f"{ontology_prefix}Cours",
-            "Competences": f"{ontology_prefix}Competence",
-            "ProjetsAcademiques": f"{ontology_prefix}ProjetAcademique",
-            "RessourcesPedagogiques": f"{ontology_prefix}RessourcePedagogique",
-            "TechnologiesEducatives": f"{ontology_prefix}TechnologieEducative",
-            "Evaluations": f"{ontology_prefix}Evaluation",
-            "OrientationsAcademiques": f"{ontology_prefix}OrientationAcademique"
+ONTOLOGY_PREFIX = "http://www.education-intelligente.org/ontologie#"
+ENTITY_TYPES = {
+    "Personnes": "Personne",
+    "Universites": "Universite",
+    "Specialites": "Specialite",
+    "Cours": "Cours",
+    "Competences": "Competence",
+    "ProjetsAcademiques": "ProjetAcademique",
+    "RessourcesPedagogiques": "RessourcePedagogique",
+    "TechnologiesEducatives": "TechnologieEducative",
+    "Evaluations": "Evaluation",
+    "OrientationsAcademiques": "OrientationAcademique"
+}
+
+class LoadError(Exception):
+    """Échec d'un lot après toutes ses tentatives"""
+
+def nt_term(term):
+    """Terme rdflib au format N-Triples (n3() peut produire des littéraux entre triples guillemets)"""
+    if isinstance(term, Literal):
+        text = '"' + (str(term).replace('\\', '\\\\').replace('"', '\\"')
+                      .replace('\n', '\\n').replace('\r', '\\r')) + '"'
+        if term.language:
+            return f"{text}@{term.language}"
+        if term.datatype:
+            return f"{text}^^<{term.datatype}>"
+        return text
+    return term.n3()
+
+def nt_line(s, p, o):
+    return f"{nt_term(s)} {nt_term(p)} {nt_term(o)} .\n"
+
+XSD_STRING = "http://www.w3.org/2001/XMLSchema#string"
+RDF_LANG_STRING = "http://www.w3.org/1999/02/22-rdf-syntax-ns#langString"
+
+# Une seule requête d'agrégats : combinaisons de types par sujet, arêtes
+# rdfs:subClassOf, cardinalités et genres d'objets par propriété
+PROFILE_QUERY = """
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+SELECT ?section ?key ?value ?n ?subjects ?min ?max WHERE {
+  { SELECT ("types" AS ?section) ?value (COUNT(*) AS ?n) WHERE {
+      SELECT ?s (GROUP_CONCAT(STR(?class); separator=" ") AS ?value) WHERE { ?s a ?class } GROUP BY ?s
+    } GROUP BY ?value }
+  UNION
+  { SELECT ("subClassOf" AS ?section) ?key ?value WHERE { ?key rdfs:subClassOf ?value FILTER(isIRI(?value)) } }
+  UNION
+  { SELECT ("property" AS ?section) ?key (SUM(?c) AS ?n) (COUNT(?s) AS ?subjects) (MIN(?c) AS ?min) (MAX(?c) AS ?max) WHERE {
+      SELECT ?key ?s (COUNT(*) AS ?c) WHERE { ?s ?key ?o } GROUP BY ?key ?s
+    } GROUP BY ?key }
+  UNION
+  { SELECT ("objects" AS ?section) ?key ?value (COUNT(*) AS ?n) WHERE {
+      ?s ?key ?o
+      BIND(IF(isIRI(?o), "iri", IF(isBlank(?o), "bnode", STR(DATATYPE(?o)))) AS ?value)
+    } GROUP BY ?key ?value }
+}
+"""
+
+def object_kind(o):
+    """"iri", "bnode" ou le datatype du littéral (comme DATATYPE() en SPARQL 1.1)"""
+    if isinstance(o, BNode):
+        return "bnode"
+    if not isinstance(o, Literal):
+        return "iri"
+    if o.language:
+        return RDF_LANG_STRING
+    return str(o.datatype or XSD_STRING)
+
+class DatasetProfile:
+    """Profil d'un jeu de données : classes, propriétés et types de littéraux.
+
+    Calculé en une passe sur les triplets du fichier (puits de parse_stream
+    ou observateur de TripleChunker), ou avec PROFILE_QUERY sur Fuseki.
+    Les deux aboutissent aux mêmes histogrammes ; les effectifs par classe,
+    sous-classes comprises, en sont déduits sans requête rdfs:subClassOf*.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.triples = 0
+        self.type_sets = defaultdict(int)          # frozenset(classes) -> sujets
+        self.subclass_of = set()                   # (sous-classe, classe)
+        self.properties = {}                       # prédicat -> triples, subjects, min, max
+        self.objects = defaultdict(Counter)        # prédicat -> genre d'objet -> triplets
+        # Accumulateurs de la passe sur le fichier, réduits par close()
+        self._types = defaultdict(set)
+        self._per_subject = defaultdict(Counter)
+        self._subject_ids = {}
+
+    @classmethod
+    def from_file(cls, file_path):
+        profile = cls(file_path)
+        parse_stream(file_path, profile)
+        return profile
+
+    @classmethod
+    def from_live(cls):
+        response = requests.get(FUSEKI_QUERY, params={'query': PROFILE_QUERY},
+                                headers={'Accept': 'application/sparql-results+json'}, timeout=UPLOAD_TIMEOUT)
+        response.raise_for_status()
+        profile = cls(FUSEKI_QUERY)
+        for row in response.json()['results']['bindings']:
+            value = lambda name: row[name]['value'] if name in row else None
+            section, key = value('section'), value('key')
+            if section == 'types':
+                profile.type_sets[frozenset(value('value').split())] += int(value('n'))
+            elif section == 'subClassOf':
+                profile.subclass_of.add((key, value('value')))
+            elif section == 'property':
+                profile.properties[key] = {name: int(value(name)) for name in ('subjects', 'min', 'max')}
+                profile.properties[key]['triples'] = int(value('n'))
+                profile.triples += int(value('n'))
+            elif section == 'objects':
+                profile.objects[key][value('value')] += int(value('n'))
+        return profile
+
+    # RDFXMLParser
+    def add(self, triple):
+        self.observe(*triple)
+
+    def bind(self, prefix, namespace, override=True, replace=False):
+        pass
+
+    # W3CNTriplesParser
+    def triple(self, s, p, o):
+        self.observe(s, p, o)
+
+    def observe(self, s, p, o):
+        self.triples += 1
+        if p == RDF.type and isinstance(o, URIRef):
+            self._types[s].add(str(o))
+        elif p == RDFS.subClassOf and isinstance(o, URIRef):
+            self.subclass_of.add((str(s), str(o)))
+        subject = self._subject_ids.setdefault(s, len(self._subject_ids))
+        self._per_subject[str(p)][subject] += 1
+        self.objects[str(p)][object_kind(o)] += 1
+
+    def close(self):
+        for classes in self._types.values():
+            self.type_sets[frozenset(classes)] += 1
+        for predicate, counts in self._per_subject.items():
+            values = counts.values()
+            self.properties[predicate] = {'triples': sum(values), 'subjects': len(counts),
+                                          'min': min(values), 'max': max(values)}
+        self._types, self._per_subject, self._subject_ids = defaultdict(set), defaultdict(Counter), {}
+
+    def class_counts(self):
+        """{classe: (instances directes, instances sous-classes comprises)}"""
+        parents = defaultdict(set)
+        for subclass, cls in self.subclass_of:
+            parents[subclass].add(cls)
+        closures = {}
+
+        def closure(cls):
+            if cls not in closures:
+                seen, pending = set(), [cls]
+                while pending:
+                    current = pending.pop()
+                    if current not in seen:
+                        seen.add(current)
+                        pending.extend(parents.get(current, ()))
+                closures[cls] = seen
+            return closures[cls]
+
+        direct, instances = Counter(), Counter()
+        for classes, subjects in self.type_sets.items():
+            ancestors = set()
+            for cls in classes:
+                direct[cls] += subjects
+                ancestors |= closure(cls)
+            for cls in ancestors:
+                instances[cls] += subjects
+        return {cls: (direct[cls], instances[cls]) for cls in instances}
+
+    def to_dict(self):
+        """Rapport JSON : instances par classe, cardinalités des propriétés, types de littéraux"""
+        classes = sorted(self.class_counts().items(), key=lambda item: (-item[1][1], item[0]))
+        literals = Counter()
+        properties = {}
+        for predicate, stats in sorted(self.properties.items()):
+            kinds = self.objects.get(predicate, Counter())
+            datatypes = {kind: n for kind, n in kinds.items() if kind not in ('iri', 'bnode')}
+            literals.update(datatypes)
+            properties[predicate] = {
+                **stats,
+                'avg': round(stats['triples'] / stats['subjects'], 3) if stats['subjects'] else 0,
+                'objects': {'iri': kinds.get('iri', 0), 'bnode': kinds.get('bnode', 0),
+                            'literal': sum(datatypes.values())},
+                'datatypes': dict(sorted(datatypes.items())),
+            }
+        return {
+            'source': self.source,
+            'triples': self.triples,
+            'typed_subjects': sum(self.type_sets.values()),
+            'classes': {cls: {'direct': direct, 'instances': instances} for cls, (direct, instances) in classes},
+            'properties': properties,
+            'literals': dict(literals.most_common()),
         }
-        
-        print("\n📊 Entités trouvées dans le fichier RDF:")
+
+    def report(self, title):
+        print(f"\n📊 {title}:")
         print("-" * 60)
-        
-        for entity_name, class_uri in entity_types_map.items():
-            # Use rdfs:subClassOf* to include all subclasses
-            query = f"""
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            SELECT (COUNT(DISTINCT ?s) as ?count) WHERE {{
-                ?s a ?type .
-                ?type rdfs:subClassOf* <{class_uri}> .
-            }}
-            """
-            try:
-                result = list(g.query(query))
-                count = int(result[0][0]) if result else 0
-                if count > 0:
-                    print(f"  ✓ {entity_name:30s}: {count:3d} entité(s)")
-                else:
-                    print(f"  ✗ {entity_name:30s}: {count:3d} entité(s)")
-            except Exception as e:
-                # Fallback: try direct type check
-                query = f"""
-                SELECT (COUNT(DISTINCT ?s) as ?count) WHERE {{
-                    ?s a <{class_uri}> .
-                }}
-                """
-                result = list(g.query(query))
-                count = int(result[0][0]) if result else 0
-                print(f"  ? {entity_name:30s}: {count:3d} entité(s) (fallback)")
-        
+        counts = self.class_counts()
+        for entity_name, class_name in ENTITY_TYPES.items():
+            count = counts.get(ONTOLOGY_PREFIX + class_name, (0, 0))[1]
+            mark = "✓" if count > 0 else "✗"
+            print(f"  {mark} {entity_name:30s}: {count:3d} entité(s)")
         print("-" * 60)
-        return g
-        
-    except Exception as e:
-        print(f"✗ Erreur lors de l'analyse: {str(e)}")
-        return None
 
-def load_ontology_to_fuseki_batch(file_path):
-    """Charger l'ontologie en utilisant l'upload direct par fichier"""
-    try:
-        print("\nChargement du fichier RDF...")
-        
-        # Charger le fichier RDF
-        g = Graph()
-        g.parse(file_path, format="xml")
-        print(f"✓ Ontologie chargée: {len(g)} triplets trouvés")
-        
-        # Sauvegarder temporairement le graphe
-        temp_file = "temp_ontology.ttl"
-        g.serialize(temp_file, format="turtle")
-        
-        # Vérifier que le fichier temporaire contient bien des données
-        import os
-        file_size = os.path.getsize(temp_file)
-        print(f"✓ Fichier temporaire créé ({file_size:,} bytes)")
-        
-        if file_size < 1000:
-            print("⚠️  ATTENTION: Le fichier temporaire est très petit, il pourrait y avoir un problème de conversion!")
-        
-        # Upload direct du fichier vers Fuseki
-        with open(temp_file, 'rb') as f:
-            headers = {'Content-Type': 'text/turtle'}
-            print(f"Upload du fichier vers Fuseki ({file_size:,} bytes)...")
-            response = requests.post(FUSEKI_DATA, data=f, headers=headers, timeout=120)
-            
-        if response.status_code in [200, 201, 204]:
-            print("✓ Données chargées avec succès via upload direct")
-            
-            # Attendre un peu pour que Fuseki indexe les données
-            print("Attente de l'indexation Fuseki (3 secondes)...")
-            time.sleep(3)
-            
-            # Nettoyer le fichier temporaire
-            import os
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-                print("✓ Fichier temporaire supprimé")
-                
-            return True
-        else:
-            print(f"✗ Erreur lors de l'upload: {response.status_code}")
-            print(f"  Réponse: {response.text[:500] if response.text else 'Aucune réponse'}")
-            return False
-            
-    except Exception as e:
-        print(f"✗ Erreur lors du chargement: {str(e)}")
-        return False
+class TripleChunker:
+    """Puits des parseurs rdflib : regroupe les triplets en lots N-Triples numérotés.
 
-def load_ontology_to_fuseki_sparql(file_path):
-    """Charger l'ontologie en utilisant SPARQL INSERT (méthode alternative)"""
-    try:
-        print("Chargement du fichier RDF pour méthode SPARQL...")
-        
-        g = Graph()
-        g.parse(file_path, format="xml")
-        print(f"✓ Ontologie chargée: {len(g)} triplets trouvés")
-        
-        # Convertir en format N-Triples pour INSERT
-        # Note: Pour de gros fichiers, on doit faire par lots
-        print("Conversion en format N-Triples...")
-        ntriples_data = g.serialize(format='nt')
-        
-        # Vérifier la taille des données
-        data_size = len(ntriples_data.encode('utf-8'))
-        print(f"✓ Données N-Triples: {data_size:,} bytes")
-        
-        # Si c'est trop gros, on utilise LOAD au lieu de INSERT DATA
-        if data_size > 10000000:  # > 10MB
-            print("⚠️  Fichier volumineux détecté, utilisation de LOAD...")
-            # Sauvegarder en fichier temporaire et utiliser LOAD
-            temp_file = "temp_ontology.nt"
-            with open(temp_file, 'wb') as f:
-                f.write(ntriples_data.encode('utf-8'))
-            
-            # Upload du fichier d'abord
-            with open(temp_file, 'rb') as f:
-                headers = {'Content-Type': 'application/n-triples'}
-                response = requests.post(FUSEKI_DATA, data=f, headers=headers, timeout=120)
-            
-            # Nettoyer
-            import os
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-            
-            if response.status_code in [200, 201, 204]:
-                print("✓ Données chargées avec succès via upload N-Triples")
-                time.sleep(3)  # Attendre l'indexation
-                return True
-            else:
-                print(f"✗ Erreur upload N-Triples: {response.status_code}")
-                return False
-        else:
-            # Préparer la requête INSERT
-            insert_query = f"""
-            INSERT DATA {{
-                {ntriples_data}
-            }}
-            """
-            
-            headers = {'Content-Type': 'application/sparql-update'}
-            print("Envoi de la requête SPARQL INSERT...")
-            response = requests.post(FUSEKI_UPDATE, data=insert_query.encode('utf-8'), headers=headers, timeout=180)
-            
-            if response.status_code in [200, 204]:
-                print("✓ Données chargées avec succès via SPARQL INSERT")
-                time.sleep(3)  # Attendre l'indexation
-                return True
-            else:
-                print(f"✗ Erreur SPARQL INSERT: {response.status_code}")
-                print(f"  Réponse: {response.text[:500] if response.text else 'Aucune réponse'}")
-                return False
-            
-    except Exception as e:
-        print(f"✗ Erreur lors du chargement SPARQL: {str(e)}")
-        return False
+    Le découpage ne dépend que du fichier et de la taille des lots, ce qui
+    permet de reconnaître les lots déjà chargés à la reprise (`skip`) sans
+    les sérialiser. Les triplets à nœud anonyme forment un dernier lot
+    unique : Fuseki attribue de nouveaux nœuds à chaque document reçu, un
+    même `_:b0` réparti sur deux lots deviendrait deux nœuds. Ce lot est
+    envoyé en requêtes SPARQL Update rejouables (`blank_updates`).
+    """
 
-def verify_data_loaded():
-    """Vérifier que les données sont bien chargées - Vérifie TOUS les types d'entités"""
-    try:
-        headers = {'Accept': 'application/json'}
-        ontology_prefix = "http://www.education-intelligente.org/ontologie#"
-        
-        # 1. Compter le total des triplets
-        test_query = """
-        PREFIX ont: <http://www.education-intelligente.org/ontologie#>
-        SELECT (COUNT(*) as ?count) WHERE { 
-            ?s ?p ?o 
+    def __init__(self, chunk_size, emit, skip, observers=()):
+        self.chunk_size = chunk_size
+        self.emit = emit
+        self.skip = skip
+        self.observers = observers
+        self.index = 0
+        self.lines = []
+        self.pending = 0
+        self.blank_triples = []
+        self.triples = 0
+
+    # RDFXMLParser
+    def add(self, triple):
+        self.triple(*triple)
+
+    def bind(self, prefix, namespace, override=True, replace=False):
+        pass
+
+    # W3CNTriplesParser
+    def triple(self, s, p, o):
+        self.triples += 1
+        for observer in self.observers:
+            observer.observe(s, p, o)
+        if isinstance(s, BNode) or isinstance(o, BNode):
+            self.blank_triples.append((s, p, o))
+            return
+        self.pending += 1
+        if not self.skip(self.index):
+            self.lines.append(nt_line(s, p, o))
+        if self.pending == self.chunk_size:
+            self._emit()
+
+    def _emit(self, update=False):
+        if not self.skip(self.index):
+            self.emit(self.index, self.lines, self.pending, update)
+        self.index += 1
+        self.lines = []
+        self.pending = 0
+
+    def close(self):
+        """Envoie le dernier lot incomplet puis celui des nœuds anonymes"""
+        if self.pending:
+            self._emit()
+        if self.blank_triples:
+            self.pending = len(self.blank_triples)
+            self.lines = [] if self.skip(self.index) else blank_updates(self.blank_triples)
+            self.blank_triples = []
+            self._emit(update=True)
+
+def parse_stream(file_path, sink):
+    """Lit le fichier triplet par triplet dans `sink` (RDF/XML et N-Triples sans graphe en mémoire)"""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.nt':
+        with open(file_path, 'rb') as f:
+            W3CNTriplesParser(sink).parse(f)
+    elif file_path.endswith('.nt.gz'):
+        with gzip.open(file_path, 'rb') as f:
+            W3CNTriplesParser(sink).parse(f)
+    elif extension in ('.rdf', '.owl', '.xml'):
+        RDFXMLParser().parse(create_input_source(source=file_path, format='xml'), sink)
+    else:
+        # Autres syntaxes (Turtle, JSON-LD...) : pas de parseur en flux, lecture en mémoire
+        for s, p, o in Graph().parse(file_path):
+            sink.triple(s, p, o)
+    sink.close()
+
+class Checkpoint:
+    """Lots déjà chargés, enregistrés après chaque envoi réussi.
+
+    Valable pour un fichier (chemin, taille, date) et une taille de lots
+    donnés. Un arrêt entre l'envoi d'un lot et sa notation fait renvoyer le
+    lot à la reprise : sans effet pour les lots N-Triples, les triplets
+    étant des ensembles ; le lot des nœuds anonymes, qui en créerait de
+    nouveaux, remplace chaque structure (DELETE WHERE puis INSERT DATA).
+    """
+
+    def __init__(self, path, file_path, chunk_size):
+        self.path = path
+        stat = os.stat(file_path)
+        self.signature = {
+            "file": os.path.abspath(file_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "chunk_size": chunk_size
         }
-        """
-        response = requests.get(FUSEKI_QUERY, params={'query': test_query}, headers=headers, timeout=30)
-        
-        if response.status_code == 200:
-            data = response.json()
-            count = data['results']['bindings'][0]['count']['value']
-            print(f"✓ Total des triplets dans Fuseki: {count}")
-        else:
-            print(f"✗ Impossible de compter les triplets: {response.status_code}")
+        self.done = set()
+        self.triples = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        """True si une reprise est possible pour ce fichier"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
             return False
-        
-        # 2. Vérifier tous les types d'entités
-        entity_types = {
-            "Personnes": [
-                "ont:Personne", "ont:Etudiant", "ont:Enseignant", "ont:Professeur",
-                "ont:Assistant", "ont:Encadrant", "ont:EtudiantLicence",
-                "ont:EtudiantMaster", "ont:EtudiantDoctorat"
-            ],
-            "Universites": ["ont:Universite", "ont:UniversitePublique", "ont:UniversitePrivee"],
-            "Specialites": ["ont:Specialite", "ont:SpecialiteInformatique", "ont:SpecialiteEconomie",
-                           "ont:SpecialiteDroit", "ont:SpecialiteLettres", "ont:SpecialiteSciences",
-                           "ont:SpecialiteMedecine", "ont:SpecialiteIngenierie"],
-            "Cours": ["ont:Cours", "ont:CoursTheorique", "ont:CoursPratique", "ont:CoursDirige",
-                     "ont:CoursEnLigne", "ont:CoursObligatoire", "ont:CoursOptionnel"],
-            "Competences": ["ont:Competence", "ont:CompetenceTechnique", "ont:CompetenceLinguistique",
-                           "ont:CompetenceMethodologique", "ont:CompetenceRecherche",
-                           "ont:CompetenceTransversale"],
-            "ProjetsAcademiques": ["ont:ProjetAcademique", "ont:ProjetDeFinDEtudes", "ont:MemoireDeMaster",
-                                   "ont:ProjetDeRecherche", "ont:ProjetCollaboratif", "ont:TheseDoctorale"],
-            "RessourcesPedagogiques": ["ont:RessourcePedagogique", "ont:ArticleScientifique", "ont:Livre",
-                                      "ont:VideoCours", "ont:SupportCours", "ont:PlateformeEnLigne",
-                                      "ont:OutilInteractif"],
-            "TechnologiesEducatives": ["ont:TechnologieEducative", "ont:PlateformeLMS", "ont:MOOCPlatform",
-                                      "ont:ApplicationMobileEducative", "ont:OutilIAEducatif",
-                                      "ont:SeriousGame", "ont:RealiteVirtuelleEducative"],
-            "Evaluations": ["ont:Evaluation", "ont:ControleContinu", "ont:ExamenFinal", "ont:QuizEnLigne",
-                           "ont:RapportDeStage", "ont:Soutenance", "ont:ProjetEvalue"],
-            "OrientationsAcademiques": ["ont:OrientationAcademique", "ont:ConseilOrientation",
-                                        "ont:EntretienConseiller", "ont:PlanDeCarriere",
-                                        "ont:SalonEtudiant", "ont:StageOrientation", "ont:TestPsychometrique"]
-        }
-        
-        print("\n📊 Vérification des entités par type:")
-        print("-" * 60)
-        
-        all_loaded = True
-        total_entities = 0
-        
-        for entity_type_name, ontology_classes in entity_types.items():
-            # Try using rdfs:subClassOf* first (more efficient and includes all subclasses)
-            base_class = ontology_classes[0] if ontology_classes else None
-            if base_class:
-                # Extract base class name (remove "ont:" prefix)
-                base_class_name = base_class.replace("ont:", "")
-                base_class_uri = f"{ontology_prefix.replace('#', '')}#{base_class_name}"
-                
-                count_query = f"""
-                PREFIX ont: <{ontology_prefix.replace('#', '')}#>
-                PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-                PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-                SELECT (COUNT(DISTINCT ?s) as ?count) WHERE {{
-                    ?s a ?type .
-                    ?type rdfs:subClassOf* <{base_class_uri}> .
-                }}
-                """
-            else:
-                # Fallback: Créer une requête UNION pour compter toutes les sous-classes
-                union_parts = " UNION ".join([f"{{ ?s a {cls} }}" for cls in ontology_classes])
-                
-                count_query = f"""
-                PREFIX ont: <{ontology_prefix.replace('#', '')}#>
-                SELECT (COUNT(DISTINCT ?s) as ?count) WHERE {{
-                    {union_parts}
-                }}
-                """
-            
+        if state.get("signature") != self.signature:
+            return False
+        self.done = set(state.get("done", []))
+        self.triples = state.get("triples", 0)
+        return True
+
+    def mark(self, index, triples):
+        with self._lock:
+            self.done.add(index)
+            self.triples += triples
+            self._save()
+
+    def start(self):
+        with self._lock:
+            self.done, self.triples = set(), 0
+            self._save()
+
+    def _save(self):
+        temp = self.path + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump({"signature": self.signature, "done": sorted(self.done), "triples": self.triples}, f)
+        os.replace(temp, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class ChunkUploader:
+    """Envoi des lots à Fuseki par plusieurs threads sur un pool de connexions keep-alive.
+
+    Les lots sont ajoutés (POST N-Triples) au graphe par défaut via le
+    protocole Graph Store ; si le point /data n'est pas disponible, ils
+    passent par INSERT DATA sur /update. Le lot des nœuds anonymes est une
+    liste de requêtes SPARQL Update, envoyées à la suite sur /update.
+    """
+
+    def __init__(self, checkpoint, workers=WORKERS):
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.method = 'gsp'
+        self.queue = queue.Queue(maxsize=workers * 2)
+        self.failed = threading.Event()
+        self.error = None
+        self._lock = threading.Lock()
+        self.uploaded = 0
+        self.started = None
+        self.threads = []
+
+    def start(self):
+        self.started = time.monotonic()
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'upload-{number}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, index, lines, triples, update=False):
+        """Ajoute un lot à la file (bloque si elle est pleine : la lecture attend les envois)"""
+        body = lines if update else ''.join(lines).encode('utf-8')
+        while True:
+            if self.failed.is_set():
+                raise LoadError(self.error)
+            try:
+                self.queue.put((index, body, triples, update), timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def close(self):
+        """Attend la fin des envois ; lève LoadError si un lot a échoué"""
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.session.close()
+        if self.failed.is_set():
+            raise LoadError(self.error)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.failed.is_set():
+                continue
+            index, body, triples, update = item
             try:
-                response = requests.get(FUSEKI_QUERY, params={'query': count_query}, headers=headers, timeout=30)
-                if response.status_code == 200:
-                    data = response.json()
-                    entity_count = int(data['results']['bindings'][0]['count']['value'])
-                    total_entities += entity_count
-                    
-                    if entity_count > 0:
-                        print(f"✓ {entity_type_name:30s}: {entity_count:3d} entité(s)")
-                    else:
-                        print(f"✗ {entity_type_name:30s}: {entity_count:3d} entité(s) - MANQUANT!")
-                        all_loaded = False
+                if update:
+                    for operation in body:
+                        post_update(self.session, operation)
                 else:
-                    print(f"✗ {entity_type_name:30s}: Erreur de requête ({response.status_code})")
-                    all_loaded = False
+                    self._upload(body)
             except Exception as e:
-                print(f"✗ {entity_type_name:30s}: Erreur - {str(e)}")
-                all_loaded = False
-        
-        print("-" * 60)
-        print(f"📈 Total des entités chargées: {total_entities}")
-        
-        # Vérifier quelques entités spécifiques pour debug
-        print("\n🔍 Vérification de quelques entités spécifiques:")
-        specific_checks = [
-            ("Cours (IntroductionIA)", "Cours", "IntroductionIA"),
-            ("Competence (Python)", "Competence", "Competence_Python"),
-            ("Projet (PFE)", "ProjetAcademique", "Projet_PFE"),
-            ("Ressource (Livre)", "RessourcePedagogique", "Livre"),
-            ("Technologie (Moodle)", "TechnologieEducative", "Moodle"),
-            ("Evaluation (Controle)", "Evaluation", "Controle"),
-            ("Orientation (Conseil)", "OrientationAcademique", "Conseil")
-        ]
-        
-        for check_name, class_type, search_term in specific_checks:
-            # Use subClassOf* to include all subclasses
-            class_uri = f"{ontology_prefix.replace('#', '')}#{class_type}"
-            check_query = f"""
-            PREFIX ont: <{ontology_prefix.replace('#', '')}#>
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            SELECT ?s WHERE {{
-                ?s a ?type .
-                ?type rdfs:subClassOf* <{class_uri}> .
-                FILTER(CONTAINS(STR(?s), "{search_term}"))
-            }}
-            LIMIT 1
-            """
-            
+                with self._lock:
+                    self.error = self.error or f"lot {index}: {str(e)}"
+                self.failed.set()
+                continue
+            self.checkpoint.mark(index, triples)
+            with self._lock:
+                self.uploaded += triples
+                rate = self.uploaded / max(time.monotonic() - self.started, 1e-6)
+                print(f"  ✓ Lot {index}: {triples:,} triplets ({self.uploaded:,} envoyés, {rate:,.0f} triplets/s)")
+
+    def _upload(self, body):
+        error = None
+        for attempt in range(MAX_RETRIES):
             try:
-                response = requests.get(FUSEKI_QUERY, params={'query': check_query}, headers=headers, timeout=30)
-                if response.status_code == 200:
-                    data = response.json()
-                    if len(data['results']['bindings']) > 0:
-                        print(f"  ✓ {check_name} trouvé")
-                    else:
-                        print(f"  ✗ {check_name} non trouvé")
-            except Exception as e:
-                print(f"  ✗ {check_name} erreur: {str(e)}")
-        
-        # Additional check: Count all NamedIndividuals
-        print("\n🔍 Vérification des NamedIndividuals (toutes les instances):")
-        named_individuals_query = """
-        PREFIX owl: <http://www.w3.org/2002/07/owl#>
-        PREFIX rdf: <http://www.w3.org/1999/02/22/rdf-syntax-ns#>
-        SELECT (COUNT(DISTINCT ?s) as ?count) WHERE {
-            ?s a owl:NamedIndividual .
-        }
-        """
+                if self.method == 'gsp':
+                    response = self.session.post(
+                        FUSEKI_DATA, data=body, timeout=UPLOAD_TIMEOUT,
+                        headers={'Content-Type': 'application/n-triples; charset=utf-8'}
+                    )
+                    if response.status_code in (404, 405, 415):
+                        print(f"⚠️  Upload direct refusé ({response.status_code}), passage à SPARQL INSERT DATA")
+                        self.method = 'update'
+                        continue
+                else:
+                    response = self.session.post(
+                        FUSEKI_UPDATE, data=b"INSERT DATA {\n" + body + b"}", timeout=UPLOAD_TIMEOUT,
+                        headers={'Content-Type': 'application/sparql-update; charset=utf-8'}
+                    )
+                if response.status_code in (200, 201, 204):
+                    return
+                error = f"HTTP {response.status_code}: {response.text[:300]}"
+                if response.status_code < 500:
+                    raise LoadError(error)
+            except requests.RequestException as e:
+                error = str(e)
+            time.sleep(2 ** attempt)
+        raise LoadError(f"{error} (après {MAX_RETRIES} tentatives)")
+
+def load_file(file_path, checkpoint, chunk_size=CHUNK_SIZE, workers=WORKERS, observers=()):
+    """Lit le fichier une fois et charge ses lots manquants ; retourne (triplets lus, triplets envoyés)"""
+    uploader = ChunkUploader(checkpoint, workers)
+    chunker = TripleChunker(chunk_size, uploader.submit, lambda index: index in checkpoint.done, observers)
+    uploader.start()
+    try:
+        parse_stream(file_path, chunker)
+    finally:
+        # Même après une erreur de lecture : les lots déjà en file sont envoyés et notés
+        uploader.close()
+    return chunker.triples, uploader.uploaded
+
+def triple_digest(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+def blank_components(triples):
+    """Triplets à nœuds anonymes regroupés par structure (composantes reliées par ces nœuds)"""
+    parent = {}
+
+    def find(node):
+        while parent.setdefault(node, node) != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for s, p, o in triples:
+        if isinstance(s, BNode) and isinstance(o, BNode):
+            parent[find(s)] = find(o)
+    components = defaultdict(list)
+    for triple in triples:
+        s, p, o = triple
+        components[find(s if isinstance(s, BNode) else o)].append(triple)
+    return components.values()
+
+class CanonicalTriples:
+    """Puits des parseurs : chaque triplet sous forme canonique, avec son empreinte.
+
+    Un triplet sans nœud anonyme est transmis au fil de la lecture (ligne
+    N-Triples). Les triplets à nœuds anonymes sont transmis à la fin, par
+    structure : les nœuds sont renommés par rdflib.compare, si bien qu'une
+    même structure a la même empreinte quels que soient les identifiants
+    choisis par le parseur ou par Fuseki. `callback(digest, text, blank)`.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.blank = []
+
+    def add(self, triple):
+        self.triple(*triple)
+
+    def bind(self, prefix, namespace, override=True, replace=False):
+        pass
+
+    def triple(self, s, p, o):
+        if isinstance(s, BNode) or isinstance(o, BNode):
+            self.blank.append((s, p, o))
+            return
+        line = nt_line(s, p, o)
+        self.callback(triple_digest(line), line, False)
+
+    def observe(self, s, p, o):
+        self.triple(s, p, o)
+
+    def close(self):
+        for component in blank_components(self.blank):
+            graph = Graph()
+            for triple in component:
+                graph.add(triple)
+            triples = list(to_canonical_graph(graph))
+            digest = triple_digest(''.join(sorted(nt_line(*triple) for triple in triples)))
+            # Les libellés canoniques (cb0...) se répètent d'une structure à l'autre :
+            # préfixés par l'empreinte, ils ne se confondent pas dans un même document
+            tag = digest.hex()[:16]
+
+            def rename(term):
+                return BNode(f"s{tag}{term}") if isinstance(term, BNode) else term
+
+            text = ''.join(sorted(nt_line(*map(rename, triple)) for triple in triples))
+            self.callback(digest, text, True)
+        self.blank = []
+
+class Manifest:
+    """Copie canonique (N-Triples compressé) du fichier tel qu'il a été chargé ou synchronisé.
+
+    C'est la base de la synchronisation suivante : un triplet retiré du
+    fichier depuis est supprimé du dataset, un triplet ajouté par l'API
+    (absent du fichier) n'est pas touché. Le fichier n'est remplacé qu'une
+    fois le chargement ou la synchronisation terminés.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.temp = path + '.tmp'
+        self._file = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def read(self, callback):
+        # Les lignes sont déjà canoniques : seules celles à nœuds anonymes repassent par le parseur
+        sink = CanonicalTriples(callback)
+        blank = []
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                s, p, o = line.split(' ', 2)
+                if s.startswith('_:') or o.startswith('_:'):
+                    blank.append(line)
+                else:
+                    callback(triple_digest(line), line, False)
+        if blank:
+            W3CNTriplesParser(sink).parse(io.BytesIO(''.join(blank).encode('utf-8')))
+        sink.close()
+
+    def open(self):
+        self._file = gzip.open(self.temp, 'wt', encoding='utf-8')
+
+    def write(self, digest, text, blank):
+        self._file.write(text)
+
+    def writer(self):
+        """Puits (et observateur de TripleChunker) qui écrit la nouvelle version"""
+        self.open()
+        return CanonicalTriples(self.write)
+
+    def commit(self):
+        self._file.close()
+        os.replace(self.temp, self.path)
+
+    def discard(self):
+        if self._file is not None:
+            self._file.close()
+        if os.path.exists(self.temp):
+            os.remove(self.temp)
+
+def read_live(callback):
+    """Triplets du graphe par défaut de Fuseki, lus en flux (N-Triples)"""
+    sink = CanonicalTriples(callback)
+    with requests.get(FUSEKI_DATA, params={'default': ''}, headers={'Accept': 'application/n-triples'},
+                      stream=True, timeout=UPLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        W3CNTriplesParser(sink).parse(response.raw)
+    sink.close()
+
+def blank_pattern(text):
+    """Structure à nœuds anonymes -> motif où chaque nœud est une variable (DELETE WHERE)"""
+    patterns = []
+    for line in text.splitlines():
+        s, p, o = line.split(' ', 2)
+        o = o[:-2]  # " ."
+        patterns.append(' '.join('?' + term[2:] if term.startswith('_:') else term for term in (s, p, o)) + ' .')
+    return '\n'.join(patterns)
+
+def replace_structure(text):
+    """Ajout rejouable d'une structure à nœuds anonymes.
+
+    Le DELETE supprime la copie laissée par un envoi précédent :
+    INSERT DATA crée toujours de nouveaux nœuds anonymes.
+    """
+    return f"DELETE WHERE {{\n{blank_pattern(text)}\n}} ;\nINSERT DATA {{\n{text}}}"
+
+def blank_updates(triples):
+    """Triplets à nœuds anonymes -> requêtes qui remplacent chacune quelques structures.
+
+    Chaque structure est rejouable isolément : les requêtes peuvent être
+    renvoyées, dans une transaction chacune, sans créer de doublons.
+    """
+    structures = []
+    sink = CanonicalTriples(lambda digest, text, blank: structures.append(text))
+    for triple in triples:
+        sink.triple(*triple)
+    sink.close()
+    # Deux structures identiques se confondent : le DELETE de la seconde retirerait la première
+    structures = list(dict.fromkeys(structures))
+    return [" ;\n".join(replace_structure(text) for text in structures[start:start + BLANK_STRUCTURES_PER_UPDATE])
+            for start in range(0, len(structures), BLANK_STRUCTURES_PER_UPDATE)]
+
+def post_update(session, update):
+    error = None
+    for attempt in range(MAX_RETRIES):
         try:
-            response = requests.get(FUSEKI_QUERY, params={'query': named_individuals_query}, headers=headers, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                ni_count = int(data['results']['bindings'][0]['count']['value'])
-                print(f"  Total NamedIndividuals: {ni_count}")
-                if ni_count < 100:
-                    print(f"  ⚠️  ATTENTION: Moins de 100 entités trouvées! (Attendu: ~141)")
-        except Exception as e:
-            print(f"  ✗ Erreur comptage NamedIndividuals: {str(e)}")
-        
-        return all_loaded
-            
-    except Exception as e:
-        print(f"✗ Erreur de vérification: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return False
+            response = session.post(FUSEKI_UPDATE, data=update.encode('utf-8'), timeout=UPLOAD_TIMEOUT,
+                                    headers={'Content-Type': 'application/sparql-update; charset=utf-8'})
+            if response.status_code in (200, 204):
+                return
+            error = f"HTTP {response.status_code}: {response.text[:300]}"
+            if response.status_code < 500:
+                raise LoadError(error)
+        except requests.RequestException as e:
+            error = str(e)
+        time.sleep(2 ** attempt)
+    raise LoadError(f"{error} (après {MAX_RETRIES} tentatives)")
+
+def change_operations(deletes, inserts, chunk_size):
+    """Opérations SPARQL Update de la synchronisation, par lots de `chunk_size` triplets"""
+    operations = []
+
+    def batched(keyword, lines):
+        for start in range(0, len(lines), chunk_size):
+            operations.append((f"{keyword} {{\n{''.join(lines[start:start + chunk_size])}}}",
+                               len(lines[start:start + chunk_size])))
+
+    # Suppressions d'abord : une valeur modifiée ne coexiste jamais avec l'ancienne
+    batched("DELETE DATA", [text for text, blank in deletes if not blank])
+    for text, blank in deletes:
+        if blank:
+            operations.append((f"DELETE WHERE {{\n{blank_pattern(text)}\n}}", text.count('\n')))
+    for text, blank in inserts:
+        if blank:
+            operations.append((replace_structure(text), text.count('\n')))
+    batched("INSERT DATA", [text for text, blank in inserts if not blank])
+
+    if sum(size for _, size in operations) <= chunk_size:
+        # Petit changement : une seule requête, donc une seule transaction
+        return [" ;\n".join(operation for operation, _ in operations)] if operations else []
+    return [operation for operation, _ in operations]
+
+def sync_file(file_path, manifest, prune=False, chunk_size=CHUNK_SIZE):
+    """Applique au dataset les différences entre le fichier et sa dernière version synchronisée.
+
+    La base de comparaison est le manifeste ; sans manifeste (ou avec
+    prune=True) c'est le contenu actuel de Fuseki. Les suppressions ne sont
+    calculées que contre le manifeste, ou contre Fuseki avec prune=True
+    (le dataset devient alors exactement le fichier). Retourne
+    (triplets supprimés, triplets ajoutés).
+    """
+    base_reader = manifest.read if manifest.exists() and not prune else read_live
+    base = set()
+    base_reader(lambda digest, text, blank: base.add(digest))
+
+    inserts = []
+    manifest.open()
+
+    def compare(digest, text, blank):
+        manifest.write(digest, text, blank)
+        if digest in base:
+            base.discard(digest)
+        else:
+            inserts.append((text, blank))
+
+    try:
+        parse_stream(file_path, CanonicalTriples(compare))
+        deletes = []
+        if base and (base_reader == manifest.read or prune):
+            base_reader(lambda digest, text, blank: deletes.append((text, blank)) if digest in base else None)
+
+        with requests.Session() as session:
+            for update in change_operations(deletes, inserts, chunk_size):
+                post_update(session, update)
+    except Exception:
+        manifest.discard()
+        raise
+    manifest.commit()
+    return (sum(text.count('\n') for text, _ in deletes), sum(text.count('\n') for text, _ in inserts))
+
+def verify_data_loaded(file_profile):
+    """Vérifier que les données sont bien chargées : profil de Fuseki comparé à celui du fichier.
+
+    Retourne (succès, profil de Fuseki).
+    """
+    try:
+        live = DatasetProfile.from_live()
+    except (requests.RequestException, ValueError, KeyError) as e:
+        print(f"✗ Impossible de profiler le dataset: {str(e)}")
+        return False, None
+
+    all_loaded = live.triples == file_profile.triples
+    mark = "✓" if all_loaded else "✗"
+    print(f"{mark} Total des triplets dans Fuseki: {live.triples:,} (fichier: {file_profile.triples:,})")
+
+    print("\n📊 Vérification des entités par type (sous-classes comprises):")
+    print("-" * 60)
+    expected, loaded = file_profile.class_counts(), live.class_counts()
+    total_entities = 0
+    for entity_name, class_name in ENTITY_TYPES.items():
+        class_uri = ONTOLOGY_PREFIX + class_name
+        entity_count = loaded.get(class_uri, (0, 0))[1]
+        file_count = expected.get(class_uri, (0, 0))[1]
+        total_entities += entity_count
+        if entity_count == 0:
+            print(f"✗ {entity_name:30s}: {entity_count:3d} entité(s) - MANQUANT!")
+            all_loaded = False
+        elif entity_count != file_count:
+            print(f"✗ {entity_name:30s}: {entity_count:3d} entité(s) - {file_count} dans le fichier")
+            all_loaded = False
+        else:
+            print(f"✓ {entity_name:30s}: {entity_count:3d} entité(s)")
+    print("-" * 60)
+    print(f"📈 Total des entités chargées: {total_entities}")
+
+    print("\n🔍 Vérification des NamedIndividuals (toutes les instances):")
+    ni_count = loaded.get(str(OWL.NamedIndividual), (0, 0))[0]
+    print(f"  Total NamedIndividuals: {ni_count}")
+    if ni_count < 100:
+        print(f"  ⚠️  ATTENTION: Moins de 100 entités trouvées! (Attendu: ~141)")
+    return all_loaded, live
+
+def write_report(report, path):
+    """Rapport JSON dans `path`, ou sur la sortie standard sans chemin"""
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if not path:
+        print(text)
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text + '\n')
+    print(f"✓ Rapport de profilage écrit dans {path}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Chargement de l'ontologie Éducation Intelligente dans Fuseki")
+    parser.add_argument('file', nargs='?', default=DEFAULT_FILE, help="fichier RDF/XML ou N-Triples")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="triplets par lot")
+    parser.add_argument('--workers', type=int, default=WORKERS, help="envois simultanés")
+    parser.add_argument('--checkpoint', help="fichier de reprise (par défaut <fichier>.load-checkpoint.json)")
+    parser.add_argument('--restart', action='store_true', help="ignorer la reprise et recharger depuis le début")
+    parser.add_argument('--sync', action='store_true',
+                        help="appliquer seulement les différences avec la dernière version chargée, sans vider le dataset")
+    parser.add_argument('--prune', action='store_true',
+                        help="avec --sync : supprimer aussi les triplets du dataset absents du fichier")
+    parser.add_argument('--manifest', help="copie de la dernière version chargée (par défaut <fichier>.sync-manifest.nt.gz)")
+    parser.add_argument('--profile', action='store_true',
+                        help="profiler le fichier sans le charger (rapport JSON : classes, propriétés, littéraux)")
+    parser.add_argument('--live', action='store_true', help="avec --profile : profiler le dataset de Fuseki")
+    parser.add_argument('--report', help="écrire le rapport JSON de profilage dans ce fichier")
+    args = parser.parse_args()
+
+    if args.profile:
+        # Seul le rapport est écrit sur la sortie standard, pour pouvoir le rediriger
+        try:
+            profile = DatasetProfile.from_live() if args.live else DatasetProfile.from_file(args.file)
+        except (OSError, requests.RequestException) as e:
+            raise SystemExit(f"✗ Échec du profilage: {str(e)}")
+        write_report(profile.to_dict(), args.report)
+        return
+
     print("=" * 60)
     print("CHARGEMENT DE L'ONTOLOGIE ÉDUCATION INTELLIGENTE")
     print("=" * 60)
-    
+
     # Vérifier que le fichier existe
-    file_path = "../data/educationInfin.rdf"
-    import os
+    file_path = args.file
     if not os.path.exists(file_path):
         print(f"✗ Fichier non trouvé: {file_path}")
         print("Assurez-vous que le fichier RDF est dans le dossier 'data/'")
         return
-    
-    # Analyser le fichier RDF avant chargement
-    rdf_graph = analyze_rdf_file(file_path)
-    if rdf_graph is None:
-        print("✗ Impossible d'analyser le fichier RDF")
-        return
-    
+
     if not test_fuseki_connection():
         print("\nVeuillez démarrer Fuseki d'abord:")
         print("./fuseki-server")
         return
-    
-    # Vider le dataset
-    if not clear_dataset():
-        print("Échec du vidage du dataset")
+
+    manifest = Manifest(args.manifest or file_path + '.sync-manifest.nt.gz')
+    if args.sync:
+        if not manifest.exists() and not args.prune:
+            print("Pas de version précédente: seuls les triplets absents du dataset seront ajoutés")
+        print(f"\nSynchronisation de {file_path}...")
+        started = time.monotonic()
+        try:
+            deleted, inserted = sync_file(file_path, manifest, args.prune, args.chunk_size)
+        except (LoadError, requests.RequestException) as e:
+            print(f"✗ Échec de la synchronisation: {str(e)}")
+            print("Le dataset peut être partiellement synchronisé; relancez la même commande.")
+            return
+        print(f"✓ {deleted:,} triplet(s) supprimé(s), {inserted:,} ajouté(s) en {time.monotonic() - started:.1f}s")
+        if deleted or inserted:
+            refresh_api()
         return
-    
-    # Attendre un peu après le vidage
-    time.sleep(2)
-    
-    # Essayer la méthode d'upload direct d'abord (plus rapide)
-    print("\n1. Tentative de chargement par upload direct...")
-    if load_ontology_to_fuseki_batch(file_path):
-        print("✓ Méthode upload direct réussie!")
+
+    checkpoint = Checkpoint(args.checkpoint or file_path + '.load-checkpoint.json', file_path, args.chunk_size)
+    if not args.restart and checkpoint.load():
+        print(f"↻ Reprise du chargement: {len(checkpoint.done)} lot(s), {checkpoint.triples:,} triplets déjà chargés")
     else:
-        print("✗ Échec de l'upload direct, tentative avec SPARQL INSERT...")
-        if not load_ontology_to_fuseki_sparql(file_path):
-            print("✗ Échec de toutes les méthodes de chargement")
+        # Vider le dataset
+        if not clear_dataset():
+            print("Échec du vidage du dataset")
             return
-    
+        checkpoint.start()
+
+    print(f"\nChargement de {file_path} (lots de {args.chunk_size:,} triplets, {args.workers} envois simultanés)...")
+    file_profile = DatasetProfile(file_path)
+    manifest_writer = manifest.writer()
+    started = time.monotonic()
+    try:
+        triples, uploaded = load_file(file_path, checkpoint, args.chunk_size, args.workers, [file_profile, manifest_writer])
+    except LoadError as e:
+        manifest.discard()
+        print(f"✗ Échec du chargement: {str(e)}")
+        print("Relancez la même commande pour reprendre à partir des lots déjà chargés.")
+        return
+    elapsed = time.monotonic() - started
+    print(f"✓ {triples:,} triplets lus, {uploaded:,} envoyés en {elapsed:.1f}s "
+          f"({triples / max(elapsed, 1e-6):,.0f} triplets/s)")
+    checkpoint.remove()
+    # Base des prochaines synchronisations (--sync)
+    manifest_writer.close()
+    manifest.commit()
+    file_profile.close()
+    file_profile.report("Entités trouvées dans le fichier RDF")
+
     # Vérification finale
     print("\n" + "=" * 60)
     print("VÉRIFICATION FINALE - TOUS LES TYPES D'ENTITÉS")
     print("=" * 60)
-    
-    if verify_data_loaded():
+
+    loaded, live = verify_data_loaded(file_profile)
+    refresh_api()
+    if args.report:
+        write_report({'file': file_profile.to_dict(), 'fuseki': live.to_dict() if live else None}, args.report)
+    if loaded:
         print("\n🎉 CHARGEMENT TERMINÉ AVEC SUCCÈS!")
         print(f"\nURL de l'interface Fuseki: {FUSEKI_ENDPOINT}")
         print(f"Dataset: {FUSEKI_DATASET}")
@@ -457,4 +976,4 @@ def main():
         print("Vérifiez les logs ci-dessus pour plus de détails.")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()